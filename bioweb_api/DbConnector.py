@@ -20,10 +20,13 @@ limitations under the License.
 #===============================================================================
 # Imports
 #===============================================================================
-from pymongo import MongoClient
+import math
+
+from pymongo import MongoClient, UpdateOne
 from pymongo.results import BulkWriteResult
 
 from . import DATABASE_URL, DATABASE_PORT, DATABASE_NAME
+from .EnumRegistry import EnumRegistry
 
 #=============================================================================
 # Connect to MongoDB
@@ -31,6 +34,8 @@ from . import DATABASE_URL, DATABASE_PORT, DATABASE_NAME
 _CLIENT = MongoClient(DATABASE_URL, DATABASE_PORT, connect=False)
 _DB     = _CLIENT[DATABASE_NAME]
 
+_ENUM_REGISTRY = EnumRegistry.Instance()
+
 #===============================================================================
 # Class
 #===============================================================================
@@ -38,7 +43,8 @@ class DbConnector(object):
     '''
     This class is intended to be a singleton. It handles communication (i.e.
     queries) with MongoDB. Every call to the _DB should go through this
-    class.
+    class. Writes mark any EnumRegistry enums derived from the written
+    collection stale.
     '''
     _INSTANCE = None
 
@@ -77,12 +83,15 @@ class DbConnector(object):
         @return WriteResult - a standard Mongo result object.
         '''
         if len(records) > 0:
-            return _DB[collection].insert(records)
+            result = _DB[collection].insert(records)
+            _ENUM_REGISTRY.invalidate(collection)
+            return result
         else:
             return BulkWriteResult({ "nInserted" : 0 })
 
     @staticmethod
-    def find(collection, criteria, projection=None):
+    def find(collection, criteria, projection=None, sort=None, skip=0,
+             limit=0):
         '''
         This function performs a MongoDB find. The find command signature is
         db.collection.find(<criteria>, <projection>). Criteria are the search
@@ -93,10 +102,63 @@ class DbConnector(object):
         @param criteria   - Dictionary of search terms. Empty dictionary or None
                             to return all records.
         @param projection - Array of field names to return. None to return all.
+        @param sort       - List of (field name, direction) tuples. None to
+                            return records in natural order.
+        @param skip       - Number of records to skip.
+        @param limit      - Maximum number of records to return. 0 to return
+                            all.
 
         @return List of records - empty list if no records are found.
         '''
-        return list(_DB[collection].find(criteria, projection))
+        return list(DbConnector.find_iter(collection, criteria, projection,
+                                          sort, skip, limit))
+
+    @staticmethod
+    def find_iter(collection, criteria, projection=None, sort=None, skip=0,
+                  limit=0):
+        '''
+        Same as find, except that an iterator over the records is returned
+        rather than a list. Records are retrieved from MongoDB in batches as
+        the iterator is consumed, so large results aren't held in memory.
+
+        @return Iterator over records.
+        '''
+        cursor = _DB[collection].find(criteria, projection, skip=skip,
+                                      limit=limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor
+
+    @classmethod
+    def find_page(cls, collection, criteria, projection, sort, page,
+                  page_size):
+        '''
+        Retrieve a single page of the records meeting the provided criteria.
+        Sort should end with a unique field (e.g. _id) so that pages are
+        stable.
+
+        @param collection - Name of collection to perform find on.
+        @param criteria   - Dictionary of search terms.
+        @param projection - Fields to return. None to return all.
+        @param sort       - List of (field name, direction) tuples.
+        @param page       - Page to return, starting at 1.
+        @param page_size  - Number of records per page.
+
+        @return Tuple of (records, (page, page_size, num_pages)), the second
+                element being the pagination info expected by process_request.
+        '''
+        num_records = cls.count(collection, criteria)
+        num_pages   = max(1, int(math.ceil(num_records / float(page_size))))
+        records     = cls.find(collection, criteria, projection, sort=sort,
+                               skip=(page - 1) * page_size, limit=page_size)
+        return records, (page, page_size, num_pages)
+
+    @staticmethod
+    def count(collection, criteria):
+        '''
+        Count the records meeting the provided criteria.
+        '''
+        return _DB[collection].count(criteria)
 
     @staticmethod
     def find_one(collection, field_name, field_value):
@@ -112,6 +174,20 @@ class DbConnector(object):
         '''
         return _DB[collection].find_one({field_name: field_value})
 
+    @staticmethod
+    def exists(collection, criteria):
+        '''
+        Determine whether at least one record meets the provided criteria.
+        Only the _id of the first match is fetched, so this is cheap when the
+        criteria fields are indexed.
+
+        @param collection - Name of collection to perform find on.
+        @param criteria   - Dictionary of search terms.
+
+        @return True if a matching record exists, False otherwise.
+        '''
+        return _DB[collection].find_one(criteria, {"_id": 1}) is not None
+
     @staticmethod
     def find_max(collection, field_name):
         """
@@ -163,17 +239,72 @@ class DbConnector(object):
             return sorted(filter(lambda x: x is not None,
                                  cls.distinct(collection, column_name)))
 
+    @staticmethod
+    def create_index(collection, keys, **kwargs):
+        '''
+        Create an index on the provided collection if it doesn't already exist.
+
+        @param collection - Name of collection to index.
+        @param keys       - Field name or list of (field name, direction)
+                            tuples.
+        @param kwargs     - Index options (e.g. unique=True, sparse=True).
+
+        @return Name of the index.
+        '''
+        return _DB[collection].create_index(keys, **kwargs)
+
     @staticmethod
     def remove(collection, criteria, parameters={}):
-        return _DB[collection].remove(criteria, parameters)
+        result = _DB[collection].remove(criteria, parameters)
+        _ENUM_REGISTRY.invalidate(collection)
+        return result
+
+    @staticmethod
+    def update(collection, query, update, upsert=False):
+        _DB[collection].update(query, update, upsert=upsert)
+        _ENUM_REGISTRY.invalidate(collection)
 
     @staticmethod
-    def update(collection, query, update):
-        _DB[collection].update(query, update)
+    def bulk_write(collection, requests, ordered=False):
+        '''
+        Perform write operations (e.g. pymongo InsertOne and UpdateOne) in a
+        single bulk write. Unordered writes are sent in as few round trips as
+        possible and a failed operation doesn't stop the remaining ones.
+
+        @param collection   - Name of collection to write to.
+        @param requests     - List of write operations.
+        @param ordered      - Perform the operations in order, stopping at the
+                              first error.
+
+        @return BulkWriteResult, or None if requests is empty.
+        '''
+        if not requests:
+            return None
+        result = _DB[collection].bulk_write(requests, ordered=ordered)
+        _ENUM_REGISTRY.invalidate(collection)
+        return result
+
+    @classmethod
+    def bulk_upsert(cls, collection, keys, records):
+        '''
+        Insert records, or update the existing records with the same values of
+        the key fields, in a single unordered bulk write.
+
+        @param collection   - Name of collection to write to.
+        @param keys         - List of field names that identify a record.
+        @param records      - List of documents to upsert.
+
+        @return BulkWriteResult, or None if records is empty.
+        '''
+        requests = [UpdateOne(dict((k, record[k]) for k in keys),
+                              {"$set": record}, upsert=True)
+                    for record in records]
+        return cls.bulk_write(collection, requests)
 
     @staticmethod
     def save(collection, document):
         _DB[collection].save(document)
+        _ENUM_REGISTRY.invalidate(collection)
 
 #===========================================================================
 # Ensure the initial instance is created.
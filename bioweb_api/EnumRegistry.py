@@ -0,0 +1,206 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#===============================================================================
+# Imports
+#===============================================================================
+import itertools
+import threading
+import time
+
+from . import ENUM_CACHE_TTL, ENUM_MISS_REFRESH_INTERVAL
+
+#===============================================================================
+# Private Classes
+#===============================================================================
+class _Entry(object):
+    '''
+    Registry bookkeeping for a single enum: the loader that produces its
+    values, the collections the values are derived from, the currently
+    loaded values along with their version and load time, and an event set
+    when a load in progress finishes.
+    '''
+    __slots__ = ['loader', 'collections', 'values', 'version', 'loaded_at',
+                 'stale', 'refreshed_at', 'loading']
+
+    def __init__(self, loader, collections):
+        self.loader       = loader
+        self.collections  = frozenset(collections)
+        self.values       = None
+        self.version      = None
+        self.loaded_at    = 0
+        self.stale        = True
+        self.refreshed_at = 0
+        self.loading      = None
+
+#===============================================================================
+# Classes
+#===============================================================================
+class RegisteredEnum(object):
+    '''
+    Handle to an enum held by the EnumRegistry. Parameters are given one of
+    these in place of a list of valid values, so a parameter can be built
+    once and still validate against current database contents.
+    '''
+    def __init__(self, registry, key):
+        self._registry = registry
+        self._key      = key
+
+    @property
+    def key(self):
+        return self._key
+
+    def snapshot(self):
+        '''
+        Return a (version, values) tuple. The version changes every time the
+        values are reloaded, so callers can cache anything derived from the
+        values until the version changes.
+        '''
+        return self._registry.snapshot(self._key)
+
+    def refresh(self):
+        '''
+        Reload the values on next access, e.g. when a value isn't found. See
+        EnumRegistry.refresh.
+        '''
+        self._registry.refresh(self._key)
+
+class EnumRegistry(object):
+    '''
+    This class is intended to be a singleton. It caches enums (e.g. archive
+    names, dyes, job UUIDs) that are expensive to derive from MongoDB so that
+    they aren't recomputed for every API request. Each enum is reloaded when
+    it is older than ttl seconds, or when one of the collections it is derived
+    from is invalidated (DbConnector invalidates a collection every time it
+    writes to it). Values are loaded outside the registry lock, so a slow
+    loader only holds up requests for its own enum, and requests for an
+    enum being loaded wait for that load rather than starting another.
+    '''
+    _INSTANCE = None
+
+    #===========================================================================
+    # Constructor
+    #===========================================================================
+    def __init__(self, ttl=ENUM_CACHE_TTL,
+                 refresh_interval=ENUM_MISS_REFRESH_INTERVAL):
+        # Enforce that it's a singleton
+        if self._INSTANCE:
+            raise Exception("%s is a singleton and should be accessed through the Instance method." % self.__class__.__name__)
+
+        self._ttl              = ttl
+        self._refresh_interval = refresh_interval
+        self._entries          = {}
+        self._versions         = itertools.count(1)
+        self._lock             = threading.RLock()
+
+    @classmethod
+    def Instance(cls):
+        if not cls._INSTANCE:
+            cls._INSTANCE = EnumRegistry()
+        return cls._INSTANCE
+
+    #===========================================================================
+    # Public methods
+    #===========================================================================
+    def register(self, key, collections, loader):
+        '''
+        Register an enum. Registering an existing key is a no-op and returns a
+        handle to the existing enum.
+
+        @param key         - Unique name of the enum.
+        @param collections - Collections the enum values are derived from.
+        @param loader      - Function that takes no arguments and returns the
+                             list of enum values.
+
+        @return RegisteredEnum handle.
+        '''
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _Entry(loader, collections)
+        return RegisteredEnum(self, key)
+
+    def snapshot(self, key):
+        '''
+        Return a (version, values) tuple for the provided enum, reloading the
+        values first if they are stale or expired. If another thread is
+        already reloading them, wait for it instead.
+        '''
+        while True:
+            with self._lock:
+                entry = self._entries[key]
+                if not entry.stale and \
+                   time.time() - entry.loaded_at <= self._ttl:
+                    return entry.version, entry.values
+                loading = entry.loading
+                if loading is None:
+                    # Invalidations made while loading mark it stale again
+                    entry.loading = threading.Event()
+                    entry.stale   = False
+                    break
+            loading.wait()
+
+        try:
+            loaded_at = time.time()
+            values    = list(entry.loader())
+            with self._lock:
+                entry.values    = values
+                entry.version   = next(self._versions)
+                entry.loaded_at = loaded_at
+                return entry.version, entry.values
+        except:
+            with self._lock:
+                entry.stale = True
+            raise
+        finally:
+            with self._lock:
+                loading, entry.loading = entry.loading, None
+            loading.set()
+
+    def values(self, key):
+        ''' Return the current values of the provided enum. '''
+        return self.snapshot(key)[1]
+
+    def refresh(self, key):
+        '''
+        Mark the provided enum stale, e.g. because a value wasn't found and
+        may have been written by another process. Enums are refreshed at most
+        once every refresh_interval seconds, so requests for values that don't
+        exist can't reload an enum on every request.
+        '''
+        with self._lock:
+            entry = self._entries[key]
+            now   = time.time()
+            if now - entry.refreshed_at >= self._refresh_interval:
+                entry.refreshed_at = now
+                entry.stale        = True
+
+    def invalidate(self, collection):
+        '''
+        Mark every enum derived from the provided collection stale. Values
+        are reloaded lazily, so this is cheap enough to call on every write.
+        '''
+        with self._lock:
+            for entry in self._entries.itervalues():
+                if collection in entry.collections:
+                    entry.stale = True
+
+#===========================================================================
+# Ensure the initial instance is created.
+#===========================================================================
+EnumRegistry.Instance()
@@ -27,6 +27,7 @@ PLATES_UPLOAD_PATH           = app.config['PLATES_UPLOAD_PATH']
 RESULTS_PATH                 = app.config['RESULTS_PATH']
 REFS_PATH                    = app.config['REFS_PATH']
 TMP_PATH                     = app.config['TMP_PATH']
+EXP_DEF_CACHE_PATH           = app.config['EXP_DEF_CACHE_PATH']
 TORNADO_LOG_FILE_PREFIX      = app.config['TORNADO_LOG_FILE_PREFIX']
 MAX_WORKERS                  = app.config['MAX_WORKERS']
 ARCHIVES_PATH                = app.config['ARCHIVES_PATH']
@@ -55,6 +56,29 @@ IMAGES_COLLECTION            = app.config['IMAGES_COLLECTION']
 RUN_REPORT_COLLECTION        = app.config['RUN_REPORT_COLLECTION']
 EXP_DEF_COLLECTION           = app.config['EXP_DEF_COLLECTION']
 SA_EXPLORATORY_COLLECTION    = app.config['SA_EXPLORATORY_COLLECTION']
+JOB_QUEUE_COLLECTION         = app.config['JOB_QUEUE_COLLECTION']
+INDEX_STATUS_COLLECTION      = app.config['INDEX_STATUS_COLLECTION']
+FOLDER_STAMPS_COLLECTION     = app.config['FOLDER_STAMPS_COLLECTION']
 DAYS_TO_EXPIRE               = app.config['DAYS_TO_EXPIRE']
+ENUM_CACHE_TTL               = app.config['ENUM_CACHE_TTL']
+ENUM_MISS_REFRESH_INTERVAL   = app.config['ENUM_MISS_REFRESH_INTERVAL']
+DYE_PROFILE_CACHE_TTL        = app.config['DYE_PROFILE_CACHE_TTL']
+EXP_DEF_NAMES_TTL            = app.config['EXP_DEF_NAMES_TTL']
+MAX_PAGE_SIZE                = app.config['MAX_PAGE_SIZE']
+COPY_ARCHIVES                = app.config['COPY_ARCHIVES']
+INDEX_REFRESH_INTERVAL       = app.config['INDEX_REFRESH_INTERVAL']
+INDEX_WORKERS                = app.config['INDEX_WORKERS']
+WSGI_THREADS                 = app.config['WSGI_THREADS']
+ENDPOINT_CONCURRENCY_LIMITS  = app.config['ENDPOINT_CONCURRENCY_LIMITS']
+STREAMED_UPLOAD_PATHS        = app.config['STREAMED_UPLOAD_PATHS']
+REPLAY_GZIP_LEVEL            = app.config['REPLAY_GZIP_LEVEL']
+REPLAY_GZIP_THREADS          = app.config['REPLAY_GZIP_THREADS']
+LIBRARY_DESIGN_WORKERS       = app.config['LIBRARY_DESIGN_WORKERS']
+LIBRARY_DESIGN_TIME_BUDGET   = app.config['LIBRARY_DESIGN_TIME_BUDGET']
+LIBRARY_DESIGN_CACHE_SIZE    = app.config['LIBRARY_DESIGN_CACHE_SIZE']
+DROP_SIZE_WORKERS            = app.config['DROP_SIZE_WORKERS']
+DROP_SIZE_TIMEOUT            = app.config['DROP_SIZE_TIMEOUT']
+REPORT_WORKERS               = app.config['REPORT_WORKERS']
+REPORT_SECTION_TIMEOUT       = app.config['REPORT_SECTION_TIMEOUT']
 
 from . import controller
@@ -95,6 +95,10 @@ class AbstractDeleteJobFunction(AbstractDeleteFunction):
                                 "database: %s" % result)
             APP_LOGGER.info("Successfully deleted the following jobs: %s" \
                             % ",".join(uuids))
+
+            # Don't run deleted jobs that haven't started yet
+            for uuid in response["deleted"]:
+                cls._EXECUTION_MANAGER.cancel(uuid)
         else:
             http_status_code = 404
             
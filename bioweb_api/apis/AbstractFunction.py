@@ -40,6 +40,9 @@ class AbstractFunction(object):
     _DB_CONNECTOR = DbConnector.Instance()
     _EXECUTION_MANAGER = ExecutionManager.Instance()
     
+    # Parameters built by each function class, keyed by class
+    _PARAMETERS = {}
+    
     #===========================================================================
     # Constructor
     #===========================================================================    
@@ -47,7 +50,7 @@ class AbstractFunction(object):
     Ensure parameter name/alias pair are unique in the parameters list.
     '''
     def __init__(self):
-        dups = [x for x, y in Counter([p.name + p.alias for p in self.parameters()]).items() if y > 1]
+        dups = [x for x, y in Counter([p.name + p.alias for p in self._get_parameters()]).items() if y > 1]
         if len(dups) > 0:
             raise Exception("Duplicate parameters not allowed: %s" % ", ".join(dups))
     
@@ -219,7 +222,7 @@ class AbstractFunction(object):
         indicating that they are parsed from the path rather than being 
         provided by the request object (by calling request.args.getlist(alias)).
         '''
-        return filter(lambda p: p.is_path(), cls.parameters())
+        return filter(lambda p: p.is_path(), cls._get_parameters())
     
     @staticmethod
     def static_path_fields():
@@ -236,6 +239,17 @@ class AbstractFunction(object):
         '''
         return list()
     
+    @classmethod
+    def _get_parameters(cls):
+        '''
+        Parameters are built once per function class rather than on every
+        request. Parameters whose enums are derived from the database are 
+        given a RegisteredEnum, so they stay current without being rebuilt.
+        '''
+        if cls not in cls._PARAMETERS:
+            cls._PARAMETERS[cls] = cls.parameters()
+        return cls._PARAMETERS[cls]
+    
     @classmethod
     def _parse_query_params(cls, query_params):
         '''
@@ -253,7 +267,7 @@ class AbstractFunction(object):
         
         _format = FORMATS.json                              # @UndefinedVariable
         
-        parameters = cls.parameters()
+        parameters = cls._get_parameters()
         
         for parameter in parameters:
             # Path parameters are parsed in _handle_path_fields()
@@ -306,7 +320,7 @@ class AbstractFunction(object):
         operation["nickname"]   = self.name()
         operation["parameters"] = list()
         operation["responseMessages"] = self.response_messages()
-        for param in self.parameters():
+        for param in self._get_parameters():
             operation["parameters"].append(param.getParameterDict())
         function["operations"].append(operation)
         return function
\ No newline at end of file
@@ -20,12 +20,26 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
+import itertools
+
 from abc import ABCMeta
-from flask import jsonify, make_response
+from flask import jsonify, json, make_response, Response, stream_with_context
 
 from bioweb_api.apis.AbstractFunction import AbstractFunction 
 from bioweb_api.apis.ApiConstants import FORMATS, MISSING_VALUE, METHODS
-from bioweb_api.utilities.io_utilities import make_clean_response
+from bioweb_api.utilities.io_utilities import clean_item
+from bioweb_api.utilities.logging_utilities import APP_LOGGER
+
+#=============================================================================
+# Private Global Variables
+#=============================================================================
+_JSON_MIMETYPE = "application/json"
+
+# Sentinel returned by next() when process_request returns no items
+_NO_ITEMS      = object()
+
+# Number of output chunks generated before the response is started
+_FIRST_BATCH   = 200
 
 #=============================================================================
 # Class
@@ -49,6 +63,13 @@ class AbstractGetFunction(AbstractFunction):
         "sequence": "bar"} and path_fields would be [<user>]. After collecting 
         input parameters, call process_request(). Then return the results in the 
         requested format.
+
+        The items returned by process_request may be a list or an iterator
+        (e.g. a MongoDB cursor). Either way the response is streamed, one item
+        at a time, so the whole response is never held in memory. The first
+        batch is generated before the response is started, so errors reading
+        or cleaning it are raised here rather than after the 200 is sent.
+        Errors raised once the response has started are logged.
         '''
         (params_dict, _format) = cls._parse_query_params(query_params)
         cls._handle_path_fields(path_fields, params_dict)
@@ -58,42 +79,91 @@ class AbstractGetFunction(AbstractFunction):
         if items is None:
             return make_response(jsonify({"error": "Operation failed."}), 500)
 
-        dict_items = False        
-        if len(items) > 0:
-            if isinstance(items[0], dict):
-                dict_items = True
+        # Peek at the first item to determine whether items are records
+        items = iter(items)
+        first = next(items, _NO_ITEMS)
+        if first is _NO_ITEMS:
+            items = iter([])
+        else:
+            items = itertools.chain([first], items)
+        dict_items = isinstance(first, dict)
         
         if _format == FORMATS.json:                         # @UndefinedVariable
-            response = {cls.name(): items}
-            return make_clean_response(response, 200), _format, page_info
+            output   = cls._generate_json_output(items)
+            mimetype = _JSON_MIMETYPE
         elif _format == FORMATS.tsv:                        # @UndefinedVariable
             if dict_items:
-                return cls._generate_delimited_output(items, "\t", column_names), _format, page_info
+                output = cls._generate_delimited_output(items, "\t", column_names)
             else:
-                tsv = cls.name()
-                for item in items:
-                    tsv += "\n" + item
-                return make_response(tsv, 200), _format, page_info
+                output = cls._generate_lines(items)
+            mimetype = None
         elif _format == FORMATS.csv:                        # @UndefinedVariable
             if dict_items:
-                return cls._generate_delimited_output(items, ",", column_names), _format, page_info
+                output = cls._generate_delimited_output(items, ",", column_names)
             else:
-                csv = cls.name()
-                for item in items:
-                    csv += "\n" + item
-                return make_response(csv, 200), _format, page_info
+                output = cls._generate_lines(items)
+            mimetype = None
         else:
             raise Exception("Unrecognized output format: %s." % _format)
+
+        first_batch = list(itertools.islice(output, _FIRST_BATCH))
+        output      = itertools.chain(first_batch,
+                                      cls._log_errors(output))
+        response = Response(stream_with_context(output), 200,
+                            mimetype=mimetype)
+        for header, value in cls.response_headers().iteritems():
+            response.headers[header] = value
+        return response, _format, page_info
+
+    @classmethod
+    def response_headers(cls):
+        '''
+        Return a dictionary of additional headers to include in the response.
+        '''
+        return {}
         
     #===========================================================================
     # Helper Methods
     #===========================================================================    
+    @classmethod
+    def _log_errors(cls, output):
+        '''
+        Yield the chunks of output, logging any error raised generating them.
+        These are raised after the response has started, so the client only
+        sees a truncated response.
+        '''
+        try:
+            for chunk in output:
+                yield chunk
+        except Exception:
+            APP_LOGGER.exception("Error streaming %s response." % cls.name())
+            raise
+
+    @classmethod
+    def _generate_json_output(cls, items):
+        '''
+        This method converts items into JSON output of the form 
+        {<name>: [<item>, ...]}, yielding one item at a time. Each item is 
+        cleaned (see clean_item) as it is serialized.
+        '''
+        yield '{%s: [' % json.dumps(cls.name())
+        for i, item in enumerate(items):
+            if i > 0:
+                yield ", "
+            yield json.dumps(clean_item(item))
+        yield "]}"
+
     @classmethod
     def _generate_delimited_output(cls, records, delimiter, column_names=None):
-        ''' This method converts records into TSV or CSV output formats. '''
+        ''' 
+        This method converts records into TSV or CSV output formats, yielding
+        one line at a time. If column_names isn't provided, it is derived from
+        the attributes of every record, so records are read into memory first.
+        '''
         if column_names is None:
+            records      = list(records)
             column_names = cls._get_unique_attributes_sorted(records)
-        delimited_output = delimiter.join(column_names)
+        yield delimiter.join(column_names)
         for record in records:
             fields = list()
             for column_name in column_names:
@@ -101,8 +171,14 @@ class AbstractGetFunction(AbstractFunction):
                     fields.append(str(record[column_name]))
                 else:
                     fields.append(MISSING_VALUE)
-            delimited_output += "\n" + delimiter.join(fields)
-        return delimited_output
+            yield "\n" + delimiter.join(fields)
+
+    @classmethod
+    def _generate_lines(cls, items):
+        ''' This method outputs the name followed by one item per line. '''
+        yield cls.name()
+        for item in items:
+            yield "\n" + item
     
     @staticmethod
     def _get_unique_attributes_sorted(records):
@@ -0,0 +1,166 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+from abc import ABCMeta
+
+from bioweb_api import MAX_PAGE_SIZE
+from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
+from bioweb_api.apis.ApiConstants import ID, JOB_NAME, STATUS, \
+    SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP
+from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+
+#=============================================================================
+# Public Global Variables
+#=============================================================================
+SORT_FIELDS  = [SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP, JOB_NAME,
+                STATUS]
+DEFAULT_SORT = SUBMIT_DATESTAMP
+
+#=============================================================================
+# Class
+#=============================================================================
+class AbstractGetJobFunction(AbstractGetFunction):
+    '''
+    Base class for GET functions that list the jobs in a job collection. Jobs
+    can be filtered by status and submit date, sorted, paginated and
+    restricted to a subset of fields. Paginated responses include Link headers
+    to the first, previous, next and last pages.
+    '''
+    __metaclass__ = ABCMeta
+
+    #===========================================================================
+    # Abstract Class Methods
+    #===========================================================================
+    @staticmethod
+    def notes():
+        return ""
+
+    @classmethod
+    def get_collection(cls):
+        '''
+        Retrieve the name of the collection
+        '''
+        raise NotImplementedError("AbstractGetJobFunction subclass must " \
+                                  "implement get_collection method.")
+
+    @classmethod
+    def get_columns(cls):
+        '''
+        Retrieve a list of the fields returned for each job, in the order in
+        which they are displayed when output format is TSV or CSV. Return None
+        to return every field of each job.
+        '''
+        raise NotImplementedError("AbstractGetJobFunction subclass must " \
+                                  "implement get_columns method.")
+
+    #===========================================================================
+    # Overridden Methods
+    #===========================================================================
+    @classmethod
+    def parameters(cls):
+        cls.page_param      = ParameterFactory.page()
+        cls.page_size_param = ParameterFactory.page_size()
+        cls.sort_param      = ParameterFactory.sort(SORT_FIELDS, DEFAULT_SORT)
+        cls.since_param     = ParameterFactory.since()
+        cls.status_param    = ParameterFactory.job_status()
+        cls.fields_param    = ParameterFactory.fields(cls.get_columns())
+        parameters = [
+                      cls.page_param,
+                      cls.page_size_param,
+                      cls.sort_param,
+                      cls.since_param,
+                      cls.status_param,
+                      cls.fields_param,
+                      ParameterFactory.format(),
+                     ]
+        return parameters
+
+    @classmethod
+    def process_request(cls, params_dict):
+        return cls.find_jobs(params_dict)
+
+    #===========================================================================
+    # Helper Methods
+    #===========================================================================
+    @classmethod
+    def find_jobs(cls, params_dict, criteria=None):
+        '''
+        Retrieve the jobs selected by the provided parameters.
+
+        @param params_dict - Parsed parameters.
+        @param criteria    - Dictionary of additional search terms.
+
+        @return Tuple of (jobs, column_names, page_info) as expected from
+                process_request. Jobs is a list if paginated, otherwise an
+                iterator.
+        '''
+        criteria = dict(criteria or {})
+        if cls.status_param in params_dict:
+            criteria[STATUS] = {"$in": params_dict[cls.status_param]}
+        if cls.since_param in params_dict:
+            criteria[SUBMIT_DATESTAMP] = {"$gte": params_dict[cls.since_param][0]}
+
+        column_names = cls.get_columns()
+        if cls.fields_param in params_dict:
+            fields = params_dict[cls.fields_param]
+            if column_names is not None:
+                # Keep the display order of the columns
+                column_names = [c for c in column_names if c in fields]
+            else:
+                column_names = fields
+
+        projection = {ID: 0}
+        if column_names is not None:
+            projection.update((c, 1) for c in column_names)
+
+        # Unpaginated requests are only sorted if a sort was requested
+        sort = None
+        if cls.sort_param in params_dict or cls.page_size_param in params_dict:
+            sort_by   = params_dict.get(cls.sort_param, [DEFAULT_SORT])[0]
+            direction = 1
+            if sort_by.startswith("-"):
+                sort_by, direction = sort_by[1:], -1
+            # Break ties on _id so pages are stable
+            sort = [(sort_by, direction), (ID, direction)]
+
+        if cls.page_size_param in params_dict:
+            page      = params_dict.get(cls.page_param, [1])[0]
+            page_size = min(params_dict[cls.page_size_param][0], MAX_PAGE_SIZE)
+            jobs, page_info = cls._DB_CONNECTOR.find_page(cls.get_collection(),
+                                                          criteria, projection,
+                                                          sort, page, page_size)
+        else:
+            # Unpaginated results can be large, so they're streamed from the
+            # cursor rather than read into memory
+            jobs      = cls._DB_CONNECTOR.find_iter(cls.get_collection(),
+                                                    criteria, projection,
+                                                    sort=sort)
+            page_info = None
+
+        return (jobs, column_names, page_info)
+
+#===============================================================================
+# Run Main
+#===============================================================================
+if __name__ == "__main__":
+    function = AbstractGetJobFunction()
+    print function
@@ -100,6 +100,7 @@ ARCHIVES         = "archives"
 AC_METHOD        = 'ac_method'
 BEST_EXIST_JOB   = "best_existing_job"
 CARTRIDGE_SN     = 'cart_serial'
+CHECKSUM         = "checksum"
 CHR_NUM          = "chr_num"
 CHR_START        = "chr_start"
 CHR_STOP         = "chr_stop"
@@ -139,6 +140,7 @@ EXPLORATORY      = "EXPLORATORY"
 FA_JOB_START_DATESTAMP = 'fa_job_start_datestamp'
 FAIL             = "fail"
 FAILED           = 'failed'
+FIELDS           = "fields"
 FILE             = "file"
 FILENAME         = "filename"
 FILENAMES        = "filenames"
@@ -187,6 +189,8 @@ PA_DOCUMENT      = 'pa_document'
 PA_MIN_NUM_IMAGES = 10 # Minimum number of images required to run
 PA_PROCESS_UUID  = "pa_process_uuid"
 PAGE             = "page"
+PAGE_SIZE        = "page_size"
+PARAM_KEYS       = "param_keys"
 PASS             = "pass"
 PDF              = "pdf"
 PDF_URL          = "pdf_url"
@@ -199,6 +203,7 @@ PNG_SUM          = "png_sum"
 PNG_SUM_URL      = "png_sum_url"
 PROBE            = "probe"
 PROBES           = "probes"
+PROGRESS         = "progress"
 REPLAY           = "replay"
 REPORT           = "report"
 REPORT_URL       = "report_url"
@@ -214,10 +219,13 @@ SAMPLE_ID        = "sample_id"
 SCATTER_PLOT     = "scatter_plot"
 SCATTER_PLOT_URL = "scatter_plot_url"
 SEQUENCE_NAME    = "sequence_name"
+SINCE            = "since"
 SEQUENCING       = "SEQUENCING"
 SNP_SEARCH_NAME  = 'snp_search_name'
+SORT             = "sort"
 SQ_DOCUMENT      = "sq_document"
 STACK_TYPE       = "stack_type"
+STAGE_KEY        = "stage_key"
 START_DATESTAMP  = "start_datestamp"
 STATUS           = "status"
 STRICT           = "strict"
@@ -227,6 +235,7 @@ SUCCEEDED        = 'succeeded'
 TAGS             = 'tags'
 TARGETS          = "targets"
 TEMPORAL_PLOT_URL = 'temporal_plot_url'
+TIME_BUDGET      = "time_budget"
 TOTAL_VOL        = "total_vol"
 TYPE             = "type"
 URL              = "url"
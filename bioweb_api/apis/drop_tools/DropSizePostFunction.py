@@ -25,6 +25,7 @@ import traceback
 
 from datetime import datetime
 import numpy
+import time
 from uuid import uuid4
 
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
@@ -103,15 +104,22 @@ class DropSizePostFunction(AbstractPostFunction):
                 nlvls.append(nlvl)
                 intensities.append((low, high))
 
+            # seconds taken by each stage
+            timings = dict()
+            start = time.time()
             centroids = make_centroids(nlvls, intensities)
+            timings['make_centroids'] = time.time() - start
+            start = time.time()
             clusters = make_clusters(centroids, drop_ave=drop_ave, drop_std=drop_std)
-            collisions = check_collision(clusters)
+            timings['make_clusters'] = time.time() - start
+            collisions = check_collision(clusters, timings=timings)
 
             json_response[DROP_AVE_DIAMETER]     = drop_ave
             json_response[DROP_STD_DIAMETER]     = drop_std
             json_response[DYE_METRICS]  = map(list, dye_metrics)
             json_response['collisions'] = collisions
             json_response['nclusters']  = numpy.product(nlvls)
+            json_response['timings']    = timings
 
         except IOError:
             APP_LOGGER.exception(traceback.format_exc())
@@ -26,11 +26,11 @@ import traceback
 
 from datetime import datetime
 
-from bioweb_api import HOSTNAME, PORT
+from bioweb_api import HOSTNAME, PORT, LIBRARY_DESIGN_TIME_BUDGET
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import ERROR, DATESTAMP, NBARCODES, MIX_VOL, \
-    TOTAL_VOL, DESIGN, NDYES, PICO1_DYE
+    TOTAL_VOL, DESIGN, NDYES, PICO1_DYE, TIME_BUDGET
 from bioweb_api.utilities.io_utilities import make_clean_response
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.apis.drop_tools.library_generation_utilities import LibraryDesign
@@ -79,6 +79,11 @@ class GenerateLibraryPostFunction(AbstractPostFunction):
         cls._pico1_dye_param = ParameterFactory.cs_string(PICO1_DYE,
                                                           'Picoinjection 1 dye',
                                                           required=False)
+        cls._time_budget_param = ParameterFactory.float(TIME_BUDGET,
+                                                'Float specifying the seconds to spend searching for designs, '
+                                                'the best designs found in this time are returned',
+                                                default=float(LIBRARY_DESIGN_TIME_BUDGET),
+                                                required=False)
         parameters = [
                       cls._dyes_lots_param,
                       cls._ndyes_param,
@@ -86,6 +91,7 @@ class GenerateLibraryPostFunction(AbstractPostFunction):
                       cls._mix_volume_param,
                       cls._total_volume_param,
                       cls._pico1_dye_param,
+                      cls._time_budget_param,
                      ]
         return parameters
     
@@ -131,6 +137,7 @@ class GenerateLibraryPostFunction(AbstractPostFunction):
         pico1_dye=None
         if cls._pico1_dye_param in params_dict:
             pico1_dye = params_dict[cls._pico1_dye_param][0]
+        time_budget = params_dict[cls._time_budget_param][0]
 
         http_status_code = 200
         json_response    = {DATESTAMP: datetime.today()}
@@ -138,7 +145,7 @@ class GenerateLibraryPostFunction(AbstractPostFunction):
         try:
             ld = LibraryDesign(requested_dye_lots=dyes_lots, requested_nbarcodes=nbarcodes,
                                requested_ndyes=requested_ndyes, pico1_dye=pico1_dye)
-            designs = ld.generate()
+            designs = ld.generate(time_budget=time_budget)
 
             if designs:
                 if mix_vol > 0.0 and total_vol > 0.0:
@@ -1,9 +1,15 @@
 import itertools
+import time
 
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
 import numpy
-from scipy.spatial import distance
+from scipy.stats import norm
 from sklearn import mixture
 
+from bioweb_api import DROP_SIZE_WORKERS, DROP_SIZE_TIMEOUT
+from bioweb_api.utilities.pool_utilities import terminate_pool
+from bioweb_api.utilities.spatial_utilities import nearest_neighbors
+
 '''
 CV_RATIO is the coefficient of variation (CV) scalar to adjust drop size
 CV to intensity CV.  BKGROUND_STD is the background standard deviation
@@ -12,6 +18,9 @@ calculated from experimental data.
 '''
 CV_RATIO = 1.184
 BKGROUND_STD = 300.0
+# pairs of clusters expected to have fewer overlapping drops than this
+# are not checked for collisions
+NEGLIGIBLE_OVERLAP = 1e-3
 
 
 class Cluster(object):
@@ -59,7 +68,8 @@ def make_centroids(lvls, ranges):
 def make_clusters(centroids, drop_ave, drop_std):
     """
     Make clusters from centroids.  Add noise based on drop size and
-    standard deviation of drop size.
+    standard deviation of drop size.  The drops of every cluster are
+    drawn at once.
 
     @param centroids:   A 2D numpy array of the centroids.
     @param drop_ave:    Float specifying the average drop size.
@@ -68,85 +78,178 @@ def make_clusters(centroids, drop_ave, drop_std):
     """
 
     # convert drop coefficient of variation (cv) to intensity cv
-    ndims = centroids.shape[1]
+    ncentroids, ndims = centroids.shape
     # simulate 500 drops per dimension, cap at 2000 drops
     ndrops = ndims * 500 if ndims * 500 <= 2000 else 2000
     drop_cv = drop_std/drop_ave
     int_cv = drop_cv * CV_RATIO
 
-    # create clusters from centroids
-    clusters = list()
-    fill_len = len(str(len(centroids)))
-    for idx, centroid in enumerate(centroids):
-        # make a cluster from centroid
-        cluster_data = numpy.array([centroid] * ndrops)
+    # make a standard deviation for each drop, shared by its dimensions
+    stddevs = numpy.random.normal(0.0, 1.0, size=(ncentroids, ndrops, 1))
+
+    # convert the stddevs to intensities based on the intensity cv and
+    # apply them to the centroids to create the clusters
+    intensity_stds = centroids * int_cv + 0.1
+    cluster_data = centroids.reshape(ncentroids, 1, ndims) + \
+                   intensity_stds.reshape(ncentroids, 1, ndims) * stddevs
 
-        # make a standard deviation for each drop
-        stddevs = numpy.random.normal(0.0, 1.0, size=ndrops)
+    # add noise to simulate decomp/spectral noise
+    cluster_data += numpy.random.normal(0.0, BKGROUND_STD, size=cluster_data.shape)
 
-        # convert the stddev to intensities based on the intensity cv
-        intensity_std = centroid * int_cv + 0.1
-        deviations = numpy.array([intensity_std]*ndrops)
-        deviations *= stddevs.reshape(cluster_data.shape[0], -1)
+    fill_len = len(str(ncentroids))
+    return [Cluster(cluster_data[idx], 'c%s' % str(idx).zfill(fill_len))
+            for idx in xrange(ncentroids)]
 
-        # apply the deviations to the centroid to create the cluster
-        cluster_data += deviations
 
-        # add noise to simulate decomp/spectral noise
-        cluster_data += numpy.random.normal(0.0, BKGROUND_STD, size=cluster_data.shape)
-        cluster_id = 'c%s' % str(idx).zfill(fill_len)
-        clusters.append(Cluster(cluster_data, cluster_id))
+def overlap_bound(centroid1, cov1, centroid2, cov2, ndrops, min_prob_thresh):
+    """
+    Estimate the number of drops of two clusters that would be ambiguous,
+    treating each cluster as a gaussian.  Drops are ambiguous near the
+    boundary between the clusters, where their probability of belonging to
+    either cluster is at most min_prob_thresh.
+
+    @param centroid1:       A numpy array, the centroid of the first cluster.
+    @param cov1:            A 2D numpy array, the covariance of the first cluster.
+    @param centroid2:       A numpy array, the centroid of the second cluster.
+    @param cov2:            A 2D numpy array, the covariance of the second cluster.
+    @param ndrops:          An integer, the number of drops in both clusters.
+    @param min_prob_thresh: A float specifying the minimum probability
+                            a drop must have to belong to a cluster.
+    @return:                A float, the expected number of ambiguous drops.
+    """
+    if not 0.5 < min_prob_thresh < 1.0:
+        return float(ndrops) if min_prob_thresh >= 1.0 else 0.0
 
-    return clusters
+    offset = centroid2 - centroid1
+    dist = numpy.linalg.norm(offset)
+    if dist == 0.0:
+        return float(ndrops)
 
+    # standard deviation of each cluster along the line between the centroids
+    direction = offset / dist
+    std1 = numpy.sqrt(direction.dot(cov1).dot(direction))
+    std2 = numpy.sqrt(direction.dot(cov2).dot(direction))
 
-def check_collision(clusters, num_nn_check=4, min_prob_thresh=0.66):
+    # distance from the centroids to the boundary and from the boundary to
+    # the nearest ambiguous drop, in standard deviations
+    boundary = dist / (std1 + std2)
+    margin = numpy.log(min_prob_thresh / (1.0 - min_prob_thresh)) / (2.0 * boundary)
+
+    return ndrops * norm.sf(boundary - margin)
+
+
+def check_collision(clusters, num_nn_check=4, min_prob_thresh=0.66, timings=None):
     """
     Check for possible cross contamination (collision) between clusters
     using sklearn's gaussian mixture model.  Collision information is
-    appended to cluster objects.
+    appended to cluster objects.  Pairs of clusters are checked in
+    parallel by a pool of worker processes created for this check, which
+    are killed if it takes longer than DROP_SIZE_TIMEOUT seconds.  Pairs
+    whose overlap is negligible are not checked.
 
     @param clusters:        A list of Cluster objects.
     @param num_nn_check:    A integer specifying the number of nearest
                             neighbors to check for each cluster
     @param min_prob_thresh: A float specifying the minimum probability
                             a drop must have to belong to a cluster.
+    @param timings:         An optional dictionary, the seconds taken by each
+                            stage of the check are added to it.
     @return:                A list of dictionaries specifying potential cluster
                             collisions. Keys are (cluster ID#1,
                             cluster ID#2, percent overlap)
     """
+    timings = timings if timings is not None else dict()
+
     # get nearest neighbors
-    ndrops = len(clusters[0].drops)
+    start = time.time()
     centroids = numpy.array([c.centroid for c in clusters])
-    dists = distance.squareform(distance.pdist(centroids))
-    nearest_neighbors_idxs = numpy.argsort(dists, axis=1)[:, 1:num_nn_check+1]
+    _, nearest_neighbors_idxs = nearest_neighbors(centroids, num_nn_check)
 
     # make a list of unique index pairs to prevent redundant checking
     nn_checks = list()
     for idx, nns in enumerate(nearest_neighbors_idxs):
         nn_checks.extend([sorted([idx, nn]) for nn in nns])
-    nn_checks = set(map(tuple, nn_checks))
+    nn_checks = sorted(set(map(tuple, nn_checks)))
+    timings['nearest_neighbors'] = time.time() - start
+
+    # skip pairs that are too far apart to overlap
+    start = time.time()
+    ndrops = len(clusters[0].drops)
+    covs = [numpy.cov(c.drops, rowvar=False).reshape(c.ndims, c.ndims) for c in clusters]
+    nn_checks = [(idx1, idx2) for idx1, idx2 in nn_checks
+                 if overlap_bound(centroids[idx1], covs[idx1], centroids[idx2], covs[idx2],
+                                  ndrops * 2, min_prob_thresh) >= NEGLIGIBLE_OVERLAP]
+    timings['overlap_bound'] = time.time() - start
+
+    # check for collisions, each worker is sent a batch of pairs with the
+    # drops of their clusters
+    start = time.time()
+    batch_size = max(1, int(numpy.ceil(len(nn_checks) / (DROP_SIZE_WORKERS * 4.0))))
+    results = list()
+    if nn_checks:
+        pool = ProcessPoolExecutor(max_workers=DROP_SIZE_WORKERS)
+        futures = list()
+        finished = False
+        try:
+            for i in xrange(0, len(nn_checks), batch_size):
+                pairs = nn_checks[i:i+batch_size]
+                drops = dict((idx, clusters[idx].drops) for pair in pairs for idx in pair)
+                futures.append(pool.submit(fit_pairs, pairs, drops, min_prob_thresh))
+
+            deadline = start + DROP_SIZE_TIMEOUT
+            for future in futures:
+                try:
+                    results.extend(future.result(timeout=max(deadline - time.time(), 0)))
+                except TimeoutError:
+                    raise Exception('Checking clusters for collisions took longer '
+                                    'than %d seconds.' % DROP_SIZE_TIMEOUT)
+            finished = True
+        finally:
+            if finished:
+                pool.shutdown()
+            else:
+                terminate_pool(pool, futures)
 
     collisions = list()
-    # check for collisions
-    for idx1, idx2 in nn_checks:
+    for idx1, idx2, perc_overlap in results:
         c1 = clusters[idx1]
         c2 = clusters[idx2]
+        clusters[idx1].collisions.append(idx2)
+        clusters[idx2].collisions.append(idx1)
+        clusters[idx1].perc_overlap.append(perc_overlap)
+        clusters[idx2].perc_overlap.append(perc_overlap)
+        collisions.append({'id_1': c1.cluster_id,
+                           'id_2': c2.cluster_id,
+                           'overlap': perc_overlap})
+    timings['gmm'] = time.time() - start
+
+    return collisions
+
+
+def fit_pairs(pairs, drops, min_prob_thresh):
+    """
+    Fit a two component gaussian mixture model to the drops of each pair of
+    clusters to find pairs that collide.  This is run by worker processes.
+
+    @param pairs:           A list of tuples of two cluster indexes.
+    @param drops:           A dictionary of cluster index to a 2D numpy array
+                            of the cluster's drops.
+    @param min_prob_thresh: A float specifying the minimum probability
+                            a drop must have to belong to a cluster.
+    @return:                A list of tuples of the cluster indexes and percent
+                            overlap of the pairs that collide.
+    """
+    collisions = list()
+    for idx1, idx2 in pairs:
         gmm = mixture.GMM(n_components=2, covariance_type='full')
-        data = numpy.concatenate((c1.drops, c2.drops))
+        data = numpy.concatenate((drops[idx1], drops[idx2]))
         gmm.fit(data)
         probabilities = gmm.predict_proba(data)
         max_prob = numpy.amax(probabilities, axis=1)
         above_thresh = numpy.where(max_prob <= min_prob_thresh)[0]
         if above_thresh.size > 0:
-            perc_overlap = (len(above_thresh) / (ndrops * 2.0)) * 100
-            clusters[idx1].collisions.append(idx2)
-            clusters[idx2].collisions.append(idx1)
-            clusters[idx1].perc_overlap.append(perc_overlap)
-            clusters[idx2].perc_overlap.append(perc_overlap)
-            collisions.append({'id_1': c1.cluster_id,
-                               'id_2': c2.cluster_id,
-                               'overlap': perc_overlap})
+            perc_overlap = (len(above_thresh) / float(len(data))) * 100
+            collisions.append((idx1, idx2, perc_overlap))
 
     return collisions
 
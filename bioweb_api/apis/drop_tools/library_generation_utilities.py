@@ -1,16 +1,22 @@
 from collections import OrderedDict, Counter
-import itertools
+from functools import partial
+import hashlib
+import threading
+import time
 
+from concurrent.futures import Future, ProcessPoolExecutor, wait, \
+    FIRST_COMPLETED
 from matplotlib import pyplot as plt
 import numpy
-from scipy.spatial import distance
 
-from bioweb_api import HOSTNAME
+from bioweb_api import LIBRARY_DESIGN_WORKERS, LIBRARY_DESIGN_CACHE_SIZE
+from bioweb_api.apis.dye_profiles_database.DyeProfileCache import DyeProfileCache
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
-from profile_database.datastore import Datastore
+from bioweb_api.utilities.pool_utilities import terminate_pool
+from bioweb_api.utilities.spatial_utilities import nearest_neighbors
 from profile_database.constants import DYE_NAME, PROFILE, LOT_NUMBER, \
     INTENSITY_CONC_RATIO, DYE_PE, DYE_CY7, DYE_FAM, DYE_JOE, DYE_IF700, \
-    DYE_IF660, DYE_IF594, DYE_IF610, DYE_AT633, DATE, DYE_IF555, PEAK_PIXEL
+    DYE_IF660, DYE_IF594, DYE_IF610, DYE_AT633, DYE_IF555, PEAK_PIXEL
 
 # the minimum and maximum number of dyes
 MIN_NDYES  = 2
@@ -29,6 +35,148 @@ DYE_SPECIFIC_NLEVELS = {
     DYE_PE: 2,
 }
 
+# evaluated designs are cached across requests by their profiles and levels
+_DESIGN_CACHE = OrderedDict()
+_DESIGN_CACHE_LOCK = threading.Lock()
+
+
+def _get_cached_design(key):
+    with _DESIGN_CACHE_LOCK:
+        result = _DESIGN_CACHE.pop(key, None)
+        if result is not None:
+            _DESIGN_CACHE[key] = result
+        return result
+
+
+def _cache_design(key, future):
+    """
+    Cache the result of an evaluated design.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _DESIGN_CACHE_LOCK:
+        _DESIGN_CACHE[key] = future.result()
+        while len(_DESIGN_CACHE) > LIBRARY_DESIGN_CACHE_SIZE:
+            _DESIGN_CACHE.popitem(last=False)
+
+
+def evaluate_design(barcode_profiles, non_barcode_profile, nlvls,
+                    intensity_scaler, resolution=100.0):
+    """
+    Find the maximum intensity of each barcode dye, space its levels between
+    MIN_INTEN and its maximum, and score the separability of the resulting
+    barcodes.  This is run by worker processes.
+
+    @param barcode_profiles:    2D numpy array of the normalized barcode dye profiles
+    @param non_barcode_profile: 1D numpy array, summed profile of the non-barcode dyes
+                                at their intensities
+    @param nlvls:               1D numpy array of the number of levels for each dye
+    @param intensity_scaler:    Float, maximum difference in level increase
+                                between lowest and highest levels
+    @param resolution:          Float, intensity unit spacing of the maximum intensities
+    @return:                    List of the integer intensity levels of each dye
+                                and integer separability
+    """
+    dye_max_intensities = calc_dye_max_intensities(barcode_profiles, non_barcode_profile,
+                                                   nlvls, resolution)
+    intensity_lvls = list()
+    for lvls, max_intensity in zip(nlvls, dye_max_intensities):
+        scales = numpy.linspace(1.0, intensity_scaler, lvls-1)
+        intensity_space = max_intensity - MIN_INTEN
+        min_intensity_space = intensity_space/numpy.sum(scales)
+        scaled_intensity_spaces = (scales * min_intensity_space)
+        lvls_scaled_intensity = numpy.cumsum(numpy.concatenate(([MIN_INTEN], scaled_intensity_spaces)))
+        intensity_lvls.append(lvls_scaled_intensity)
+
+    centroids = numpy.array(numpy.meshgrid(*intensity_lvls, copy=False)).T.reshape(-1, len(intensity_lvls))
+    # levels are strictly increasing, so every centroid is distinct
+    min_dists, _ = nearest_neighbors(centroids)
+    ave_distance = numpy.mean(min_dists)
+
+    return [[int(lvl) for lvl in lvls] for lvls in intensity_lvls], int(ave_distance)
+
+
+def calc_dye_max_intensities(barcode_profiles, non_barcode_profile, nlvls, resolution=100.0):
+    """
+    The ideal library will take full advantage of our intensity space, which
+    peaks at 65535 intensity units.  This function attempt to optimize the
+    maximum level of each dye by recomposing the profiles and testing that
+    they do not saturate.
+
+    @param barcode_profiles:    2D numpy array of the normalized barcode dye profiles
+    @param non_barcode_profile: 1D numpy array, summed profile of the non-barcode dyes
+                                at their intensities
+    @param nlvls:               1D numpy array of the number of levels for each dye
+    @param resolution:          Float, intensity unit spacing, i.e. resolution of 100.0
+                                would result in intensities of: 1000.0, 1100.00, 1200.0...
+    @return:                    1D numpy of maximum intensities for each dye.
+    """
+    dye_max_intensities = None
+    # test various percent cutoffs
+    for percent_best in numpy.arange(2.5, 25, 2.5):
+        try:
+            # make a group of scalars for each dye (dimension)
+            scalars = [numpy.linspace(10000.0, MAX_INTEN, resolution).reshape(-1, 1) for _ in barcode_profiles]
+            # create barcode profiles by summing each combination of dyes profiles
+            # to find an optimal max barcode profile
+            scalar_combos = scalars.pop(0)
+            while scalars:
+                scalar_combos = numpy.hstack((
+                    numpy.repeat(scalar_combos, resolution, axis=0),
+                    numpy.tile(scalars.pop(0), (len(scalar_combos), 1))
+                ))
+                scalar_combos = _rm_saturated(scalar_combos, barcode_profiles, non_barcode_profile)
+                scalar_combos = _rm_most_variable(scalar_combos, percent_best, nlvls)
+
+            midx = numpy.argmax(numpy.sum(scalar_combos, axis=1))
+
+            dye_max_intensities = scalar_combos[midx]
+            break
+        except Exception as e:
+            APP_LOGGER.exception(e)
+
+    if dye_max_intensities is None or len(dye_max_intensities) != len(barcode_profiles):
+        raise Exception('A library cannot be generated from this combination of dyes.')
+
+    return dye_max_intensities
+
+
+def _rm_saturated(scalar_combos, barcode_profiles, non_barcode_profile):
+    """
+    Remove designs where the max barcode profile exceeds the saturation limit
+
+    @param scalar_combos:   Numpy array, max intensity combinations
+    @return:                Numpy array, max intensity combinations
+    """
+    ndims = scalar_combos.shape[1]
+    dye_profs = barcode_profiles[:ndims]
+
+    barcode_profs = numpy.sum(scalar_combos.reshape(-1, ndims, 1) * dye_profs, axis=1)
+    barcode_profs += non_barcode_profile
+
+    # remove barcodes that exceed the maximum
+    invalid = (barcode_profs > SATURATION_CAP).any(axis=1)
+    del barcode_profs
+    return scalar_combos[~invalid]
+
+
+def _rm_most_variable(scalar_combos, percent_best, nlvls):
+    """
+    Remove designs where the dyes have the most uneven intensity/level
+
+    @param scalar_combos:   Numpy array, max intensity combinations
+    @param percent_best:    Float, the percentage of combinations to return
+    @return:                Numpy array, max intensity combinations
+    """
+    # criteria is the variance of intensity per level between dyes, lower is better
+    ndims = scalar_combos.shape[1]
+    intensity_per_lvl = scalar_combos/nlvls[:ndims]
+    var_intensity_per_lvl = numpy.var(intensity_per_lvl, axis=1)
+
+    # remove solutions that have a low probability of success
+    mask_ = var_intensity_per_lvl < numpy.percentile(var_intensity_per_lvl, percent_best)
+    return scalar_combos[mask_]
+
 
 
 class LibraryDesign(object):
@@ -94,8 +242,17 @@ class LibraryDesign(object):
         self._normalized_non_barcode_profile = None
         self._set_non_barcode_profiles()
 
+        # set peak spacing variables
+        self._peak_conflicts = None
+        self._non_barcode_conflicts = None
+        self._set_peak_conflicts()
+
         self._design_candidates = list()
 
+        # set while generating designs
+        self._pool = None
+        self._deadline = None
+
     @property
     def need_additional_db_dyes(self):
         """
@@ -150,19 +307,20 @@ class LibraryDesign(object):
         """
         Set the dictionary with available barcode dye profiles
         """
+        profile_cache = DyeProfileCache.Instance()
+
         # get requested lots first
         for name, lot, _ in self._requested_dye_lots:
             # preference should be lot then name
             if lot is not None:
-                db_records = sorted(Datastore(url=HOSTNAME).get_lot(lot), key=lambda x: x[DATE])
+                most_recent = profile_cache.latest_lot(lot)
             else:
-                db_records = sorted(Datastore(url=HOSTNAME).get_dye(name), key=lambda x: x[DATE])
+                most_recent = profile_cache.latest_dye(name)
 
-            if not db_records:
+            if most_recent is None:
                 raise Exception('Dye %s was not found in the database.' % name)
 
-            most_recent = db_records[-1]
-            self._barcode_profile_map[most_recent[DYE_NAME]] = numpy.array(most_recent[PROFILE])
+            self._barcode_profile_map[most_recent[DYE_NAME]] = most_recent[PROFILE]
             self._barcode_lot_map[most_recent[DYE_NAME]] = most_recent[LOT_NUMBER]
             self._barcode_potency_map[most_recent[DYE_NAME]] = most_recent[INTENSITY_CONC_RATIO]
             self._barcode_peaks_map[most_recent[DYE_NAME]] = most_recent[PEAK_PIXEL]
@@ -171,9 +329,9 @@ class LibraryDesign(object):
         # get all the profiles (most recent are preferred)
         if not self._requested_dye_lots or self.need_additional_db_dyes:
             non_barcode_dyes = {self._assay_dye, self._pico1_dye, self._pico2_dye}
-            for profile in sorted(Datastore(url=HOSTNAME).get_profiles(), key=lambda x: x[DATE], reverse=True):
+            for profile in profile_cache.profiles():
                 if profile[DYE_NAME] not in self._barcode_profile_map and profile[DYE_NAME] not in non_barcode_dyes:
-                    self._barcode_profile_map[profile[DYE_NAME]] = numpy.array(profile[PROFILE])
+                    self._barcode_profile_map[profile[DYE_NAME]] = profile[PROFILE]
                     self._barcode_lot_map[profile[DYE_NAME]] = profile[LOT_NUMBER]
                     self._barcode_potency_map[profile[DYE_NAME]] = profile[INTENSITY_CONC_RATIO]
                     self._barcode_peaks_map[profile[DYE_NAME]] = profile[PEAK_PIXEL]
@@ -190,17 +348,16 @@ class LibraryDesign(object):
         for non_barcode_dye, intensity in zip([self._assay_dye, self._pico1_dye, self._pico2_dye],
                                   [self._assay_intensity, self._pico1_intensity, self._pico2_intensity]):
             if non_barcode_dye is not None:
-                db_records = sorted(Datastore(url=HOSTNAME).get_dye(non_barcode_dye), key=lambda x: x[DATE])
-                if not db_records:
+                most_recent = DyeProfileCache.Instance().latest_dye(non_barcode_dye)
+                if most_recent is None:
                     raise Exception('Could not retrieve %s information from the database.' % non_barcode_dye)
-                most_recent = db_records[-1]
-                profile = numpy.array(most_recent[PROFILE])
+                profile = most_recent[PROFILE]
                 self._non_barcode_profile += (profile * intensity)
                 self._normalized_non_barcode_profile += profile
                 self._non_barcode_profile_map[non_barcode_dye] = profile
                 self._non_barcode_lot_map[non_barcode_dye] = most_recent[LOT_NUMBER]
                 self._non_barcode_intensity_map[non_barcode_dye] = intensity
-                non_barcode_peaks.append(db_records[-1][PEAK_PIXEL])
+                non_barcode_peaks.append(most_recent[PEAK_PIXEL])
 
         self._non_barcode_peaks = numpy.array(non_barcode_peaks)
 
@@ -221,15 +378,81 @@ class LibraryDesign(object):
 
         self._barcode_lvl_ranges = numpy.array(lvl_ranges)
 
-    def generate(self):
+    def _set_peak_conflicts(self):
+        """
+        Sets which pairs of barcode dyes and which barcode dyes and non-barcode
+        dyes have peaks that are too close, so combinations can be pruned
+        without comparing their peaks.
+        """
+        peak_diffs = numpy.abs(self._barcode_peaks.reshape(-1, 1) - self._barcode_peaks.reshape(1, -1))
+        self._peak_conflicts = peak_diffs < self._min_peak_difference
+        numpy.fill_diagonal(self._peak_conflicts, False)
+
+        non_barcode_diffs = numpy.abs(self._barcode_peaks.reshape(-1, 1) - self._non_barcode_peaks.reshape(1, -1))
+        self._non_barcode_conflicts = numpy.any(non_barcode_diffs < self._min_peak_difference, axis=1)
+
+        # no combination is valid if the non-barcode peaks are too close
+        if numpy.any(numpy.diff(numpy.sort(self._non_barcode_peaks)) < self._min_peak_difference):
+            self._non_barcode_conflicts[:] = True
+
+    def generate(self, time_budget=None):
         """
-        Generate a library design.
+        Generate a library design.  Candidate designs are evaluated in parallel
+        by a pool of worker processes created for this call.
+
+        @param time_budget: Float, seconds to spend generating designs.  Once it
+                            expires the search stops and candidate designs that
+                            have not been evaluated are skipped, the best designs
+                            found so far are returned.  The search continues past
+                            the budget until at least one design is evaluated.
+                            None to evaluate every candidate design.
+        @return:            List of designs, most separable first
         """
+        self._deadline = None if time_budget is None else time.time() + time_budget
+
         if self._requested_ndyes is None:
-            for ndyes in xrange(1, len(self._barcode_profiles)+1):
-                self._generate(ndyes)
+            ndyes_range = xrange(1, len(self._barcode_profiles)+1)
         else:
-            self._generate(self._requested_ndyes)
+            ndyes_range = [self._requested_ndyes]
+
+        # candidates for each number of dyes are submitted as soon as they are
+        # found, so they are evaluated while the next number of dyes is searched
+        futures = OrderedDict()
+        not_done = set()
+        finished = False
+        try:
+            for ndyes in ndyes_range:
+                if futures and self._expired():
+                    break
+                for nlvls, dye_idxs in self._generate(ndyes, required=not futures):
+                    futures[self._submit_design(nlvls, dye_idxs)] = dye_idxs
+
+            timeout = None if self._deadline is None else max(self._deadline - time.time(), 0)
+            done, not_done = wait(futures.keys(), timeout=timeout)
+            if not done and not_done:
+                done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+            finished = True
+        finally:
+            if self._pool is not None:
+                if finished and not not_done:
+                    self._pool.shutdown()
+                else:
+                    terminate_pool(self._pool, not_done or futures.keys())
+                self._pool = None
+
+        if not_done:
+            APP_LOGGER.info('Library design time budget of %s seconds expired, '
+                            'skipped %d of %d candidate designs.' %
+                            (time_budget, len(not_done), len(futures)))
+
+        for future, dye_idxs in futures.items():
+            if future not in done:
+                continue
+            try:
+                intensity_lvls, separability = future.result()
+                self._make_design(dye_idxs, intensity_lvls, separability)
+            except Exception as e:
+                APP_LOGGER.exception(e)
 
         self._design_candidates.sort(key=lambda x: x['separability'], reverse=True)
 
@@ -241,10 +464,20 @@ class LibraryDesign(object):
 
         return self._design_candidates
 
-    def _generate(self, ndyes, nchoose=5):
+    def _expired(self):
         """
-        @param ndyes:   1nteger, number of dyes to use per solution
-        #param nchoose: Integer, maximum number of combinations that will be further optimized
+        @return:    Bool, whether or not the time budget of generate has expired
+        """
+        return self._deadline is not None and time.time() >= self._deadline
+
+    def _generate(self, ndyes, nchoose=5, required=False):
+        """
+        @param ndyes:    1nteger, number of dyes to use per solution
+        #param nchoose:  Integer, maximum number of combinations that will be further optimized
+        @param required: Bool, whether or not to keep searching after the time
+                         budget expires until a combination is found
+        @return:         List of tuples of the number of levels for each dye
+                         and the indexes of the dyes of the best combinations
         """
         # check to see if the minimum maximum levels of dyes can make the requested number of dyes
         min_nbarcodes = numpy.product(self._barcode_min_nlvls[numpy.argsort(self._barcode_min_nlvls)[:ndyes]])
@@ -255,32 +488,22 @@ class LibraryDesign(object):
             APP_LOGGER.info('Cannot generate requested number of barcodes (%d).  '
                             'Smallest library would have %d barcodes.' %
                             (self._requested_nbarcodes, min_nbarcodes))
-            return
+            return []
 
         # too few dyes were selected
         if max_nbarcodes < self._requested_nbarcodes:
             APP_LOGGER.info('Cannot generate requested number of barcodes (%d).  '
                             'Largest library would have %d barcodes.' %
                             (self._requested_nbarcodes, max_nbarcodes))
-            return
+            return []
 
         # find the optimal number of levels for each dye combination
-        requested_dye_idxs = set(range(len(self._requested_dye_lots)))
+        # once the time budget expires the best combinations found so far are used
         optimal_nlvls = list()
-        for dye_idxs in itertools.combinations(xrange(len(self._barcode_profiles)), ndyes):
+        for dye_idxs in self._dye_combinations(ndyes):
+            if self._expired() and (optimal_nlvls or not required):
+                break
             dye_idxs = numpy.array(dye_idxs)
-
-            # ignore combinations that do not include requested dyes
-            if self.need_additional_db_dyes and \
-                    self._requested_dye_lots and \
-                    not requested_dye_idxs.issubset(dye_idxs):
-                continue
-
-            # ignore combinations in which the peaks are too close
-            peaks = numpy.concatenate((self._barcode_peaks[dye_idxs], self._non_barcode_peaks))
-            if numpy.any(numpy.diff(numpy.sort(peaks)) < self._min_peak_difference):
-                continue
-
             try:
                 candidate_nlvls, candidate_lowest_peak = self._calc_optimal_nlvls(dye_idxs)
                 optimal_nlvls.append((candidate_lowest_peak, dye_idxs, candidate_nlvls))
@@ -289,21 +512,105 @@ class LibraryDesign(object):
 
         optimal_nlvls.sort(key=lambda x: x[0])
 
-        for _, dye_idxs, nlvls in optimal_nlvls[: nchoose]:
-            try:
-                self._make_design(nlvls, dye_idxs)
-            except Exception as e:
-                APP_LOGGER.exception(e)
+        return [(nlvls, dye_idxs) for _, dye_idxs, nlvls in optimal_nlvls[: nchoose]]
 
-    def _make_design(self, nlvls, dye_idxs):
+    def _dye_combinations(self, ndyes):
+        """
+        Generate the combinations of barcode dyes that include the requested
+        dyes, whose peaks are not too close and whose levels can make the
+        requested number of barcodes.  Combinations are built one dye at a
+        time and abandoned as soon as a dye's peak is too close or the fewest
+        barcodes they can make exceeds the requested number.
+
+        @param ndyes:   Integer, number of dyes per combination
+        @return:        Generator of tuples of the indexes of the barcode dyes
         """
-        Generate the optimal design based on the number of levels for each dye.
+        # combinations must include requested dyes, which are the first dyes
+        if self.need_additional_db_dyes and self._requested_dye_lots:
+            required_idxs = range(len(self._requested_dye_lots))
+        else:
+            required_idxs = []
+
+        if len(required_idxs) > ndyes:
+            return
+
+        combo = list()
+        min_nbarcodes = 1
+        for idx in required_idxs:
+            if self._non_barcode_conflicts[idx] or self._peak_conflicts[idx, combo].any():
+                return
+            combo.append(idx)
+            min_nbarcodes *= int(self._barcode_min_nlvls[idx])
+
+        for dye_idxs in self._extend_combination(combo, len(combo), ndyes, min_nbarcodes):
+            yield dye_idxs
+
+    def _extend_combination(self, combo, start, ndyes, min_nbarcodes):
+        if len(combo) == ndyes:
+            if self._can_make_nbarcodes(combo, self._requested_nbarcodes):
+                yield tuple(combo)
+            return
+
+        for idx in xrange(start, len(self._barcode_dyes) - (ndyes - len(combo)) + 1):
+            if self._non_barcode_conflicts[idx] or self._peak_conflicts[idx, combo].any():
+                continue
+            # every dye has at least two levels, so adding dyes can only increase this
+            idx_min_nbarcodes = min_nbarcodes * int(self._barcode_min_nlvls[idx])
+            if idx_min_nbarcodes > self._requested_nbarcodes:
+                continue
+            combo.append(idx)
+            for dye_idxs in self._extend_combination(combo, idx + 1, ndyes, idx_min_nbarcodes):
+                yield dye_idxs
+            combo.pop()
+
+    def _can_make_nbarcodes(self, dye_idxs, nbarcodes):
+        """
+        @param dye_idxs:    List of the indexes of the barcode dyes
+        @param nbarcodes:   Integer, number of barcodes
+        @return:            Bool, whether or not some number of levels of each
+                            dye multiply to the number of barcodes
+        """
+        if not dye_idxs:
+            return nbarcodes == 1
+        return any(nbarcodes % int(nlvls) == 0 and
+                   self._can_make_nbarcodes(dye_idxs[1:], nbarcodes // int(nlvls))
+                   for nlvls in self._barcode_lvl_ranges[dye_idxs[0]])
+
+    def _submit_design(self, nlvls, dye_idxs):
+        """
+        Submit a candidate design to the worker processes, unless it has
+        already been evaluated.  The pool is created on first use.
 
-        @param dye_idxs:    1D numpy array of the indexes of the barcode dyes
         @param nlvls:       1D numpy array of the number of levels for each dye
+        @param dye_idxs:    1D numpy array of the indexes of the barcode dyes
+        @return:            Future of the result of evaluate_design
+        """
+        barcode_profiles = self._barcode_profiles[dye_idxs]
+        key = (hashlib.md5(barcode_profiles.tobytes() + self._non_barcode_profile.tobytes()).hexdigest(),
+               tuple(int(n) for n in nlvls), self._intensity_scaler)
+
+        result = _get_cached_design(key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=LIBRARY_DESIGN_WORKERS)
+        future = self._pool.submit(evaluate_design, barcode_profiles,
+                                   self._non_barcode_profile, nlvls,
+                                   self._intensity_scaler)
+        future.add_done_callback(partial(_cache_design, key))
+        return future
+
+    def _make_design(self, dye_idxs, intensity_lvls, separability):
+        """
+        Add a design to the design candidates.
+
+        @param dye_idxs:        1D numpy array of the indexes of the barcode dyes
+        @param intensity_lvls:  List of the integer intensity levels of each dye
+        @param separability:    Integer, average distance between barcodes
         """
-        dye_max_intensities = self._calc_dye_max_intensities(dye_idxs, nlvls)
-        intensity_lvls = list()
         design = {'barcode_dyes': {}, 'fiducial_dyes': {}}
         if self._assay_dye is not None:
             design['fiducial_dyes'][self._assay_dye] = {
@@ -323,22 +630,11 @@ class LibraryDesign(object):
                 'lot_number': str(self._non_barcode_lot_map[self._pico2_dye]),
             }
 
-        for dname, lvls, max_intensity in zip(self._barcode_dyes[dye_idxs], nlvls, dye_max_intensities):
-            scales = numpy.linspace(1.0, self._intensity_scaler, lvls-1)
-            intensity_space = max_intensity - MIN_INTEN
-            min_intensity_space = intensity_space/numpy.sum(scales)
-            scaled_intensity_spaces = (scales * min_intensity_space)
-            lvls_scaled_intensity = numpy.cumsum(numpy.concatenate(([MIN_INTEN], scaled_intensity_spaces)))
-            intensity_lvls.append(lvls_scaled_intensity)
+        for dname, lvls in zip(self._barcode_dyes[dye_idxs], intensity_lvls):
             design['barcode_dyes'][str(dname)] = {'potency': float(self._barcode_potency_map[dname]),
                                   'lot_number': str(self._barcode_lot_map[dname]),
-                                  'intensities': [int(lvl) for lvl in lvls_scaled_intensity]}
-        centroids = numpy.array(numpy.meshgrid(*intensity_lvls, copy=False)).T.reshape(-1, len(intensity_lvls))
-        nn_dist = distance.squareform(distance.pdist(centroids))
-        nn_dist[nn_dist == 0.0] = numpy.nan
-        min_dists = numpy.nanmin(nn_dist, axis=1)
-        ave_distance = numpy.mean(min_dists)
-        design['separability'] = int(ave_distance)
+                                  'intensities': list(lvls)}
+        design['separability'] = separability
 
         self._design_candidates.append(design)
 
@@ -381,84 +677,6 @@ class LibraryDesign(object):
         # the best combination will have a lowest summed profile peak intensity
         return nlvl_products[lowest_peak_idx], peak_intensities[lowest_peak_idx]
 
-    def _rm_saturated(self, scalar_combos, dye_idxs):
-        """
-        Remove designs where the max barcode profile exceeds the saturation limit
-
-        @param scalar_combos:   Numpy array, max intensity combinations
-        @return:                Numpy array, max intensity combinations
-        """
-        # use default dye map, it should have all barcode dyes by default
-        ndims = scalar_combos.shape[1]
-        dye_profs = self._barcode_profiles[dye_idxs[:ndims]]
-
-        barcode_profs = numpy.sum(scalar_combos.reshape(-1, ndims, 1) * dye_profs, axis=1)
-        barcode_profs += self._non_barcode_profile
-
-        # remove barcodes that exceed the maximum
-        invalid = (barcode_profs > SATURATION_CAP).any(axis=1)
-        del barcode_profs
-        return scalar_combos[~invalid]
-
-    def _rm_most_variable(self, scalar_combos, percent_best, nlvls):
-        """
-        Remove designs where the dyes have the most uneven intensity/level
-
-        @param scalar_combos:   Numpy array, max intensity combinations
-        @param percent_best:    Float, the percentage of combinations to return
-        @return:                Numpy array, max intensity combinations
-        """
-        # criteria is the variance of intensity per level between dyes, lower is better
-        ndims = scalar_combos.shape[1]
-        intensity_per_lvl = scalar_combos/nlvls[:ndims]
-        var_intensity_per_lvl = numpy.var(intensity_per_lvl, axis=1)
-
-        # remove solutions that have a low probability of success
-        mask_ = var_intensity_per_lvl < numpy.percentile(var_intensity_per_lvl, percent_best)
-        return scalar_combos[mask_]
-
-    def _calc_dye_max_intensities(self, dye_idxs, nlvls, resolution=100.0):
-        """
-        The ideal library will take full advantage of our intensity space, which
-        peaks at 65535 intensity units.  This function attempt to optimize the
-        maximum level of each dye by recomposing the profiles and testing that
-        they do not saturate.
-
-        @param dye_idxs:    1D numpy array of the indexes of the barcode dyes
-        @param nlvls:       1D numpy array of the number of levels for each dye
-        @param resolution:  Float, intensity unit spacing, i.e. resolution of 100.0
-                            would result in intensities of: 1000.0, 1100.00, 1200.0...
-        @return:            1D numpy of maximum intensities for each dye.
-        """
-        dye_max_intensities = None
-        # test various percent cutoffs
-        for percent_best in numpy.arange(2.5, 25, 2.5):
-            try:
-                # make a group of scalars for each dye (dimension)
-                scalars = [numpy.linspace(10000.0, MAX_INTEN, resolution).reshape(-1, 1) for _ in dye_idxs]
-                # create barcode profiles by summing each combination of dyes profiles
-                # to find an optimal max barcode profile
-                scalar_combos = scalars.pop(0)
-                while scalars:
-                    scalar_combos = numpy.hstack((
-                        numpy.repeat(scalar_combos, resolution, axis=0),
-                        numpy.tile(scalars.pop(0), (len(scalar_combos), 1))
-                    ))
-                    scalar_combos = self._rm_saturated(scalar_combos, dye_idxs)
-                    scalar_combos = self._rm_most_variable(scalar_combos, percent_best, nlvls)
-
-                midx = numpy.argmax(numpy.sum(scalar_combos, axis=1))
-
-                dye_max_intensities = scalar_combos[midx]
-                break
-            except Exception as e:
-                APP_LOGGER.exception(e)
-
-        if dye_max_intensities is None or len(dye_max_intensities) != len(dye_idxs):
-            raise Exception('A library cannot be generated from this combination of dyes.')
-
-        return dye_max_intensities
-
     def plot(self, design):
         """
         A function to generate a visualization of the candidate profiles
@@ -0,0 +1,203 @@
+'''
+Copyright 2016 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import threading
+import time
+
+import numpy
+
+from bioweb_api import HOSTNAME, DYE_PROFILE_CACHE_TTL
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.dye_profiles_database.constants import PROFILES_COLLECTION, \
+    PROFILES_VERSION_COLLECTION
+from profile_database.constants import DYE_NAME, LOT_NUMBER, PROFILE, DATE, \
+    PEAK_PIXEL
+from profile_database.datastore import Datastore
+
+#=============================================================================
+# Private Static Variables
+#=============================================================================
+_ID      = "_id"
+_VERSION = "version"
+
+#=============================================================================
+# Class
+#=============================================================================
+class DyeProfileCache(object):
+    """
+    This class is intended to be a singleton.
+
+    Caches the dye profile database so library designs and the dye profiles
+    GET don't query it for every request. The whole profile set is loaded in
+    one query and indexed by dye name and lot number. Cached profiles are
+    contiguous, read-only numpy arrays and every profile has a peak pixel.
+    The profiles are reloaded when they are older than ttl seconds or after
+    invalidate() is called, e.g. when profiles are added to the database.
+    invalidate() bumps a version document shared by every process, which is
+    checked before cached profiles are returned, so a process that adds
+    profiles invalidates the cache of the server too.
+    """
+    _INSTANCE = None
+
+    #===========================================================================
+    # Constructor
+    #===========================================================================
+    def __init__(self, ttl=DYE_PROFILE_CACHE_TTL):
+        # Enforce that it's a singleton
+        if self._INSTANCE:
+            raise Exception("%s is a singleton and should be accessed through the Instance method." % self.__class__.__name__)
+
+        self._ttl       = ttl
+        self._lock      = threading.Lock()
+        self._loaded_at = 0
+        self._stale     = True
+        self._version   = None
+        self._loading   = None
+        self._documents = list()
+        self._newest    = list()
+        self._by_dye    = dict()
+        self._by_lot    = dict()
+        self._db_connector = DbConnector.Instance()
+
+    @classmethod
+    def Instance(cls):
+        if not cls._INSTANCE:
+            cls._INSTANCE = DyeProfileCache()
+        return cls._INSTANCE
+
+    #===========================================================================
+    # Public methods
+    #===========================================================================
+    def documents(self):
+        """
+        Return copies of the profile documents as they are stored in the
+        database.
+        """
+        self._load()
+        return [dict(document) for document in self._documents]
+
+    def profiles(self):
+        """
+        Return every profile record, most recent first. Records are shared
+        and must not be modified.
+        """
+        self._load()
+        return list(self._newest)
+
+    def latest_dye(self, dye_name):
+        """
+        Return the most recent profile record of a dye, or None if there
+        isn't one. The record is shared and must not be modified.
+        """
+        self._load()
+        records = self._by_dye.get(dye_name)
+        return records[-1] if records else None
+
+    def latest_lot(self, lot_number):
+        """
+        Return the most recent profile record of a dye lot, or None if there
+        isn't one. The record is shared and must not be modified.
+        """
+        self._load()
+        records = self._by_lot.get(lot_number)
+        return records[-1] if records else None
+
+    def invalidate(self):
+        """
+        Reload the profiles the next time they're accessed, in this and every
+        other process.
+        """
+        self._db_connector.update(PROFILES_VERSION_COLLECTION,
+                                  {_ID: PROFILES_COLLECTION},
+                                  {"$inc": {_VERSION: 1}}, upsert=True)
+        with self._lock:
+            self._stale = True
+
+    #===========================================================================
+    # Private methods
+    #===========================================================================
+    def _shared_version(self):
+        record = self._db_connector.find_one(PROFILES_VERSION_COLLECTION, _ID,
+                                             PROFILES_COLLECTION)
+        return record.get(_VERSION) if record is not None else None
+
+    def _load(self):
+        """
+        Reload the profiles if they're stale. Only one thread loads them, the
+        others wait for it, and the database isn't queried while holding the
+        lock.
+        """
+        version = self._shared_version()
+        while True:
+            with self._lock:
+                if not self._stale and self._version == version and \
+                   time.time() - self._loaded_at <= self._ttl:
+                    return
+                event = self._loading
+                if event is None:
+                    event = self._loading = threading.Event()
+                    # invalidations during the load must trigger another one
+                    self._stale = False
+                    break
+            event.wait()
+
+        try:
+            loaded_at = time.time()
+            documents = Datastore(url=HOSTNAME).get_profiles()
+
+            records = list()
+            for document in documents:
+                record  = dict(document)
+                profile = numpy.ascontiguousarray(document[PROFILE], dtype=float)
+                profile.flags.writeable = False
+                record[PROFILE] = profile
+                if record.get(PEAK_PIXEL) is None:
+                    record[PEAK_PIXEL] = int(numpy.argmax(profile))
+                records.append(record)
+
+            # most recent records are last
+            by_dye = dict()
+            by_lot = dict()
+            for record in sorted(records, key=lambda x: x[DATE]):
+                by_dye.setdefault(record[DYE_NAME], list()).append(record)
+                by_lot.setdefault(record[LOT_NUMBER], list()).append(record)
+
+            with self._lock:
+                self._documents = documents
+                self._newest    = sorted(records, key=lambda x: x[DATE], reverse=True)
+                self._by_dye    = by_dye
+                self._by_lot    = by_lot
+                self._version   = version
+                self._loaded_at = loaded_at
+        except:
+            with self._lock:
+                self._stale = True
+            raise
+        finally:
+            with self._lock:
+                self._loading = None
+            event.set()
+
+#===========================================================================
+# Ensure the initial instance is created.
+#===========================================================================
+DyeProfileCache.Instance()
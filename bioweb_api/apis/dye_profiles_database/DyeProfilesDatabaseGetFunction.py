@@ -1,15 +1,13 @@
 #=============================================================================
 # Imports
 #=============================================================================
-from bioweb_api import HOSTNAME
 from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
+from bioweb_api.apis.dye_profiles_database.DyeProfileCache import DyeProfileCache
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from profile_database.constants import DYE_STOCK_UUID, DETECTION_UUID, \
     DYE_NAME, DYE_FAM, DYE_JOE
 
 
-from profile_database.datastore import Datastore
-
 DYE_PROFILES_DATABASE = 'DyeProfilesDatabase'
 
 #=============================================================================
@@ -41,7 +39,7 @@ class DyeProfilesDatabaseGetFunction(AbstractGetFunction):
 
     @classmethod
     def process_request(cls, params_dict):
-        data = Datastore(url=HOSTNAME).get_profiles()
+        data = DyeProfileCache.Instance().documents()
 
         # remove uuids and mongo ids
         unneeded_ids = [DETECTION_UUID, DYE_STOCK_UUID]
@@ -35,6 +35,7 @@ PEAK_INTENSITY = 'peak_intensity'
 PEAK_PIXEL = 'peak_pixel'
 PROFILE = 'profile'
 PROFILES_COLLECTION = 'profiles'
+PROFILES_VERSION_COLLECTION = 'profiles_version'
 SURFACTANT = 'surfactant'
 USER = 'user'
 
@@ -0,0 +1,55 @@
+from pymongo import UpdateOne
+
+# maximum number of keys matched by a single query
+MAX_KEYS_PER_QUERY = 1000
+
+
+def ensure_unique_index(db, collection, key_fields):
+    """
+    Create a unique compound index on the fields that identify a document.
+
+    @param db:          DbConnector
+    @param collection:  String, name of collection
+    @param key_fields:  List of strings, names of the fields that identify a document
+    """
+    db.create_index(collection, [(field, 1) for field in key_fields], unique=True)
+
+
+def find_existing(db, collection, key_fields, keys, projection=None):
+    """
+    Look up existing documents in batches of queries on their key fields.
+
+    @param db:          DbConnector
+    @param collection:  String, name of collection
+    @param key_fields:  List of strings, names of the fields that identify a document
+    @param keys:        List of tuples, values of the key fields to look up
+    @param projection:  List of strings, names of the fields to return in
+                        addition to the key fields. None to return all fields.
+    @return:            Dictionary, key tuple to existing document
+    """
+    if projection is not None:
+        projection = key_fields + projection
+
+    existing = dict()
+    for idx in xrange(0, len(keys), MAX_KEYS_PER_QUERY):
+        criteria = {'$or': [dict(zip(key_fields, key)) for key in keys[idx:idx+MAX_KEYS_PER_QUERY]]}
+        for doc in db.find(collection, criteria, projection):
+            existing[tuple(doc[field] for field in key_fields)] = doc
+    return existing
+
+
+def insert_missing(db, collection, key_fields, docs):
+    """
+    Insert documents that don't already exist in a single unordered bulk
+    write.  Existing documents with the same key fields are left unchanged.
+
+    @param db:          DbConnector
+    @param collection:  String, name of collection
+    @param key_fields:  List of strings, names of the fields that identify a document
+    @param docs:        List of dictionaries, documents to insert
+    @return:            BulkWriteResult, or None if docs is empty
+    """
+    requests = [UpdateOne(dict((field, doc[field]) for field in key_fields),
+                          {'$setOnInsert': doc}, upsert=True)
+                for doc in docs]
+    return db.bulk_write(collection, requests)
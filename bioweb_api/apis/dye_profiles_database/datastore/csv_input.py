@@ -1,7 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
 import pickle
 
 import pandas
 
+from bioweb_api.apis.dye_profiles_database.DyeProfileCache import DyeProfileCache
 from bioweb_api.apis.dye_profiles_database.constants import DYE_NAME, LOT_NUMBER, \
     MANUFACTURER, DATE, DETECTION_CHIP_TYPE, USER, INSTRUMENT, LINE_RATE, \
     LASER_POWER, OIL_PSI, DROP_PSI, GAIN, CONCENTRATION_UGML, PEAK_INTENSITY, \
@@ -29,17 +31,29 @@ DETECTION_FIELDS = [
 ]
 
 
+def _load_profile(path):
+    """
+    @param path:    String, path to a pickled list containing a normalized profile
+    @return:        List, the normalized profile
+    """
+    with open(path) as fh:
+        return pickle.load(fh)
+
+
 class CsvInput(object):
     """
     A wrapper for entering profiles into profile database through a csv file.
     All objects (DyeStocks, Detections, and Profiles) are checked
     """
-    def __init__(self, csv_path, delimiter='\t'):
+    def __init__(self, csv_path, delimiter='\t', workers=None):
         """
         @param csv_path:    String, path to csv file
         @param delimiter:   String, csv delimiting character
+        @param workers:     Integer, number of processes loading profile pickles,
+                            None for the number of processors
         """
         self.csv_data = pandas.read_csv(csv_path, sep=delimiter)
+        self.workers = workers
         self.dye_stocks = DyeStocks()
         self.detections = Detections()
         self.profiles = Profiles()
@@ -54,64 +68,92 @@ class CsvInput(object):
         self.get_detections()
         self.get_profiles()
 
+    def _columns(self, data, fields):
+        """
+        @param data:    DataFrame, csv data
+        @param fields:  List of strings, names of columns
+        @return:        List of tuples, row values of the columns as python types
+        """
+        columns = list()
+        for field in fields:
+            if field == DATE:
+                columns.append(data[field].astype(str).tolist())
+            else:
+                columns.append(data[field].tolist())
+        return zip(*columns)
+
     def get_dye_stocks(self):
         """
         Generate DyeStock objects.
         """
-        for _, row in self.csv_data[DYE_STOCK_FIELDS].drop_duplicates().iterrows():
-            new_ds = DyeStock(dye_name=row[DYE_NAME],
-                              lot_number=row[LOT_NUMBER],
-                              manufacturer=row[MANUFACTURER])
+        rows = self._columns(self.csv_data[DYE_STOCK_FIELDS].drop_duplicates(),
+                             [DYE_NAME, LOT_NUMBER, MANUFACTURER])
+        for dye_name, lot_number, manufacturer in rows:
+            new_ds = DyeStock(dye_name=dye_name,
+                              lot_number=lot_number,
+                              manufacturer=manufacturer)
             self.dye_stocks.append(new_ds)
 
     def get_detections(self):
         """
         Generate Detection objects.
         """
-        for _, row in self.csv_data[DETECTION_FIELDS].drop_duplicates().iterrows():
-            new_detection = Detection(date=str(row[DATE]),
-                                      detection_chip_type=row[DETECTION_CHIP_TYPE],
-                                      user=row[USER],
-                                      instrument=row[INSTRUMENT],
-                                      line_rate=row[LINE_RATE],
-                                      laser_power=row[LASER_POWER],
-                                      oil_psi=row[OIL_PSI],
-                                      drop_psi=row[DROP_PSI],
-                                      gain=row[GAIN])
-            self.detections.append(new_detection)
+        rows = self._columns(self.csv_data[DETECTION_FIELDS].drop_duplicates(),
+                             DETECTION_FIELDS)
+        for row in rows:
+            self.detections.append(Detection(**self._detection_kwargs(row)))
 
     def get_profiles(self):
         """
-        Generate Profile objects
+        Generate Profile objects.  Each distinct pickle is loaded once and
+        the pickles are loaded in parallel.
         """
-        for _, row in self.csv_data.iterrows():
+        # csv file must specify path to a pickled list containing
+        # the normalized dye profile
+        paths = self.csv_data[NORMALIZED_PROFILE_PATH].tolist()
+        uniq_paths = list(set(paths))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            loaded = dict(zip(uniq_paths, executor.map(_load_profile, uniq_paths)))
+
+        dye_stock_rows = self._columns(self.csv_data, [DYE_NAME, LOT_NUMBER, MANUFACTURER])
+        detection_rows = self._columns(self.csv_data, DETECTION_FIELDS)
+        concentrations = self.csv_data[CONCENTRATION_UGML].astype(float).tolist()
+        peak_intensities = self.csv_data[PEAK_INTENSITY].tolist()
+
+        for idx, path in enumerate(paths):
+            dye_name, lot_number, manufacturer = dye_stock_rows[idx]
             dye_stock_uuid = self.dye_stocks.find_uuid(
-                                dye_name=row[DYE_NAME],
-                                lot_number=row[LOT_NUMBER],
-                                manufacturer=row[MANUFACTURER])
-
-            detection_uuid = self.detections.find_uuid(date=str(row[DATE]),
-                                                  detection_chip_type=row[DETECTION_CHIP_TYPE],
-                                                  user=row[USER],
-                                                  instrument=row[INSTRUMENT],
-                                                  line_rate=row[LINE_RATE],
-                                                  laser_power=row[LASER_POWER],
-                                                  oil_psi=row[OIL_PSI],
-                                                  drop_psi=row[DROP_PSI],
-                                                  gain=row[GAIN])
-
-            # csv file must specify path to a pickled list containing
-            # the normalized dye profile
-            with open(row[NORMALIZED_PROFILE_PATH]) as fh:
-                profile = pickle.load(fh)
+                                dye_name=dye_name,
+                                lot_number=lot_number,
+                                manufacturer=manufacturer)
+
+            detection_uuid = self.detections.find_uuid(
+                                **self._detection_kwargs(detection_rows[idx]))
 
             new_profile = Profile(dye_stock_uuid=dye_stock_uuid,
                                   detection_uuid=detection_uuid,
-                                  profile=profile,
-                                  concentration_ugml=float(row[CONCENTRATION_UGML]),
-                                  peak_intensity=row[PEAK_INTENSITY])
+                                  profile=loaded[path],
+                                  concentration_ugml=concentrations[idx],
+                                  peak_intensity=peak_intensities[idx])
             self.profiles.append(new_profile)
 
+    @staticmethod
+    def _detection_kwargs(row):
+        """
+        @param row: Tuple, values of DETECTION_FIELDS
+        @return:    Dictionary, keyword arguments of Detection and find_uuid
+        """
+        kwargs = dict(zip(DETECTION_FIELDS, row))
+        return {'date': kwargs[DATE],
+                'detection_chip_type': kwargs[DETECTION_CHIP_TYPE],
+                'user': kwargs[USER],
+                'instrument': kwargs[INSTRUMENT],
+                'line_rate': kwargs[LINE_RATE],
+                'laser_power': kwargs[LASER_POWER],
+                'oil_psi': kwargs[OIL_PSI],
+                'drop_psi': kwargs[DROP_PSI],
+                'gain': kwargs[GAIN]}
+
     def populate_database(self):
         """
         Adds the data to the database. Run this only after parsing
@@ -121,6 +163,7 @@ class CsvInput(object):
         self.dye_stocks.add_new_dye_stocks()
         self.detections.add_new_detections()
         self.profiles.add_new_profiles()
+        DyeProfileCache.Instance().invalidate()
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import datetime
 import uuid
 
@@ -6,6 +7,12 @@ from bioweb_api.apis.dye_profiles_database.constants import VALID_INSTRUMENTS, \
     VALID_DETECTION_CHIP_TYPES, DETECTIONS_COLLECTION, DATE, DETECTION_CHIP_TYPE, \
     USER, INSTRUMENT, LINE_RATE, LASER_POWER, OIL_PSI, DROP_PSI, GAIN, \
     DETECTION_UUID
+from bioweb_api.apis.dye_profiles_database.datastore.bulk_utilities import \
+    ensure_unique_index, find_existing, insert_missing
+
+# fields that identify a detection, in the order of Detection.uniq_data
+DETECTION_KEY_FIELDS = [DATE, DETECTION_CHIP_TYPE, DROP_PSI, GAIN, INSTRUMENT,
+                        LASER_POWER, LINE_RATE, OIL_PSI]
 
 
 class Detections(object):
@@ -13,51 +20,47 @@ class Detections(object):
         """
         @param new_detections:  A list of Detection objects
         """
-        if new_detections is None:
-            new_detections = list()
-
-        self.new_detections = new_detections
+        # new detections by their unique data, detections that have not been
+        # checked against the database yet, and uuids of existing detections
+        self._detections = OrderedDict()
+        self._unchecked = list()
+        self._existing_uuids = dict()
 
-        # get existing database detection documents
         self._db = DbConnector.Instance()
-        self.existing_detections = list()
-        for existing_doc in self._db.find(DETECTIONS_COLLECTION, None):
-            existing_detection = Detection(date=existing_doc[DATE],
-                                           detection_chip_type=existing_doc[DETECTION_CHIP_TYPE],
-                                           user=existing_doc[USER],
-                                           instrument=existing_doc[INSTRUMENT],
-                                           line_rate=existing_doc[LINE_RATE],
-                                           laser_power=existing_doc[LASER_POWER],
-                                           oil_psi=existing_doc[OIL_PSI],
-                                           drop_psi=existing_doc[DROP_PSI],
-                                           gain=existing_doc[GAIN],
-                                           detection_uuid=existing_doc[DETECTION_UUID],
-                                           verify=False)
-            self.existing_detections.append(existing_detection)
-
-        # run here in case user entered profiles on initialization
+        ensure_unique_index(self._db, DETECTIONS_COLLECTION, DETECTION_KEY_FIELDS)
+
+        if new_detections is not None:
+            self.extend(new_detections)
+
+    @property
+    def new_detections(self):
+        """
+        @return:    A list of Detection objects that are not in the database
+        """
         self.rm_duplicates()
+        return self._detections.values()
 
     def add_new_detections(self):
         """
         Add detections to the database.
         """
-        if self.new_detections:
-            new_docs = [nd.mongo_document for nd in self.new_detections]
-            self._db.insert(DETECTIONS_COLLECTION, new_docs)
+        new_docs = [nd.mongo_document for nd in self.new_detections]
+        insert_missing(self._db, DETECTIONS_COLLECTION, DETECTION_KEY_FIELDS, new_docs)
 
     def rm_duplicates(self):
         """
         Run this to remove detection objects that have duplicate values to
-        existing database entries.
+        existing database entries.  Only detections added since the last
+        call are looked up.
         """
-        # get uniq representation of existing detection documents
-        existing = set(ed.uniq_data for ed in self.existing_detections)
-        # remove duplicates
-        for idx in xrange(len(self.new_detections)-1, -1, -1):
-            nd = self.new_detections[idx]
-            if nd.uniq_data in existing:
-                self.new_detections.pop(idx)
+        if not self._unchecked:
+            return
+        existing = find_existing(self._db, DETECTIONS_COLLECTION, DETECTION_KEY_FIELDS,
+                                 self._unchecked, [DETECTION_UUID])
+        for key, doc in existing.iteritems():
+            self._existing_uuids[key] = doc[DETECTION_UUID]
+            self._detections.pop(key, None)
+        self._unchecked = list()
 
     def __iter__(self):
         """
@@ -78,8 +81,10 @@ class Detections(object):
         """
         if not isinstance(detection, Detection):
             raise Exception('Can only append Detection objects')
-        self.new_detections.append(detection)
-        self.rm_duplicates()
+        key = detection.uniq_data
+        if key not in self._detections and key not in self._existing_uuids:
+            self._detections[key] = detection
+            self._unchecked.append(key)
 
     def extend(self, detections):
         """
@@ -88,13 +93,14 @@ class Detections(object):
         for detection in detections:
             if not isinstance(detection, Detection):
                 raise Exception('List must contain Detection objects')
-        self.new_detections.extend(detections)
-        self.rm_duplicates()
+        for detection in detections:
+            self.append(detection)
 
     def find_uuid(self, date, detection_chip_type, user, instrument,
                  line_rate, laser_power, oil_psi, drop_psi, gain):
         """
-        Get detection uuid from existing and new detections
+        Get detection uuid from existing and new detections.  The user is not
+        part of what makes a detection unique, so it is not matched.
 
         @param date:                String, date in format YYYYMMDD
         @param detection_chip_type: String, usually plastic or pdms
@@ -107,17 +113,15 @@ class Detections(object):
         @param gain:                Integer, gain used during detection
         @return:                    String, uuid of detection
         """
-        for detection in self.existing_detections + self.new_detections:
-            if detection.date == date and \
-               detection.detection_chip_type == detection_chip_type and \
-               detection.user == user and \
-               detection.instrument == instrument and \
-               detection.line_rate == line_rate and \
-               detection.laser_power == laser_power and \
-               detection.oil_psi == oil_psi and \
-               detection.drop_psi == drop_psi and \
-               detection.gain == gain:
-                return detection.uuid
+        key = (date, detection_chip_type, drop_psi, gain, instrument,
+               laser_power, line_rate, oil_psi)
+        self.rm_duplicates()
+        if key in self._detections:
+            return self._detections[key].uuid
+        if key not in self._existing_uuids:
+            self._unchecked.append(key)
+            self.rm_duplicates()
+        return self._existing_uuids.get(key)
 
 
 class Detection(object):
@@ -1,8 +1,14 @@
+from collections import OrderedDict
 import uuid
 
 from bioweb_api.DbConnector import DbConnector
 from bioweb_api.apis.dye_profiles_database.constants import VALID_DYE_NAMES, DYE_NAME, \
     LOT_NUMBER, MANUFACTURER, DYE_STOCK_UUID, DYE_STOCKS_COLLECTION
+from bioweb_api.apis.dye_profiles_database.datastore.bulk_utilities import \
+    ensure_unique_index, find_existing, insert_missing
+
+# fields that identify a dye stock, in the order of DyeStock.uniq_data
+DYE_STOCK_KEY_FIELDS = [DYE_NAME, LOT_NUMBER, MANUFACTURER]
 
 
 class DyeStocks(object):
@@ -10,42 +16,47 @@ class DyeStocks(object):
         """
         @param new_dye_stocks:  A list of DyeStock objects
         """
-        if new_dye_stocks is None:
-            new_dye_stocks = list()
-
-        self.new_dye_stocks = new_dye_stocks
+        # new dye stocks by their unique data, dye stocks that have not been
+        # checked against the database yet, and uuids of existing dye stocks
+        self._dye_stocks = OrderedDict()
+        self._unchecked = list()
+        self._existing_uuids = dict()
 
-        # get existing database dye stock documents
         self._db = DbConnector.Instance()
-        self.existing_dye_stocks = list()
-        for existing_doc in self._db.find(DYE_STOCKS_COLLECTION, None):
-            existing_ds = DyeStock(dye_name=existing_doc[DYE_NAME],
-                                   lot_number=existing_doc[LOT_NUMBER],
-                                   manufacturer=existing_doc[MANUFACTURER],
-                                   dye_stock_uuid=existing_doc[DYE_STOCK_UUID],
-                                   verify=False)
-            self.existing_dye_stocks.append(existing_ds)
-
-        # remove duplicates
+        ensure_unique_index(self._db, DYE_STOCKS_COLLECTION, DYE_STOCK_KEY_FIELDS)
+
+        if new_dye_stocks is not None:
+            self.extend(new_dye_stocks)
+
+    @property
+    def new_dye_stocks(self):
+        """
+        @return:    A list of DyeStock objects that are not in the database
+        """
         self.rm_duplicates()
+        return self._dye_stocks.values()
 
     def add_new_dye_stocks(self):
-        if self.new_dye_stocks:
-            new_docs = [nds.mongo_document for nds in self.new_dye_stocks]
-            self._db.insert(DYE_STOCKS_COLLECTION, new_docs)
+        """
+        Add dye stocks to the database.
+        """
+        new_docs = [nds.mongo_document for nds in self.new_dye_stocks]
+        insert_missing(self._db, DYE_STOCKS_COLLECTION, DYE_STOCK_KEY_FIELDS, new_docs)
 
     def rm_duplicates(self):
         """
         Run this to remove dye stock objects that have duplicate values to
-        existing database entries.
-        """
-        # get uniq representation of existing dye stock documents
-        existing = set(eds.uniq_data for eds in self.existing_dye_stocks)
-        # remove duplicates
-        for idx in xrange(len(self.new_dye_stocks)-1, -1, -1):
-            nds = self.new_dye_stocks[idx]
-            if nds.uniq_data in existing:
-                self.new_dye_stocks.pop(idx)
+        existing database entries.  Only dye stocks added since the last
+        call are looked up.
+        """
+        if not self._unchecked:
+            return
+        existing = find_existing(self._db, DYE_STOCKS_COLLECTION, DYE_STOCK_KEY_FIELDS,
+                                 self._unchecked, [DYE_STOCK_UUID])
+        for key, doc in existing.iteritems():
+            self._existing_uuids[key] = doc[DYE_STOCK_UUID]
+            self._dye_stocks.pop(key, None)
+        self._unchecked = list()
 
     def __iter__(self):
         """
@@ -66,8 +77,10 @@ class DyeStocks(object):
         """
         if not isinstance(dye_stock, DyeStock):
             raise Exception('Can only append DyeStock objects')
-        self.new_dye_stocks.append(dye_stock)
-        self.rm_duplicates()
+        key = dye_stock.uniq_data
+        if key not in self._dye_stocks and key not in self._existing_uuids:
+            self._dye_stocks[key] = dye_stock
+            self._unchecked.append(key)
 
     def extend(self, dye_stocks):
         """
@@ -76,8 +89,8 @@ class DyeStocks(object):
         for dye_stock in dye_stocks:
             if not isinstance(dye_stock, DyeStock):
                 raise Exception('List must contain DyeStock objects')
-        self.new_dye_stocks.extend(dye_stocks)
-        self.rm_duplicates()
+        for dye_stock in dye_stocks:
+            self.append(dye_stock)
 
     def find_uuid(self, dye_name, lot_number, manufacturer):
         """
@@ -88,11 +101,14 @@ class DyeStocks(object):
         @param manufacturer:    String, manufacturer
         @return:                String, UUID or None if no matching stocks
         """
-        for dye_stock in self.existing_dye_stocks + self.new_dye_stocks:
-            if dye_stock.dye_name == dye_name and \
-               dye_stock.lot_number == lot_number and \
-               dye_stock.manufacturer == manufacturer:
-                return dye_stock.uuid
+        key = (dye_name, lot_number, manufacturer)
+        self.rm_duplicates()
+        if key in self._dye_stocks:
+            return self._dye_stocks[key].uuid
+        if key not in self._existing_uuids:
+            self._unchecked.append(key)
+            self.rm_duplicates()
+        return self._existing_uuids.get(key)
 
 
 class DyeStock(object):
@@ -1,6 +1,13 @@
+from collections import OrderedDict
+
 from bioweb_api.DbConnector import DbConnector
 from bioweb_api.apis.dye_profiles_database.constants import DYE_STOCK_UUID, DETECTION_UUID, \
     CONCENTRATION_UGML, PROFILE, PEAK_INTENSITY, PROFILES_COLLECTION
+from bioweb_api.apis.dye_profiles_database.datastore.bulk_utilities import \
+    ensure_unique_index, find_existing, insert_missing
+
+# fields that identify a profile, in the order of Profile.uniq_data
+PROFILE_KEY_FIELDS = [DYE_STOCK_UUID, DETECTION_UUID, CONCENTRATION_UGML]
 
 
 class Profiles(object):
@@ -12,42 +19,44 @@ class Profiles(object):
         """
         @param profiles:    A list of profile objects
         """
-        if profiles is None:
-            profiles = list()
-
-        self.new_profiles = profiles
+        # new profiles by their unique data and profiles that have not been
+        # checked against the database yet
+        self._profiles = OrderedDict()
+        self._unchecked = list()
+        self._existing = set()
 
-        # check existing profiles
         self._db = DbConnector.Instance()
-        self.existing_profiles = list()
-        # Don't used the profiles array data, just check UUIDs and concentration
-        for existing_doc in self._db.find(PROFILES_COLLECTION, None, {PROFILE: 0}):
-            existing_prof = Profile(dye_stock_uuid=existing_doc[DYE_STOCK_UUID],
-                                    detection_uuid=existing_doc[DETECTION_UUID],
-                                    profile=None,
-                                    concentration_ugml=existing_doc[CONCENTRATION_UGML],
-                                    peak_intensity=None,
-                                    verify=False)
-            self.existing_profiles.append(existing_prof)
+        ensure_unique_index(self._db, PROFILES_COLLECTION, PROFILE_KEY_FIELDS)
 
+        if profiles is not None:
+            self.extend(profiles)
+
+    @property
+    def new_profiles(self):
+        """
+        @return:    A list of Profile objects that are not in the database
+        """
         self.rm_duplicates()
+        return self._profiles.values()
 
     def rm_duplicates(self):
         """
-        Duplicate profiles cannot be entered, remove them here.
+        Duplicate profiles cannot be entered, remove them here.  Only
+        profiles added since the last call are looked up, the profile
+        arrays of existing profiles are not retrieved.
         """
-        # get unique representation of existing profile documents
-        existing = set(prof.uniq_data for prof in self.existing_profiles)
-        # remove duplicates
-        for idx in xrange(len(self.new_profiles)-1, -1, -1):
-            nd = self.new_profiles[idx]
-            if nd.uniq_data in existing:
-                self.new_profiles.pop(idx)
+        if not self._unchecked:
+            return
+        existing = find_existing(self._db, PROFILES_COLLECTION, PROFILE_KEY_FIELDS,
+                                 self._unchecked, [])
+        for key in existing:
+            self._existing.add(key)
+            self._profiles.pop(key, None)
+        self._unchecked = list()
 
     def add_new_profiles(self):
-        if self.new_profiles:
-            new_docs = [prof.mongo_document for prof in self.new_profiles]
-            self._db.insert(PROFILES_COLLECTION, new_docs)
+        new_docs = [prof.mongo_document for prof in self.new_profiles]
+        insert_missing(self._db, PROFILES_COLLECTION, PROFILE_KEY_FIELDS, new_docs)
 
     def __iter__(self):
         """
@@ -68,8 +77,10 @@ class Profiles(object):
         """
         if not isinstance(profile, Profile):
             raise Exception('Can only append Profile objects')
-        self.new_profiles.append(profile)
-        self.rm_duplicates()
+        key = profile.uniq_data
+        if key not in self._profiles and key not in self._existing:
+            self._profiles[key] = profile
+            self._unchecked.append(key)
 
     def extend(self, profiles):
         """
@@ -78,8 +89,8 @@ class Profiles(object):
         for profile in profiles:
             if not isinstance(profile, Profile):
                 raise Exception('List must contain Profile objects')
-        self.new_profiles.extend(profiles)
-        self.rm_duplicates()
+        for profile in profiles:
+            self.append(profile)
 
 
 class Profile(object):
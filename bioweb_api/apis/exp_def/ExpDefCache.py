@@ -0,0 +1,309 @@
+'''
+Copyright 2016 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import cPickle
+import hashlib
+import os
+import threading
+import time
+
+from collections import defaultdict
+from uuid import uuid4
+
+from bioweb_api import EXP_DEF_COLLECTION, EXP_DEF_CACHE_PATH, \
+    EXP_DEF_NAMES_TTL
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.ApiConstants import UUID, NAME
+from bioweb_api.utilities.io_utilities import safe_make_dirs, \
+    silently_remove_file
+from bioweb_api.utilities.logging_utilities import APP_LOGGER
+
+from gbutils.exp_def.exp_def_handler import ExpDefHandler
+
+#=============================================================================
+# Class
+#=============================================================================
+class ExpDefCache(object):
+    """
+    This class is intended to be a singleton.
+
+    Read-through cache of parsed experiment definitions keyed by uuid. A
+    definition is fetched and parsed by ExpDefHandler the first time it's
+    requested and pickled to path, so the server and job processes share it
+    rather than fetching it for every job. Each process keeps the definitions
+    it has loaded in memory and reloads one when its file is replaced or
+    removed by invalidate(). Names are resolved to uuids in memory from the
+    exp_def collection, which is reloaded after names_ttl seconds or when
+    load_names() is called.
+    """
+    _INSTANCE = None
+
+    #===========================================================================
+    # Constructor
+    #===========================================================================
+    def __init__(self, path=EXP_DEF_CACHE_PATH, names_ttl=EXP_DEF_NAMES_TTL):
+        # Enforce that it's a singleton
+        if self._INSTANCE:
+            raise Exception("%s is a singleton and should be accessed through the Instance method." % self.__class__.__name__)
+
+        self._path            = path
+        self._names_ttl       = names_ttl
+        self._lock            = threading.Lock()
+        self._entries         = dict()
+        self._loading         = dict()
+        self._uuids           = dict()
+        self._names_loaded_at = None
+        self._db_connector    = DbConnector.Instance()
+
+    @classmethod
+    def Instance(cls):
+        if not cls._INSTANCE:
+            cls._INSTANCE = ExpDefCache()
+        return cls._INSTANCE
+
+    #===========================================================================
+    # Public methods
+    #===========================================================================
+    def get_uuid(self, exp_def):
+        """
+        Return the uuid of an experiment definition.
+
+        @param exp_def: Name or uuid of the experiment definition.
+        @return:        String, uuid or None if the definition doesn't exist.
+        """
+        with self._lock:
+            stale = self._names_loaded_at is None or \
+                    time.time() - self._names_loaded_at > self._names_ttl
+        if stale:
+            self.load_names()
+        with self._lock:
+            uuid = self._uuids.get(exp_def)
+        if uuid is not None:
+            return uuid
+
+        # Definitions that aren't indexed yet, and names that aren't unique,
+        # are left to the experiment definition service to resolve.
+        exp_def_fetcher = ExpDefHandler()
+        uuid = exp_def_fetcher.get_experiment_uuid(exp_def)
+        if uuid is None and exp_def in exp_def_fetcher.experiment_uuids:
+            uuid = exp_def
+        if uuid is not None:
+            with self._lock:
+                self._uuids[exp_def] = uuid
+        return uuid
+
+    def load_names(self, new_uuids=None):
+        """
+        Reload the uuids and unique names of the definitions in the exp_def
+        collection.
+
+        @param new_uuids:   Uuids of definitions that aren't in the collection
+                            yet, so they're resolved without the service.
+        """
+        loaded_at = time.time()
+        records   = self._db_connector.find(EXP_DEF_COLLECTION, {}, [UUID, NAME])
+
+        uuids = dict((uuid, uuid) for uuid in new_uuids or [])
+        names = defaultdict(set)
+        for record in records:
+            uuids[record[UUID]] = record[UUID]
+            names[record[NAME]].add(record[UUID])
+        for name, name_uuids in names.iteritems():
+            if len(name_uuids) == 1 and name not in uuids:
+                uuids[name] = name_uuids.pop()
+
+        with self._lock:
+            self._uuids           = uuids
+            self._names_loaded_at = loaded_at
+
+    def experiment(self, exp_def):
+        """
+        Return the parsed experiment definition. The experiment is shared and
+        must not be modified.
+
+        @param exp_def: Name or uuid of the experiment definition.
+        @return:        Experiment or None if the definition doesn't exist.
+        """
+        entry = self._entry(exp_def)
+        return entry[0] if entry is not None else None
+
+    def dye_levels(self, exp_def):
+        """
+        Return the dyes used by the barcodes of an experiment definition.
+
+        @param exp_def: Name or uuid of the experiment definition.
+        @return:        Dictionary of dye name to number of levels, or None
+                        if the definition doesn't exist.
+        """
+        entry = self._entry(exp_def)
+        return dict(entry[1]) if entry is not None else None
+
+    def digest(self, exp_def):
+        """
+        Return a digest of the cached experiment definition, which changes
+        when the definition is replaced in the cache.
+
+        @param exp_def: Name or uuid of the experiment definition.
+        @return:        String, hex digest or None if the definition doesn't
+                        exist or can't be cached.
+        """
+        entry = self._entry(exp_def)
+        return entry[2] if entry is not None else None
+
+    def invalidate(self, uuids=None):
+        """
+        Remove experiment definitions from the cache of every process, so
+        they are fetched again the next time they're requested.
+
+        @param uuids:   Uuids of definitions to remove, None to remove all.
+        """
+        with self._lock:
+            if uuids is None:
+                uuids = [os.path.splitext(f)[0] for f in self._cached_files()]
+                self._entries.clear()
+            for uuid in uuids:
+                self._entries.pop(uuid, None)
+                silently_remove_file(self._file_path(uuid))
+
+    #===========================================================================
+    # Private methods
+    #===========================================================================
+    def _entry(self, exp_def):
+        """
+        Return a tuple containing the experiment, its dye levels and digest.
+        Only one thread of a process loads or fetches a definition that isn't
+        in memory, the others wait for it.
+        """
+        uuid = self.get_uuid(exp_def)
+        if uuid is None:
+            return None
+
+        path = self._file_path(uuid)
+        while True:
+            with self._lock:
+                cached = self._entries.get(uuid)
+                if cached is not None and cached[0] == self._version(path):
+                    return cached[1]
+                event = self._loading.get(uuid)
+                if event is None:
+                    event = self._loading[uuid] = threading.Event()
+                    break
+            event.wait()
+
+        try:
+            return self._load(uuid, path)
+        finally:
+            with self._lock:
+                del self._loading[uuid]
+            event.set()
+
+    def _load(self, uuid, path):
+        """
+        Load an experiment from its file, fetching it if the file doesn't
+        exist, and keep it in memory.
+        """
+        data    = None
+        version = None
+        try:
+            with open(path, "rb") as f:
+                stat       = os.fstat(f.fileno())
+                data       = f.read()
+                experiment = cPickle.loads(data)
+                version    = (stat.st_ino, stat.st_mtime, stat.st_size)
+        except IOError:
+            data = None
+        except Exception:
+            APP_LOGGER.exception("Unable to load cached experiment " \
+                                 "definition %s." % uuid)
+            data = None
+
+        if data is None:
+            experiment = ExpDefHandler().get_experiment_definition(uuid)
+            if experiment is None:
+                return None
+            data    = self._write(uuid, experiment)
+            version = self._version(path) if data is not None else None
+
+        digest = hashlib.md5(data).hexdigest() if data is not None else None
+        entry  = (experiment, self._get_dye_levels(experiment), digest)
+        if version is not None:
+            with self._lock:
+                self._entries[uuid] = (version, entry)
+        return entry
+
+    def _write(self, uuid, experiment):
+        """
+        Pickle an experiment to its file. The file is replaced atomically so
+        other processes never read a partial file.
+
+        @return:    String, the pickled experiment or None if it can't be
+                    pickled.
+        """
+        try:
+            data = self._dumps(experiment)
+        except Exception:
+            APP_LOGGER.exception("Experiment definition %s can't be " \
+                                 "pickled, it won't be cached." % uuid)
+            return None
+        safe_make_dirs(self._path)
+        tmp_path = os.path.join(self._path, "%s.tmp" % uuid4())
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.rename(tmp_path, self._file_path(uuid))
+        return data
+
+    def _file_path(self, uuid):
+        return os.path.join(self._path, "%s.pkl" % uuid)
+
+    def _cached_files(self):
+        if not os.path.isdir(self._path):
+            return list()
+        return [f for f in os.listdir(self._path) if f.endswith(".pkl")]
+
+    @staticmethod
+    def _version(path):
+        """
+        Return a value that changes whenever the file at path is replaced, or
+        None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime, stat.st_size)
+
+    @staticmethod
+    def _dumps(experiment):
+        return cPickle.dumps(experiment, cPickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _get_dye_levels(experiment):
+        dye_levels = defaultdict(int)
+        for barcode in experiment.barcodes:
+            for dye_name, lvl in barcode.dye_levels.items():
+                dye_levels[dye_name] = max(dye_levels[dye_name], int(lvl+1))
+        return dict(dye_levels)
+
+#===========================================================================
+# Ensure the initial instance is created.
+#===========================================================================
+ExpDefCache.Instance()
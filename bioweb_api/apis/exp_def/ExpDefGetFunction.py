@@ -22,8 +22,8 @@ limitations under the License.
 #=============================================================================
 from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
-from bioweb_api.apis.exp_def.ExpDefUtils import get_experiment_defintions, \
-    update_experiment_definitions
+from bioweb_api.apis.exp_def.ExpDefUtils import get_experiment_defintions
+from bioweb_api.execution_engine.Indexer import Indexer, EXP_DEFS_INDEX
 
 #=============================================================================
 # Class
@@ -57,10 +57,14 @@ class ExpDefGetFunction(AbstractGetFunction):
     def process_request(cls, params_dict):
         if cls.refresh_parameter in params_dict and \
            params_dict[cls.refresh_parameter][0]:
-            update_experiment_definitions()
+            Indexer.Instance().refresh(EXP_DEFS_INDEX)
             
         return get_experiment_defintions()
 
+    @classmethod
+    def response_headers(cls):
+        return Indexer.Instance().freshness_headers(EXP_DEFS_INDEX)
+
 #===============================================================================
 # Run Main
 #===============================================================================
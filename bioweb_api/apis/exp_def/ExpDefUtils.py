@@ -26,6 +26,7 @@ from bioweb_api import EXP_DEF_COLLECTION
 from bioweb_api.DbConnector import DbConnector
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.apis.ApiConstants import VARIANTS, UUID, ID, NAME, DYES, TYPE
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 
 from gbutils.exp_def.exp_def_handler import ExpDefHandler
 from expdb.utils import get_target_id
@@ -71,26 +72,35 @@ def get_experiment_defintions():
 
 def update_experiment_definitions():
     """
-    Update EXP_DEF_COLLECTION with new experiment definitions.
+    Update EXP_DEF_COLLECTION with new experiment definitions and remove
+    obsolete ones. New and obsolete definitions are removed from the
+    experiment definition cache and its names are reloaded.
     """
     exp_def_fetcher = ExpDefHandler()
+    exp_def_cache = ExpDefCache.Instance()
 
     db_uuids = set(_DB_CONNECTOR.distinct(EXP_DEF_COLLECTION, UUID))
     cur_uuids = set(exp_def_fetcher.experiment_uuids)
     new_uuids = cur_uuids - db_uuids
     obselete_uuids = db_uuids - cur_uuids
-    new_exp_defs = list()
+    exp_def_cache.invalidate(new_uuids | obselete_uuids)
+    if new_uuids:
+        exp_def_cache.load_names(new_uuids)
+
+    exp_defs = list()
     for uuid in new_uuids:
-        experiment = exp_def_fetcher.get_experiment_definition(uuid)
+        experiment = exp_def_cache.experiment(uuid)
         if experiment is not None:
             update = {UUID: uuid, NAME: experiment.name, DYES: list(experiment.dyes),
                       TYPE: experiment.exp_type}
             if experiment.exp_type == 'HOTSPOT':
                 update[VARIANTS] = format_variants(experiment)
-            new_exp_defs.append(update)
-    if new_exp_defs:
-        _DB_CONNECTOR.insert(EXP_DEF_COLLECTION, new_exp_defs)
+            exp_defs.append(update)
+    _DB_CONNECTOR.bulk_upsert(EXP_DEF_COLLECTION, [UUID], exp_defs)
 
     if obselete_uuids:
         _DB_CONNECTOR.remove(EXP_DEF_COLLECTION,
                              {UUID: {"$in": list(obselete_uuids)}})
+
+    if new_uuids or obselete_uuids:
+        exp_def_cache.load_names()
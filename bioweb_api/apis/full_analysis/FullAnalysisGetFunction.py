@@ -21,16 +21,16 @@ limitations under the License.
 # Imports
 #=============================================================================
 from bioweb_api.apis.full_analysis.FullAnalysisPostFunction import FULL_ANALYSIS
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import FA_PROCESS_COLLECTION
-from bioweb_api.apis.ApiConstants import UUID
+from bioweb_api.apis.ApiConstants import UUID, DIFF_PARAMS
 from bioweb_api.apis.full_analysis.FullAnalysisUtils import update_fa_docs
 
 #=============================================================================
 # Class
 #=============================================================================
-class FullAnalysisGetFunction(AbstractGetFunction):
+class FullAnalysisGetFunction(AbstractGetJobFunction):
 
     #===========================================================================
     # Overridden Methods
@@ -47,34 +47,49 @@ class FullAnalysisGetFunction(AbstractGetFunction):
     def notes():
         return ""
 
+    @classmethod
+    def get_collection(cls):
+        return FA_PROCESS_COLLECTION
+
+    @classmethod
+    def get_columns(cls):
+        # Full analysis documents vary in their fields
+        return None
+
     @classmethod
     def parameters(cls):
         cls.uuids_param = ParameterFactory.uuid(required=False)
-        parameters = [
-                      cls.uuids_param,
-                      ParameterFactory.format(),
-                     ]
+        parameters = [cls.uuids_param] + \
+                     super(FullAnalysisGetFunction, cls).parameters()
         return parameters
 
     @classmethod
     def process_request(cls, params_dict):
-        uuids = list()
-        if cls.uuids_param in params_dict:
-            uuids = params_dict[cls.uuids_param]
+        criteria = dict()
+        if cls.uuids_param in params_dict and params_dict[cls.uuids_param]:
+            criteria[UUID] = {'$in': params_dict[cls.uuids_param]}
 
-        if not uuids:
-            fa_documents = cls._DB_CONNECTOR.find(FA_PROCESS_COLLECTION, {})
-        else:
-            fa_documents = cls._DB_CONNECTOR.find(FA_PROCESS_COLLECTION,
-                                                  {UUID: {'$in': uuids}})
-        fa_documents = update_fa_docs(fa_documents)
+        # Diff params are derived from the whole document, so if they are
+        # requested the whole document is retrieved and trimmed afterwards.
+        fields = params_dict.get(cls.fields_param)
+        if fields and DIFF_PARAMS in fields:
+            params_dict = dict(params_dict)
+            del params_dict[cls.fields_param]
 
-        if fa_documents:
+        fa_documents, _, page_info = cls.find_jobs(params_dict, criteria)
+        fa_documents = list(fa_documents)
+        if not fields or DIFF_PARAMS in fields:
+            fa_documents = update_fa_docs(fa_documents)
+        if fields:
+            fa_documents = [{k: doc[k] for k in fields if k in doc}
+                            for doc in fa_documents]
+            column_names = fields
+        elif fa_documents:
             column_names = fa_documents[0].keys()
         else:
             column_names = ['']
 
-        return (fa_documents, column_names, None)
+        return (fa_documents, column_names, page_info)
 
 #===============================================================================
 # Run Main
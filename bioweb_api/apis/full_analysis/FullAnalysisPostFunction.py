@@ -22,9 +22,13 @@ limitations under the License.
 #=============================================================================
 import copy
 from datetime import datetime
+import hashlib
+import json
 import sys
 import traceback
 
+from pymongo import UpdateOne
+
 from bioweb_api import FA_PROCESS_COLLECTION
 from bioweb_api.apis.ApiConstants import ERROR, FINISH_DATESTAMP, \
     ID, UUID, JOB_NAME, MAJOR, MINOR, OFFSETS, USE_IID, PICO2_DYE, STATUS, \
@@ -39,13 +43,18 @@ from bioweb_api.apis.ApiConstants import ERROR, FINISH_DATESTAMP, \
     USE_PICO1_FILTER_DESCRIPTION, PICO1_DYE, AC_MODEL, AC_MODEL_DESCRIPTION, \
     DRIFT_COMPENSATE, DEFAULT_DRIFT_COMPENSATE, USE_PICO2_FILTER, USE_PICO2_FILTER_DESCRIPTION, \
     PA_DOCUMENT, ID_DOCUMENT, AC_DOCUMENT, GT_DOCUMENT, EP_DOCUMENT, URL, EXP_DEF, \
-    SUCCEEDED, BEST_EXIST_JOB
+    SUCCEEDED, BEST_EXIST_JOB, PARAM_KEYS
 
-from bioweb_api.apis.full_analysis.FullAnalysisWorkflow import FullAnalysisWorkFlowCallable
+from bioweb_api.apis.full_analysis.FullAnalysisWorkflow import FullAnalysisWorkFlowCallable, \
+    check_exp_type
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 from bioweb_api.apis.full_analysis.FullAnalysisUtils import convert_param_name
 from bioweb_api.utilities.io_utilities import make_clean_response
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
+from bioweb_api.utilities.job_utilities import JobExistsError
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback, \
+    BATCH_PRIORITY
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import parse_pa_data_src
 from primary_analysis.dye_model import DEFAULT_OFFSETS
@@ -296,13 +305,25 @@ class FullAnalysisPostFunction(AbstractPostFunction):
         if len(archives) < 1:
             return make_clean_response(json_response, 404)
 
+        # Ensure the workflow of the experiment type can be run
+        experiment = ExpDefCache.Instance().experiment(parameters[EXP_DEF])
+        if experiment is not None:
+            try:
+                check_exp_type(experiment.exp_type)
+            except:
+                json_response[ERROR] = str(sys.exc_info()[1])
+                return make_clean_response(json_response, 400)
+
         status_codes = list()
         len_archives = len(archives)
         for idx, (name, is_hdf5) in enumerate(archives):
             cur_job_name = "%s-%d" % (parameters[JOB_NAME], idx + 1) if len_archives > 1 \
                            else parameters[JOB_NAME]
+            param_keys = get_param_keys(name, parameters.get(EXP_DEF),
+                            lambda doc_type: [parameters.get(param)
+                                              for param in _DOC_TYPE_TO_PARAMS[doc_type]])
             exist_fa_jobs = cls._DB_CONNECTOR.find(FA_PROCESS_COLLECTION,
-                                    {ARCHIVE: name})
+                                    {PARAM_KEYS: param_keys[-1]})
 
             status_code = 200
             if any(all(has_duplicate_params(parameters, job, doc_type)
@@ -316,16 +337,26 @@ class FullAnalysisPostFunction(AbstractPostFunction):
                     cur_parameters[JOB_NAME] = cur_job_name
                     cur_parameters[ARCHIVE] = name
                     cur_parameters[IS_HDF5] = is_hdf5
+                    cur_parameters[PARAM_KEYS] = param_keys
                     cur_parameters[BEST_EXIST_JOB] = find_best_exising_job(
-                                                    parameters, exist_fa_jobs)
+                                                    parameters, param_keys,
+                                                    cls._DB_CONNECTOR)
 
                     fa_workflow = FullAnalysisWorkFlowCallable(parameters=cur_parameters,
                                                                db_connector=cls._DB_CONNECTOR)
                     response = fa_workflow.document
-                    callback = make_process_callback(fa_workflow.uuid, cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           fa_workflow.uuid,
+                                           cls._DB_CONNECTOR)
 
+                    # Full analyses are long running, so single stage jobs
+                    # submitted after them run first
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
-                                                   fa_workflow, callback)
+                                                   fa_workflow, callback,
+                                                   priority=BATCH_PRIORITY)
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception(traceback.format_exc())
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -366,14 +397,75 @@ def has_duplicate_params(parameters, exist_job, doc_type):
         return False
     return True
 
-def find_best_exising_job(parameters, jobs):
+def get_param_keys(archive, exp_def, get_params):
+    """
+    Return a key for each document type, identifying the archive, experiment
+    definition and the parameters of that document type and the ones before it
+    in ALL_DOC_TYPES, so jobs with the same key for a document type can reuse
+    each other's results up to that document type.
+
+    @param archive:             archive name
+    @param exp_def:             experiment definition name
+    @param get_params:          function returning the list of parameter
+                                values of a document type, in
+                                _DOC_TYPE_TO_PARAMS order, or None if they're
+                                unknown
+    @return:                    list of md5 hex digests, ending at the first
+                                document type with unknown parameters
+    """
+    param_keys = list()
+    params = list()
+    for doc_type in ALL_DOC_TYPES:
+        doc_params = get_params(doc_type)
+        if doc_params is None: break
+        params.append(doc_params)
+        canonical = json.dumps([archive, exp_def, params], sort_keys=True,
+                               default=str)
+        param_keys.append(hashlib.md5(canonical).hexdigest())
+    return param_keys
+
+def get_job_param_keys(job):
+    """
+    Return the parameter keys of an existing full analysis job from its
+    documents.
+
+    @param job:                 a full analysis job
+    """
+    def get_params(doc_type):
+        params = _DOC_TYPE_TO_PARAMS[doc_type]
+        if doc_type not in job:
+            return None if params else []
+        return [job[doc_type].get(convert_param_name(param)) for param in params]
+    return get_param_keys(job.get(ARCHIVE), job.get(EXP_DEF), get_params)
+
+def ensure_param_keys(db_connector):
+    """
+    Record the parameter keys of full analysis jobs submitted before they were
+    recorded, so find_best_exising_job() can find them.
+
+    @param db_connector:        A DbConnector object.
+    """
+    jobs = db_connector.find_iter(FA_PROCESS_COLLECTION,
+                                  {PARAM_KEYS: {'$exists': False}})
+    requests = [UpdateOne({UUID: job[UUID]},
+                          {'$set': {PARAM_KEYS: get_job_param_keys(job)}})
+                for job in jobs]
+    if requests:
+        db_connector.bulk_write(FA_PROCESS_COLLECTION, requests)
+        APP_LOGGER.info("Recorded parameter keys of %d full analysis jobs." %
+                        len(requests))
+
+def find_best_exising_job(parameters, param_keys, db_connector):
     """
-    From a list of existing full analysis jobs, find the best one for rerun.
+    Find the best existing full analysis job for rerun. Only jobs whose
+    parameter keys match the longest run of succeeded documents are
+    retrieved, starting from the last document type, so the number of jobs
+    compared doesn't grow with the number of jobs of an archive.
 
     @param parameters:          full analysis parameters
-    @param jobs:                a list of full analysis jobs
+    @param param_keys:          parameter keys returned by get_param_keys()
+    @param db_connector:        A DbConnector object.
     """
-    if not jobs: return None
     max_num_subjobs = 0
     best_job = None
 
@@ -390,12 +482,18 @@ def find_best_exising_job(parameters, jobs):
                     count += 1
         return count
 
-    for job in jobs:
-        num_subjobs = count_subjobs(job)
-        if num_subjobs > max_num_subjobs:
-            max_num_subjobs = num_subjobs
-            best_job = job
-    return best_job
+    for doc_type, param_key in reversed(zip(ALL_DOC_TYPES, param_keys)):
+        jobs = db_connector.find(FA_PROCESS_COLLECTION,
+                                 {PARAM_KEYS: param_key,
+                                  '%s.%s' % (doc_type, STATUS): SUCCEEDED})
+        for job in jobs:
+            num_subjobs = count_subjobs(job)
+            if num_subjobs > max_num_subjobs:
+                max_num_subjobs = num_subjobs
+                best_job = job
+        if best_job is not None:
+            return best_job
+    return None
 
 def make_process_callback(uuid, db_connector):
     """
@@ -416,7 +514,7 @@ def make_process_callback(uuid, db_connector):
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(FA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(FA_PROCESS_COLLECTION, query):
                 db_connector.update(FA_PROCESS_COLLECTION, query, update)
         except:
             error_msg = str(sys.exc_info()[1])
@@ -424,7 +522,7 @@ def make_process_callback(uuid, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(FA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(FA_PROCESS_COLLECTION, query):
                 db_connector.update(FA_PROCESS_COLLECTION, query, update)
 
     return process_callback
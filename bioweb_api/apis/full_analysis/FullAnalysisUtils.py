@@ -20,11 +20,12 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
 import os
 from random import choice
 import shutil
 from string import ascii_letters
-import traceback
+import time
 
 from PyPDF2 import PdfFileMerger
 from reportlab.lib.pagesizes import letter, landscape
@@ -34,10 +35,11 @@ from reportlab.lib.units import inch
 from reportlab.lib import utils
 
 from bioweb_api import TMP_PATH, FA_PROCESS_COLLECTION, EXP_DEF_COLLECTION, \
-    RUN_REPORT_COLLECTION
+    RUN_REPORT_COLLECTION, REPORT_WORKERS, REPORT_SECTION_TIMEOUT
 from bioweb_api.DbConnector import DbConnector
 from bioweb_api.utilities.io_utilities import safe_make_dirs, get_results_folder, \
     get_results_url, get_results_filepath
+from bioweb_api.utilities.pool_utilities import terminate_pool
 from bioweb_api.apis.ApiConstants import ID, UUID, STATUS, PA_DOCUMENT, ID_DOCUMENT, \
      AC_DOCUMENT, GT_DOCUMENT, OFFSETS, ID_TRAINING_FACTOR, UI_THRESHOLD, AC_TRAINING_FACTOR, \
      CTRL_THRESH, REQUIRED_DROPS, DIFF_PARAMS, TRAINING_FACTOR, UNIFIED_PDF, UNIFIED_PDF_URL, \
@@ -45,7 +47,7 @@ from bioweb_api.apis.ApiConstants import ID, UUID, STATUS, PA_DOCUMENT, ID_DOCUM
      PDF_URL, VARIANTS, NAME, MAX_UNINJECTED_RATIO, CTRL_FILTER, IGNORE_LOWEST_BARCODE, \
      AC_METHOD, AC_MODEL, PICO1_DYE, USE_PICO1_FILTER, EP_DOCUMENT, ARCHIVE, DEV_MODE, \
      DEFAULT_DEV_MODE, IMAGE_STACKS, EXP_DEF, DRIFT_COMPENSATE, DEFAULT_DRIFT_COMPENSATE, \
-     USE_PICO2_FILTER
+     USE_PICO2_FILTER, PARAM_KEYS
 from primary_analysis.dye_model import DEFAULT_OFFSETS
 from secondary_analysis.constants import ID_TRAINING_FACTOR as DEFAULT_ID_TRAINING_FACTOR
 from secondary_analysis.constants import AC_TRAINING_FACTOR as DEFAULT_AC_TRAINING_FACTOR
@@ -96,6 +98,10 @@ DEFAULTS = {OFFSETS:            abs(DEFAULT_OFFSETS[0]),
 
 _DB_CONNECTOR = DbConnector.Instance()
 
+# Styles used to render the sections of unified PDF reports, they are
+# created on first use
+_REPORT_STYLES = None
+
 #=============================================================================
 # Functions and Classes
 #=============================================================================
@@ -110,20 +116,62 @@ def update_fa_docs(jobs):
     2. Add unified PDF
     """
     if not jobs: return []
+    run_report_exp_defs = get_run_report_exp_defs(job[ARCHIVE] for job in jobs
+                                                  if ARCHIVE in job)
     for job in jobs:
         if ID in job:
             del job[ID]
+        job.pop(PARAM_KEYS, None)
 
-        add_diff_params(job)
+        add_diff_params(job, run_report_exp_defs)
     return jobs
 
-def add_diff_params(fa_job):
+def get_run_report_exp_defs(archives):
+    """
+    Retrieve the experiment definition of the run report of each archive with
+    a single query.
+
+    @param archives:    Iterable of archive names.
+    @return:            Dictionary mapping archive names to experiment
+                        definitions. Archives without a run report are absent.
+    """
+    archives = list(set(archives))
+    if not archives: return dict()
+
+    reports = _DB_CONNECTOR.find_iter(RUN_REPORT_COLLECTION,
+                                      {IMAGE_STACKS: {'$in': archives}},
+                                      {ID: 0, IMAGE_STACKS: 1, EXP_DEF: 1})
+    archives = set(archives)
+    exp_defs = dict()
+    for report in reports:
+        if EXP_DEF not in report: continue
+        image_stacks = report[IMAGE_STACKS]
+        if not isinstance(image_stacks, list):
+            image_stacks = [image_stacks]
+        for archive in image_stacks:
+            # an archive found in several reports keeps the first report
+            if isinstance(archive, basestring) and archive in archives \
+                    and archive not in exp_defs:
+                exp_defs[archive] = report[EXP_DEF]
+    return exp_defs
+
+def add_diff_params(fa_job, run_report_exp_defs=None):
+    """
+    Add the parameters of a full analysis job that differ from their defaults.
+
+    @param fa_job:              A full analysis job document
+    @param run_report_exp_defs: Optional dictionary mapping archives to run
+                                report experiment definitions, as returned by
+                                get_run_report_exp_defs(). Avoids a query per
+                                job when updating many jobs.
+    """
     diff_params = dict()
 
     # check if a non-default experiment definition is used.
-    run_report = _DB_CONNECTOR.find_one(RUN_REPORT_COLLECTION, IMAGE_STACKS,
-                                        fa_job[ARCHIVE])
-    if run_report is not None and run_report[EXP_DEF] != fa_job[EXP_DEF]:
+    if run_report_exp_defs is None:
+        run_report_exp_defs = get_run_report_exp_defs([fa_job[ARCHIVE]])
+    if fa_job[ARCHIVE] in run_report_exp_defs and \
+            run_report_exp_defs[fa_job[ARCHIVE]] != fa_job[EXP_DEF]:
         diff_params[EXP_DEF] = fa_job[EXP_DEF]
 
     for param, doc_name in PARAM_MAP.items():
@@ -145,10 +193,13 @@ def add_unified_pdf(fa_job, document_list):
                    for indiv_doc in document_list):
         return False
 
+    fa_uuid = fa_job[UUID]
     make_pdf = MakeUnifiedPDF(fa_job)
-    make_pdf.save()
+    timings = make_pdf.save()
+    APP_LOGGER.info("Unified PDF report of %s generated: %s" %
+                    (fa_uuid, ", ".join("%s %.2fs" % item
+                                        for item in sorted(timings.items()))))
 
-    fa_uuid = fa_job[UUID]
     results_folder = get_results_folder()
     fa_pdf_path = os.path.join(results_folder, fa_uuid + '.pdf')
     if not os.path.isfile(fa_pdf_path):
@@ -241,80 +292,83 @@ class MakeUnifiedPDF(PDFWriter):
         self.tmp_pdf_path        = os.path.join(self.tmp_path, 'fa_unified.pdf')
 
     def save(self):
+        """
+        Render the sections of the report concurrently and merge them with the
+        genotyper PDFs into the unified report in a single pass.
+
+        @return:    Dictionary, the seconds taken by each step.
+        """
+        timings = dict()
         try:
             safe_make_dirs(self.tmp_path)
 
-            combine_sa = self._combine_sa(self.tmp_sa_path,
-                                          self.id_report_path,
-                                          self.png_path,
-                                          self.png_sum_path,
-                                          self.kde_path,
-                                          self.kde_sum_path)
-            if not combine_sa:
-                raise Exception("Failed to combine secondary analysis results.")
+            sections = self._render_sections(self.tmp_sa_path,
+                                             self.id_report_path,
+                                             self.png_sum_path,
+                                             self.kde_sum_path,
+                                             timings)
 
-            if not os.path.isfile(self.tmp_sa_path):
-                raise Exception("Failed to find temporary combined secondary analysis file")
-
-            self._merge_pdfs(self.tmp_pdf_path, self.vcf_pdf_path, self.tmp_sa_path)
+            start = time.time()
+            self._merge_pdfs(self.tmp_pdf_path, self.vcf_pdf_path,
+                             self.png_path, self.kde_path, *sections)
+            timings['merge'] = time.time() - start
 
             if not os.path.isfile(self.tmp_pdf_path):
                 raise Exception("Failed to merge PDF files.")
 
-            shutil.copy(self.tmp_pdf_path, self.fa_pdf_path)
+            shutil.move(self.tmp_pdf_path, self.fa_pdf_path)
         finally:
             shutil.rmtree(self.tmp_path, ignore_errors=True)
+        return timings
 
-    def _combine_sa(self, output_path, id_report_path, gt_png_path,
-            gt_png_sum_path, gt_kde_path, gt_kde_sum_path):
+    @staticmethod
+    def _render_sections(output_path, id_report_path, gt_png_sum_path,
+                         gt_kde_sum_path, timings=None):
         """
-        Combine Identity report, Assay Caller scatter plot, and Genotyper PNG
-
-        @param id_report_path:          pathname of identity report
-        @param gt_png_path:             pathname of genotyper scatter PNG
-        @param gt_png_sum_path:         pathname of genotyper scatter sum PNG
-        @param gt_kde_path:             pathname of genotyper KDE PNG
-        @param gt_kde_sum_path:         pathname of genotyper KDE sum PNG
+        Render the genotyper summary plots and the identity report to
+        separate PDFs concurrently, in a pool of REPORT_WORKERS processes
+        created for this report. Waits at most REPORT_SECTION_TIMEOUT seconds
+        for each section, the renderers are killed if one takes longer.
+
+        @param output_path:     base pathname of the section PDFs
+        @param timings:         An optional dictionary, the seconds taken to
+                                render each section are added to it
+        @return:                list of pathnames of the section PDFs, in
+                                report order
         """
+        timings  = timings if timings is not None else dict()
+        sections = [('scatter_summary', render_images,
+                     (output_path + '_scatter', [gt_png_sum_path])),
+                    ('kde_summary', render_images,
+                     (output_path + '_kde', [gt_kde_sum_path])),
+                    ('identity_report', render_report,
+                     (output_path + '_id', 'Identity Report', id_report_path))]
+
+        start    = time.time()
+        paths    = list()
+        pool     = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+        futures  = list()
+        finished = False
         try:
-            path = output_path + '_png_id'
-            doc = SimpleDocTemplate(path, pagesize=landscape(letter))
-            story = list()
-
-            story.append(self.get_image(gt_png_sum_path))
-            story.append(PageBreak())
-
-            story.append(self.get_image(gt_kde_sum_path))
-            story.append(PageBreak())
-
-            styles = getSampleStyleSheet()
-            id_title = Paragraph('Identity Report', styles['h2'])
-            story.append(id_title)
-            story.append(Spacer(1, 0.2*inch))
-
-            with open(id_report_path, 'r') as id_report:
-                lines = id_report.readlines()
-                for line in lines:
-                    styles = getSampleStyleSheet()
-                    left_indent = (len(line) - len(line.lstrip())) * 5
-                    styles.add(ParagraphStyle(name='custom_style',
-                                              fontName=FONT_NAME_STD,
-                                              fontSize=FONT_SIZE,
-                                              leftIndent=left_indent))
-                    p = Paragraph(line, styles['custom_style'])
-                    story.append(p)
-                story.append(PageBreak())
-
-            doc.build(story, onFirstPage=self.standard_page,
-                      onLaterPages=self.standard_page)
-
-            self._merge_pdfs(output_path, gt_png_path, gt_kde_path, path)
-
-            os.unlink(path)
-            return True
-        except:
-            APP_LOGGER.exception(traceback.format_exc())
-            return False
+            for name, render, args in sections:
+                futures.append(pool.submit(render, *args))
+            for (name, _, _), future in zip(sections, futures):
+                try:
+                    path, seconds = future.result(timeout=REPORT_SECTION_TIMEOUT)
+                except TimeoutError:
+                    raise Exception("Rendering the %s section of the unified " \
+                                    "PDF report took longer than %d seconds." %
+                                    (name, REPORT_SECTION_TIMEOUT))
+                timings[name] = seconds
+                paths.append(path)
+            finished = True
+        finally:
+            if finished:
+                pool.shutdown()
+            else:
+                terminate_pool(pool, futures)
+        timings['render'] = time.time() - start
+        return paths
 
     @staticmethod
     def _merge_pdfs(output_path, *args):
@@ -322,10 +376,13 @@ class MakeUnifiedPDF(PDFWriter):
         Merge multiple PDF files into one file
         """
         merger = PdfFileMerger()
-        for path in args:
-            if path is not None:
-                merger.append(path)
-        merger.write(output_path)
+        try:
+            for path in args:
+                if path is not None:
+                    merger.append(path)
+            merger.write(output_path)
+        finally:
+            merger.close()
 
     @staticmethod
     def get_image(path, max_width=8*inch, max_height=6.08*inch):
@@ -343,3 +400,76 @@ class MakeUnifiedPDF(PDFWriter):
             return Image(path,
                          width=(max_height / aspect),
                          height=max_height)
+
+
+class ReportSection(PDFWriter):
+    """
+    Renders a section of the unified PDF report with the page decorations
+    of the genotyper PDFs
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+
+    def build(self, story):
+        doc = SimpleDocTemplate(self.output_path, pagesize=landscape(letter))
+        doc.build(story, onFirstPage=self.standard_page,
+                  onLaterPages=self.standard_page)
+
+
+def render_images(output_path, image_paths):
+    """
+    Render images to a PDF, one per page.
+
+    @param output_path: pathname of the PDF
+    @param image_paths: list of pathnames of images
+    @return:            tuple, the pathname of the PDF and the seconds taken
+    """
+    start = time.time()
+    story = list()
+    for path in image_paths:
+        story.append(MakeUnifiedPDF.get_image(path))
+        story.append(PageBreak())
+    ReportSection(output_path).build(story)
+    return output_path, time.time() - start
+
+def render_report(output_path, title, report_path):
+    """
+    Render a text report to a PDF, keeping the indentation of each line.
+
+    @param output_path: pathname of the PDF
+    @param title:       title of the report
+    @param report_path: pathname of the text report
+    @return:            tuple, the pathname of the PDF and the seconds taken
+    """
+    start  = time.time()
+    styles = _get_report_styles()
+    story  = [Paragraph(title, styles['h2']), Spacer(1, 0.2*inch)]
+    with open(report_path, 'r') as report:
+        for line in report:
+            indent = len(line) - len(line.lstrip())
+            story.append(Paragraph(line, _get_indent_style(styles, indent)))
+    story.append(PageBreak())
+    ReportSection(output_path).build(story)
+    return output_path, time.time() - start
+
+def _get_report_styles():
+    """
+    @return:    StyleSheet1 used by unified PDF reports, it is created once
+                per process
+    """
+    global _REPORT_STYLES
+    if _REPORT_STYLES is None:
+        _REPORT_STYLES = getSampleStyleSheet()
+    return _REPORT_STYLES
+
+def _get_indent_style(styles, indent):
+    """
+    @return:    ParagraphStyle of report lines indented by indent characters
+    """
+    name = 'report_indent_%d' % indent
+    if name not in styles:
+        styles.add(ParagraphStyle(name=name,
+                                  fontName=FONT_NAME_STD,
+                                  fontSize=FONT_SIZE,
+                                  leftIndent=indent * 5))
+    return styles[name]
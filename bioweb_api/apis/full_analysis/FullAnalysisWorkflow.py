@@ -1,11 +1,11 @@
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime
-import time
 import traceback
 from uuid import uuid4
 
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job
 from bioweb_api import FA_PROCESS_COLLECTION, SA_GENOTYPER_COLLECTION, \
     SA_ASSAY_CALLER_COLLECTION, SA_IDENTITY_COLLECTION, PA_PROCESS_COLLECTION, \
     SA_EXPLORATORY_COLLECTION
@@ -22,7 +22,8 @@ from bioweb_api.apis.ApiConstants import PICO2_DYE, ASSAY_DYE, SUBMIT_DATESTAMP,
     IGNORE_LOWEST_BARCODE, CTRL_FILTER, AC_METHOD, PICO1_DYE, USE_PICO1_FILTER, \
     HOTSPOT, SEQUENCING, EXPLORATORY, EP_DOCUMENT, SQ_DOCUMENT, SA_EXPLORATORY_UUID, \
     AC_MODEL, DYES_SCATTER_PLOT_URL, DRIFT_COMPENSATE, DEFAULT_DRIFT_COMPENSATE, \
-    USE_PICO2_FILTER, API_VERSION, BEST_EXIST_JOB, DROP_COUNT_PLOT_URL
+    USE_PICO2_FILTER, API_VERSION, BEST_EXIST_JOB, DROP_COUNT_PLOT_URL, \
+    PARAM_KEYS
 from bioweb_api.apis.full_analysis.FullAnalysisUtils import is_param_diff, generate_random_str, \
     add_unified_pdf
 from bioweb_api.apis.primary_analysis.ProcessPostFunction import PaProcessCallable, PROCESS
@@ -30,18 +31,32 @@ from bioweb_api.apis.secondary_analysis.IdentityPostFunction import SaIdentityCa
 from bioweb_api.apis.secondary_analysis.AssayCallerPostFunction import SaAssayCallerCallable, ASSAY_CALLER
 from bioweb_api.apis.secondary_analysis.GenotyperPostFunction import SaGenotyperCallable, GENOTYPER
 from bioweb_api.apis.secondary_analysis.ExploratoryPostFunction import SaExploratoryCallable
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 from bioweb_api.apis.primary_analysis.ProcessPostFunction import make_process_callback as pa_make_process_callback
 from bioweb_api.apis.secondary_analysis.IdentityPostFunction import make_process_callback as id_make_process_callback
 from bioweb_api.apis.secondary_analysis.AssayCallerPostFunction import make_process_callback as ac_make_process_callback
 from bioweb_api.apis.secondary_analysis.GenotyperPostFunction import make_process_callback as gt_make_process_callback
 from bioweb_api.apis.secondary_analysis.ExploratoryPostFunction import make_process_callback as ep_make_process_callback
-from gbutils.exp_def.exp_def_handler import ExpDefHandler
 
 
 # lookup dictionary for last step in workflow
 WORKFLOW_LOOKUP = {HOTSPOT: GENOTYPER, EXPLORATORY: EXPLORATORY, SEQUENCING: SEQUENCING}
 # lookup dictionary for last element in document list
 DOCUMENT_LOOKUP = {HOTSPOT: GT_DOCUMENT, EXPLORATORY: EP_DOCUMENT, SEQUENCING: SQ_DOCUMENT}
+# lookup dictionary for the stage whose result each stage takes as input
+STAGE_DEPENDENCIES = {PROCESS: None, IDENTITY: PROCESS, ASSAY_CALLER: IDENTITY,
+                      GENOTYPER: ASSAY_CALLER, EXPLORATORY: ASSAY_CALLER}
+
+def check_exp_type(exp_type):
+    """
+    Raise an exception if the workflow of an experiment type can't be run,
+    i.e. its last stage (see WORKFLOW_LOOKUP) has no job. There is no
+    sequencing job yet.
+
+    @param exp_type:    Experiment type, e.g. HOTSPOT.
+    """
+    if WORKFLOW_LOOKUP.get(exp_type) not in STAGE_DEPENDENCIES:
+        raise Exception("Full analysis of %s experiments is not supported." % exp_type)
 
 class FullAnalysisWorkFlowCallable(object):
     def __init__(self, parameters, db_connector):
@@ -63,14 +78,17 @@ class FullAnalysisWorkFlowCallable(object):
             ARCHIVE:            parameters[ARCHIVE],
             IS_HDF5:            parameters[IS_HDF5],
             EXP_DEF:            parameters[EXP_DEF],
+            PARAM_KEYS:         parameters.get(PARAM_KEYS),
             API_VERSION:        VERSION,
         }
 
         self.uuid_container = [None]
-        self.db_connector.insert(FA_PROCESS_COLLECTION, [self.document])
+        insert_job(FA_PROCESS_COLLECTION, self.document)
 
     def __call__(self):
         self.set_defaults()
+        if hasattr(self, 'exp_type'):
+            check_exp_type(self.exp_type)
         # check if a run needs to be resumed.
         if BEST_EXIST_JOB in self.parameters:
             self.resume_workflow()
@@ -94,8 +112,8 @@ class FullAnalysisWorkFlowCallable(object):
         for exploratory experiment, and sequencing API for sequencing experiment.
         """
         try:
-            exp_def_fetcher = ExpDefHandler()
-            experiment = exp_def_fetcher.get_experiment_definition(self.parameters[EXP_DEF])
+            exp_def_cache = ExpDefCache.Instance()
+            experiment = exp_def_cache.experiment(self.parameters[EXP_DEF])
 
             self.exp_type = experiment.exp_type
             self.workflow = [PROCESS, IDENTITY, ASSAY_CALLER] + [WORKFLOW_LOOKUP[self.exp_type]]
@@ -107,10 +125,7 @@ class FullAnalysisWorkFlowCallable(object):
                NUM_PROBES not in self.parameters or \
                PICO1_DYE not in self.parameters:
                 # get dyes and number of levels
-                dye_levels = defaultdict(int)
-                for barcode in experiment.barcodes:
-                    for dye_name, lvl in barcode.dye_levels.items():
-                        dye_levels[dye_name] = max(dye_levels[dye_name], int(lvl+1))
+                dye_levels = exp_def_cache.dye_levels(self.parameters[EXP_DEF])
                 if DYES not in self.parameters:
                     self.parameters[DYES] = dye_levels.keys()
                 if DYE_LEVELS not in self.parameters:
@@ -221,9 +236,7 @@ class FullAnalysisWorkFlowCallable(object):
                                                          OFFSETS: self.parameters[OFFSETS]}}})
 
         # run primary analysis job
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(callable)
-            future.add_done_callback(callback)
+        self.run_stage(callable, callback)
 
         # update full analysis entry with results from primary analysis
         result = self.db_connector.find_one(PA_PROCESS_COLLECTION, UUID, callable.uuid)
@@ -289,9 +302,7 @@ class FullAnalysisWorkFlowCallable(object):
                                                          DRIFT_COMPENSATE: self.parameters[DRIFT_COMPENSATE]}}})
 
         # run identity job
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(callable)
-            future.add_done_callback(callback)
+        self.run_stage(callable, callback)
 
         # update full analysis entry with results from identity
         result = self.db_connector.find_one(SA_IDENTITY_COLLECTION, UUID, callable.uuid)
@@ -347,9 +358,7 @@ class FullAnalysisWorkFlowCallable(object):
                                                          AC_MODEL: ac_model}}})
 
         # run assay caller job
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(callable)
-            future.add_done_callback(callback)
+        self.run_stage(callable, callback)
 
         # update full analysis entry with results from assay caller
         result = self.db_connector.find_one(SA_ASSAY_CALLER_COLLECTION, UUID, callable.uuid)
@@ -382,12 +391,8 @@ class FullAnalysisWorkFlowCallable(object):
                                         mask_code=mask_code,
                                         combine_alleles=True)
         callback = gt_make_process_callback(uuid=callable.uuid,
-                                            exp_def_name=self.parameters[EXP_DEF],
-                                            ac_result_path=callable.ac_result_path,
-                                            ignored_dyes=callable.ignored_dyes,
                                             outfile_path=callable.outfile_path,
-                                            db_connector=self.db_connector,
-                                            cur_job_name=job_name)
+                                            db_connector=self.db_connector)
 
         # enter genotyper uuid into full analysis database entry
         self.db_connector.update(FA_PROCESS_COLLECTION, self.query,
@@ -396,9 +401,7 @@ class FullAnalysisWorkFlowCallable(object):
                                                          REQUIRED_DROPS: self.parameters[REQUIRED_DROPS]}}})
 
         # run genotyper job
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(callable)
-            future.add_done_callback(callback)
+        self.run_stage(callable, callback)
 
         # update full analysis entry with results from genotyper
         result = self.db_connector.find_one(SA_GENOTYPER_COLLECTION, UUID, callable.uuid)
@@ -438,9 +441,7 @@ class FullAnalysisWorkFlowCallable(object):
                                                          REQUIRED_DROPS: self.parameters[REQUIRED_DROPS]}}})
 
         # run genotyper job
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(callable)
-            future.add_done_callback(callback)
+        self.run_stage(callable, callback)
 
         # update full analysis entry with results from genotyper
         result = self.db_connector.find_one(SA_EXPLORATORY_COLLECTION, UUID, callable.uuid)
@@ -453,29 +454,53 @@ class FullAnalysisWorkFlowCallable(object):
         # return genotyper status and uuid
         return callable.uuid, result[STATUS], 'exploratory'
 
+    def run_stage(self, callable, callback):
+        """
+        Run the callable of a stage in this thread and fire its callback with
+        the outcome, as an executor would. The callback has updated the stage's
+        document by the time this returns, so the next stage can start
+        immediately.
+
+        @param callable:    Callable that runs the stage's job.
+        @param callback:    Callback that expects a completed future.
+        """
+        future = Future()
+        try:
+            future.set_result(callable())
+        except Exception, e:
+            future.set_exception(e)
+        future.add_done_callback(callback)
+
     def run_analysis(self):
         """
-        Initialize a list of jobs that will be run in order
+        Run the stages in self.workflow. Each stage is started as soon as the
+        stage it depends on (see STAGE_DEPENDENCIES) completes successfully,
+        using the uuid of that stage's job as input. The first stage uses the
+        last uuid in self.uuid_container, which is that of the last stage
+        completed by a resumed workflow, if any.
         """
         job_map = {PROCESS:         self.primary_analysis_job,
                    IDENTITY:        self.identity_job,
                    ASSAY_CALLER:    self.assay_caller_job,
                    GENOTYPER:       self.genotyper_job,
                    EXPLORATORY:     self.exploratory_job}
-        # run jobs in the order specified by self.workflow
-        while self.workflow:
-            job = job_map[self.workflow.pop(0)]
-            job_uuid, status, name = job(self.uuid_container[-1])
+
+        # queue of (stage, input uuid) for stages whose input is available
+        ready = deque((stage, self.uuid_container[-1]) for stage in self.workflow
+                      if STAGE_DEPENDENCIES.get(stage) not in self.workflow)
+        while ready:
+            stage, input_uuid = ready.popleft()
+            self.workflow.remove(stage)
+            job_uuid, status, name = job_map[stage](input_uuid)
             if status != SUCCEEDED:
                 raise Exception('failed at %s' % name)
 
             self.uuid_container.append(job_uuid)
+            # completion of a stage triggers the stages that depend on it
+            ready.extend((next_stage, job_uuid) for next_stage in self.workflow
+                         if STAGE_DEPENDENCIES.get(next_stage) == stage)
 
-        # add unified pdf
+        # add unified pdf, every stage has completed so no need to wait
         fa_job = self.db_connector.find_one(FA_PROCESS_COLLECTION, UUID, self.uuid)
         last_doc = DOCUMENT_LOOKUP[self.exp_type]
-
-        while STATUS not in fa_job[last_doc] or fa_job[last_doc][STATUS] == JOB_STATUS.running:
-            time.sleep(10)
-            fa_job = self.db_connector.find_one(FA_PROCESS_COLLECTION, UUID, self.uuid)
         add_unified_pdf(fa_job, [PA_DOCUMENT, ID_DOCUMENT, AC_DOCUMENT, last_doc])
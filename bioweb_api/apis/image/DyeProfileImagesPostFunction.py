@@ -28,7 +28,7 @@ import traceback
 from datetime import datetime
 from uuid import uuid4
 
-from bioweb_api.apis.image.ImageApiHelperFunctions import check_ham_tar_structure
+from bioweb_api.apis.image.ImageApiHelperFunctions import check_ham_tar_members
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import FILENAME, ERROR, RESULT, \
@@ -41,6 +41,7 @@ from bioweb_api import TMP_PATH, IMAGES_COLLECTION, RESULTS_PATH, HOSTNAME, \
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file, get_archive_dirs
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
+from bioweb_api.utilities.upload_utilities import save_upload
 
 from primary_analysis.experiment.experiment_definitions import ExperimentDefinitions
 
@@ -198,9 +199,9 @@ class DyeProfileImagesPostFunction(AbstractPostFunction):
 
         try:
             # check tar file
-            image_stack_tgz.save(tmp_archive_path)
+            members, _ = save_upload(image_stack_tgz, tmp_archive_path)
             image_stack_tgz.close()
-            tar_error, nimgs = check_ham_tar_structure(tmp_archive_path, HAM)
+            tar_error, nimgs = check_ham_tar_members(members, HAM)
 
             # check for existing image stacks
             existing_stacks = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
@@ -226,7 +227,7 @@ class DyeProfileImagesPostFunction(AbstractPostFunction):
             else:
                 url = "http://%s/results/%s/%s" % (HOSTNAME, PORT,
                                                    os.path.basename(archive_path))
-                shutil.copy(tmp_archive_path, archive_path)
+                shutil.move(tmp_archive_path, archive_path)
                 json_response[RESULT]       = archive_path
                 json_response[URL]          = url
                 json_response[NAME]         = img_stack_name
@@ -299,7 +300,7 @@ def make_process_callback(uuid, outfile_path, config_path, db_connector):
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PROCESS_COLLECTION, query):
                 db_connector.update(PA_PROCESS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -311,7 +312,7 @@ def make_process_callback(uuid, outfile_path, config_path, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PROCESS_COLLECTION, query):
                 db_connector.update(PA_PROCESS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -1,10 +1,16 @@
+import copy
+import gzip
 import os
+import subprocess
 import tarfile
-import tempfile
+import time
+import zlib
+
+from cStringIO import StringIO
+from distutils.spawn import find_executable
 
 from bioweb_api.apis.ApiConstants import VALID_HAM_IMAGE_EXTENSIONS
 from bioweb_api.apis.ApiConstants import VALID_MON_IMAGE_EXTENSIONS
-from bioweb_api.utilities.io_utilities import silently_remove_tree
 
 
 def set_tar_permissions(tarinfo):
@@ -40,6 +46,23 @@ def check_ham_tar_structure(tar_path, valid_dir_name):
     members = tf.getmembers()
     tf.close()
 
+    return check_ham_tar_members(members, valid_dir_name)
+
+
+def check_ham_tar_members(members, valid_dir_name):
+    """
+    Verify the members of a ham image stack tar file, as described in
+    check_ham_tar_structure.
+
+    @param members:         List of TarInfo objects, or None if the file
+                            isn't a tar file
+    @param valid_dir_name:  String specifying valid root directory name
+    @return:                Tuple containing error message if any and
+                            image count if no errors were encountered.
+    """
+    if members is None:
+        return 'Not a tar file.', None
+
     # verify that there are no other files in tar root except a single directory
     valid_root_members = [m for m in members if os.path.split(m.name)[0] == '' and m.isdir()]
     if len(valid_root_members) != 1:
@@ -80,69 +103,108 @@ def check_mon_tar_structure(tar_path, valid_dir_name):
     must have a valid name and it must contain three directories named
     cropped_electrode_off, cropped_electrode_on, and uncropped.
 
+    The tar headers are read in a single pass in stream mode, so the
+    images are decompressed but never written to disk.
+
     @param tar_path:        String of tar file path
     @param valid_dir_name:  String specifying valid root directory name
     @return:                Tuple containing error message if any and
                             image count if no errors were encountered.
     """
-    # verify that file is tar file
-    if not tarfile.is_tarfile(tar_path):
+    try:
+        tf = tarfile.open(tar_path, 'r|*')
+    except (tarfile.TarError, IOError, EOFError, zlib.error):
         return 'Not a tar file.', None
 
-    # open file
-    tf = tarfile.open(tar_path)
-
-    # try to extract the file
-    tmp_path = tempfile.mkdtemp()
     try:
-        tf.extractall(tmp_path)
-    except:
-        silently_remove_tree(tmp_path)
-        tf.close()
+        return check_mon_tar_members(tf, valid_dir_name)
+    except (tarfile.TarError, IOError, EOFError, zlib.error):
         return 'Tar file could not be extracted.', None
+    finally:
+        tf.close()
 
-    silently_remove_tree(tmp_path)
-    # get members
-    members = tf.getmembers()
-    tf.close()
+
+def check_mon_tar_members(members, valid_dir_name):
+    """
+    Verify the members of a monitor image stack, as described in
+    check_mon_tar_structure, in a single pass over members. Members that
+    couldn't be extracted are also rejected: a file or link whose name is
+    a directory (or whose directory is a file) of an earlier member, or a
+    hard link to a file that isn't an earlier member.
+
+    @param members:         Iterable of TarInfo objects, e.g. a TarFile
+                            opened in stream mode, or None if the file
+                            isn't a tar file
+    @param valid_dir_name:  String specifying valid root directory name
+    @return:                Tuple containing error message if any and
+                            image count if no errors were encountered.
+    """
+    if members is None:
+        return 'Not a tar file.', None
+
+    mon_dir_names = set(['cropped_electrode_off', 'cropped_electrode_on',
+                         'uncropped'])
+    names         = set()
+    dir_names     = set()
+    file_names    = set()
+    extractable   = True
+    root_dirs     = []
+    mon_dir_valid = []
+    mon_dir_count = 0
+    img_count     = 0
+    for member in members:
+        parent, base_name = os.path.split(member.name)
+
+        # check that the member can be extracted over earlier members
+        ancestor = parent
+        while ancestor:
+            if ancestor in file_names:
+                extractable = False
+            dir_names.add(ancestor)
+            ancestor = os.path.dirname(ancestor)
+        if member.isdir():
+            if member.name in file_names:
+                extractable = False
+            dir_names.add(member.name)
+        elif member.name in dir_names or \
+             (member.islnk() and member.linkname not in names):
+            extractable = False
+        elif not member.issym():
+            file_names.add(member.name)
+        names.add(member.name)
+
+        if parent == '' and member.isdir():
+            root_dirs.append(member.name)
+        elif parent == valid_dir_name:
+            mon_dir_count += 1
+            if member.isdir() or member.issym():
+                mon_dir_valid.append(base_name)
+
+        # osx makes non-visible files, ignore them
+        if not base_name.startswith('.') and \
+                member.isfile() and \
+                base_name.endswith(tuple(VALID_MON_IMAGE_EXTENSIONS)):
+            img_count += 1
+
+    if not extractable:
+        return 'Tar file could not be extracted.', None
 
     # verify that there are no other files in tar root except a single directory
-    valid_root_members = [m for m in members if os.path.split(m.name)[0] == '' and m.isdir()]
-    if len(valid_root_members) != 1:
+    if len(root_dirs) != 1:
         return 'Tar root must have a single directory.', None
 
     # verify tar root directory has a valid name
-    valid_root_dir = [m for m in valid_root_members if m.name == valid_dir_name]
-    if not valid_root_dir:
+    if root_dirs[0] != valid_dir_name:
         return 'Tar root folder must be named "%s".' % valid_dir_name, None
 
     # check if directory contains three folders named cropped_electrode_off,
     # cropped_electrode_on, and uncropped.
-    mon_dir_members = [m for m in members if os.path.split(m.name)[0] == valid_dir_name]
-    mon_dir_invalid = [m for m in mon_dir_members if not m.isdir() and not m.issym()]
-    mon_dir_valid   = [m for m in mon_dir_members if m.isdir() or m.issym()]
-    crop_ele_off    = [m for m in mon_dir_valid if os.path.basename(m.name) == 'cropped_electrode_off']
-    crop_ele_on     = [m for m in mon_dir_valid if os.path.basename(m.name) == 'cropped_electrode_on']
-    uncropped       = [m for m in mon_dir_valid if os.path.basename(m.name) == 'uncropped']
-
-    if mon_dir_invalid or \
-                    len(mon_dir_valid) != 3 or \
-            not crop_ele_on or \
-            not uncropped or \
-            not crop_ele_off:
+    if mon_dir_count != len(mon_dir_valid) or \
+            len(mon_dir_valid) != 3 or \
+            set(mon_dir_valid) != mon_dir_names:
         return '%s folder must contain directories named cropped_electrode_off,' \
                ' cropped_electrode_on, and uncropped' % valid_dir_name, None
 
-    # get image count
-    img_count = 0
-    for member in members:
-        base_name = os.path.basename(member.name)
-        # osx makes non-visible files, ignore them
-        if not base_name.startswith('.') and \
-                member.isfile() and \
-                base_name.endswith(tuple(VALID_MON_IMAGE_EXTENSIONS)):
-            img_count += 1
-
     # make sure there are images
     if img_count == 0:
         return 'There are no images in this tar file', None
@@ -150,17 +212,79 @@ def check_mon_tar_structure(tar_path, valid_dir_name):
     return '', img_count
 
 
-def extract_imgs(existing_tar, replay_dir_path):
+def build_replay_stack(replay_path, stack_paths, readme_str, compresslevel=1,
+                       gzip_threads=0, progress_callback=None):
     """
-    Adds images from existing image files into a the replay tar file.
+    Write a replay image stack containing the members of existing image
+    stacks under a replay directory, along with a README. Members are copied
+    directly from each stack's tar stream into the replay tar stream, so
+    nothing is extracted to disk. Images are already compressed, so the
+    replay stack is gzipped at a low compression level by default.
 
-    @param existing_tar:    String specifying path to tar file containing image stacks
-    @param tmp_path:        String specifying temporary directory to tar/untar
+    @param replay_path:       String specifying path of the replay tar file
+    @param stack_paths:       List of paths to existing image stack tar files
+    @param readme_str:        String contents of the README
+    @param compresslevel:     Gzip compression level, 0-9
+    @param gzip_threads:      Number of threads used to gzip the replay stack
+                              with pigz, if it is installed. If 0, it is
+                              gzipped in this process.
+    @param progress_callback: Called with the fraction of the existing stacks
+                              copied so far
     """
-    # extract incoming
-    tf = tarfile.open(existing_tar)
-    tf.extractall(replay_dir_path)
-    tf.close()
+    pigz = find_executable('pigz') if gzip_threads > 0 else None
+    with open(replay_path, 'wb') as fh:
+        if pigz:
+            proc   = subprocess.Popen([pigz, '-%d' % compresslevel,
+                                       '-p', str(gzip_threads), '-c'],
+                                      stdin=subprocess.PIPE, stdout=fh)
+            gz_obj = proc.stdin
+        else:
+            proc   = None
+            gz_obj = gzip.GzipFile(fileobj=fh, mode='wb',
+                                   compresslevel=compresslevel)
+
+        try:
+            new_tf = tarfile.open(fileobj=gz_obj, mode='w|')
+
+            # add readme
+            readme_info = tarfile.TarInfo('replay/README')
+            readme_info.size = len(readme_str)
+            readme_info.mtime = time.time()
+            replay_info = tarfile.TarInfo('replay')
+            replay_info.type = tarfile.DIRTYPE
+            replay_info.mtime = readme_info.mtime
+            new_tf.addfile(set_tar_permissions(replay_info))
+            new_tf.addfile(set_tar_permissions(readme_info),
+                           StringIO(readme_str))
+
+            # add images
+            total_size  = sum(os.path.getsize(p) for p in stack_paths) or 1
+            copied_size = 0
+            for stack_path in stack_paths:
+                with open(stack_path, 'rb') as stack_fh:
+                    tf = tarfile.open(fileobj=stack_fh, mode='r|*')
+                    for member in tf:
+                        info = copy.copy(member)
+                        info.name = 'replay/' + member.name
+                        if member.islnk():
+                            info.linkname = 'replay/' + member.linkname
+                        fileobj = tf.extractfile(member) if member.isfile() \
+                                                         else None
+                        new_tf.addfile(set_tar_permissions(info), fileobj)
+                        if progress_callback is not None:
+                            progress_callback(float(copied_size +
+                                                    stack_fh.tell()) /
+                                              total_size)
+                    tf.close()
+                copied_size += os.path.getsize(stack_path)
+
+            readme_info.name = 'README'
+            new_tf.addfile(readme_info, StringIO(readme_str))
+            new_tf.close()
+        finally:
+            gz_obj.close()
+            if proc is not None and proc.wait() != 0:
+                raise Exception('pigz exited with status %d.' % proc.returncode)
 
 
 if __name__ == '__main__':
@@ -28,19 +28,19 @@ import traceback
 from datetime import datetime
 from uuid import uuid4
 
-from bioweb_api.apis.image.ImageApiHelperFunctions import check_ham_tar_structure
+from bioweb_api.apis.image.ImageApiHelperFunctions import check_ham_tar_members
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import FILENAME, ERROR, RESULT, \
     EXP_DEF_NAME, EXP_DEF_UUID, NUM_IMAGES, DATESTAMP, UUID, NAME, \
-    DESCRIPTION, URL, ID, STACK_TYPE, HAM
+    DESCRIPTION, URL, ID, STACK_TYPE, HAM, CHECKSUM
 from bioweb_api import TMP_PATH, IMAGES_COLLECTION, RESULTS_PATH, HOSTNAME, \
     PORT
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
-
-from gbutils.exp_def.exp_def_handler import ExpDefHandler
+from bioweb_api.utilities.upload_utilities import save_upload
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 
 #=============================================================================
 # Public Static Variables
@@ -117,9 +117,9 @@ class ImagesPostFunction(AbstractPostFunction):
 
         try:
             # check tar file
-            image_stack_tgz.save(tmp_archive_path)
+            members, checksum = save_upload(image_stack_tgz, tmp_archive_path)
             image_stack_tgz.close()
-            tar_error, nimgs = check_ham_tar_structure(tmp_archive_path, HAM)
+            tar_error, nimgs = check_ham_tar_members(members, HAM)
 
             # check for existing image stacks
             existing_stacks = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
@@ -127,8 +127,7 @@ class ImagesPostFunction(AbstractPostFunction):
                                                      [NAME])
 
             # check for exp def
-            exp_def_fetcher = ExpDefHandler()
-            exp_def_uuid = exp_def_fetcher.get_experiment_uuid(exp_def_name)
+            exp_def_uuid = ExpDefCache.Instance().get_uuid(exp_def_name)
 
             if existing_stacks:
                 http_status_code = 403
@@ -145,7 +144,7 @@ class ImagesPostFunction(AbstractPostFunction):
             else:
                 url = "http://%s/results/%s/%s" % (HOSTNAME, PORT,
                                                    os.path.basename(archive_path))
-                shutil.copy(tmp_archive_path, archive_path)
+                shutil.move(tmp_archive_path, archive_path)
                 json_response[RESULT]       = archive_path
                 json_response[URL]          = url
                 json_response[NAME]         = img_stack_name
@@ -154,6 +153,7 @@ class ImagesPostFunction(AbstractPostFunction):
                 json_response[EXP_DEF_UUID] = exp_def_uuid
                 json_response[NUM_IMAGES]   = nimgs
                 json_response[STACK_TYPE]  = HAM
+                json_response[CHECKSUM]     = checksum
                 cls._DB_CONNECTOR.insert(IMAGES_COLLECTION,
                                          [json_response])
         except IOError:
@@ -29,16 +29,17 @@ import traceback
 from datetime import datetime
 from uuid import uuid4
 
-from bioweb_api.apis.image.ImageApiHelperFunctions import check_mon_tar_structure
+from bioweb_api.apis.image.ImageApiHelperFunctions import check_mon_tar_members
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import FILENAME, ERROR, RESULT, \
-    NUM_IMAGES,DATESTAMP, UUID, NAME, DESCRIPTION, URL, ID, STACK_TYPE
+    NUM_IMAGES,DATESTAMP, UUID, NAME, DESCRIPTION, URL, ID, STACK_TYPE, CHECKSUM
 from bioweb_api import TMP_PATH, IMAGES_COLLECTION, RESULTS_PATH, HOSTNAME, \
     PORT
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
+from bioweb_api.utilities.upload_utilities import save_upload
 
 #=============================================================================
 # Public Static Variables
@@ -113,10 +114,10 @@ class MonitorImagesPostFunction(AbstractPostFunction):
 
         try:
             # check tar file
-            image_stack_tgz.save(tmp_archive_path)
+            members, checksum = save_upload(image_stack_tgz, tmp_archive_path)
             image_stack_tgz.close()
 
-            tar_error, nimgs = check_mon_tar_structure(tmp_archive_path, stack_type)
+            tar_error, nimgs = check_mon_tar_members(members, stack_type)
 
             # check for existing image stacks
             existing_stacks = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
@@ -133,13 +134,14 @@ class MonitorImagesPostFunction(AbstractPostFunction):
             else:
                 url = 'http://%s/results/%s/%s' % (HOSTNAME, PORT,
                                                    os.path.basename(archive_path))
-                shutil.copy(tmp_archive_path, archive_path)
+                shutil.move(tmp_archive_path, archive_path)
                 json_response[RESULT]      = archive_path
                 json_response[URL]         = url
                 json_response[NAME]        = img_stack_name
                 json_response[DESCRIPTION] = short_desc
                 json_response[NUM_IMAGES]  = nimgs
                 json_response[STACK_TYPE]  = stack_type
+                json_response[CHECKSUM]    = checksum
                 cls._DB_CONNECTOR.insert(IMAGES_COLLECTION,
                                          [json_response])
         except IOError:
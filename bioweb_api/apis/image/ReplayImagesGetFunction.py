@@ -27,7 +27,8 @@ from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import IMAGES_COLLECTION
 from bioweb_api.apis.ApiConstants import FILENAME, ID, \
     RESULT, STACK_TYPE, REPLAY, NUM_IMAGES,\
-    DATESTAMP, UUID, NAME, DESCRIPTION, URL, HAM_NAME, MON1_NAME, MON2_NAME
+    DATESTAMP, UUID, NAME, DESCRIPTION, URL, HAM_NAME, MON1_NAME, MON2_NAME, \
+    STATUS, PROGRESS, ERROR, JOB_STATUS
 from bioweb_api.apis.image.ReplayImagesPostFunction import REPLAY_IMAGES
 
 #=============================================================================
@@ -48,11 +49,15 @@ class ReplayImagesGetFunction(AbstractGetFunction):
     
     @staticmethod
     def notes():
-        return ""
+        return "Replay image stacks are built by a job. Only stacks that " \
+               "have been built are returned unless status is provided, " \
+               "e.g. status=submitted,running to follow their progress."
     
     @classmethod
     def parameters(cls):
+        cls.status_param = ParameterFactory.job_status()
         parameters = [
+                      cls.status_param,
                       ParameterFactory.format(),
                      ]
         return parameters
@@ -73,11 +78,22 @@ class ReplayImagesGetFunction(AbstractGetFunction):
         columns[HAM_NAME]     = 1
         columns[MON1_NAME]    = 1
         columns[MON2_NAME]    = 1
+        columns[STATUS]       = 1
+        columns[PROGRESS]     = 1
+        columns[ERROR]        = 1
 
         column_names = columns.keys()  
         column_names.remove(ID)         
         
-        data = cls._DB_CONNECTOR.find(IMAGES_COLLECTION, {STACK_TYPE: REPLAY}, columns)
+        statuses = list(params_dict.get(cls.status_param,
+                                        [JOB_STATUS.succeeded])) # @UndefinedVariable
+        # Stacks recorded before replay stacks were built by a job have no
+        # status
+        if JOB_STATUS.succeeded in statuses: # @UndefinedVariable
+            statuses.append(None)
+        data = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
+                                      {STACK_TYPE: REPLAY,
+                                       STATUS: {"$in": statuses}}, columns)
          
         return (data, column_names, None)
          
@@ -23,24 +23,23 @@ limitations under the License.
 import os
 import shutil
 import sys
-import tarfile
-import tempfile
 import traceback
 
 from datetime import datetime
 from uuid import uuid4
 
-from bioweb_api.apis.image.ImageApiHelperFunctions import extract_imgs
-from bioweb_api.apis.image.ImageApiHelperFunctions import set_tar_permissions
+from bioweb_api.apis.image.ImageApiHelperFunctions import build_replay_stack
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import FILENAME, ERROR, RESULT, \
     DESCRIPTION, DATESTAMP, UUID, NAME, URL, ID, HAM_NAME, \
-    MON1_NAME, MON2_NAME, STACK_TYPE, MONITOR1, MONITOR2, HAM, REPLAY
-from bioweb_api import IMAGES_COLLECTION, RESULTS_PATH, HOSTNAME, \
-    PORT
+    MON1_NAME, MON2_NAME, STACK_TYPE, MONITOR1, MONITOR2, HAM, REPLAY, \
+    STATUS, JOB_STATUS, PROGRESS, START_DATESTAMP, FINISH_DATESTAMP
+from bioweb_api import IMAGES_COLLECTION, RESULTS_PATH, TMP_PATH, HOSTNAME, \
+    PORT, REPLAY_GZIP_LEVEL, REPLAY_GZIP_THREADS
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.utilities.io_utilities import make_clean_response, \
-    silently_remove_tree
+    silently_remove_file
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 
 #=============================================================================
@@ -147,62 +146,37 @@ class ReplayImagesPostFunction(AbstractPostFunction):
                 similar_name = similar_replay_stacks[0][NAME]
                 http_status_code = 403
                 json_response[ERROR] = 'Similar replay stack named "%s" already exists.' % similar_name
-            # if no similar stack exists enter it into the database
+            # if no similar stack exists enter it into the database and queue
+            # a job to build it
             else:
-                tmp_path = ''
-                try:
-                    # temporary path for taring, untaring, etc...
-                    tmp_path = tempfile.mkdtemp()
-
-                    # create a replay directory
-                    replay_dir_path = os.path.join(tmp_path, 'replay')
-                    os.mkdir(replay_dir_path)
-
-                    # make readme
-                    readme_file_name = 'README'
-                    readme_path = os.path.join(replay_dir_path, readme_file_name)
-                    readme_str = '\n'.join([replay_stack_name, ham_stack_name,
-                                            mon1_stack_name, mon2_stack_name,
-                                            short_desc])
-                    with open(readme_path, 'w') as fh:
-                        fh.write(readme_str)
-
-                    # create new tar file
-                    new_tf_name = uuid+'.tar.gz'
-                    new_tf_path = os.path.join(tmp_path, new_tf_name)
-                    new_tf = tarfile.open(new_tf_path, 'w:gz')
-
-                    # add readme and images
-                    extract_imgs(existing_ham_stacks[0][RESULT], replay_dir_path)
-                    extract_imgs(existing_mon1_stacks[0][RESULT], replay_dir_path)
-                    extract_imgs(existing_mon2_stacks[0][RESULT], replay_dir_path)
-                    new_tf.add(replay_dir_path, 'replay', filter=set_tar_permissions)
-                    new_tf.add(readme_path, readme_file_name, filter=set_tar_permissions)
-                    new_tf.close()
-
-                    # move new tar file to results directory
-                    archive_path = os.path.join(RESULTS_PATH, new_tf_name)
-                    shutil.move(new_tf_path, archive_path)
-
-                    # insert into database
-                    url = 'http://%s/results/%s/%s' % (HOSTNAME, PORT, os.path.basename(archive_path))
-                    json_response[FILENAME]    = new_tf_name
-                    json_response[RESULT]      = archive_path
-                    json_response[URL]         = url
-                    json_response[UUID]        = uuid
-                    json_response[HAM_NAME]    = ham_stack_name
-                    json_response[MON1_NAME]   = mon1_stack_name
-                    json_response[MON2_NAME]   = mon2_stack_name
-                    json_response[NAME]        = replay_stack_name
-                    json_response[STACK_TYPE]  = REPLAY
-                    json_response[DESCRIPTION] = short_desc
-                    cls._DB_CONNECTOR.insert(IMAGES_COLLECTION, [json_response])
-                except:
-                    APP_LOGGER.exception(traceback.format_exc())
-                    http_status_code     = 500
-                    json_response[ERROR] = str(sys.exc_info()[1])
-                finally:
-                    silently_remove_tree(tmp_path)
+                readme_str = '\n'.join([replay_stack_name, ham_stack_name,
+                                        mon1_stack_name, mon2_stack_name,
+                                        short_desc])
+                stack_paths = [existing_ham_stacks[0][RESULT],
+                               existing_mon1_stacks[0][RESULT],
+                               existing_mon2_stacks[0][RESULT]]
+                new_tf_name  = uuid+'.tar.gz'
+                archive_path = os.path.join(RESULTS_PATH, new_tf_name)
+
+                json_response[FILENAME]    = new_tf_name
+                json_response[UUID]        = uuid
+                json_response[HAM_NAME]    = ham_stack_name
+                json_response[MON1_NAME]   = mon1_stack_name
+                json_response[MON2_NAME]   = mon2_stack_name
+                json_response[NAME]        = replay_stack_name
+                json_response[STACK_TYPE]  = REPLAY
+                json_response[DESCRIPTION] = short_desc
+                json_response[STATUS]      = JOB_STATUS.submitted # @UndefinedVariable
+                json_response[PROGRESS]    = 0
+
+                replay_callable = ReplayImagesCallable(stack_paths, readme_str,
+                                                       archive_path, uuid,
+                                                       cls._DB_CONNECTOR)
+                callback = JobCallback(make_replay_callback, uuid,
+                                       archive_path, cls._DB_CONNECTOR)
+
+                cls._DB_CONNECTOR.insert(IMAGES_COLLECTION, [json_response])
+                cls._EXECUTION_MANAGER.add_job(uuid, replay_callable, callback)
 
         except:
             APP_LOGGER.exception(traceback.format_exc())
@@ -215,6 +189,89 @@ class ReplayImagesPostFunction(AbstractPostFunction):
 
         return make_clean_response(json_response, http_status_code)
     
+#===============================================================================
+# Callable/Callback Functionality
+#===============================================================================
+class ReplayImagesCallable(object):
+    """
+    Callable that builds a replay image stack in TMP_PATH, recording its
+    progress, then moves it to the results directory.
+    """
+    def __init__(self, stack_paths, readme_str, archive_path, uuid,
+                 db_connector):
+        self.stack_paths  = stack_paths
+        self.readme_str   = readme_str
+        self.archive_path = archive_path
+        self.tmp_path     = os.path.join(TMP_PATH, os.path.basename(archive_path))
+        self.db_connector = db_connector
+        self.query        = {UUID: uuid}
+        self.progress     = 0
+
+    def __call__(self):
+        update = {"$set": {STATUS: JOB_STATUS.running,      # @UndefinedVariable
+                           START_DATESTAMP: datetime.today()}}
+        self.db_connector.update(IMAGES_COLLECTION, self.query, update)
+        try:
+            build_replay_stack(self.tmp_path, self.stack_paths,
+                               self.readme_str,
+                               compresslevel=REPLAY_GZIP_LEVEL,
+                               gzip_threads=REPLAY_GZIP_THREADS,
+                               progress_callback=self.update_progress)
+            shutil.move(self.tmp_path, self.archive_path)
+        finally:
+            silently_remove_file(self.tmp_path)
+
+    def update_progress(self, fraction):
+        # Record progress in whole percents
+        progress = int(fraction * 100)
+        if progress > self.progress:
+            self.progress = progress
+            self.db_connector.update(IMAGES_COLLECTION, self.query,
+                                     {"$set": {PROGRESS: progress}})
+
+def make_replay_callback(uuid, archive_path, db_connector):
+    """
+    Return a closure that is fired when the job finishes. This
+    callback updates the DB with completion status, result file location, and
+    an error message if applicable.
+
+    @param uuid:         Unique job id in database
+    @param archive_path: Path where the replay image stack should live.
+    @param db_connector: Object that handles communication with the DB
+    """
+    query = {UUID: uuid}
+    def replay_callback(future):
+        try:
+            _ = future.result()
+            update = { "$set": {
+                                 STATUS: JOB_STATUS.succeeded, # @UndefinedVariable
+                                 PROGRESS: 100,
+                                 RESULT: archive_path,
+                                 FINISH_DATESTAMP: datetime.today(),
+                                 URL: 'http://%s/results/%s/%s' % (HOSTNAME, PORT,
+                                          os.path.basename(archive_path)),
+                               }
+                    }
+            # If job has been deleted, then delete result and don't update DB.
+            if db_connector.exists(IMAGES_COLLECTION, query):
+                db_connector.update(IMAGES_COLLECTION, query, update)
+            else:
+                silently_remove_file(archive_path)
+        except:
+            APP_LOGGER.exception(traceback.format_exc())
+            error_msg = str(sys.exc_info()[1])
+            update    = { "$set": {STATUS: JOB_STATUS.failed, # @UndefinedVariable
+                                   RESULT: None,
+                                   FINISH_DATESTAMP: datetime.today(),
+                                   ERROR: error_msg}}
+            # If job has been deleted, then delete result and don't update DB.
+            if db_connector.exists(IMAGES_COLLECTION, query):
+                db_connector.update(IMAGES_COLLECTION, query, update)
+            else:
+                silently_remove_file(archive_path)
+
+    return replay_callback
+
 #===============================================================================
 # Run Main
 #===============================================================================
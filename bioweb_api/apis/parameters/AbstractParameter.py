@@ -91,6 +91,13 @@ class AbstractParameter(object):
         self._unique_items  = None
         self._equality      = None
         
+        # Set when enum is a RegisteredEnum rather than a fixed list. The 
+        # converted enum and its membership set are cached per registry 
+        # version.
+        self._enum_source   = None
+        self._enum_cache    = None
+        self._enum_members  = None
+        
         if self.param_type not in PARAMETER_TYPES:
             raise Exception("Unrecognized parameter type: %s." % self.param_type)
 
@@ -176,15 +183,53 @@ class AbstractParameter(object):
             elif self.required:
                 raise Exception("Required argument %s not provided." % self.name)
             
+        if self._enum_source is not None:
+            # Bring case mappings etc. up to date before converting
+            self._get_registered_enum()
         converted_args = self._convert_args(raw_args)
-        if self.enum:
-            valid_args = set(self.enum)
-            if not set(converted_args).issubset(valid_args):
-                invalid_args = set(converted_args).difference(valid_args)
-                raise Exception("Provided arguments %s not a subset of valid arguments: %s" % (invalid_args, valid_args))
+        valid_args     = self._get_enum_members()
+        if valid_args:
+            invalid_args = set(converted_args).difference(valid_args)
+            if invalid_args and self._enum_source is not None:
+                # Registered enum may predate a write made by another process
+                self._enum_source.refresh()
+                self._get_registered_enum()
+                converted_args = self._convert_args(raw_args)
+                valid_args     = self._get_enum_members()
+                invalid_args   = set(converted_args).difference(valid_args)
+            if invalid_args:
+                raise Exception("Provided arguments %s not a subset of valid arguments: %s" % (invalid_args, set(valid_args)))
             
         return converted_args
     
+    def _convert_enum(self, values):
+        '''
+        Convert the values of a registered enum. Called each time the 
+        registry reloads the enum.
+        '''
+        return self._convert_args(values)
+    
+    def _get_registered_enum(self):
+        '''
+        Return the converted enum and its membership set for the current
+        version of the registered enum, converting only when it changes.
+        '''
+        version, values = self._enum_source.snapshot()
+        cache = self._enum_cache
+        if cache is None or cache[0] != version:
+            enum  = self._convert_enum(values)
+            cache = (version, enum, frozenset(enum))
+            self._enum_cache = cache
+        return cache[1], cache[2]
+    
+    def _get_enum_members(self):
+        ''' Set of valid arguments for O(1) membership tests. '''
+        if self._enum_source is not None:
+            return self._get_registered_enum()[1]
+        if self._enum_members is None and self._enum:
+            self._enum_members = frozenset(self._enum)
+        return self._enum_members
+    
     def _ensure_default_in_enum(self):
         if self.default and self.enum and self.default not in self.enum:
             raise Exception("Default (%s) not found in enum: %s" % (self.default, self.enum))
@@ -238,6 +283,8 @@ class AbstractParameter(object):
     @property
     def enum(self):
         ''' List of allowable parameter values. '''
+        if self._enum_source is not None:
+            return self._get_registered_enum()[0]
         return self._enum
     
     @property
@@ -24,6 +24,7 @@ from abc import ABCMeta, abstractmethod
 
 from bioweb_api.apis.parameters.AbstractParameter import AbstractParameter 
 from bioweb_api.apis.ApiConstants import SWAGGER_TYPES
+from bioweb_api.EnumRegistry import RegisteredEnum
 
 #=============================================================================
 # Class
@@ -56,7 +57,9 @@ class AbstractStringParameter(AbstractParameter):
                 raise Exception("Expected default to be of type str but found: %s" % type(default))
             self._default = self._convert_args([default])[0]
         
-        if enum:
+        if isinstance(enum, RegisteredEnum):
+            self._enum_source = enum
+        elif enum:
             if False in map(lambda x: isinstance(x, str) or isinstance(x,unicode), enum):
                 raise Exception("All enum values must be strings but found: %s" % enum)
             self._enum = self._convert_args(enum)
@@ -22,6 +22,7 @@ limitations under the License.
 #=============================================================================
 from bioweb_api.apis.parameters.AbstractStringParameter import AbstractStringParameter 
 from bioweb_api.apis.ApiConstants import PARAMETER_TYPES
+from bioweb_api.EnumRegistry import RegisteredEnum
 
 #=============================================================================
 # Class
@@ -47,8 +48,9 @@ class CaseSensitiveStringParameter(AbstractStringParameter):
         self._mapping = None
         
         # Super constructor calls update_case, so the map must be populated
-        # prior to calling super
-        if enum:
+        # prior to calling super. The map of a registered enum is populated
+        # each time the registry reloads it.
+        if enum and not isinstance(enum, RegisteredEnum):
             if len(enum) > len(set([x.lower() for x in enum])):
                 raise Exception("Enum cannot contain duplicate entries: %s" % enum)
             self._mapping = {v.lower(): v for v in enum}
@@ -64,10 +66,21 @@ class CaseSensitiveStringParameter(AbstractStringParameter):
     #===========================================================================
     # Overriden Methods
     #===========================================================================    
+    def _convert_enum(self, values):
+        ''' Rebuild the case mapping from the reloaded enum values. '''
+        self._mapping = {v.lower(): v for v in values}
+        return list(values)
+    
     def update_case(self, s):
         ''' 
         If a fixed set of case sensitive strings was provided, then abide by it.
         '''
+        if self._enum_source is not None:
+            self._get_registered_enum()
+            if self._mapping and s.lower() not in self._mapping:
+                # Registered enum may predate a write made by another process
+                self._enum_source.refresh()
+                self._get_registered_enum()
         if self._mapping:
             if s.lower() not in self._mapping:
                 raise Exception("Unrecognized input argument: %s" % s)
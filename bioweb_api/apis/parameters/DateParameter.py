@@ -26,6 +26,7 @@ from datetime import datetime
 
 from bioweb_api.apis.parameters.AbstractParameter import AbstractParameter 
 from bioweb_api.apis.ApiConstants import SWAGGER_TYPES, SWAGGER_FORMATS
+from bioweb_api.EnumRegistry import RegisteredEnum
 
 #=============================================================================
 # Private Global Variables
@@ -59,7 +60,9 @@ class DateParameter(AbstractParameter):
                 raise Exception("Default date (%s) doesn't match accepted pattern: YYYY_MM_DD." % default)
             self._default = self._convert_args([default])[0]
 
-        if enum:
+        if isinstance(enum, RegisteredEnum):
+            self._enum_source = enum
+        elif enum:
             for date in enum:
                 if not _DATE_PATTERN.match(date):
                     raise Exception("Enum date (%s) doesn't match accepted pattern: YYYY_MM_DD." % date)
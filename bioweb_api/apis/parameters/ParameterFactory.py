@@ -35,11 +35,14 @@ from bioweb_api.apis.ApiConstants import PARAMETER_TYPES, FORMAT, FORMATS, SEQUE
     SEQUENCE_NAME, PROBE, EQUALITY, FILE, FILENAMES, UUID, CHR_NUM, CHR_START, \
     CHR_STOP, SNP_SEARCH_NAME, ARCHIVE, DYES, DEVICE, DATE, DYE_LEVELS, EXP_DEF, \
     STACK_TYPE, MONITOR1, MONITOR2, NAME, DYE_METRICS, FILTERED_DYES, DYES_LOTS, \
-    PA_DATA_SOURCE, EXP_DEF_NAME, CARTRIDGE_SN, DESIGN, TAGS
+    PA_DATA_SOURCE, CARTRIDGE_SN, DESIGN, TAGS, PAGE, PAGE_SIZE, SORT, SINCE, \
+    STATUS, FIELDS, JOB_STATUS
 from bioweb_api.DbConnector import DbConnector
+from bioweb_api.EnumRegistry import EnumRegistry
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_archives, \
     get_dyes, get_devices, get_hdf5_dataset_names
-from bioweb_api import IMAGES_COLLECTION, EXP_DEF_COLLECTION
+from bioweb_api import IMAGES_COLLECTION, ARCHIVES_COLLECTION, HDF5_COLLECTION, \
+    DYES_COLLECTION, DEVICES_COLLECTION, MAX_PAGE_SIZE
 from secondary_analysis.constants import AC_MODEL_NAIVE_BAYES, AC_MODEL_GMM, \
     AC_MODEL_CUTPOINT
 
@@ -49,7 +52,28 @@ from secondary_analysis.constants import AC_MODEL_NAIVE_BAYES, AC_MODEL_GMM, \
 #=============================================================================
 class ParameterFactory(object):
 
-    _DB_CONNECTOR = DbConnector.Instance()
+    _DB_CONNECTOR  = DbConnector.Instance()
+    _ENUM_REGISTRY = EnumRegistry.Instance()
+
+    @classmethod
+    def registered_enum(cls, key, collections, loader):
+        """
+        Create an enum that is cached by the EnumRegistry and reloaded when
+        one of the provided collections is written to. Pass the result as the
+        enum of a parameter in place of a list of values.
+        """
+        return cls._ENUM_REGISTRY.register(key, collections, loader)
+
+    @classmethod
+    def distinct_enum(cls, collection, column_name):
+        """
+        Create a registered enum of the distinct values of column_name in the
+        provided collection.
+        """
+        return cls.registered_enum("%s.%s" % (collection, column_name),
+                                   [collection],
+                                   lambda: cls._DB_CONNECTOR.distinct_sorted(collection,
+                                                                             column_name))
 
     @staticmethod
     def format():
@@ -176,30 +200,34 @@ class ParameterFactory(object):
                                             param_type=param_type,
                                             required=required,
                                             allow_multiple=allow_multiple)
-    @staticmethod
-    def pa_data_source(required=True):
+    @classmethod
+    def pa_data_source(cls, required=True):
+        enum = cls.registered_enum(PA_DATA_SOURCE,
+                                   [ARCHIVES_COLLECTION, HDF5_COLLECTION],
+                                   lambda: get_archives()+get_hdf5_dataset_names())
         return CaseSensitiveStringParameter(PA_DATA_SOURCE, "Primary analysis data source.",
                                required=required,
                                allow_multiple=False,
-                               enum=get_archives()+get_hdf5_dataset_names())
+                               enum=enum)
 
-    @staticmethod
-    def archive(required=True):
+    @classmethod
+    def archive(cls, required=True):
+        enum = cls.registered_enum(ARCHIVE, [ARCHIVES_COLLECTION], get_archives)
         return CaseSensitiveStringParameter(ARCHIVE, "Archive directory name.",
                                required=required,
                                allow_multiple=False,
-                               enum=get_archives())
+                               enum=enum)
 
-    @staticmethod
-    def dyes(name=DYES, description=None, required=True, allow_multiple=True,
-             default=None):
+    @classmethod
+    def dyes(cls, name=DYES, description=None, required=True,
+             allow_multiple=True, default=None):
         if not description:
             description = "Comma separated list of dye names."
         return CaseSensitiveStringParameter(name, description,
                                             required=required,
                                             allow_multiple=allow_multiple,
                                             default=default,
-                                            enum=get_dyes())
+                                            enum=cls._dyes_enum())
 
     @staticmethod
     def ac_method(name, description, required=True, default=AC_MODEL_NAIVE_BAYES):
@@ -210,20 +238,25 @@ class ParameterFactory(object):
                                                   AC_MODEL_CUTPOINT],
                                             default=default)
 
-    @staticmethod
-    def dye(name, description, required=False, default=None):
+    @classmethod
+    def dye(cls, name, description, required=False, default=None):
         return CaseSensitiveStringParameter(name, description,
                                             required=required,
                                             allow_multiple=False,
-                                            enum=get_dyes(),
+                                            enum=cls._dyes_enum(),
                                             default=default)
 
-    @staticmethod
-    def device(required=True, default=None):
+    @classmethod
+    def _dyes_enum(cls):
+        return cls.registered_enum(DYES, [DYES_COLLECTION], get_dyes)
+
+    @classmethod
+    def device(cls, required=True, default=None):
+        enum = cls.registered_enum(DEVICE, [DEVICES_COLLECTION], get_devices)
         return CaseSensitiveStringParameter(DEVICE, "Device name.",
                                             required=required,
                                             allow_multiple=False,
-                                            enum=get_devices(),
+                                            enum=enum,
                                             default=default)
 
     @staticmethod
@@ -244,8 +277,7 @@ class ParameterFactory(object):
         return LowerCaseStringParameter(UUID, description,
                                alias=alias, required=required,
                                allow_multiple=allow_multiple,
-                               enum=cls._DB_CONNECTOR.distinct_sorted(collection,
-                                                                      UUID))
+                               enum=cls.distinct_enum(collection, UUID))
     @staticmethod
     def lc_string(name, description, alias=None, required=True,
                   allow_multiple=False, enum=None, default=None):
@@ -316,9 +348,12 @@ class ParameterFactory(object):
 
     @classmethod
     def job_uuid(cls, collection, required=True, allow_multiple=True):
-        job_uuids = cls._DB_CONNECTOR.distinct(collection, UUID)
+        # Job UUIDs aren't validated against an enum of the whole collection.
+        # Functions look up the provided UUIDs in the (indexed) collection
+        # and report any that aren't found.
         return cls.lc_string(UUID, "Comma separated job UUID(s).",
-                             allow_multiple=allow_multiple, enum=job_uuids, required=required)
+                             allow_multiple=allow_multiple,
+                             required=required)
 
     @classmethod
     def date(cls, required=True, enum=None):
@@ -326,11 +361,56 @@ class ParameterFactory(object):
         return DateParameter(DATE, "Run date of the form YYYY_MM_DD.",
                              required=required, enum=enum)
 
+    @classmethod
+    def page(cls):
+        """ Create a parameter instance for selecting a page of results. """
+        return cls.integer(PAGE, "Page of results to return. Only used when " \
+                           "page_size is provided.", default=1, minimum=1)
+
+    @classmethod
+    def page_size(cls):
+        """ Create a parameter instance for the number of results per page. """
+        return cls.integer(PAGE_SIZE, "Number of results per page (at most " \
+                           "%d). All results are returned if not provided." \
+                           % MAX_PAGE_SIZE, minimum=1)
+
+    @classmethod
+    def sort(cls, fields, default):
+        """
+        Create a parameter instance for sorting results by one of the provided
+        fields. Prefixing a field with '-' sorts in descending order.
+        """
+        return cls.lc_string(SORT, "Field to sort results by, prefixed with " \
+                             "'-' for descending order (default: %s)." % default,
+                             required=False, allow_multiple=False,
+                             enum=fields + ["-" + field for field in fields])
+
+    @staticmethod
+    def since(description="Only return results submitted on or after this " \
+                          "date (YYYY_MM_DD)."):
+        """ Create a parameter instance for filtering out older results. """
+        return DateParameter(SINCE, description, required=False,
+                             allow_multiple=False)
+
+    @classmethod
+    def job_status(cls):
+        """ Create a parameter instance for filtering jobs by status. """
+        return cls.lc_string(STATUS, "Comma separated job status(es).",
+                             required=False, allow_multiple=True,
+                             enum=list(JOB_STATUS))
+
+    @classmethod
+    def fields(cls, enum=None):
+        """ Create a parameter instance for selecting the fields to return. """
+        return cls.lc_string(FIELDS, "Comma separated fields to return. All " \
+                             "fields are returned if not provided.",
+                             required=False, allow_multiple=True, enum=enum)
+
     @classmethod
     def experiment_definition(cls):
-        exp_defs = cls._DB_CONNECTOR.distinct(EXP_DEF_COLLECTION, EXP_DEF_NAME)
-        return cls.cs_string(EXP_DEF, "Experiment definition.", required=True,
-                             enum=exp_defs)
+        # cs_string does not validate against an enum, so the list of
+        # experiment definition names isn't needed.
+        return cls.cs_string(EXP_DEF, "Experiment definition.", required=True)
 
     @staticmethod
     def mon_camera_type(name=STACK_TYPE, description=None, required=True, allow_multiple=True,
@@ -345,14 +425,22 @@ class ParameterFactory(object):
 
     @classmethod
     def available_stacks(cls, name, description, stack_type, required=True, allow_multiple=False):
-        existing_stacks = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
-                                              {STACK_TYPE: stack_type},
-                                              [NAME])
-        uniq_names = set([rec[NAME] for rec in existing_stacks])
+        def get_stack_names():
+            # Stacks built by jobs (e.g. replay stacks) are recorded before
+            # they exist, only succeeded stacks and stacks recorded without a
+            # status can be used.
+            existing_stacks = cls._DB_CONNECTOR.find(IMAGES_COLLECTION,
+                                                     {STACK_TYPE: stack_type,
+                                                      STATUS: {"$in": [JOB_STATUS.succeeded, # @UndefinedVariable
+                                                                       None]}},
+                                                     [NAME])
+            return set([rec[NAME] for rec in existing_stacks])
+        enum = cls.registered_enum("%s.%s" % (IMAGES_COLLECTION, stack_type),
+                                   [IMAGES_COLLECTION], get_stack_names)
         return CaseSensitiveStringParameter(name, description,
                                             required=required,
                                             allow_multiple=allow_multiple,
-                                            enum=uniq_names)
+                                            enum=enum)
 
     @staticmethod
     def cartridge_sn(required=False, allow_multiple=False,
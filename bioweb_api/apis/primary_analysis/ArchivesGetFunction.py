@@ -22,8 +22,8 @@ limitations under the License.
 #=============================================================================
 from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
-from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_archives, \
-    update_archives
+from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_archives
+from bioweb_api.execution_engine.Indexer import Indexer, ARCHIVES_INDEX
 
 #=============================================================================
 # Class
@@ -43,7 +43,9 @@ class ArchivesGetFunction(AbstractGetFunction):
     
     @staticmethod
     def notes():
-        return ""
+        return "Archives are indexed in the background, so a refresh only " \
+            "queues an update. The X-Index-Freshness header holds the " \
+            "time of the last complete update."
     
     @classmethod
     def parameters(cls):
@@ -61,10 +63,14 @@ class ArchivesGetFunction(AbstractGetFunction):
     def process_request(cls, params_dict):
         if cls.refresh_parameter in params_dict and \
            params_dict[cls.refresh_parameter][0]:
-            update_archives()
+            Indexer.Instance().refresh(ARCHIVES_INDEX)
             
         archives = [ {"archive": a} for a in get_archives()]
         return (archives, None, None)
+
+    @classmethod
+    def response_headers(cls):
+        return Indexer.Instance().freshness_headers(ARCHIVES_INDEX)
          
 #===============================================================================
 # Run Main
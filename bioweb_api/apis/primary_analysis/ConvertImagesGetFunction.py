@@ -20,20 +20,17 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
 from bioweb_api.apis.primary_analysis.ConvertImagesPostFunction import CONVERT_IMAGES
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import PA_CONVERT_IMAGES_COLLECTION
-from bioweb_api.apis.ApiConstants import UUID, STATUS, ID, JOB_TYPE_NAME, \
+from bioweb_api.apis.ApiConstants import UUID, STATUS, JOB_TYPE_NAME, \
     SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP, ERROR, RESULT, URL, \
     ARCHIVE, JOB_NAME
     
 #=============================================================================
 # Class
 #=============================================================================
-class ConvertImagesGetFunction(AbstractGetFunction):
+class ConvertImagesGetFunction(AbstractGetJobFunction):
 
     #===========================================================================
     # Overridden Methods
@@ -51,35 +48,26 @@ class ConvertImagesGetFunction(AbstractGetFunction):
         return ""
     
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
-    
+    def get_collection(cls):
+        return PA_CONVERT_IMAGES_COLLECTION
+
     @classmethod
-    def process_request(cls, params_dict):
-        columns                   = OrderedDict()
-        columns[ID]               = 0
-        columns[JOB_NAME]         = 1
-        columns[JOB_TYPE_NAME]    = 1
-        columns[UUID]             = 1
-        columns[ARCHIVE]          = 1
-        columns[STATUS]           = 1
-        columns[SUBMIT_DATESTAMP] = 1
-        columns[START_DATESTAMP]  = 1
-        columns[FINISH_DATESTAMP] = 1
-        columns[ERROR]            = 1
-        columns[RESULT]           = 1
-        columns[URL]              = 1
-        
-        column_names = columns.keys()  
-        column_names.remove(ID)         
-        
-        data = cls._DB_CONNECTOR.find(PA_CONVERT_IMAGES_COLLECTION, {}, columns)
-         
-        return (data, column_names, None)
-         
+    def get_columns(cls):
+        columns = [
+                   JOB_NAME,
+                   JOB_TYPE_NAME,
+                   UUID,
+                   ARCHIVE,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   RESULT,
+                   URL,
+                  ]
+        return columns
+
 #===============================================================================
 # Run Main
 #===============================================================================
@@ -29,10 +29,13 @@ from datetime import datetime
 
 from bioweb_api import PA_CONVERT_IMAGES_COLLECTION
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     get_archive_dirs, silently_remove_file, get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
+from bioweb_api.utilities.job_utilities import insert_job, job_name_exists, \
+    JobExistsError
 from bioweb_api.apis.ApiConstants import ERROR, JOB_NAME, ARCHIVE, UUID, \
     SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP, STATUS, JOB_STATUS, \
     JOB_TYPE_NAME, JOB_TYPE, ID, RESULT, URL
@@ -129,8 +132,7 @@ class ConvertImagesPostFunction(AbstractPostFunction):
                        }
             status_code = 200
 
-            if cur_job_name in cls._DB_CONNECTOR.distinct(PA_CONVERT_IMAGES_COLLECTION,
-                                                          JOB_NAME):
+            if job_name_exists(PA_CONVERT_IMAGES_COLLECTION, cur_job_name):
                 status_code = 403
             else:
                 try:
@@ -143,16 +145,19 @@ class ConvertImagesPostFunction(AbstractPostFunction):
                                                            outfile_path,
                                                            response[UUID],
                                                            cls._DB_CONNECTOR)
-                    callback = make_process_callback(response[UUID],
-                                                     outfile_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           response[UUID],
+                                           outfile_path,
+                                           cls._DB_CONNECTOR)
 
                     # Add to queue and update DB
-                    cls._DB_CONNECTOR.insert(PA_CONVERT_IMAGES_COLLECTION,
-                                             [response])
+                    insert_job(PA_CONVERT_IMAGES_COLLECTION, response)
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
                                                    abs_callable, callback)
                     del response[ID]
+                except JobExistsError:
+                    response[ERROR] = 'Job exists.'
+                    status_code = 403
                 except:
                     APP_LOGGER.exception(traceback.format_exc())
                     response[ERROR]  = str(sys.exc_info()[1])
@@ -209,7 +214,7 @@ def make_process_callback(uuid, outfile_path, db_connector):
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_CONVERT_IMAGES_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_CONVERT_IMAGES_COLLECTION, query):
                 db_connector.update(PA_CONVERT_IMAGES_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -221,7 +226,7 @@ def make_process_callback(uuid, outfile_path, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_CONVERT_IMAGES_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_CONVERT_IMAGES_COLLECTION, query):
                 db_connector.update(PA_CONVERT_IMAGES_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -22,9 +22,9 @@ limitations under the License.
 #=============================================================================
 from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
-from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_hdf5s, \
-    update_hdf5s
+from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_hdf5s
 from bioweb_api.apis.ApiConstants import HDF5_DATASET
+from bioweb_api.execution_engine.Indexer import Indexer, HDF5S_INDEX
 
 #=============================================================================
 # Class
@@ -45,8 +45,8 @@ class HDF5sGetFunction(AbstractGetFunction):
     @classmethod
     def parameters(cls):
         cls.refresh_parameter = ParameterFactory.boolean("refresh", 
-                                                         "Refresh available " \
-                                                         "HDF5s.",
+                                                         "Queue a refresh " \
+                                                         "of available HDF5s.",
                                                          default_value=False)
         parameters = [
                       cls.refresh_parameter,
@@ -58,10 +58,14 @@ class HDF5sGetFunction(AbstractGetFunction):
     def process_request(cls, params_dict):
         if cls.refresh_parameter in params_dict and \
            params_dict[cls.refresh_parameter][0]:
-            update_hdf5s()
+            Indexer.Instance().refresh(HDF5S_INDEX)
 
         hdf5s = [doc[HDF5_DATASET] for doc in get_hdf5s()]
         return (hdf5s, None, None)
+
+    @classmethod
+    def response_headers(cls):
+        return Indexer.Instance().freshness_headers(HDF5S_INDEX)
          
 #===============================================================================
 # Run Main
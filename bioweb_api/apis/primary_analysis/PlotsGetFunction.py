@@ -20,19 +20,16 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import PA_PLOTS_COLLECTION
-from bioweb_api.apis.ApiConstants import UUID, STATUS, ID, JOB_TYPE_NAME, \
+from bioweb_api.apis.ApiConstants import UUID, STATUS, JOB_TYPE_NAME, \
     SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP, ERROR, PLOT, \
     PLOT_URL, PA_PROCESS_UUID
 
 #=============================================================================
 # Class
 #=============================================================================
-class PlotsGetFunction(AbstractGetFunction):
+class PlotsGetFunction(AbstractGetJobFunction):
     
     #===========================================================================
     # Overridden Methods
@@ -50,34 +47,25 @@ class PlotsGetFunction(AbstractGetFunction):
         return ""
     
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
-    
+    def get_collection(cls):
+        return PA_PLOTS_COLLECTION
+
     @classmethod
-    def process_request(cls, params_dict):
-        columns                   = OrderedDict()
-        columns[ID]               = 0
-        columns[JOB_TYPE_NAME]    = 1
-        columns[UUID]             = 1
-        columns[PA_PROCESS_UUID]  = 1
-        columns[STATUS]           = 1
-        columns[SUBMIT_DATESTAMP] = 1
-        columns[START_DATESTAMP]  = 1
-        columns[FINISH_DATESTAMP] = 1
-        columns[ERROR]            = 1
-        columns[PLOT]             = 1
-        columns[PLOT_URL]         = 1
-        
-        column_names = columns.keys()  
-        column_names.remove(ID)         
-        
-        data = cls._DB_CONNECTOR.find(PA_PLOTS_COLLECTION, {}, columns)
-         
-        return (data, column_names, None)
-         
+    def get_columns(cls):
+        columns = [
+                   JOB_TYPE_NAME,
+                   UUID,
+                   PA_PROCESS_UUID,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   PLOT,
+                   PLOT_URL,
+                  ]
+        return columns
+
 #===============================================================================
 # Run Main
 #===============================================================================
@@ -31,7 +31,10 @@ from datetime import datetime
 from bioweb_api.utilities.io_utilities import silently_remove_file, make_clean_response, \
     get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
+from bioweb_api.utilities.job_utilities import insert_job, job_exists, \
+    JobExistsError
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.ApiConstants import UUID, RESULT, ERROR, ID, PLOT, \
     PLOT_URL, SUBMIT_DATESTAMP, FINISH_DATESTAMP, PA_PROCESS_UUID, \
@@ -122,8 +125,8 @@ class PlotsPostFunction(AbstractPostFunction):
                 outfile_path = os.path.join(results_folder,
                                             pa_process_job[UUID] + ".png")
 
-                if pa_process_job[UUID] in cls._DB_CONNECTOR.distinct(PA_PLOTS_COLLECTION,
-                                                                      PA_PROCESS_UUID):
+                if job_exists(PA_PLOTS_COLLECTION, PA_PROCESS_UUID,
+                              pa_process_job[UUID]):
                     status_code = 403
                 else:
                     with open(pa_process_job[CONFIG]) as fd:
@@ -135,14 +138,18 @@ class PlotsPostFunction(AbstractPostFunction):
                                                      outfile_path,
                                                      response[UUID],
                                                      cls._DB_CONNECTOR)
-                    callback = make_process_callback(response[UUID],
-                                                     outfile_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           response[UUID],
+                                           outfile_path,
+                                           cls._DB_CONNECTOR)
 
                     # Add to queue and update DB
-                    cls._DB_CONNECTOR.insert(PA_PLOTS_COLLECTION, [response])
+                    insert_job(PA_PLOTS_COLLECTION, response)
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
                                                    abs_callable, callback)
+            except JobExistsError:
+                response[ERROR] = 'Job exists.'
+                status_code = 403
             except:
                 APP_LOGGER.exception(traceback.format_exc())
                 response[ERROR]  = str(sys.exc_info()[1])
@@ -207,7 +214,7 @@ def make_process_callback(uuid, outfile_path, db_connector):
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PLOTS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PLOTS_COLLECTION, query):
                 db_connector.update(PA_PLOTS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -219,7 +226,7 @@ def make_process_callback(uuid, outfile_path, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PLOTS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PLOTS_COLLECTION, query):
                 db_connector.update(PA_PLOTS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
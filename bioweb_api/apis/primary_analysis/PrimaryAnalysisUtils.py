@@ -26,12 +26,15 @@ import re
 import sys
 import shutil
 
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 import h5py
+from pymongo.errors import OperationFailure
 
 from bioweb_api import ARCHIVES_PATH, TMP_PATH, DYES_COLLECTION, \
     DEVICES_COLLECTION, ARCHIVES_COLLECTION, PROBE_METADATA_COLLECTION, \
-    HDF5_COLLECTION, ALTERNATE_ARCHIVES_PATHS, RUN_REPORT_PATH
+    HDF5_COLLECTION, ALTERNATE_ARCHIVES_PATHS, RUN_REPORT_PATH, COPY_ARCHIVES, \
+    INDEX_WORKERS, FOLDER_STAMPS_COLLECTION
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.utilities import io_utilities
 from bioweb_api.DbConnector import DbConnector
@@ -50,12 +53,50 @@ _DATASTORE    = Datastore()
 
 DISK_DIR = os.path.join(ARCHIVES_PATH, '')
 
+# Stamps (see io_utilities.get_dir_stamp) of the folders listed by the last
+# update_archives and update_hdf5s, used to skip folders that haven't changed.
+# They're recorded in the folder stamps collection, so folders aren't listed
+# again after a restart, and loaded on first use.
+_ARCHIVES_INDEX = "archives"
+_HDF5S_INDEX    = "hdf5s"
+_FOLDER_STAMPS  = dict()
+
+_INDEX  = "index"
+_FOLDER = "folder"
+_MTIME  = "mtime"
+_INODE  = "inode"
+
+# Processes reading new HDF5 files, created on first use and reused by every
+# update_hdf5s, which is only called from the indexer thread
+_HDF5_READERS = None
+
+_HDF5_DATASET_PATTERNS = [r'^\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}',
+                          r'^Pilot\d+_\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}']
+
 class DataType(Enum):
     image_stack, hdf5 = ['image_stack', 'hdf5']
 
 #=============================================================================
 # RESTful location of services
 #=============================================================================
+def ensure_primary_analysis_indexes():
+    '''
+    Ensure the unique indexes on the fields archives, HDF5 datasets and
+    folder stamps are upserted by exist. If a collection already contains
+    duplicates, a non-unique index is created instead and a warning is logged.
+    '''
+    for collection, keys in [(ARCHIVES_COLLECTION, [(ARCHIVE, 1)]),
+                             (HDF5_COLLECTION, [(HDF5_PATH, 1), (HDF5_DATASET, 1)]),
+                             (FOLDER_STAMPS_COLLECTION, [(_INDEX, 1), (_FOLDER, 1)])]:
+        try:
+            _DB_CONNECTOR.create_index(collection, keys, unique=True)
+        except OperationFailure:
+            APP_LOGGER.warning("Unable to create unique index on %s, " \
+                               "falling back to non-unique index. Remove " \
+                               "duplicate records and drop the index to " \
+                               "enforce uniqueness." % collection)
+            _DB_CONNECTOR.create_index(collection, keys)
+
 def get_archives():
     '''
     Return a listing of the archives directory.
@@ -111,6 +152,38 @@ def get_data_filepath(data_name, data_type=DataType.image_stack):
             return data_filepath
     return None
 
+def get_data_fingerprint(data_name, data_type=DataType.image_stack):
+    """
+    Return a fingerprint of the content of an image stack or HDF5 file: the
+    number of its files, their total size and latest modification time. It
+    changes when the data is replaced or modified in place, so results
+    computed from the old data aren't reused.
+
+    @param data_name:   String, archive or HDF5 dataset name
+    @param data_type:   DataType of the data
+    @return:            Tuple or None if the data can't be found
+    """
+    try:
+        data_filepath = get_data_filepath(data_name, data_type=data_type)
+    except IndexError:
+        # not indexed yet
+        return None
+    if data_filepath is None:
+        return None
+
+    if os.path.isfile(data_filepath):
+        paths = [data_filepath]
+    else:
+        paths = [os.path.join(root, name)
+                 for root, _, names in os.walk(data_filepath, followlinks=True)
+                 for name in names]
+    try:
+        stats = [os.stat(path) for path in paths]
+    except OSError:
+        return None
+    return (len(stats), sum(st.st_size for st in stats),
+            max([st.st_mtime for st in stats] or [None]))
+
 def parse_pa_data_src(pa_data_src_name):
     """
     Determine primary analysis data source type (HDF5 or image stack) and return
@@ -192,20 +265,23 @@ def remove_disk_directory(filepath):
 def update_archives():
     '''
     Update the database with available primary analysis archives.  It is not
-    an error if zero archives are available at this moment.
+    an error if zero archives are available at this moment. Folders that
+    haven't changed since they were last listed are skipped.
 
     @return True if database is successfully updated, False otherwise
     '''
     APP_LOGGER.info("Updating database with available archives...")
-    exist_archives = _DB_CONNECTOR.distinct(ARCHIVES_COLLECTION, ARCHIVE)
+    exist_archives = set(_DB_CONNECTOR.distinct(ARCHIVES_COLLECTION, ARCHIVE))
     if os.path.isdir(ARCHIVES_PATH):
-        # Remove archives named similarly (same name, different capitalization)
-        archives = io_utilities.get_subfolders(ARCHIVES_PATH)
-
-        # Check yyyy_mm/dd/HHMM_pilotX location
-        run_folders = get_run_folders()
-        for folder in run_folders:
-            archives.extend(io_utilities.get_subfolders(folder))
+        # Check top level and yyyy_mm/dd/HHMM_pilotX locations
+        archives = list()
+        scanned  = dict()
+        stamps   = _get_folder_stamps(_ARCHIVES_INDEX)
+        for folder in [ARCHIVES_PATH] + get_run_folders():
+            stamp = io_utilities.get_dir_stamp(folder)
+            if stamps.get(folder) != stamp:
+                archives.extend(io_utilities.get_subfolders(folder))
+                scanned[folder] = stamp
 
         new_archives = [x for x in archives if os.path.basename(x) not in exist_archives]
         records = [{ARCHIVE: os.path.basename(archive),
@@ -213,10 +289,8 @@ def update_archives():
                        for archive in new_archives]
 
         APP_LOGGER.info("Found %d archives" % (len(records)))
-        if len(records) > 0:
-            # There is a possible race condition here. Ideally these operations
-            # would be performed in concert atomically
-            _DB_CONNECTOR.insert(ARCHIVES_COLLECTION, records)
+        _DB_CONNECTOR.bulk_upsert(ARCHIVES_COLLECTION, [ARCHIVE], records)
+        _set_folder_stamps(_ARCHIVES_INDEX, scanned)
     else:
         APP_LOGGER.error("Couldn't locate archives path '%s', to update database." % ARCHIVES_PATH)
         return False
@@ -224,7 +298,21 @@ def update_archives():
     APP_LOGGER.info("Database successfully updated with available archives.")
     return True
 
+def read_hdf5_dataset_names(hdf5_path):
+    '''
+    Return the names of the datasets in an HDF5 file.
+    '''
+    with h5py.File(hdf5_path, 'r') as h5_file:
+        return list(h5_file.keys())
+
 def update_hdf5s():
+    '''
+    Update the database with the datasets of available HDF5 files. Folders
+    that haven't changed since they were last listed are skipped, and new
+    files are read in parallel.
+
+    @return True if database is successfully updated, False otherwise
+    '''
     APP_LOGGER.info("Updating database with available HDF5 files...")
 
     # check if run report path exists
@@ -235,52 +323,112 @@ def update_hdf5s():
     # find new hdf5 files, using nested listdirs, way faster than glob, os.walk, or scandir
     # only search two subdirectories within the run report folder
     # assumes each the hdf5 file is in a subfolder in the run report folder
-    database_paths = set(_DB_CONNECTOR.distinct_sorted(HDF5_COLLECTION, HDF5_PATH))
-    current_paths = set()
+    folders = list()
     for par_ in os.listdir(RUN_REPORT_PATH):
         report_dir = os.path.join(RUN_REPORT_PATH, par_)
         if os.path.isdir(report_dir):
-            for sub_ in os.listdir(report_dir):
-                subdir = os.path.join(report_dir, sub_)
-                if os.path.isdir(subdir):
-                    hdf5s = [f for f in os.listdir(subdir) if os.path.splitext(f)[-1] in VALID_HDF5_EXTENSIONS]
-                    hdf5_paths = [os.path.join(subdir, f) for f in hdf5s]
-                    current_paths.update(hdf5_paths)
+            folders.extend(os.path.join(report_dir, sub_)
+                           for sub_ in os.listdir(report_dir))
 
     # Check yyyy_mm/dd/HHMM_pilotX location
-    run_folders = get_run_folders()
-    for folder in run_folders:
-        hdf5s = [f for f in os.listdir(folder) if os.path.splitext(f)[-1] in VALID_HDF5_EXTENSIONS]
-        hdf5_paths = [os.path.join(folder, f) for f in hdf5s]
-        current_paths.update(hdf5_paths)
-
-    # update database with any new files
-    new_hdf5_paths = current_paths - database_paths
+    folders.extend(get_run_folders())
+
+    current_paths = set()
+    scanned       = dict()
+    stamps        = _get_folder_stamps(_HDF5S_INDEX)
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        stamp = io_utilities.get_dir_stamp(folder)
+        if stamps.get(folder) == stamp:
+            continue
+        scanned[folder] = stamp
+        current_paths.update(os.path.join(folder, f) for f in os.listdir(folder)
+                             if os.path.splitext(f)[-1] in VALID_HDF5_EXTENSIONS)
+
+    # update database with any new files, paths are stored relative to the disk
+    database_paths = set(_DB_CONNECTOR.distinct(HDF5_COLLECTION, HDF5_PATH))
+    new_hdf5_paths = [p for p in current_paths
+                      if remove_disk_directory(p) not in database_paths]
     new_records = list()
-    for hdf5_path in new_hdf5_paths:
-        try:
-            with h5py.File(hdf5_path) as h5_file:
-                dataset_names = h5_file.keys()
+    if new_hdf5_paths:
+        executor = _get_hdf5_readers()
+        futures  = [(hdf5_path, executor.submit(read_hdf5_dataset_names, hdf5_path))
+                    for hdf5_path in new_hdf5_paths]
+        for hdf5_path, future in futures:
+            try:
+                dataset_names = future.result()
+            except:
+                APP_LOGGER.exception('Unable to get dataset information from HDF5 file: %s' % hdf5_path)
+                # The file may still be being written, so list its folder
+                # again next time
+                scanned.pop(os.path.dirname(hdf5_path), None)
+                continue
             for dsname in dataset_names:
-                if any(re.match(pat, dsname) for pat in [r'^\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}',
-                                                         r'^Pilot\d+_\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}']):
+                if any(re.match(pat, dsname) for pat in _HDF5_DATASET_PATTERNS):
                     new_records.append({
                         HDF5_PATH: remove_disk_directory(hdf5_path),
                         HDF5_DATASET: dsname,
                     })
-        except:
-            APP_LOGGER.exception('Unable to get dataset information from HDF5 file: %s' % hdf5_path)
 
     if new_records:
-        # There is a possible race condition here. Ideally these operations
-        # would be performed in concert atomically
-        _DB_CONNECTOR.insert(HDF5_COLLECTION, new_records)
+        _DB_CONNECTOR.bulk_upsert(HDF5_COLLECTION, [HDF5_PATH, HDF5_DATASET],
+                                  new_records)
         APP_LOGGER.info('Updated database with %s new HDF5 files' % len(new_records))
     else:
         APP_LOGGER.info('Unable to find any new HDF5 files')
+    _set_folder_stamps(_HDF5S_INDEX, scanned)
 
     return True
 
+def _get_hdf5_readers():
+    '''
+    Return the process pool that reads new HDF5 files.
+    '''
+    global _HDF5_READERS
+    if _HDF5_READERS is None:
+        _HDF5_READERS = ProcessPoolExecutor(max_workers=INDEX_WORKERS)
+    return _HDF5_READERS
+
+def shutdown_hdf5_readers():
+    '''
+    Shut down the process pool that reads new HDF5 files, if it was created.
+    '''
+    global _HDF5_READERS
+    if _HDF5_READERS is not None:
+        _HDF5_READERS.shutdown(wait=False)
+        _HDF5_READERS = None
+
+def _get_folder_stamps(index):
+    '''
+    Return the stamps of the folders listed by the last update of an index,
+    loading them from the folder stamps collection on first use.
+
+    @param index - Name of the index, e.g. _ARCHIVES_INDEX.
+    @return Dictionary of folder path to stamp.
+    '''
+    if index not in _FOLDER_STAMPS:
+        records = _DB_CONNECTOR.find(FOLDER_STAMPS_COLLECTION, {_INDEX: index},
+                                     [_FOLDER, _MTIME, _INODE])
+        _FOLDER_STAMPS[index] = dict((r[_FOLDER], (r[_MTIME], r[_INODE]))
+                                     for r in records)
+    return _FOLDER_STAMPS[index]
+
+def _set_folder_stamps(index, scanned):
+    '''
+    Record the stamps of the folders listed by an update of an index. Call
+    this only once the index has been updated from the folders.
+
+    @param index   - Name of the index, e.g. _ARCHIVES_INDEX.
+    @param scanned - Dictionary of folder path to stamp.
+    '''
+    records = [{_INDEX: index, _FOLDER: folder, _MTIME: stamp[0],
+                _INODE: stamp[1]} for folder, stamp in scanned.iteritems()]
+    if records:
+        _DB_CONNECTOR.bulk_upsert(FOLDER_STAMPS_COLLECTION, [_INDEX, _FOLDER],
+                                  records)
+    _get_folder_stamps(index).update(scanned)
+
 def update_dyes():
     '''
     Update the database with available dyes.
@@ -328,11 +476,47 @@ def update_devices():
     APP_LOGGER.info("Database successfully updated with available devices.")
     return True
 
+def stage_archive(archive_path, tmp_path, extensions):
+    '''
+    Create the job directory tmp_path from the contents of an archive and
+    return the paths of the images in it. Unless COPY_ARCHIVES is set, the
+    images are symlinked so they are read in place rather than copied.
+    Directories are created and other files are small and are copied, so
+    outputs written to tmp_path can't overwrite files in the archive. Any
+    existing tmp_path, e.g. from an earlier attempt at the job, is removed
+    first.
+
+    @param archive_path - Archive directory path where the images live.
+    @param tmp_path     - Job directory to create.
+    @param extensions   - List of image file extensions.
+    '''
+    io_utilities.safe_make_dirs(TMP_PATH)
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    if COPY_ARCHIVES:
+        # shutil.copytree does not play nicely when copying from samba drive to
+        # Mac, so use a system command.
+        os.system("cp -fr %s %s" % (pipes.quote(archive_path), pipes.quote(tmp_path)))
+    else:
+        archive_path = os.path.abspath(archive_path)
+        for root, _, names in os.walk(archive_path, followlinks=True):
+            dst_root = os.path.join(tmp_path, os.path.relpath(root, archive_path))
+            io_utilities.safe_make_dirs(dst_root)
+            for name in names:
+                src = os.path.join(root, name)
+                dst = os.path.join(dst_root, name)
+                if name.endswith(tuple(extensions)):
+                    os.symlink(src, dst)
+                else:
+                    shutil.copy(src, dst)
+
+    images = io_utilities.filter_files(os.listdir(tmp_path), extensions)
+    return [os.path.join(tmp_path, image) for image in images]
+
 def execute_convert_images(archive, outfile_path, uuid):
     '''
-    Execute the primary analysis convert_imgs command. This function copies the
-    provided archive to tmp space and executes primary analysis convert_imgs on
-    all binaries found in the archive.
+    Execute the primary analysis convert_imgs command. This function stages the
+    provided archive in tmp space (see stage_archive) and executes primary
+    analysis convert_imgs on all binaries found in the archive.
 
     @param archive      - Archive directory name where the TDI images live.
     @param outfile_path - File path to final destination of image tar.gz file.
@@ -343,14 +527,7 @@ def execute_convert_images(archive, outfile_path, uuid):
     destination      = os.path.join(TMP_PATH, uuid, archive)
     destination      = os.path.abspath(destination)
     try:
-        # shutil.copytree does not play nicely when copying from samba drive to
-        # Mac, so use a system command.
-        io_utilities.safe_make_dirs(TMP_PATH)
-        os.system("cp -fr %s %s" % (archive_path, tmp_path))
-
-        images = io_utilities.filter_files(os.listdir(tmp_path),
-                                           extensions=["bin"])
-        images =[os.path.join(tmp_path, image) for image in images]
+        images = stage_archive(archive_path, tmp_path, extensions=["bin"])
 
         # Run primary analysis process
         convert_images(images, "png", destination)
@@ -378,9 +555,9 @@ def execute_convert_images(archive, outfile_path, uuid):
 def execute_process(archive_path, dyes, device, major, minor, offsets, use_iid,
                     outfile_path, config_path, uuid):
     '''
-    Execute the primary analysis process command. This function copies the
-    provided archive to tmp space and executes primary analysis process on
-    all PNGs found in the archive.
+    Execute the primary analysis process command. This function stages the
+    provided archive in tmp space (see stage_archive) and executes primary
+    analysis process on all PNGs found in the archive.
 
     @param archive_path - Archive directory path where the TDI images live.
     @param dyes         - Set of dyes used in this run.
@@ -398,10 +575,8 @@ def execute_process(archive_path, dyes, device, major, minor, offsets, use_iid,
     tmp_path         = os.path.join(TMP_PATH, uuid)
     tmp_config_path  = os.path.join(tmp_path, "config.txt")
     try:
-        # shutil.copytree does not play nicely when copying from samba drive to
-        # Mac, so use a system command.
-        io_utilities.safe_make_dirs(TMP_PATH)
-        os.system("cp -fr %s %s" % (pipes.quote(archive_path), pipes.quote(tmp_path)))
+        images = stage_archive(archive_path, tmp_path,
+                               VALID_HAM_IMAGE_EXTENSIONS)
 
         with open(tmp_config_path, "w") as f:
             print >>f, "dye_map:"
@@ -412,10 +587,6 @@ def execute_process(archive_path, dyes, device, major, minor, offsets, use_iid,
                 print >>f, "  minor: %s" % minor
             print >>f, "  dyes: [%s]" % ", ".join([ "\"%s\"" % x for x in dyes])
 
-        images = io_utilities.filter_files(os.listdir(tmp_path),
-                                           VALID_HAM_IMAGE_EXTENSIONS)
-        images =[os.path.join(tmp_path, image) for image in images]
-
         # Run primary analysis process
         process(tmp_config_path, images, tmp_path, offsets=offsets,
                 use_iid=use_iid)
@@ -20,12 +20,9 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import PA_PROCESS_COLLECTION
-from bioweb_api.apis.ApiConstants import UUID, STATUS, ID, JOB_NAME, JOB_TYPE_NAME, \
+from bioweb_api.apis.ApiConstants import UUID, STATUS, JOB_NAME, JOB_TYPE_NAME, \
     SUBMIT_DATESTAMP, START_DATESTAMP, FINISH_DATESTAMP, ERROR, \
     RESULT, URL, CONFIG_URL, ARCHIVE, DYES, DEVICE, CONFIG
 from bioweb_api.apis.primary_analysis.ProcessPostFunction import PROCESS
@@ -33,7 +30,7 @@ from bioweb_api.apis.primary_analysis.ProcessPostFunction import PROCESS
 #=============================================================================
 # Class
 #=============================================================================
-class ProcessGetFunction(AbstractGetFunction):
+class ProcessGetFunction(AbstractGetJobFunction):
     
     #===========================================================================
     # Overridden Methods
@@ -51,39 +48,30 @@ class ProcessGetFunction(AbstractGetFunction):
         return ""
     
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
-    
+    def get_collection(cls):
+        return PA_PROCESS_COLLECTION
+
     @classmethod
-    def process_request(cls, params_dict):
-        columns                   = OrderedDict()
-        columns[ID]               = 0
-        columns[JOB_NAME]         = 1
-        columns[JOB_TYPE_NAME]    = 1
-        columns[UUID]             = 1
-        columns[ARCHIVE]          = 1
-        columns[DEVICE]           = 1
-        columns[DYES]             = 1
-        columns[STATUS]           = 1
-        columns[SUBMIT_DATESTAMP] = 1
-        columns[START_DATESTAMP]  = 1
-        columns[FINISH_DATESTAMP] = 1
-        columns[ERROR]            = 1
-        columns[URL]              = 1
-        columns[CONFIG_URL]       = 1
-        columns[RESULT]           = 1
-        columns[CONFIG]           = 1
-        
-        column_names = columns.keys()  
-        column_names.remove(ID)         
-        
-        data = cls._DB_CONNECTOR.find(PA_PROCESS_COLLECTION, {}, columns)
-         
-        return (data, column_names, None)
-         
+    def get_columns(cls):
+        columns = [
+                   JOB_NAME,
+                   JOB_TYPE_NAME,
+                   UUID,
+                   ARCHIVE,
+                   DEVICE,
+                   DYES,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   URL,
+                   CONFIG_URL,
+                   RESULT,
+                   CONFIG,
+                  ]
+        return columns
+
 #===============================================================================
 # Run Main
 #===============================================================================
@@ -20,6 +20,7 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
+import calendar
 import copy
 from datetime import datetime
 import os
@@ -34,7 +35,10 @@ from uuid import uuid4
 
 from bioweb_api.utilities.io_utilities import make_clean_response
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job, job_name_exists, \
+    get_stage_key, reuse_stage_result, JobExistsError
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.utilities.io_utilities import silently_remove_file, get_results_folder, \
     get_results_url
@@ -42,10 +46,10 @@ from bioweb_api import PA_PROCESS_COLLECTION, MAX_DATASET_SIZE
 from bioweb_api.apis.ApiConstants import UUID, ARCHIVE, JOB_STATUS, STATUS, ID, \
     ERROR, JOB_NAME, SUBMIT_DATESTAMP, DYES, DEVICE, START_DATESTAMP, RESULT, \
     FINISH_DATESTAMP, URL, CONFIG_URL, JOB_TYPE, JOB_TYPE_NAME, CONFIG, \
-    OFFSETS, MAJOR, MINOR, USE_IID, IS_HDF5, API_VERSION
+    OFFSETS, MAJOR, MINOR, USE_IID, IS_HDF5, API_VERSION, STAGE_KEY
 
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import execute_process, \
-    parse_pa_data_src, get_data_filepath, DataType
+    parse_pa_data_src, get_data_filepath, get_data_fingerprint, DataType
 
 from primary_analysis.dye_model import DEFAULT_OFFSETS
 
@@ -57,7 +61,8 @@ PROCESS        = "Process"
 #===============================================================================
 # Private Static Variables
 #===============================================================================
-
+# Number of HDF5 dataset rows converted to text at a time
+_CONVERSION_CHUNK_SIZE = 100000
 
 #===============================================================================
 # Class
@@ -155,8 +160,6 @@ class ProcessPostFunction(AbstractPostFunction):
         if len(archives) < 1:
             return make_clean_response(json_response, 404)
 
-        pa_job_names = set(cls._DB_CONNECTOR.distinct(PA_PROCESS_COLLECTION, JOB_NAME))
-
         # Process each archive
         status_codes  = []
         for i, (name, is_hdf5) in enumerate(archives):
@@ -166,7 +169,7 @@ class ProcessPostFunction(AbstractPostFunction):
                 cur_job_name = "%s-%d" % (job_name, i)
 
             status_code = 200
-            if cur_job_name in pa_job_names:
+            if job_name_exists(PA_PROCESS_COLLECTION, cur_job_name):
                 status_code = 403
                 json_response[PROCESS].append({ERROR: 'Job exists.'})
             else:
@@ -177,15 +180,19 @@ class ProcessPostFunction(AbstractPostFunction):
                                                      cls._DB_CONNECTOR,
                                                      cur_job_name, is_hdf5)
                     response = copy.deepcopy(pa_callable.document)
-                    callback = make_process_callback(pa_callable.uuid,
-                                                     pa_callable.outfile_path,
-                                                     pa_callable.config_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           pa_callable.uuid,
+                                           pa_callable.outfile_path,
+                                           pa_callable.config_path,
+                                           cls._DB_CONNECTOR)
 
 
                     # Add to queue
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
                                                    pa_callable, callback)
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception(traceback.format_exc())
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -208,6 +215,9 @@ class PaProcessCallable(object):
     """
     Callable that executes the process command.
     """
+    # Jobs queued by earlier releases have no stage key
+    stage_key = None
+
     def __init__(self, archive, dyes, device, major, minor, offset, use_iid,
                  db_connector, job_name, is_hdf5):
         """
@@ -239,6 +249,21 @@ class PaProcessCallable(object):
         self.outfile_path = os.path.join(results_folder, self.uuid)
         self.config_path  = self.outfile_path + '.cfg'
         self.db_connector = db_connector
+
+        # the archive is identified by its content too, so results aren't
+        # reused once it's modified or replaced
+        data_type         = DataType.hdf5 if is_hdf5 else DataType.image_stack
+        fingerprint       = get_data_fingerprint(archive, data_type=data_type)
+        self.stage_key    = None
+        if fingerprint is not None:
+            self.stage_key = get_stage_key(PROCESS, [archive, fingerprint],
+                                           {IS_HDF5: is_hdf5,
+                                            DYES: dyes,
+                                            DEVICE: device,
+                                            MAJOR: major,
+                                            MINOR: minor,
+                                            OFFSETS: offset,
+                                            USE_IID: use_iid})
         self.document     = {ARCHIVE: archive,
                              IS_HDF5: is_hdf5,
                              DYES: dyes,
@@ -250,22 +275,35 @@ class PaProcessCallable(object):
                              JOB_NAME: job_name,
                              JOB_TYPE_NAME: JOB_TYPE.pa_process, # @UndefinedVariable
                              SUBMIT_DATESTAMP: datetime.today(),
+                             STAGE_KEY: self.stage_key,
                              API_VERSION: VERSION}
 
-        self.db_connector.insert(PA_PROCESS_COLLECTION, [self.document])
+        insert_job(PA_PROCESS_COLLECTION, self.document)
 
     def __call__(self):
         update = {"$set": {STATUS: JOB_STATUS.running,      # @UndefinedVariable
                            START_DATESTAMP: datetime.today()}}
         query = {UUID: self.uuid}
         self.db_connector.update(PA_PROCESS_COLLECTION, query, update)
+
+        # reuse the result of an identical job if there is one
+        reused = reuse_stage_result(PA_PROCESS_COLLECTION, self.stage_key,
+                                    self.uuid, [self.outfile_path,
+                                                self.config_path])
+        if reused is not None:
+            # dyes of HDF5 datasets are read from the dataset
+            self.db_connector.update(PA_PROCESS_COLLECTION, query,
+                                     {"$set": {DYES: reused[DYES]}})
+            return
+
         if self.is_hdf5:
             hdf5_path = get_data_filepath(self.archive, data_type=DataType.hdf5)
-            dataset = h5py.File(hdf5_path)[self.archive]
-            if dataset.shape[0] > MAX_DATASET_SIZE:
-                raise RuntimeError("Size of the dataset %s (%d) is over the limit %d." % \
-                    (os.path.basename(self.archive), dataset.shape[0], MAX_DATASET_SIZE))
-            columns = dataset.attrs['columns']
+            with h5py.File(hdf5_path, 'r') as h5_file:
+                dataset = h5_file[self.archive]
+                if dataset.shape[0] > MAX_DATASET_SIZE:
+                    raise RuntimeError("Size of the dataset %s (%d) is over the limit %d." % \
+                        (os.path.basename(self.archive), dataset.shape[0], MAX_DATASET_SIZE))
+                columns = dataset.attrs['columns']
             decomp_dyes = [c.replace('-decomp', '') for c in columns if '-decomp' in c]
 
             # make config file
@@ -296,14 +334,18 @@ class PaProcessCallable(object):
                             self.uuid)
 
 
-def convert_hdf5_dataset_to_txt(hdf5_path, dataset, output_path, delimiter='\t'):
+def convert_hdf5_dataset_to_txt(hdf5_path, dataset, output_path, delimiter='\t',
+                                chunk_size=_CONVERSION_CHUNK_SIZE):
     """
-    Utility function to convert and HDF5 dataset into a csv file
+    Utility function to convert and HDF5 dataset into a csv file. The dataset
+    is read and written chunk_size rows at a time, so only one chunk is held
+    in memory.
 
     @param hdf5_path:   String, path of HDF5 file
     @param dataset:     String, name of dataset in HDF5 file to convert
     @param output_path: String, output path of text file
     @param delimiter:   String, delimiting character
+    @param chunk_size:  Integer, number of rows to convert at a time
     """
     # data type conversions
     conversions = {
@@ -318,47 +360,79 @@ def convert_hdf5_dataset_to_txt(hdf5_path, dataset, output_path, delimiter='\t')
         'capture_epoch': '%.6f'
     }
 
-    # get HDF5 dataset
-    dataset = h5py.File(hdf5_path)[dataset]
-    columns = dataset.attrs['columns']
-    data = dataset.value.astype(numpy.float64)
-    creation_time = dataset.attrs.get('creation_time', None)
-    convert_time_human_readable = numpy.vectorize(
-        lambda x: float(time.strftime('%H%M.%S', time.localtime(x)))
-    )
-
-    # append capture time if available
-    if 'capture_time' in columns and creation_time is not None:
-        idx = numpy.where(columns == 'capture_time')[0][0]
-        data[:, idx] += creation_time
-        columns[idx] = 'capture_epoch'
-
-    # append capture time if available
-    if 'img_creation_time' in columns and creation_time is not None:
-        idx = numpy.where(columns == 'img_creation_time')[0][0]
-        data[:, idx] += creation_time
-        columns[idx] = 'img_epoch'
-
-        human_readable_hour_min = convert_time_human_readable(data[:, idx]).reshape(-1, 1)
-        # also append epoch time
-        data = numpy.hstack((human_readable_hour_min, data))
-        columns = numpy.concatenate((['time'], columns))
-
-    # create data types
-    data_types = list()
-    for col in columns:
-        if col in conversions:
-            data_types.append(conversions[col])
-        elif col.endswith('-decomp'):
-            data_types.append(conversions['-decomp'])
-        else:
-            raise Exception('Unable to determine datatype for %s' % col)
-
-    # save file
-    numpy.savetxt(output_path, data, fmt=data_types,
-                  delimiter=delimiter, header=delimiter.join(columns),
-                  comments='')
+    with h5py.File(hdf5_path, 'r') as h5_file:
+        # get HDF5 dataset
+        dataset = h5_file[dataset]
+        columns = list(dataset.attrs['columns'])
+        creation_time = dataset.attrs.get('creation_time', None)
+
+        # append capture time if available
+        capture_idx = None
+        if 'capture_time' in columns and creation_time is not None:
+            capture_idx = columns.index('capture_time')
+            columns[capture_idx] = 'capture_epoch'
+
+        # append capture time if available
+        img_idx = None
+        if 'img_creation_time' in columns and creation_time is not None:
+            img_idx = columns.index('img_creation_time')
+            columns[img_idx] = 'img_epoch'
+            # also append epoch time
+            columns = ['time'] + columns
+
+        # create data types
+        data_types = list()
+        for col in columns:
+            if col in conversions:
+                data_types.append(conversions[col])
+            elif col.endswith('-decomp'):
+                data_types.append(conversions['-decomp'])
+            else:
+                raise Exception('Unable to determine datatype for %s' % col)
+
+        # save file
+        with open(output_path, 'w') as fh:
+            fh.write(delimiter.join(columns) + '\n')
+            for start in xrange(0, dataset.shape[0], chunk_size):
+                data = dataset[start:start + chunk_size].astype(numpy.float64)
+                if capture_idx is not None:
+                    data[:, capture_idx] += creation_time
+                if img_idx is not None:
+                    data[:, img_idx] += creation_time
+                    human_readable_hour_min = epoch_to_hour_min(data[:, img_idx])
+                    data = numpy.column_stack((human_readable_hour_min, data))
+                numpy.savetxt(fh, data, fmt=data_types, delimiter=delimiter)
+
+def epoch_to_hour_min(epochs):
+    """
+    Convert epoch times to local times of day of the form HHMM.SS, e.g.
+    09:24:38 becomes 924.38. Equivalent to
+    float(time.strftime('%H%M.%S', time.localtime(epoch))) for each epoch,
+    except that NaN epochs are converted to NaN.
 
+    @param epochs:  Numpy array of epoch times in seconds.
+    @return:        Numpy array of local times of day.
+    """
+    epochs      = numpy.asarray(epochs, dtype=numpy.float64)
+    hour_min    = numpy.full(epochs.shape, numpy.nan)
+    valid       = ~numpy.isnan(epochs)
+    seconds     = numpy.floor(epochs[valid]).astype(numpy.int64)
+    if len(seconds) == 0:
+        return hour_min
+
+    # The UTC offset of each epoch is looked up, as it changes across
+    # daylight saving transitions, but only once per distinct second since
+    # the drops of an image share its epoch.
+    unique_seconds, inverse = numpy.unique(seconds, return_inverse=True)
+    offsets = numpy.array([calendar.timegm(time.localtime(t)) - t
+                           for t in unique_seconds.tolist()],
+                          dtype=numpy.int64)[inverse]
+
+    seconds_of_day  = (seconds + offsets) % 86400
+    hours           = seconds_of_day // 3600
+    minutes         = (seconds_of_day // 60) % 60
+    hour_min[valid] = hours * 100 + minutes + (seconds_of_day % 60) / 100.0
+    return hour_min
 
 def make_process_callback(uuid, outfile_path, config_path, db_connector):
     """
@@ -385,7 +459,7 @@ def make_process_callback(uuid, outfile_path, config_path, db_connector):
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PROCESS_COLLECTION, query):
                 db_connector.update(PA_PROCESS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -397,7 +471,7 @@ def make_process_callback(uuid, outfile_path, config_path, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(PA_PROCESS_COLLECTION, query, {})) > 0:
+            if db_connector.exists(PA_PROCESS_COLLECTION, query):
                 db_connector.update(PA_PROCESS_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
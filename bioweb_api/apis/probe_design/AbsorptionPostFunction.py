@@ -31,6 +31,7 @@ from probe_design.absorption import execute_absorption
 from bioweb_api.utilities.io_utilities import make_clean_response
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import PROBES_COLLECTION, TARGETS_COLLECTION, \
     ABSORPTION_COLLECTION, RESULTS_PATH, HOSTNAME, PORT
@@ -128,9 +129,10 @@ class AbsorptionPostFunction(AbstractPostFunction):
                                                   strict, outfile_path, 
                                                   json_response[UUID], 
                                                   cls._DB_CONNECTOR)
-                callback     = make_absorption_callback(json_response[UUID], 
-                                                        outfile_path, 
-                                                        cls._DB_CONNECTOR)
+                callback     = JobCallback(make_absorption_callback,
+                                           json_response[UUID],
+                                           outfile_path,
+                                           cls._DB_CONNECTOR)
                 # Add to queue and update DB
                 cls._DB_CONNECTOR.insert(ABSORPTION_COLLECTION, [json_response])
                 cls._EXECUTION_MANAGER.add_job(json_response[UUID], 
@@ -188,7 +190,7 @@ def make_absorption_callback(uuid, outfile_path, db_connector):
                                 URL: "http://%s/results/%s/%s" % (HOSTNAME, 
                                                                   PORT, uuid)}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(ABSORPTION_COLLECTION, query, {})) > 0:
+            if db_connector.exists(ABSORPTION_COLLECTION, query):
                 db_connector.update(ABSORPTION_COLLECTION, query, update)
             elif os.path.isfile(outfile_path):
                 os.remove(outfile_path)
@@ -200,7 +202,7 @@ def make_absorption_callback(uuid, outfile_path, db_connector):
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(ABSORPTION_COLLECTION, query, {})) > 0:
+            if db_connector.exists(ABSORPTION_COLLECTION, query):
                 db_connector.update(ABSORPTION_COLLECTION, query, update)
             elif os.path.isfile(outfile_path):
                 os.remove(outfile_path)
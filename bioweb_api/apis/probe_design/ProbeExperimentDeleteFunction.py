@@ -49,8 +49,8 @@ class ProbeExperimentDeleteFunction(AbstractDeleteFunction):
     
     @classmethod
     def parameters(cls):
-        rid_enum = cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
-                                              RUN_ID)
+        rid_enum = ParameterFactory.distinct_enum(PROBE_EXPERIMENTS_COLLECTION,
+                                                  RUN_ID)
         cls._rid_param  = ParameterFactory.lc_string(RUN_ID, "Run ID.", 
                                                      required=True, 
                                                      allow_multiple=True,
@@ -46,15 +46,18 @@ class ProbeExperimentGetFunction(AbstractGetFunction):
     
     @classmethod
     def parameters(cls):
-        sid_enum  = cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
-                                               SAMPLE_ID)
-        rid_enum  = cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
-                                               RUN_ID)
-        pid_enum  = cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
-                                               PROBE_ID)
-        date_enum = cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
-                                               DATE)
-        date_enum = map(lambda x: x.strftime("%Y_%m_%d"), date_enum)
+        sid_enum  = ParameterFactory.distinct_enum(PROBE_EXPERIMENTS_COLLECTION,
+                                                   SAMPLE_ID)
+        rid_enum  = ParameterFactory.distinct_enum(PROBE_EXPERIMENTS_COLLECTION,
+                                                   RUN_ID)
+        pid_enum  = ParameterFactory.distinct_enum(PROBE_EXPERIMENTS_COLLECTION,
+                                                   PROBE_ID)
+        date_enum = ParameterFactory.registered_enum(
+            "%s.%s" % (PROBE_EXPERIMENTS_COLLECTION, DATE),
+            [PROBE_EXPERIMENTS_COLLECTION],
+            lambda: map(lambda x: x.strftime("%Y_%m_%d"),
+                        cls._DB_CONNECTOR.distinct(PROBE_EXPERIMENTS_COLLECTION,
+                                                   DATE)))
 
         parameters = [
                       ParameterFactory.format(),
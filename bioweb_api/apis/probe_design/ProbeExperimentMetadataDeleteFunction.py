@@ -47,8 +47,8 @@ class ProbeExperimentMetadataDeleteFunction(AbstractDeleteFunction):
     
     @classmethod
     def parameters(cls):
-        pid_enum = cls._DB_CONNECTOR.distinct(PROBE_METADATA_COLLECTION,
-                                              PROBE_ID)
+        pid_enum = ParameterFactory.distinct_enum(PROBE_METADATA_COLLECTION,
+                                                  PROBE_ID)
         cls._pid_param  = ParameterFactory.lc_string(PROBE_ID, "Probe ID(s).", 
                                                      required=True, 
                                                      allow_multiple=True,
@@ -46,8 +46,8 @@ class ProbeExperimentMetadataGetFunction(AbstractGetFunction):
     
     @classmethod
     def parameters(cls):
-        pid_enum = cls._DB_CONNECTOR.distinct(PROBE_METADATA_COLLECTION,
-                                              PROBE_ID)
+        pid_enum = ParameterFactory.distinct_enum(PROBE_METADATA_COLLECTION,
+                                                  PROBE_ID)
 
         parameters = [
                       ParameterFactory.format(),
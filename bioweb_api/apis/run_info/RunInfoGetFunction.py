@@ -22,13 +22,14 @@ limitations under the License.
 #=============================================================================
 from datetime import timedelta, datetime
 
-from bioweb_api import RUN_REPORT_COLLECTION
+from bioweb_api import RUN_REPORT_COLLECTION, MAX_PAGE_SIZE
 from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api.apis.parameters.DateParameter import DateParameter
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.apis.ApiConstants import ID, UUID, RUN_REPORT
-from bioweb_api.apis.run_info.RunInfoUtils import get_run_reports, update_run_reports
+from bioweb_api.apis.run_info.RunInfoUtils import get_run_reports
+from bioweb_api.execution_engine.Indexer import Indexer, RUN_REPORTS_INDEX
 
 #=============================================================================
 # Function
@@ -59,7 +60,8 @@ class RunInfoGetFunction(AbstractGetFunction):
     @staticmethod
     def notes():
         return "Returns a list of instrumental run reports that exist in " \
-            "the run report datastore."
+            "the run report datastore. Refreshing queues a background update " \
+            "of the datastore."
 
     @classmethod
     def parameters(cls):
@@ -76,12 +78,20 @@ class RunInfoGetFunction(AbstractGetFunction):
                                      required=False)
         cls.uuid_parameter = ParameterFactory.uuid(required=False,
                                                    allow_multiple=False)
+        cls.since_parameter = ParameterFactory.since("Only return reports of " \
+                                                     "runs on or after this " \
+                                                     "date (YYYY_MM_DD).")
+        cls.page_parameter = ParameterFactory.page()
+        cls.page_size_parameter = ParameterFactory.page_size()
         parameters = [
                       cls.cart_sn_parameter,
                       cls.refresh_parameter,
                       cls.start_date,
                       cls.end_date,
                       cls.uuid_parameter,
+                      cls.since_parameter,
+                      cls.page_parameter,
+                      cls.page_size_parameter,
                       ParameterFactory.format(),
                      ]
         return parameters
@@ -117,15 +127,31 @@ class RunInfoGetFunction(AbstractGetFunction):
                 # New file location 2017_05/10
                 date_folders.extend(d.strftime("%Y_%m/%d")
                                     for d in daterange(start_date, end_date))
+                Indexer.Instance().refresh(RUN_REPORTS_INDEX,
+                                           tuple(date_folders))
             else:
-                date_folders = None
-            update_run_reports(date_folders)
+                Indexer.Instance().refresh(RUN_REPORTS_INDEX)
 
+        cartridge_sn = None
         if cls.cart_sn_parameter in params_dict and \
             params_dict[cls.cart_sn_parameter][0]:
-            return get_run_reports(params_dict[cls.cart_sn_parameter][0])
-        else:
-            return get_run_reports()
+            cartridge_sn = params_dict[cls.cart_sn_parameter][0]
+
+        since = None
+        if cls.since_parameter in params_dict:
+            since = params_dict[cls.since_parameter][0]
+
+        page      = params_dict.get(cls.page_parameter, [1])[0]
+        page_size = None
+        if cls.page_size_parameter in params_dict:
+            page_size = min(params_dict[cls.page_size_parameter][0],
+                            MAX_PAGE_SIZE)
+
+        return get_run_reports(cartridge_sn, since, page, page_size)
+
+    @classmethod
+    def response_headers(cls):
+        return Indexer.Instance().freshness_headers(RUN_REPORTS_INDEX)
 
 #===============================================================================
 # Run Main
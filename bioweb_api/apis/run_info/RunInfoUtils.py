@@ -28,6 +28,7 @@ import traceback
 import yaml
 
 import h5py
+from pymongo import InsertOne, UpdateOne
 
 from bioweb_api import ARCHIVES_PATH, RUN_REPORT_COLLECTION, HDF5_COLLECTION, \
     ARCHIVES_COLLECTION, FA_PROCESS_COLLECTION, RUN_REPORT_PATH
@@ -47,7 +48,7 @@ from bioweb_api.apis.run_info.model.run_report import (
 from bioweb_api.utilities.logging_utilities import APP_LOGGER
 from bioweb_api.DbConnector import DbConnector
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import get_date_folders, \
-    remove_disk_directory
+    remove_disk_directory, read_hdf5_dataset_names
 
 #=============================================================================
 # Private Static Variables
@@ -59,9 +60,25 @@ ALLOWED_EXTENSIONS = ['.h5']
 #=============================================================================
 # RESTful location of services
 #=============================================================================
-def get_run_reports(cartridge_sn=None):
+def ensure_run_report_indexes():
+    """
+    Ensure the indexes used to filter and paginate run reports by date and to
+    look up the run reports of archives and run folders exist.
+    """
+    _DB_CONNECTOR.create_index(RUN_REPORT_COLLECTION, [(DATETIME, 1), (ID, 1)])
+    _DB_CONNECTOR.create_index(RUN_REPORT_COLLECTION, IMAGE_STACKS)
+    _DB_CONNECTOR.create_index(RUN_REPORT_COLLECTION, UTAG)
+
+def get_run_reports(cartridge_sn=None, since=None, page=1, page_size=None):
     """
     Retrieve a list of run reports.
+
+    @param cartridge_sn:    Only return reports for this cartridge.
+    @param since:           Only return reports for runs on or after this
+                            datetime.
+    @param page:            Page of reports to return, starting at 1.
+    @param page_size:       Number of reports per page. All reports are
+                            returned if None.
     """
     columns                     = OrderedDict()
     columns[ID]                 = 0
@@ -92,20 +109,38 @@ def get_run_reports(cartridge_sn=None):
                               {CARTRIDGE_SN_OLD: cartridge_sn},
                               {'{0}.{1}'.format(CARTRIDGE_BC, 'serial_num'): cartridge_sn}]})
 
-    reports = _DB_CONNECTOR.find(RUN_REPORT_COLLECTION, query, columns)
+    if since is not None:
+        query[DATETIME] = {'$gte': since}
+
+    if page_size is None:
+        reports   = _DB_CONNECTOR.find(RUN_REPORT_COLLECTION, query, columns)
+        page_info = None
+    else:
+        reports, page_info = _DB_CONNECTOR.find_page(RUN_REPORT_COLLECTION,
+                                                     query, columns,
+                                                     [(DATETIME, 1), (ID, 1)],
+                                                     page, page_size)
     APP_LOGGER.info('Retrieved %d run reports with image stack(s)' \
                     % (len(reports), ))
 
     if reports:
-        all_jobs = _DB_CONNECTOR.find(FA_PROCESS_COLLECTION, {})
+        def get_archive_name(archive):
+            return archive['name'] if isinstance(archive, dict) else archive
+
+        # Only retrieve the jobs run on the archives in these reports
+        archive_names = set(get_archive_name(archive) for report in reports
+                            for archive in report[IMAGE_STACKS])
+        jobs = _DB_CONNECTOR.find(FA_PROCESS_COLLECTION,
+                                  {ARCHIVE: {'$in': list(archive_names)}},
+                                  {ID: 0, ARCHIVE: 1, STATUS: 1, UUID: 1})
         job_map = defaultdict(list)
-        for job in all_jobs:
+        for job in jobs:
             job_map[job[ARCHIVE]].append(job)
 
         for report in reports:
             report[DATA_TO_JOBS] = dict()
             for archive in report[IMAGE_STACKS]:
-                archive_name = archive['name'] if isinstance(archive, dict) else archive
+                archive_name = get_archive_name(archive)
 
                 job_status = {STATUS: 'not processed', 'job_uuids': list()}
                 jobs = job_map[archive_name] if archive_name in job_map else list()
@@ -120,7 +155,7 @@ def get_run_reports(cartridge_sn=None):
                         job_status[STATUS] = FAILED
                     job_status['job_uuids'] = [j[UUID] for j in jobs]
                 report[DATA_TO_JOBS][archive_name] = job_status
-    return (reports, column_names, None)
+    return (reports, column_names, page_info)
 
 def set_utag(date_obj, sf):
     date_str = "%s_%s_%s" % (date_obj.year, date_obj.month, date_obj.day)
@@ -225,73 +260,125 @@ def get_run_info_path(path, sub_folder):
             return run_info_path
     return None
 
-def get_hdf5_datasets(log_data, data_folder):
+def get_hdf5_paths(log_data, data_folder):
     """
-    Fetch the HDF5 archives associated with a run report.
+    Return the paths of the HDF5 files associated with a run report.
 
     @param log_data:            the document of run report yaml
-    @param date_folder:         folder where data is located
+    @param data_folder:         folder where data is located
     """
-    if log_data is None or RUN_ID not in log_data: return set()
+    if log_data is None or RUN_ID not in log_data: return list()
 
     run_id = log_data[RUN_ID]
-    hdf5_paths = [os.path.join(data_folder, f + '.h5')
-                  for f in [run_id, run_id + '-baseline']
-                  if os.path.isfile(os.path.join(data_folder, f + '.h5'))]
-    all_datasets = set()
-
-    for path in hdf5_paths:
-        exist_records = _DB_CONNECTOR.find(HDF5_COLLECTION,
-                                {HDF5_PATH: remove_disk_directory(path)})
-        if exist_records:
-            all_datasets.update(set(r[HDF5_DATASET] for r in exist_records))
+    return [os.path.join(data_folder, f + '.h5')
+            for f in [run_id, run_id + '-baseline']
+            if os.path.isfile(os.path.join(data_folder, f + '.h5'))]
+
+
+def find_hdf5_datasets(reports):
+    """
+    Fetch the HDF5 archives associated with a list of run reports. The
+    datasets of known HDF5 files are retrieved with a single query, and new
+    HDF5 files are read and their datasets added to HDF5 collection in a
+    single bulk write.
+
+    @param reports:             list of (log_data, data_folder) tuples
+    @return:                    list of sets of dataset names, one per report
+    """
+    report_paths = [get_hdf5_paths(log_data, data_folder)
+                    for log_data, data_folder in reports]
+    all_paths = set(remove_disk_directory(path) for paths in report_paths
+                    for path in paths)
+    if not all_paths:
+        return [set() for _ in reports]
+
+    path_datasets = defaultdict(set)
+    for record in _DB_CONNECTOR.find(HDF5_COLLECTION,
+                                     {HDF5_PATH: {'$in': list(all_paths)}},
+                                     {ID: 0, HDF5_PATH: 1, HDF5_DATASET: 1}):
+        path_datasets[record[HDF5_PATH]].add(record[HDF5_DATASET])
+
+    new_records = list()
+    for path in set(path for paths in report_paths for path in paths):
+        rel_path = remove_disk_directory(path)
+        if rel_path in path_datasets:
             continue
 
-        new_records = list()
         try:
-            with h5py.File(path) as h5_file:
-                dataset_names = h5_file.keys()
-            for dsname in dataset_names:
-                if re.match(r'^\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}', dsname):
-                    new_records.append({
-                        HDF5_PATH: remove_disk_directory(path),
-                        HDF5_DATASET: dsname,
-                    })
+            dataset_names = read_hdf5_dataset_names(path)
         except:
             APP_LOGGER.exception('Unable to get dataset information from HDF5 file: %s' % path)
+            continue
+
+        path_records = [{HDF5_PATH: rel_path, HDF5_DATASET: dsname}
+                        for dsname in dataset_names
+                        if re.match(r'^\d{4}-\d{2}-\d{2}_\d{4}\.\d{2}', dsname)]
+        if path_records:
+            APP_LOGGER.info('Found %d datasets from HDF5 file: %s' % (len(path_records), path))
+            new_records.extend(path_records)
+            path_datasets[rel_path].update(r[HDF5_DATASET] for r in path_records)
 
-        if new_records:
-            APP_LOGGER.info('Found %d datasets from HDF5 file: %s' % (len(new_records), path))
-            _DB_CONNECTOR.insert(HDF5_COLLECTION, new_records)
-            all_datasets.update(set(r[HDF5_DATASET] for r in new_records))
+    _DB_CONNECTOR.bulk_upsert(HDF5_COLLECTION, [HDF5_PATH, HDF5_DATASET],
+                              new_records)
 
-    return all_datasets
+    return [set(dsname for path in paths
+                for dsname in path_datasets.get(remove_disk_directory(path), []))
+            for paths in report_paths]
 
 
-def update_image_stacks(log_data, data_folder):
+def get_hdf5_datasets(log_data, data_folder):
     """
-    Check whether the image_stacks in a run report document exist in archive collection.
-    If not, add them to database.
+    Fetch the HDF5 archives associated with a run report.
 
     @param log_data:            the document of run report yaml
-    @param date_folder:         folder where data is located
+    @param data_folder:         folder where data is located
+    """
+    return find_hdf5_datasets([(log_data, data_folder)])[0]
+
+
+def update_image_stacks(reports):
+    """
+    Check whether the image_stacks in run report documents exist in archive
+    collection. If not, add them to database. Existing archives are retrieved
+    with a single query.
+
+    @param reports:             list of (log_data, data_folder) tuples
     """
-    if log_data is None or IMAGE_STACKS not in log_data: return
+    reports = [(log_data, data_folder) for log_data, data_folder in reports
+               if log_data is not None and IMAGE_STACKS in log_data]
+    image_stacks = set(image_stack for log_data, _ in reports
+                       for image_stack in log_data[IMAGE_STACKS])
+    if not image_stacks: return
+
+    exist_archives = set(r[ARCHIVE] for r in _DB_CONNECTOR.find(
+                            ARCHIVES_COLLECTION,
+                            {ARCHIVE: {'$in': list(image_stacks)}},
+                            {ID: 0, ARCHIVE: 1}))
 
     new_records = list()
-    for image_stack in log_data[IMAGE_STACKS]:
-        exist_record = _DB_CONNECTOR.find_one(ARCHIVES_COLLECTION, ARCHIVE, image_stack)
-        if not exist_record:
+    for log_data, data_folder in reports:
+        for image_stack in log_data[IMAGE_STACKS]:
+            if image_stack in exist_archives: continue
             for folder in [ARCHIVES_PATH, data_folder]:
                 archive_path = os.path.join(folder, image_stack)
                 if os.path.isdir(archive_path):
                     new_records.append({ARCHIVE: image_stack,
                                         ARCHIVE_PATH: remove_disk_directory(archive_path)})
+                    exist_archives.add(image_stack)
                     break
 
     if new_records:
         APP_LOGGER.info('Found %d image stacks: %s' % (len(new_records), new_records))
-        _DB_CONNECTOR.insert(ARCHIVES_COLLECTION, new_records)
+        _DB_CONNECTOR.bulk_upsert(ARCHIVES_COLLECTION, [ARCHIVE], new_records)
+
+
+def is_instrument_report(log_data):
+    """
+    Return True if a run report was read and is from a pilot or beta
+    instrument.
+    """
+    return log_data is not None and \
+        any(log_data[DEVICE_NAME].lower().startswith(x) for x in ['pilot', 'beta'])
 
 
 def get_date_object(folder):
@@ -308,15 +395,14 @@ def get_date_object(folder):
 def update_run_reports(date_folders=None):
     '''
     Update the database with available run reports.  It is not an error
-    if zero reports are available at this moment.
+    if zero reports are available at this moment. Existing run reports,
+    archives and HDF5 files are retrieved with one query per collection,
+    and the changes are written with one bulk write per collection.
 
     @return True if database is successfully updated, False otherwise
     '''
     APP_LOGGER.info("Updating database with available run reports...")
 
-    # fetch utags from run report collection
-    db_utags = _DB_CONNECTOR.distinct(RUN_REPORT_COLLECTION, UTAG)
-
     if os.path.isdir(RUN_REPORT_PATH):
         if date_folders is None:
             try:
@@ -338,69 +424,82 @@ def update_run_reports(date_folders=None):
         date_folders = [os.path.join(RUN_REPORT_PATH, f) for f in date_folders]
         date_folders = [f for f in date_folders if os.path.isdir(f)]
 
-        reports = list()
+        # (report file path, date, data folder, utag) of every run
+        runs = list()
         for folder in date_folders:
+            date_obj = get_date_object(folder)
             for sf in os.listdir(folder):
                 report_file_path = get_run_info_path(folder, sf)
                 if report_file_path is None: continue
-
-                date_obj = get_date_object(folder)
-                data_folder = os.path.join(RUN_REPORT_PATH, folder, sf)
-
-                utag = set_utag(date_obj, sf)
-                if utag not in db_utags: # if not exists, need to insert to collection
+                runs.append((report_file_path, date_obj,
+                             os.path.join(RUN_REPORT_PATH, folder, sf),
+                             set_utag(date_obj, sf)))
+
+        # fetch existing reports of these runs from run report collection
+        db_reports = dict()
+        if runs:
+            for report in _DB_CONNECTOR.find(RUN_REPORT_COLLECTION,
+                                             {UTAG: {'$in': [r[3] for r in runs]}}):
+                db_reports.setdefault(report[UTAG], report)
+
+        new_reports   = list()  # (log_data, data_folder) of reports to insert
+        exist_reports = list()  # (log_data, data_folder) of existing reports
+        read_reports  = list()  # (log_data, data_folder) of reports read from file
+        for report_file_path, date_obj, data_folder, utag in runs:
+            if utag not in db_reports: # if not exists, need to insert to collection
+                log_data = read_report_file(report_file_path, date_obj, utag)
+                if not is_instrument_report(log_data):
+                    log_data = {DATETIME: date_obj, UTAG: utag}
+                # add report direcotry path
+                log_data[DIR_PATH] = remove_disk_directory(os.path.dirname(report_file_path))
+                new_reports.append((log_data, data_folder))
+                read_reports.append((log_data, data_folder))
+            else: # if exists, check HDF5 collection for new datasets
+                log_data = db_reports[utag]
+
+                # If previously a run report was not there or had wrong format,
+                # the mongo documents only has three or four fields, _id, datetime,
+                # unique_tag, and maybe dir_path. If this occurs, try reading the
+                # run report again.
+                if not set(log_data.keys()) - set([ID, DATETIME, UTAG, DIR_PATH]):
                     log_data = read_report_file(report_file_path, date_obj, utag)
-                    if log_data is None or all(not log_data[DEVICE_NAME].lower().startswith(x)
-                                               for x in ['pilot', 'beta']):
-                        log_data = {DATETIME: date_obj, UTAG: utag}
-                    if IMAGE_STACKS in log_data:
-                        # add image stacks to archive collection
-                        update_image_stacks(log_data, data_folder)
-                        # find HDF5 datasets and add them to HDF5 collection
-                        hdf5_datasets = get_hdf5_datasets(log_data, data_folder)
-                        log_data[IMAGE_STACKS].extend(hdf5_datasets)
+                    if not is_instrument_report(log_data):
+                        continue
                     # add report direcotry path
                     log_data[DIR_PATH] = remove_disk_directory(os.path.dirname(report_file_path))
-                    reports.append(log_data)
-                else: # if exists, check HDF5 collection for new datasets
-                    log_data = _DB_CONNECTOR.find_one(RUN_REPORT_COLLECTION, UTAG, utag)
-
-                    # If previously a run report was not there or had wrong format,
-                    # the mongo documents only has three or four fields, _id, datetime,
-                    # unique_tag, and maybe dir_path. If this occurs, try reading the
-                    # run report again.
-                    if not set(log_data.keys()) - set([ID, DATETIME, UTAG, DIR_PATH]):
-                        log_data = read_report_file(report_file_path, date_obj, utag)
-                        if log_data is None or all(not log_data[DEVICE_NAME].lower().startswith(x)
-                                                   for x in ['pilot', 'beta']):
-                            continue
-                        # add report direcotry path
-                        log_data[DIR_PATH] = remove_disk_directory(os.path.dirname(report_file_path))
-                        # add image stacks to archive collection
-                        update_image_stacks(log_data, data_folder)
-
-                    if IMAGE_STACKS in log_data:
-                        # find HDF5 datasets and add new records to HDF5 collection
-                        new_datasets = set(get_hdf5_datasets(log_data, data_folder))
-                        if new_datasets:
-                            # exclude uploaded HDF5 datasets
-                            exist_datasets = set([d for d in log_data[IMAGE_STACKS]
-                                                  if isinstance(d, str) or isinstance(d, unicode)])
-                            new_datasets = list(new_datasets - exist_datasets)
-                            if new_datasets:
-                                _DB_CONNECTOR.update(
-                                        RUN_REPORT_COLLECTION,
-                                        {UTAG: utag},
-                                        {"$addToSet": {IMAGE_STACKS:
-                                            {'$each': new_datasets}}})
-                                APP_LOGGER.info('Updated run report utag=%s with %d datasets'
-                                                % (utag, len(new_datasets)))
-
-        APP_LOGGER.info("Found %d run reports" % (len(reports)))
-        if len(reports) > 0:
-            # There is a possible race condition here. Ideally these operations
-            # would be performed in concert atomically
-            _DB_CONNECTOR.insert(RUN_REPORT_COLLECTION, reports)
+                    read_reports.append((log_data, data_folder))
+                exist_reports.append((log_data, data_folder))
+
+        # add image stacks to archive collection
+        update_image_stacks(read_reports)
+
+        # find HDF5 datasets and add them to HDF5 collection
+        new_stack_reports   = [r for r in new_reports if IMAGE_STACKS in r[0]]
+        exist_stack_reports = [r for r in exist_reports if IMAGE_STACKS in r[0]]
+        hdf5_datasets = find_hdf5_datasets(new_stack_reports + exist_stack_reports)
+        for (log_data, _), datasets in zip(new_stack_reports, hdf5_datasets):
+            log_data[IMAGE_STACKS].extend(datasets)
+
+        requests = [InsertOne(log_data) for log_data, _ in new_reports]
+        for (log_data, _), datasets in zip(exist_stack_reports,
+                                           hdf5_datasets[len(new_stack_reports):]):
+            if datasets:
+                # exclude uploaded HDF5 datasets
+                exist_datasets = set([d for d in log_data[IMAGE_STACKS]
+                                      if isinstance(d, str) or isinstance(d, unicode)])
+                new_datasets = list(datasets - exist_datasets)
+                if new_datasets:
+                    requests.append(UpdateOne(
+                            {UTAG: log_data[UTAG]},
+                            {"$addToSet": {IMAGE_STACKS:
+                                {'$each': new_datasets}}}))
+                    APP_LOGGER.info('Updated run report utag=%s with %d datasets'
+                                    % (log_data[UTAG], len(new_datasets)))
+
+        APP_LOGGER.info("Found %d run reports" % (len(new_reports)))
+        # There is a possible race condition here. Ideally these operations
+        # would be performed in concert atomically
+        _DB_CONNECTOR.bulk_write(RUN_REPORT_COLLECTION, requests)
     else:
         APP_LOGGER.error("Couldn't locate run report path '%s', to update database." % RUN_REPORT_PATH)
         return False
@@ -20,13 +20,10 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import SA_ASSAY_CALLER_COLLECTION
 from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, STATUS, \
-    ID, PICO2_DYE, ASSAY_DYE, JOB_TYPE_NAME, RESULT, \
+    PICO2_DYE, ASSAY_DYE, JOB_TYPE_NAME, RESULT, \
     ERROR, SA_IDENTITY_UUID, SUBMIT_DATESTAMP, NUM_PROBES, TRAINING_FACTOR, \
     START_DATESTAMP, SCATTER_PLOT, SCATTER_PLOT_URL, AC_METHOD, \
     FINISH_DATESTAMP, URL, EXP_DEF_NAME, EXP_DEF_UUID, CTRL_THRESH, \
@@ -36,7 +33,7 @@ from bioweb_api.apis.secondary_analysis.AssayCallerPostFunction import ASSAY_CAL
 #=============================================================================
 # Class
 #=============================================================================
-class AssayCallerGetFunction(AbstractGetFunction):
+class AssayCallerGetFunction(AbstractGetJobFunction):
 
     #===========================================================================
     # Overridden Methods
@@ -54,46 +51,37 @@ class AssayCallerGetFunction(AbstractGetFunction):
         return ""
 
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
+    def get_collection(cls):
+        return SA_ASSAY_CALLER_COLLECTION
 
     @classmethod
-    def process_request(cls, params_dict):
-        columns                        = OrderedDict()
-        columns[ID]                    = 0
-        columns[JOB_NAME]              = 1
-        columns[JOB_TYPE_NAME]         = 1
-        columns[UUID]                  = 1
-        columns[EXP_DEF_NAME]          = 1
-        columns[EXP_DEF_UUID]          = 1
-        columns[SA_IDENTITY_UUID]      = 1
-        columns[PICO2_DYE]             = 1
-        columns[ASSAY_DYE]             = 1
-        columns[NUM_PROBES]            = 1
-        columns[TRAINING_FACTOR]       = 1
-        columns[CTRL_THRESH]           = 1
-        columns[STATUS]                = 1
-        columns[SUBMIT_DATESTAMP]      = 1
-        columns[START_DATESTAMP]       = 1
-        columns[FINISH_DATESTAMP]      = 1
-        columns[ERROR]                 = 1
-        columns[RESULT]                = 1
-        columns[URL]                   = 1
-        columns[SCATTER_PLOT]          = 1
-        columns[SCATTER_PLOT_URL]      = 1
-        columns[DYES_SCATTER_PLOT]     = 1
-        columns[DYES_SCATTER_PLOT_URL] = 1
-        columns[AC_METHOD]              = 1
-
-        column_names = columns.keys()
-        column_names.remove(ID)
-
-        data = cls._DB_CONNECTOR.find(SA_ASSAY_CALLER_COLLECTION, {}, columns)
-
-        return (data, column_names, None)
+    def get_columns(cls):
+        columns = [
+                   JOB_NAME,
+                   JOB_TYPE_NAME,
+                   UUID,
+                   EXP_DEF_NAME,
+                   EXP_DEF_UUID,
+                   SA_IDENTITY_UUID,
+                   PICO2_DYE,
+                   ASSAY_DYE,
+                   NUM_PROBES,
+                   TRAINING_FACTOR,
+                   CTRL_THRESH,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   RESULT,
+                   URL,
+                   SCATTER_PLOT,
+                   SCATTER_PLOT_URL,
+                   DYES_SCATTER_PLOT,
+                   DYES_SCATTER_PLOT_URL,
+                   AC_METHOD,
+                  ]
+        return columns
 
 #===============================================================================
 # Run Main
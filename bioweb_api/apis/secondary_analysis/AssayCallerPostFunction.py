@@ -31,9 +31,13 @@ from uuid import uuid4
 from datetime import datetime
 
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file, safe_make_dirs, get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job, job_name_exists, \
+    get_stage_key, get_source_key, get_exp_def_key, \
+    reuse_stage_result, JobExistsError
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import SA_ASSAY_CALLER_COLLECTION, SA_IDENTITY_COLLECTION, \
     FA_PROCESS_COLLECTION, RUN_REPORT_COLLECTION, RUN_REPORT_PATH, \
@@ -47,12 +51,12 @@ from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, JOB_STATUS, STATUS, \
     CTRL_THRESH_DESCRIPTION, CTRL_FILTER, CTRL_FILTER_DESCRIPTION, AC_METHOD, \
     AC_METHOD_DESCRIPTION, PICO1_DYE, DYES_SCATTER_PLOT, \
     DYES_SCATTER_PLOT_URL, AC_MODEL, AC_MODEL_DESCRIPTION, ARCHIVE, \
-    IMAGE_STACKS, ID_DOCUMENT, API_VERSION
+    IMAGE_STACKS, ID_DOCUMENT, API_VERSION, STAGE_KEY, EXP_DEF
 from bioweb_api.apis.run_info.constants import DIR_PATH
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 
 from primary_analysis.command import InvalidFileError
 from primary_analysis.pa_utils import sniff_delimiter
-from gbutils.exp_def.exp_def_handler import ExpDefHandler
 from secondary_analysis.assay_calling.assay_call_manager import AssayCallManager
 from secondary_analysis.constants import AC_TRAINING_FACTOR, AC_CTRL_THRESHOLD
 from secondary_analysis.assay_calling.assay_caller_plotting import generate_dye_scatterplots
@@ -169,6 +173,10 @@ class AssayCallerPostFunction(AbstractPostFunction):
             json_response[ERROR] = str(sys.exc_info()[1])
             return make_clean_response(json_response, 500)
 
+        # Ensure at least one valid identity job exists
+        if len(sa_identity_jobs) < 1:
+            return make_clean_response(json_response, 404)
+
         # Process each archive
         status_codes  = []
         for i, sa_identity_job in enumerate(sa_identity_jobs):
@@ -180,8 +188,7 @@ class AssayCallerPostFunction(AbstractPostFunction):
 
             status_code = 200
 
-            if cur_job_name in cls._DB_CONNECTOR.distinct(SA_ASSAY_CALLER_COLLECTION,
-                                                          JOB_NAME):
+            if job_name_exists(SA_ASSAY_CALLER_COLLECTION, cur_job_name):
                 status_code = 403
                 json_response[ASSAY_CALLER].append({ERROR: 'Job exists.'})
             else:
@@ -200,15 +207,19 @@ class AssayCallerPostFunction(AbstractPostFunction):
                                                          ac_method,
                                                          ac_model)
                     response = copy.deepcopy(sac_callable.document)
-                    callback = make_process_callback(sac_callable.uuid,
-                                                     sac_callable.outfile_path,
-                                                     sac_callable.scatter_plot_path,
-                                                     sac_callable.dyes_plot_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           sac_callable.uuid,
+                                           sac_callable.outfile_path,
+                                           sac_callable.scatter_plot_path,
+                                           sac_callable.dyes_plot_path,
+                                           cls._DB_CONNECTOR)
                     # Add to queue
                     cls._EXECUTION_MANAGER.add_job(response[UUID], sac_callable,
                                                    callback)
 
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception(traceback.format_exc())
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -231,6 +242,9 @@ class SaAssayCallerCallable(object):
     '''
     Callable that executes the assay caller command.
     '''
+    # Jobs queued by earlier releases have no stage key
+    stage_key = None
+
     def __init__(self, identity_uuid, exp_def_name, training_factor,
                  ctrl_thresh, db_connector, job_name, ctrl_filter,
                  ac_method, ac_model):
@@ -264,6 +278,16 @@ class SaAssayCallerCallable(object):
         self.tmp_sys_listener_path = os.path.join(self.tmp_path, SYS_LISTENER)
         self.tmp_dyes_plot_path    = os.path.join(self.tmp_path,
                                                   'assay_calls_dyes_scatter.png')
+        self.stage_key = get_stage_key(ASSAY_CALLER,
+                        get_source_key(SA_IDENTITY_COLLECTION, identity_uuid),
+                        {
+                         EXP_DEF: get_exp_def_key(exp_def_name),
+                         TRAINING_FACTOR: training_factor,
+                         CTRL_THRESH: ctrl_thresh,
+                         CTRL_FILTER: ctrl_filter,
+                         AC_METHOD: ac_method,
+                         AC_MODEL: ac_model,
+                        })
         self.document = {
                         EXP_DEF_NAME: exp_def_name,
                         PICO1_DYE: self.pico1_dye,
@@ -281,12 +305,10 @@ class SaAssayCallerCallable(object):
                         CTRL_FILTER: ctrl_filter,
                         AC_METHOD: ac_method,
                         AC_MODEL: ac_model,
+                        STAGE_KEY: self.stage_key,
                         API_VERSION: VERSION,
                        }
-        if job_name in self.db_connector.distinct(SA_ASSAY_CALLER_COLLECTION, JOB_NAME):
-            raise Exception('Job name %s already exists in assay caller collection' % job_name)
-
-        self.db_connector.insert(SA_ASSAY_CALLER_COLLECTION, [self.document])
+        insert_job(SA_ASSAY_CALLER_COLLECTION, self.document)
 
 
     def __call__(self):
@@ -295,12 +317,21 @@ class SaAssayCallerCallable(object):
         query = {UUID: self.uuid}
         self.db_connector.update(SA_ASSAY_CALLER_COLLECTION, query, update)
 
+        # reuse the result of an identical job if there is one
+        if reuse_stage_result(SA_ASSAY_CALLER_COLLECTION, self.stage_key,
+                              self.uuid, [self.outfile_path,
+                                          self.scatter_plot_path,
+                                          self.dyes_plot_path]):
+            return
+
         def gen_dye_scatterplot(dyes, sys_listener_path):
             try:
                 analysis_df = pandas.read_table(self.analysis_file,
                     sep=sniff_delimiter(self.analysis_file))
-                ac_df = pandas.read_table(self.tmp_outfile_path,
-                    sep=sniff_delimiter(self.tmp_outfile_path))
+                # only the assay calls are needed from the assay caller output
+                ac_df = pandas.read_table(self.outfile_path,
+                    sep=sniff_delimiter(self.outfile_path),
+                    usecols=['assay'])
                 analysis_df['assay'] = False
                 analysis_df.loc[analysis_df['identity'].notnull(), 'assay'] = ac_df['assay'].values
 
@@ -340,8 +371,7 @@ class SaAssayCallerCallable(object):
         try:
             safe_make_dirs(self.tmp_path)
 
-            exp_def_fetcher = ExpDefHandler()
-            experiment = exp_def_fetcher.get_experiment_definition(self.exp_def_name)
+            experiment = ExpDefCache.Instance().experiment(self.exp_def_name)
 
             model_file_dict = available_models(self.ac_method)
             if self.ac_model is None:
@@ -372,7 +402,9 @@ class SaAssayCallerCallable(object):
                 raise Exception('Secondary analysis assay caller job ' +
                                 'failed: output file not generated.')
 
-            shutil.copy(self.tmp_outfile_path, self.outfile_path)
+            # the temporary directory is removed below, so move the calls
+            # rather than copying them
+            shutil.move(self.tmp_outfile_path, self.outfile_path)
             gen_dye_scatterplot(experiment.dyes, self.get_sys_listener_path())
 
             if os.path.isfile(self.tmp_scatter_plot_path):
@@ -437,7 +469,7 @@ def make_process_callback(uuid, outfile_path, scatter_plot_path,
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_ASSAY_CALLER_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_ASSAY_CALLER_COLLECTION, query):
                 db_connector.update(SA_ASSAY_CALLER_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -451,7 +483,7 @@ def make_process_callback(uuid, outfile_path, scatter_plot_path,
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_ASSAY_CALLER_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_ASSAY_CALLER_COLLECTION, query):
                 db_connector.update(SA_ASSAY_CALLER_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
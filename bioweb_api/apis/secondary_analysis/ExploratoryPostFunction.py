@@ -30,6 +30,7 @@ from datetime import datetime
 from uuid import uuid4
 
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import SA_EXPLORATORY_COLLECTION, SA_ASSAY_CALLER_COLLECTION, \
     SA_IDENTITY_COLLECTION, TMP_PATH
@@ -43,6 +44,8 @@ from bioweb_api.apis.ApiConstants import JOB_NAME, UUID, ERROR, ID, \
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file, safe_make_dirs, get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job, job_exists, \
+    job_name_exists, JobExistsError
 
 from primary_analysis.command import InvalidFileError
 from secondary_analysis.exploratory.offline_analysis import offline_analysis
@@ -121,8 +124,10 @@ class ExploratoryPostFunction(AbstractPostFunction):
                 cur_job_name = "%s-%d" % (job_name, i)
             status_code = 200
 
-            if cur_job_name in cls._DB_CONNECTOR.distinct(SA_EXPLORATORY_COLLECTION,
-                                                          JOB_NAME):
+            if not job_exists(SA_ASSAY_CALLER_COLLECTION, UUID, assay_caller_uuid):
+                status_code = 404
+                json_response[EXPLORATORY].append({ERROR: 'Assay caller job %s not found.' % assay_caller_uuid})
+            elif job_name_exists(SA_EXPLORATORY_COLLECTION, cur_job_name):
                 status_code = 403
                 json_response[EXPLORATORY].append({ERROR: 'Job exists.'})
             else:
@@ -134,15 +139,19 @@ class ExploratoryPostFunction(AbstractPostFunction):
                                                              cls._DB_CONNECTOR,
                                                              cur_job_name)
                     response = copy.deepcopy(exploratory_callable.document)
-                    callback = make_process_callback(exploratory_callable.uuid,
-                                                     exploratory_callable.tsv_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           exploratory_callable.uuid,
+                                           exploratory_callable.tsv_path,
+                                           cls._DB_CONNECTOR)
 
                     # Add to queue
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
                                                    exploratory_callable,
                                                    callback)
 
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception("Error processing Exploratory post request.")
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -216,10 +225,7 @@ class SaExploratoryCallable(object):
                         API_VERSION: VERSION,
                        }
 
-        if job_name in self.db_connector.distinct(SA_EXPLORATORY_COLLECTION, JOB_NAME):
-            raise Exception('Job name %s already exists in exploratory collection' % job_name)
-
-        self.db_connector.insert(SA_EXPLORATORY_COLLECTION, [self.document])
+        insert_job(SA_EXPLORATORY_COLLECTION, self.document)
 
     def __call__(self):
         update = {"$set": {STATUS: JOB_STATUS.running,      # @UndefinedVariable
@@ -297,7 +303,7 @@ def make_process_callback(uuid, outfile_path, db_connector):
                                    ERROR: error_msg}}
         finally:
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_EXPLORATORY_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_EXPLORATORY_COLLECTION, query):
                 db_connector.update(SA_EXPLORATORY_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -20,12 +20,9 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import SA_GENOTYPER_COLLECTION
-from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, STATUS, ID, \
+from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, STATUS, \
     JOB_TYPE_NAME, RESULT, ERROR, SUBMIT_DATESTAMP, START_DATESTAMP, \
     FINISH_DATESTAMP, URL, REQUIRED_DROPS, SA_ASSAY_CALLER_UUID, EXP_DEF_NAME, \
     EXP_DEF_UUID, PDF, PDF_URL, PNG, PNG_URL, PNG_SUM, PNG_SUM_URL, KDE_PNG, \
@@ -35,7 +32,7 @@ from bioweb_api.apis.secondary_analysis.GenotyperPostFunction import GENOTYPER
 #=============================================================================
 # Class
 #=============================================================================
-class GenotyperGetFunction(AbstractGetFunction):
+class GenotyperGetFunction(AbstractGetJobFunction):
 
     #===========================================================================
     # Overridden Methods
@@ -53,47 +50,38 @@ class GenotyperGetFunction(AbstractGetFunction):
         return ""
 
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
+    def get_collection(cls):
+        return SA_GENOTYPER_COLLECTION
 
     @classmethod
-    def process_request(cls, params_dict):
-        columns                       = OrderedDict()
-        columns[ID]                   = 0
-        columns[JOB_NAME]             = 1
-        columns[JOB_TYPE_NAME]        = 1
-        columns[UUID]                 = 1
-        columns[EXP_DEF_NAME]         = 1
-        columns[EXP_DEF_UUID]         = 1
-        columns[REQUIRED_DROPS]       = 1
-        columns[SA_ASSAY_CALLER_UUID] = 1
-        columns[STATUS]               = 1
-        columns[SUBMIT_DATESTAMP]     = 1
-        columns[START_DATESTAMP]      = 1
-        columns[FINISH_DATESTAMP]     = 1
-        columns[ERROR]                = 1
-        columns[RESULT]               = 1
-        columns[PDF]                  = 1
-        columns[PDF_URL]              = 1
-        columns[PNG]                  = 1
-        columns[PNG_URL]              = 1
-        columns[PNG_SUM]              = 1
-        columns[PNG_SUM_URL]          = 1
-        columns[KDE_PNG]              = 1
-        columns[KDE_PNG_URL]          = 1
-        columns[KDE_PNG_SUM]          = 1
-        columns[KDE_PNG_SUM_URL]      = 1
-        columns[URL]                  = 1
-
-        column_names = columns.keys()
-        column_names.remove(ID)
-
-        data = cls._DB_CONNECTOR.find(SA_GENOTYPER_COLLECTION, {}, columns)
-
-        return (data, column_names, None)
+    def get_columns(cls):
+        columns = [
+                   JOB_NAME,
+                   JOB_TYPE_NAME,
+                   UUID,
+                   EXP_DEF_NAME,
+                   EXP_DEF_UUID,
+                   REQUIRED_DROPS,
+                   SA_ASSAY_CALLER_UUID,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   RESULT,
+                   PDF,
+                   PDF_URL,
+                   PNG,
+                   PNG_URL,
+                   PNG_SUM,
+                   PNG_SUM_URL,
+                   KDE_PNG,
+                   KDE_PNG_URL,
+                   KDE_PNG_SUM,
+                   KDE_PNG_SUM_URL,
+                   URL,
+                  ]
+        return columns
 
 #===============================================================================
 # Run Main
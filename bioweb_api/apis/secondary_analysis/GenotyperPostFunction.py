@@ -30,6 +30,7 @@ from datetime import datetime
 from uuid import uuid4
 
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import SA_GENOTYPER_COLLECTION, SA_ASSAY_CALLER_COLLECTION, \
     SA_IDENTITY_COLLECTION, TMP_PATH
@@ -39,12 +40,15 @@ from bioweb_api.apis.ApiConstants import JOB_NAME, UUID, ERROR, ID, \
     JOB_NAME_DESC, START_DATESTAMP, FINISH_DATESTAMP, URL, JOB_STATUS, \
     STATUS, JOB_TYPE, JOB_TYPE_NAME, VCF, PDF, PDF_URL, PNG, PNG_URL, PNG_SUM, \
     PNG_SUM_URL, REQ_DROPS_DESCRIPTION, VARIANT_MASK, KDE_PNG, KDE_PNG_SUM, \
-    KDE_PNG_SUM_URL, KDE_PNG_URL, API_VERSION
+    KDE_PNG_SUM_URL, KDE_PNG_URL, API_VERSION, STAGE_KEY, EXP_DEF
 from bioweb_api.utilities.io_utilities import make_clean_response, \
     silently_remove_file, safe_make_dirs, get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job, job_exists, \
+    job_name_exists, get_stage_key, get_source_key, get_exp_def_key, \
+    reuse_stage_result, JobExistsError
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
 
-from gbutils.exp_def.exp_def_handler import ExpDefHandler
 from primary_analysis.command import InvalidFileError
 from secondary_analysis.genotyping.genotype_analysis import GenotypeProcessor
 from secondary_analysis.assay_calling.assay_caller_plotting import generate_plots
@@ -123,8 +127,10 @@ class GenotyperPostFunction(AbstractPostFunction):
                 cur_job_name = "%s-%d" % (job_name, i)
             status_code = 200
 
-            if cur_job_name in cls._DB_CONNECTOR.distinct(SA_GENOTYPER_COLLECTION,
-                                                          JOB_NAME):
+            if not job_exists(SA_ASSAY_CALLER_COLLECTION, UUID, assay_caller_uuid):
+                status_code = 404
+                json_response[GENOTYPER].append({ERROR: 'Assay caller job %s not found.' % assay_caller_uuid})
+            elif job_name_exists(SA_GENOTYPER_COLLECTION, cur_job_name):
                 status_code = 403
                 json_response[GENOTYPER].append({ERROR: 'Job exists.'})
             else:
@@ -136,19 +142,19 @@ class GenotyperPostFunction(AbstractPostFunction):
                                                              cls._DB_CONNECTOR,
                                                              cur_job_name)
                     response = copy.deepcopy(genotyper_callable.document)
-                    callback = make_process_callback(genotyper_callable.uuid,
-                                                     exp_def_name,
-                                                     genotyper_callable.ac_result_path,
-                                                     genotyper_callable.ignored_dyes,
-                                                     genotyper_callable.outfile_path,
-                                                     cls._DB_CONNECTOR,
-                                                     cur_job_name)
+                    callback = JobCallback(make_process_callback,
+                                           genotyper_callable.uuid,
+                                           genotyper_callable.outfile_path,
+                                           cls._DB_CONNECTOR)
 
                     # Add to queue
                     cls._EXECUTION_MANAGER.add_job(response[UUID],
                                                    genotyper_callable,
                                                    callback)
 
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception("Error processing Genotyper post request.")
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -172,6 +178,9 @@ class SaGenotyperCallable(object):
     """
     Callable that executes the genotyper command.
     """
+    # Jobs queued by earlier releases have no stage key
+    stage_key = None
+
     def __init__(self, assay_caller_uuid, exp_def_name,
                  required_drops, db_connector, job_name, mask_code=None,
                  combine_alleles=False):
@@ -196,6 +205,15 @@ class SaGenotyperCallable(object):
         self.combine_alleles  = combine_alleles
         self.tmp_path         = os.path.join(TMP_PATH, self.uuid)
         self.tmp_outfile_path = os.path.join(self.tmp_path, self.uuid + ".%s" % VCF)
+        self.stage_key = get_stage_key(GENOTYPER,
+                        get_source_key(SA_ASSAY_CALLER_COLLECTION, assay_caller_uuid),
+                        {
+                         EXP_DEF: get_exp_def_key(exp_def_name),
+                         REQUIRED_DROPS: required_drops,
+                         IGNORED_DYES: self.ignored_dyes,
+                         VARIANT_MASK: mask_code,
+                         'combine_alleles': combine_alleles,
+                        })
         self.document = {
                         EXP_DEF_NAME: exp_def_name,
                         REQUIRED_DROPS: required_drops,
@@ -206,24 +224,30 @@ class SaGenotyperCallable(object):
                         JOB_TYPE_NAME: JOB_TYPE.sa_genotyping, # @UndefinedVariable
                         SUBMIT_DATESTAMP: datetime.today(),
                         VARIANT_MASK: self.mask_code,
+                        STAGE_KEY: self.stage_key,
                         API_VERSION: VERSION,
                        }
 
-        if job_name in self.db_connector.distinct(SA_GENOTYPER_COLLECTION, JOB_NAME):
-            raise Exception('Job name %s already exists in genotyper collection' % job_name)
-
-        self.db_connector.insert(SA_GENOTYPER_COLLECTION, [self.document])
+        insert_job(SA_GENOTYPER_COLLECTION, self.document)
 
     def __call__(self):
         update = {"$set": {STATUS: JOB_STATUS.running,      # @UndefinedVariable
                            START_DATESTAMP: datetime.today()}}
         query = {UUID: self.uuid}
         self.db_connector.update(SA_GENOTYPER_COLLECTION, query, update)
+
+        # reuse the result of an identical job if there is one, the plots
+        # are titled with the job name so they're generated regardless
+        if reuse_stage_result(SA_GENOTYPER_COLLECTION, self.stage_key,
+                              self.uuid, [self.outfile_path,
+                                          self.outfile_path[:-3] + PDF]):
+            self.generate_plots()
+            return
+
         try:
             safe_make_dirs(self.tmp_path)
 
-            exp_def_fetcher = ExpDefHandler()
-            experiment = exp_def_fetcher.get_experiment_definition(self.exp_def_name)
+            experiment = ExpDefCache.Instance().experiment(self.exp_def_name)
             GenotypeProcessor(experiment, None, self.tmp_outfile_path,
                               required_drops=self.required_drops,
                               in_file=self.ac_result_path,
@@ -246,22 +270,34 @@ class SaGenotyperCallable(object):
             # Regardless of success or failure, remove the copied archive directory
             shutil.rmtree(self.tmp_path, ignore_errors=True)
 
-def make_process_callback(uuid, exp_def_name, ac_result_path, ignored_dyes,
-                          outfile_path, db_connector, cur_job_name):
+        self.generate_plots()
+
+    def generate_plots(self):
+        """
+        Generate the scatter and kde plots of the assay caller result next to
+        the VCF file. They're titled with the job name.
+        """
+        generate_plots(self.exp_def_name, self.ac_result_path,
+                       os.path.splitext(self.outfile_path)[0],
+                       ignored_dyes=self.ignored_dyes,
+                       data_set_name=self.document[JOB_NAME])
+
+def make_process_callback(uuid, outfile_path, db_connector, *legacy_args):
     """
     Return a closure that is fired when the job finishes. This
     callback updates the DB with completion status, result file location, and
-    an error message if applicable.
+    an error message if applicable. The plots are generated by the job.
 
     @param uuid:         Unique job id in database
-    @param exp_def_name: Experiment definition name
-    @param ac_result_path: Path to assay caller result
-    @param ignored_dyes: List of dyes to ignore
     @param outfile_path: Path where the final identity results will live
     @param db_connector: Object that handles communication with the DB
-    @param cur_job_name: Current job name from which to get the title for
-        plotting purposes (e.g. 2016-08-16_1400.59-pilot2_2MVHbM)
+    @param legacy_args:  Jobs queued by earlier releases pass uuid,
+                         exp_def_name, ac_result_path, ignored_dyes,
+                         outfile_path, db_connector and cur_job_name
     """
+    if legacy_args:
+        outfile_path, db_connector = legacy_args[1:3]
+
     query = {UUID: uuid}
     def process_callback(future):
         try:
@@ -276,11 +312,6 @@ def make_process_callback(uuid, exp_def_name, ac_result_path, ignored_dyes,
             kde_png_fn         = '%s_kde.%s' % (basename, PNG)
             kde_ind_pdf_fn     = '%s_kde_ind.%s' % (basename, PDF)
 
-            generate_plots(exp_def_name, ac_result_path,
-                           os.path.splitext(outfile_path)[0],
-                           ignored_dyes=ignored_dyes,
-                           data_set_name=cur_job_name)
-
             update = { "$set": {
                                  STATUS: JOB_STATUS.succeeded, # @UndefinedVariable
                                  RESULT: outfile_path,
@@ -299,7 +330,7 @@ def make_process_callback(uuid, exp_def_name, ac_result_path, ignored_dyes,
                                }
                     }
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_GENOTYPER_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_GENOTYPER_COLLECTION, query):
                 db_connector.update(SA_GENOTYPER_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
@@ -319,7 +350,7 @@ def make_process_callback(uuid, exp_def_name, ac_result_path, ignored_dyes,
                                    FINISH_DATESTAMP: datetime.today(),
                                    ERROR: error_msg}}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_GENOTYPER_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_GENOTYPER_COLLECTION, query):
                 db_connector.update(SA_GENOTYPER_COLLECTION, query, update)
             else:
                 silently_remove_file(outfile_path)
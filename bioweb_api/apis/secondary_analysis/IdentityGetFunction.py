@@ -20,13 +20,10 @@ limitations under the License.
 #=============================================================================
 # Imports
 #=============================================================================
-from collections import OrderedDict
-
-from bioweb_api.apis.AbstractGetFunction import AbstractGetFunction
-from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
+from bioweb_api.apis.AbstractGetJobFunction import AbstractGetJobFunction
 from bioweb_api import SA_IDENTITY_COLLECTION
 from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, STATUS, \
-    ID, PICO2_DYE, ASSAY_DYE, JOB_TYPE_NAME, RESULT, CONFIG, \
+    PICO2_DYE, ASSAY_DYE, JOB_TYPE_NAME, RESULT, CONFIG, \
     ERROR, PA_PROCESS_UUID, SUBMIT_DATESTAMP, NUM_PROBES, TRAINING_FACTOR, \
     START_DATESTAMP, PLOT, PLOT_URL, FINISH_DATESTAMP, URL, DYE_LEVELS, \
     IGNORED_DYES, UI_THRESHOLD, PLATE_PLOT_URL, USE_PICO1_FILTER, \
@@ -36,7 +33,7 @@ from bioweb_api.apis.secondary_analysis.IdentityPostFunction import IDENTITY
 #=============================================================================
 # Class
 #=============================================================================
-class IdentityGetFunction(AbstractGetFunction):
+class IdentityGetFunction(AbstractGetJobFunction):
 
     #===========================================================================
     # Overridden Methods
@@ -54,52 +51,43 @@ class IdentityGetFunction(AbstractGetFunction):
         return ""
     
     @classmethod
-    def parameters(cls):
-        parameters = [
-                      ParameterFactory.format(),
-                     ]
-        return parameters
-    
+    def get_collection(cls):
+        return SA_IDENTITY_COLLECTION
+
     @classmethod
-    def process_request(cls, params_dict):
-        columns                     = OrderedDict()
-        columns[ID]                 = 0
-        columns[JOB_NAME]           = 1
-        columns[JOB_TYPE_NAME]      = 1
-        columns[UUID]               = 1
-        columns[PA_PROCESS_UUID]    = 1
-        columns[USE_PICO1_FILTER]   = 1
-        columns[PICO1_DYE]          = 1
-        columns[PICO2_DYE]          = 1
-        columns[ASSAY_DYE]          = 1
-        columns[NUM_PROBES]         = 1
-        columns[TRAINING_FACTOR]    = 1
-        columns[DYE_LEVELS]         = 1
-        columns[IGNORED_DYES]       = 1
-        columns[UI_THRESHOLD]       = 1
-        columns[STATUS]             = 1
-        columns[SUBMIT_DATESTAMP]   = 1
-        columns[START_DATESTAMP]    = 1
-        columns[FINISH_DATESTAMP]   = 1
-        columns[ERROR]              = 1
-        columns[RESULT]             = 1
-        columns[URL]                = 1
-        columns[PLOT]               = 1
-        columns[PLOT_URL]           = 1
-        columns[PLATE_PLOT_URL]     = 1
-        columns[TEMPORAL_PLOT_URL]  = 1
-        columns[CONFIG]             = 1
-        columns[REPORT_URL]         = 1
-        columns[REPORT]             = 1
-        columns[DROP_COUNT_PLOT_URL] = 1
+    def get_columns(cls):
+        columns = [
+                   JOB_NAME,
+                   JOB_TYPE_NAME,
+                   UUID,
+                   PA_PROCESS_UUID,
+                   USE_PICO1_FILTER,
+                   PICO1_DYE,
+                   PICO2_DYE,
+                   ASSAY_DYE,
+                   NUM_PROBES,
+                   TRAINING_FACTOR,
+                   DYE_LEVELS,
+                   IGNORED_DYES,
+                   UI_THRESHOLD,
+                   STATUS,
+                   SUBMIT_DATESTAMP,
+                   START_DATESTAMP,
+                   FINISH_DATESTAMP,
+                   ERROR,
+                   RESULT,
+                   URL,
+                   PLOT,
+                   PLOT_URL,
+                   PLATE_PLOT_URL,
+                   TEMPORAL_PLOT_URL,
+                   CONFIG,
+                   REPORT_URL,
+                   REPORT,
+                   DROP_COUNT_PLOT_URL,
+                  ]
+        return columns
 
-        column_names = columns.keys()  
-        column_names.remove(ID)         
-        
-        data = cls._DB_CONNECTOR.find(SA_IDENTITY_COLLECTION, {}, columns)
-         
-        return (data, column_names, None)
-         
 #===============================================================================
 # Run Main
 #===============================================================================
@@ -33,7 +33,10 @@ from datetime import datetime
 from bioweb_api.utilities.io_utilities import make_clean_response, silently_remove_file, \
     safe_make_dirs, get_results_folder, get_results_url
 from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bioweb_api.utilities.job_utilities import insert_job, job_name_exists, \
+    get_stage_key, get_source_key, reuse_stage_result, JobExistsError
 from bioweb_api.apis.AbstractPostFunction import AbstractPostFunction
+from bioweb_api.execution_engine.ExecutionManager import JobCallback
 from bioweb_api.apis.parameters.ParameterFactory import ParameterFactory
 from bioweb_api import SA_IDENTITY_COLLECTION, PA_PROCESS_COLLECTION, TMP_PATH
 from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, JOB_STATUS, STATUS, \
@@ -47,7 +50,7 @@ from bioweb_api.apis.ApiConstants import UUID, JOB_NAME, JOB_STATUS, STATUS, \
     IGNORE_LOWEST_BARCODE_DESCRIPTION, PICO1_DYE, USE_PICO1_FILTER, DEV_MODE, \
     DEFAULT_DEV_MODE, DRIFT_COMPENSATE, DEFAULT_DRIFT_COMPENSATE, \
     DEFAULT_IGNORE_LOWEST_BARCODE, USE_PICO2_FILTER, API_VERSION, \
-    DROP_COUNT_PLOT_URL
+    DROP_COUNT_PLOT_URL, STAGE_KEY
 from primary_analysis.command import InvalidFileError
 from secondary_analysis.constants import FACTORY_ORGANIC, UNINJECTED_THRESHOLD, \
     UNINJECTED_RATIO, ID_PLOT_SUFFIX, ID_PLATES_PLOT_SUFFIX, ID_TEMPORAL_PLOT_SUFFIX, \
@@ -247,6 +250,8 @@ class IdentityPostFunction(AbstractPostFunction):
         if len(pa_process_jobs) < 1:
             return make_clean_response(json_response, 404)
 
+        pa_process_uuids = set(job[UUID] for job in pa_process_jobs)
+
         # Process each archive
         status_codes  = []
         for i, pa_uuid in enumerate(job_uuids):
@@ -258,8 +263,10 @@ class IdentityPostFunction(AbstractPostFunction):
 
             status_code = 200
 
-            if cur_job_name in cls._DB_CONNECTOR.distinct(SA_IDENTITY_COLLECTION,
-                                                          JOB_NAME):
+            if pa_uuid not in pa_process_uuids:
+                status_code = 404
+                json_response[IDENTITY].append({ERROR: 'Primary analysis job %s not found.' % pa_uuid})
+            elif job_name_exists(SA_IDENTITY_COLLECTION, cur_job_name):
                 status_code = 403
                 json_response[IDENTITY].append({ERROR: 'Job exists.'})
             else:
@@ -279,26 +286,30 @@ class IdentityPostFunction(AbstractPostFunction):
                                                       ui_threshold,
                                                       max_uninj_ratio,
                                                       cls._DB_CONNECTOR,
-                                                      job_name,
+                                                      cur_job_name,
                                                       use_pico_thresh,
                                                       ignore_lowest_barcode,
                                                       dev_mode,
                                                       drift_compensate)
                     response = copy.deepcopy(sai_callable.document)
-                    callback = make_process_callback(sai_callable.uuid,
-                                                     sai_callable.outfile_path,
-                                                     sai_callable.plot_path,
-                                                     sai_callable.report_path,
-                                                     sai_callable.plate_plot_path,
-                                                     sai_callable.temporal_plot_path,
-                                                     sai_callable.drop_count_plot_path,
-                                                     cls._DB_CONNECTOR)
+                    callback = JobCallback(make_process_callback,
+                                           sai_callable.uuid,
+                                           sai_callable.outfile_path,
+                                           sai_callable.plot_path,
+                                           sai_callable.report_path,
+                                           sai_callable.plate_plot_path,
+                                           sai_callable.temporal_plot_path,
+                                           sai_callable.drop_count_plot_path,
+                                           cls._DB_CONNECTOR)
 
                     # Add to queue
                     cls._EXECUTION_MANAGER.add_job(sai_callable.uuid,
                                                    sai_callable,
                                                    callback)
 
+                except JobExistsError:
+                    response = {JOB_NAME: cur_job_name, ERROR: 'Job exists.'}
+                    status_code = 403
                 except:
                     APP_LOGGER.exception(traceback.format_exc())
                     response = {JOB_NAME: cur_job_name, ERROR: str(sys.exc_info()[1])}
@@ -321,6 +332,9 @@ class SaIdentityCallable(object):
     """
     Callable that executes the absorption command.
     """
+    # Jobs queued by earlier releases have no stage key
+    stage_key = None
+
     def __init__(self, primary_analysis_uuid, num_probes, training_factor, assay_dye,
                  use_pico1_filter, use_pico2_filter, pico1_dye, pico2_dye, dye_levels,
                  ignored_dyes, filtered_dyes, ui_threshold, max_uninj_ratio, db_connector,
@@ -357,6 +371,26 @@ class SaIdentityCallable(object):
         self.tmp_path              = os.path.join(TMP_PATH, self.uuid)
         self.tmp_outfile_path      = os.path.join(self.tmp_path, "identity.txt")
         self.tmp_report_path       = os.path.join(self.tmp_path, "report.yaml")
+        self.stage_key             = get_stage_key(IDENTITY,
+                        get_source_key(PA_PROCESS_COLLECTION, primary_analysis_uuid),
+                        {
+                         USE_PICO1_FILTER: use_pico1_filter,
+                         USE_PICO2_FILTER: use_pico2_filter,
+                         PICO1_DYE: pico1_dye,
+                         PICO2_DYE: pico2_dye,
+                         ASSAY_DYE: assay_dye,
+                         NUM_PROBES: num_probes,
+                         TRAINING_FACTOR: training_factor,
+                         DYE_LEVELS: self.dye_levels,
+                         IGNORED_DYES: ignored_dyes,
+                         FILTERED_DYES: filtered_dyes,
+                         UI_THRESHOLD: ui_threshold,
+                         MAX_UNINJECTED_RATIO: max_uninj_ratio,
+                         CONTINUOUS_PHASE: use_pico_thresh,
+                         IGNORE_LOWEST_BARCODE: ignore_lowest_barcode,
+                         DEV_MODE: dev_mode,
+                         DRIFT_COMPENSATE: drift_compensate,
+                        })
         self.document              = {
                         USE_PICO1_FILTER: use_pico1_filter,
                         USE_PICO2_FILTER: use_pico2_filter,
@@ -380,12 +414,10 @@ class SaIdentityCallable(object):
                         IGNORE_LOWEST_BARCODE: ignore_lowest_barcode,
                         DEV_MODE: dev_mode,
                         DRIFT_COMPENSATE: drift_compensate,
+                        STAGE_KEY: self.stage_key,
                         API_VERSION: VERSION,
                        }
-        if job_name in self.db_connector.distinct(SA_IDENTITY_COLLECTION, JOB_NAME):
-            raise Exception('Job name %s already exists in identity collection' % job_name)
-
-        self.db_connector.insert(SA_IDENTITY_COLLECTION, [self.document])
+        insert_job(SA_IDENTITY_COLLECTION, self.document)
 
 
     def __call__(self):
@@ -411,6 +443,16 @@ class SaIdentityCallable(object):
                            START_DATESTAMP: datetime.today()}}
         self.db_connector.update(SA_IDENTITY_COLLECTION, {UUID: self.uuid}, update)
 
+        # reuse the result of an identical job if there is one
+        if reuse_stage_result(SA_IDENTITY_COLLECTION, self.stage_key,
+                              self.uuid, [self.outfile_path,
+                                          self.report_path,
+                                          self.plot_path,
+                                          self.plate_plot_path,
+                                          self.temporal_plot_path,
+                                          self.drop_count_plot_path]):
+            return check_report_for_errors(self.report_path)
+
         try:
             # for full analysis the user may want to turn off picoinjection filtering
             # even if there is a pico1 dye.  If use_pico1_filter is False, set pico1_dye to None
@@ -442,7 +484,9 @@ class SaIdentityCallable(object):
             if not os.path.isfile(self.tmp_outfile_path):
                 raise Exception("Secondary analysis identity job failed: identity output file not generated.")
             else:
-                shutil.copy(self.tmp_outfile_path, self.outfile_path)
+                # the temporary directory is removed below, so move the
+                # results rather than copying them
+                shutil.move(self.tmp_outfile_path, self.outfile_path)
             tmp_plot_path = plate_base_path + ID_PLOT_SUFFIX
             tmp_plate_plot_path = plate_base_path + ID_PLATES_PLOT_SUFFIX
             tmp_temporal_plot_path = plate_base_path + ID_TEMPORAL_PLOT_SUFFIX
@@ -461,6 +505,8 @@ class SaIdentityCallable(object):
             # Regardless of success or failure, remove the copied archive directory
             shutil.rmtree(self.tmp_path, ignore_errors=True)
 
+        return check_report_for_errors(self.report_path)
+
 
 def make_process_callback(uuid, outfile_path, plot_path, report_path,
                           plate_plot_path, temporal_plot_path,
@@ -468,7 +514,7 @@ def make_process_callback(uuid, outfile_path, plot_path, report_path,
     """
     Return a closure that is fired when the job finishes. This
     callback updates the DB with completion status, result file location, and
-    an error message if applicable.
+    an error message if applicable. The job returns the errors in its report.
 
     @param uuid:         Unique job id in database
     @param outfile_path: Path where the final identity results will live.
@@ -482,8 +528,7 @@ def make_process_callback(uuid, outfile_path, plot_path, report_path,
     query = {UUID: uuid}
     def process_callback(future):
         try:
-            _ = future.result()
-            report_errors = check_report_for_errors(report_path)
+            report_errors = future.result()
             update_data = { STATUS: JOB_STATUS.succeeded,
                             RESULT: outfile_path,
                             URL: get_results_url(outfile_path),
@@ -500,7 +545,7 @@ def make_process_callback(uuid, outfile_path, plot_path, report_path,
 
             update = {"$set": update_data}
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_IDENTITY_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_IDENTITY_COLLECTION, query):
                 db_connector.update(SA_IDENTITY_COLLECTION, query, update)
             else:
                 silently_remove_file(report_path)
@@ -517,7 +562,7 @@ def make_process_callback(uuid, outfile_path, plot_path, report_path,
             if os.path.isfile(report_path):
                 update['$set'][REPORT_URL]
             # If job has been deleted, then delete result and don't update DB.
-            if len(db_connector.find(SA_IDENTITY_COLLECTION, query, {})) > 0:
+            if db_connector.exists(SA_IDENTITY_COLLECTION, query):
                 db_connector.update(SA_IDENTITY_COLLECTION, query, update)
             else:
                 silently_remove_file(report_path)
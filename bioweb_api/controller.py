@@ -38,6 +38,10 @@ from collections import defaultdict
 API_MANAGER = ApiManager()
 ORIGIN      = '*'
 
+# Key of the WSGI environ entry holding files the server streamed to disk,
+# which replace request.files
+STREAMED_FILES = 'bioweb_api.streamed_files'
+
 #===============================================================================
 # APIs
 #===============================================================================
@@ -90,7 +94,10 @@ def function(version, name, path):
             for k in request.args.keys():
                 for arg in request.args.getlist(k):
                     query_params[k.lower()].extend(arg.split(","))
-            for k,v in request.files.iteritems():
+            files = request.environ.get(STREAMED_FILES)
+            if files is None:
+                files = request.files
+            for k,v in files.iteritems():
                 if isinstance(v,(list,tuple)):
                     query_params[k.lower()].extend(v)
                 else:
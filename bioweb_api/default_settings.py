@@ -37,8 +37,10 @@ PLATES_UPLOAD_PATH      = os.path.join(HOME_DIR, "uploads", str(PORT), "plates")
 RESULTS_PATH            = os.path.join(HOME_DIR, "results", str(PORT))
 REFS_PATH               = os.path.join(HOME_DIR, "refs")
 TMP_PATH                = os.path.join(HOME_DIR, "tmp")
+EXP_DEF_CACHE_PATH      = os.path.join(HOME_DIR, "exp_defs")
 TORNADO_LOG_FILE_PREFIX = os.path.join(HOME_DIR, "logs/tornado_%s.log" % str(PORT))
 MAX_WORKERS             = 6
+WSGI_THREADS            = 16                # Threads serving API requests, 0 to serve them on the IOLoop thread
 DAYS_TO_EXPIRE          = 30
 
 #===============================================================================
@@ -50,9 +52,43 @@ MODIFIED_ARCHIVES_PATH  = "/mnt/runs/run_analysis/modifiedH5"
 DATABASE_PORT           = 27017             # the Mongo port is well-known and pretty much constant
 MAX_BUFFER_SIZE         = 2*1024*1024*1024  # Max file upload size: 2GB
 MAX_DATASET_SIZE        = 15000000          # Collections over 15 million drops aren't allowed
+ENUM_CACHE_TTL          = 60                # Seconds before cached parameter enums are reloaded
+ENUM_MISS_REFRESH_INTERVAL = 5              # Min seconds between reloads of a cached parameter enum caused by unrecognized values
+DYE_PROFILE_CACHE_TTL   = 600               # Seconds before cached dye profiles are reloaded
+EXP_DEF_NAMES_TTL       = 600               # Seconds before cached experiment definition names are reloaded
+MAX_PAGE_SIZE           = 1000              # Max records returned per page by paginated GETs
+COPY_ARCHIVES           = False             # Copy archives to TMP_PATH for processing instead of linking their images
+INDEX_REFRESH_INTERVAL  = 600               # Seconds between background refreshes of the archive, HDF5, run report and experiment definition indexes
+INDEX_WORKERS           = 4                 # Max processes used to read new HDF5 files while indexing
+REPLAY_GZIP_LEVEL       = 1                 # Gzip level of replay image stacks, their images are already compressed
+REPLAY_GZIP_THREADS     = 0                 # Threads used to gzip replay image stacks with pigz, 0 to gzip in the job process
+LIBRARY_DESIGN_WORKERS  = 4                 # Max processes used to evaluate candidate library designs
+LIBRARY_DESIGN_TIME_BUDGET = 60             # Default seconds spent searching for library designs
+LIBRARY_DESIGN_CACHE_SIZE  = 1024           # Max evaluated library designs cached across requests
+DROP_SIZE_WORKERS       = 4                 # Max processes used to check simulated drop clusters for collisions
+DROP_SIZE_TIMEOUT       = 300               # Max seconds spent checking simulated drop clusters for collisions
+REPORT_WORKERS          = 3                 # Max processes used to render the sections of a unified PDF report
+REPORT_SECTION_TIMEOUT  = 300               # Max seconds spent waiting for a section of a unified PDF report
 
 ALTERNATE_ARCHIVES_PATHS = ["/mnt/old-data"]
 
+# Max concurrent requests to slow endpoints, by regex matched against the
+# request method and path, e.g. "POST /api/v1/Image/Images", so they can't
+# occupy every WSGI thread
+ENDPOINT_CONCURRENCY_LIMITS = {
+                               r"^GET /api/v\d+/SNPSearch/":          2,
+                               r"^GET /api/v\d+/MeltingTemperature/": 2,
+                               r"^POST /api/v\d+/DropTools/":         2,
+                               r"^POST /api/v\d+/Image/":             2,
+                              }
+
+# Paths of uploads that are streamed to disk as they are received rather than
+# buffered in memory (up to MAX_BUFFER_SIZE)
+STREAMED_UPLOAD_PATHS = [
+                         r"/api/v\d+/Image/Images",
+                         r"/api/v\d+/Image/MonitorImages",
+                        ]
+
 # MongoDb Collections
 TARGETS_COLLECTION           = "targets"
 PROBES_COLLECTION            = "probes"
@@ -76,3 +112,6 @@ IMAGES_COLLECTION            = "images_collection"
 RUN_REPORT_COLLECTION        = "run_reports"
 EXP_DEF_COLLECTION           = "exp_def"
 SA_EXPLORATORY_COLLECTION    = "sa_exploratory"
+JOB_QUEUE_COLLECTION         = "job_queue"
+INDEX_STATUS_COLLECTION      = "index_status"
+FOLDER_STAMPS_COLLECTION     = "folder_stamps"
@@ -20,18 +20,86 @@ limitations under the License.
 #===============================================================================
 # Imports
 #===============================================================================
-from bioweb_api import MAX_WORKERS
-from concurrent.futures import ProcessPoolExecutor
+from bioweb_api import MAX_WORKERS, JOB_QUEUE_COLLECTION
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.ApiConstants import ID, UUID, STATUS, SUBMIT_DATESTAMP, \
+    RUNNING, SUBMITTED
+from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+from bson.binary import Binary
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from flask import has_request_context, request
+from functools import partial
+import cPickle
+import itertools
 import multiprocessing
 import threading
 import time
 
+#===============================================================================
+# Public Static Variables
+#===============================================================================
+# Job priorities, lower values run first
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY       = 1
+
+#===============================================================================
+# Private Static Variables
+#===============================================================================
+# Fields of the job queue collection
+_PRIORITY = "priority"
+_OWNER    = "owner"
+_PAYLOAD  = "payload"
+_VERSION  = "version"
+
 #===============================================================================
 # Class
 #===============================================================================
+class JobCallback(object):
+    """
+    Picklable job callback that builds the callback by calling
+    factory(*args, **kwargs) when the job finishes. Factory must be a module
+    level function, e.g. a make_process_callback function. Jobs submitted with
+    a JobCallback (or no callback) are persisted in the job queue and resumed
+    after a restart.
+    """
+    def __init__(self, factory, *args, **kwargs):
+        self.factory = factory
+        self.args    = args
+        self.kwargs  = kwargs
+
+    def __call__(self, future):
+        return self.factory(*self.args, **self.kwargs)(future)
+
+class _Job(object):
+    """
+    A submitted job. Future is the future returned to callers, it is
+    completed when the job finishes running in the process pool.
+    """
+    def __init__(self, uuid, fn, callback, priority, owner, sequence, durable):
+        self.uuid     = uuid
+        self.fn       = fn
+        self.priority = priority
+        self.owner    = owner
+        self.sequence = sequence
+        self.durable  = durable
+        self.future   = Future()
+        if callback:
+            self.future.add_done_callback(callback)
+
 class ExecutionManager(object):
     """
     This class is intended to be a singleton.
+
+    Jobs are queued and dispatched to a persistent process pool, at most
+    max_workers at a time. Queued jobs run in order of priority; among jobs of
+    the same priority, jobs of the owner with the fewest running jobs run
+    first, then jobs are run in the order they were submitted. Jobs with a
+    picklable callable and callback are also recorded in the job queue
+    collection until they finish, so they can be resumed after a restart.
+    Each is recorded with the API version that queued it, and jobs queued by
+    an incompatible version aren't resumed.
     """
     _INSTANCE  = None
     # List of futures for submitted jobs.
@@ -49,7 +117,12 @@ class ExecutionManager(object):
             self._max_workers = multiprocessing.cpu_count()
         else:
             self._max_workers = max_workers
-        self._pool = None
+        self._pool         = None
+        self._lock         = threading.RLock()
+        self._pending      = []
+        self._running      = defaultdict(int)
+        self._sequence     = itertools.count()
+        self._db_connector = DbConnector.Instance()
 
         # start loop that monitors queue in a thread
         t = threading.Thread(target=self._monitor_queue)
@@ -57,7 +130,8 @@ class ExecutionManager(object):
         t.start()
 
     def __del__(self):
-        self._pool.shutdown()
+        if self._pool is not None:
+            self._pool.shutdown()
 
     @classmethod
     def Instance(cls):
@@ -68,17 +142,164 @@ class ExecutionManager(object):
     #===========================================================================
     # Simple execution functions
     #===========================================================================
-    def add_job(self, uuid, fn, callback=None):
+    def add_job(self, uuid, fn, callback=None, priority=INTERACTIVE_PRIORITY,
+                owner=None):
         """
         Submit new job to job queue.
+
+        @param uuid:        Unique job id.
+        @param fn:          Callable that runs the job.
+        @param callback:    Called with the job's future when it finishes.
+        @param priority:    INTERACTIVE_PRIORITY or BATCH_PRIORITY.
+        @param owner:       Owner of the job, used to share workers fairly
+                            between owners. Defaults to the address of the
+                            client making the current request, see
+                            _request_owner.
         """
-        if self._pool is None:
-            self._pool = ProcessPoolExecutor(max_workers=self._max_workers)
+        if owner is None and has_request_context():
+            owner = self._request_owner()
 
-        future = self._pool.submit(fn)
-        self._JOB_QUEUE[uuid] = future
-        if callback:
-            future.add_done_callback(callback)
+        try:
+            payload = Binary(cPickle.dumps((fn, callback),
+                                           cPickle.HIGHEST_PROTOCOL))
+        except Exception:
+            APP_LOGGER.debug("Job %s can't be pickled, it won't be resumed " \
+                             "after a restart." % uuid)
+            payload = None
+
+        if payload is not None:
+            self._db_connector.insert(JOB_QUEUE_COLLECTION,
+                                      [{UUID: uuid,
+                                        _PRIORITY: priority,
+                                        _OWNER: owner,
+                                        STATUS: SUBMITTED,
+                                        SUBMIT_DATESTAMP: datetime.today(),
+                                        _VERSION: VERSION,
+                                        _PAYLOAD: payload}])
+
+        self._queue_job(uuid, fn, callback, priority, owner,
+                        durable=payload is not None)
+
+    def resume_jobs(self):
+        """
+        Queue the jobs recorded in the job queue collection by a previous
+        instance that didn't finish. Jobs that were running are rerun from the
+        beginning. Jobs queued by an incompatible API version, or whose
+        payload can't be loaded, are removed from the job queue instead, so
+        they are deleted like any other unfinished job.
+
+        @return: List of uuids of resumed jobs.
+        """
+        resumed = list()
+        records = self._db_connector.find(JOB_QUEUE_COLLECTION, {},
+                                          sort=[(SUBMIT_DATESTAMP, 1)])
+        for record in records:
+            version = record.get(_VERSION)
+            if not self._compatible(version):
+                APP_LOGGER.error("Unable to resume job %s queued by " \
+                                 "incompatible API version %s." %
+                                 (record[UUID], version))
+                self._db_connector.remove(JOB_QUEUE_COLLECTION,
+                                          {ID: record[ID]})
+                continue
+
+            try:
+                fn, callback = cPickle.loads(str(record[_PAYLOAD]))
+            except Exception:
+                APP_LOGGER.exception("Unable to resume job %s." % record[UUID])
+                self._db_connector.remove(JOB_QUEUE_COLLECTION,
+                                          {ID: record[ID]})
+                continue
+
+            self._db_connector.update(JOB_QUEUE_COLLECTION, {ID: record[ID]},
+                                      {"$set": {STATUS: SUBMITTED}})
+            self._queue_job(record[UUID], fn, callback, record[_PRIORITY],
+                            record[_OWNER], durable=True)
+            resumed.append(record[UUID])
+
+        if resumed:
+            APP_LOGGER.info("Resumed jobs: %s" % ", ".join(resumed))
+        return resumed
+
+    @staticmethod
+    def _compatible(version):
+        """
+        Jobs queued by an API version with the same major version can be
+        resumed, releases with a different major version may have removed or
+        changed the callables they pickled. Jobs queued before versions were
+        recorded have none, and are resumed if their payload can be loaded.
+        """
+        if version is None:
+            return True
+        return version.split(".")[0] == VERSION.split(".")[0]
+
+    @staticmethod
+    def _request_owner():
+        """
+        Return the owner of jobs submitted by the current request: the
+        address of the client that made it. Requests forwarded by a proxy are
+        owned by the original client, from X-Forwarded-For, rather than by
+        the proxy.
+        """
+        if request.access_route:
+            return request.access_route[0]
+        return request.remote_addr
+
+    def _queue_job(self, uuid, fn, callback, priority, owner, durable):
+        with self._lock:
+            job = _Job(uuid, fn, callback, priority, owner,
+                       next(self._sequence), durable)
+            self._JOB_QUEUE[uuid] = job.future
+            self._pending.append(job)
+            self._dispatch()
+
+    def _dispatch(self):
+        """
+        Submit queued jobs to the process pool while there are idle workers.
+        """
+        with self._lock:
+            while self._pending and \
+                  sum(self._running.itervalues()) < self._max_workers:
+                job = min(self._pending, key=lambda j: (j.priority,
+                                                        self._running[j.owner],
+                                                        j.sequence))
+                self._pending.remove(job)
+                # Skip jobs cancelled while queued
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self._max_workers)
+
+                self._running[job.owner] += 1
+                if job.durable:
+                    self._db_connector.update(JOB_QUEUE_COLLECTION,
+                                              {UUID: job.uuid},
+                                              {"$set": {STATUS: RUNNING}})
+                pool_future = self._pool.submit(job.fn)
+                pool_future.add_done_callback(partial(self._job_done, job))
+
+    def _job_done(self, job, pool_future):
+        """
+        Dispatch the next queued job to the freed worker, then complete the
+        job's future, which fires its callback.
+        """
+        with self._lock:
+            self._running[job.owner] -= 1
+            if self._running[job.owner] <= 0:
+                del self._running[job.owner]
+            self._dispatch()
+
+        try:
+            job.future.set_result(pool_future.result())
+        except Exception, e:
+            job.future.set_exception(e)
+        finally:
+            # The callback has recorded the outcome, so the job needn't be
+            # resumed.
+            if job.durable:
+                self._db_connector.remove(JOB_QUEUE_COLLECTION,
+                                          {UUID: job.uuid})
 
     def _monitor_queue(self):
         while True:
@@ -87,9 +308,6 @@ class ExecutionManager(object):
             for future_uuid in future_uuids:
                 if self.done(future_uuid):
                     self.del_uuid(future_uuid)
-            if len(self._JOB_QUEUE) <= 0 and self._pool is not None:
-                self._pool.shutdown()
-                self._pool = None
 
     def del_uuid(self, uuid):
         del self._JOB_QUEUE[uuid]
@@ -117,12 +335,15 @@ class ExecutionManager(object):
 
     def cancel(self, uuid):
         """
-        Cancel job.
+        Cancel job. Only jobs that are still queued can be cancelled.
         """
-        if self.done(uuid) or self.running(uuid):
+        if uuid not in self._JOB_QUEUE or self.done(uuid) or \
+           self.running(uuid):
             return False
-        else:
-            return self._get_future(uuid).cancel()
+        elif self._get_future(uuid).cancel():
+            self._db_connector.remove(JOB_QUEUE_COLLECTION, {UUID: uuid})
+            return True
+        return False
 
     def _get_future(self, uuid):
         return self._JOB_QUEUE[uuid]
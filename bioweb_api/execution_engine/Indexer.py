@@ -0,0 +1,203 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#===============================================================================
+# Imports
+#===============================================================================
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+
+from bioweb_api import INDEX_STATUS_COLLECTION, INDEX_REFRESH_INTERVAL
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.ApiConstants import NAME
+from bioweb_api.apis.exp_def.ExpDefUtils import update_experiment_definitions
+from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import \
+    update_archives, update_hdf5s
+from bioweb_api.apis.run_info.RunInfoUtils import update_run_reports
+from bioweb_api.utilities.io_utilities import TIME_FORMAT
+from bioweb_api.utilities.logging_utilities import APP_LOGGER
+
+#===============================================================================
+# Public Static Variables
+#===============================================================================
+ARCHIVES_INDEX    = "archives"
+HDF5S_INDEX       = "hdf5s"
+RUN_REPORTS_INDEX = "run_reports"
+EXP_DEFS_INDEX    = "exp_defs"
+
+# Response header holding the freshness of the index a GET reads from
+FRESHNESS_HEADER  = "X-Index-Freshness"
+
+#===============================================================================
+# Private Static Variables
+#===============================================================================
+_LAST_INDEXED = "last_indexed"
+
+#===============================================================================
+# Class
+#===============================================================================
+class Indexer(object):
+    """
+    This class is intended to be a singleton.
+
+    Keeps the archive, HDF5, run report and experiment definition collections
+    up to date from a background thread, so requests never wait on scanning
+    the file system. Refreshes are queued with refresh() and run one at a
+    time; identical queued refreshes are only run once. Every index is also
+    refreshed when no refresh has been queued for interval seconds. The time
+    each index was last fully refreshed is recorded in the index status
+    collection.
+    """
+    _INSTANCE = None
+
+    #===========================================================================
+    # Constructor
+    #===========================================================================
+    def __init__(self, interval=INDEX_REFRESH_INTERVAL):
+        # Enforce that it's a singleton
+        if self._INSTANCE:
+            raise Exception("%s is a singleton and should be accessed through the Instance method." % self.__class__.__name__)
+
+        self._interval     = interval
+        self._updaters     = OrderedDict([
+                                          (ARCHIVES_INDEX, update_archives),
+                                          (HDF5S_INDEX, update_hdf5s),
+                                          (RUN_REPORTS_INDEX, update_run_reports),
+                                          (EXP_DEFS_INDEX, update_experiment_definitions),
+                                         ])
+        self._pending      = OrderedDict()
+        self._busy         = False
+        self._condition    = threading.Condition()
+        self._thread       = None
+        self._db_connector = DbConnector.Instance()
+
+    @classmethod
+    def Instance(cls):
+        if not cls._INSTANCE:
+            cls._INSTANCE = Indexer()
+        return cls._INSTANCE
+
+    #===========================================================================
+    # Public methods
+    #===========================================================================
+    def refresh(self, name=None, *args):
+        """
+        Queue a refresh of an index and return immediately. The indexer
+        thread is started on the first call.
+
+        @param name:    Name of the index, or None to refresh every index.
+        @param args:    Hashable arguments passed to the index's update
+                        function, e.g. the date folders of run reports.
+        """
+        names = self._updaters.keys() if name is None else [name]
+        for n in names:
+            if n not in self._updaters:
+                raise Exception("Unknown index: %s" % n)
+
+        with self._condition:
+            for n in names:
+                self._pending[(n, args)] = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        Block until every queued refresh has finished.
+
+        @param timeout: Maximum number of seconds to wait, None to wait
+                        indefinitely.
+
+        @return True if the queued refreshes finished, False on timeout.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+        return True
+
+    def freshness(self, name):
+        """
+        Return the time the last full refresh of an index started, or None if
+        it has never been refreshed. Files added before this time are indexed.
+        """
+        record = self._db_connector.find_one(INDEX_STATUS_COLLECTION, NAME,
+                                             name)
+        if record is None:
+            return None
+        return record.get(_LAST_INDEXED)
+
+    def freshness_headers(self, name):
+        """
+        Return response headers holding the freshness of an index, for GETs
+        that read from it.
+        """
+        freshness = self.freshness(name)
+        if freshness is None:
+            return {}
+        return {FRESHNESS_HEADER: freshness.strftime(TIME_FORMAT)}
+
+    #===========================================================================
+    # Private methods
+    #===========================================================================
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._condition.wait(self._interval)
+                if not self._pending:
+                    for name in self._updaters:
+                        self._pending[(name, ())] = None
+                (name, args), _ = self._pending.popitem(last=False)
+                self._busy = True
+
+            try:
+                self._update(name, args)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _update(self, name, args):
+        started = datetime.today()
+        try:
+            updated = self._updaters[name](*args)
+        except:
+            APP_LOGGER.exception("Failure refreshing %s index." % name)
+            return
+
+        # Partial refreshes (e.g. of a date range) don't make an index fresh
+        if updated is not False and not args:
+            self._db_connector.update(INDEX_STATUS_COLLECTION, {NAME: name},
+                                      {"$set": {_LAST_INDEXED: started}},
+                                      upsert=True)
+
+#===========================================================================
+# Ensure the initial instance is created.
+#===========================================================================
+Indexer.Instance()
@@ -25,30 +25,49 @@ limitations under the License.
 #===============================================================================
 import sys
 import os
+import copy
 import getpass
 import platform
+import re
 import time
 import signal
 import csv
 import shutil
+import tornado
 import tornado.options
 
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from tornado import escape, gen, httputil, iostream
+from tornado.concurrent import chain_future
 from tornado.wsgi import WSGIContainer
 from tornado.ioloop import IOLoop
-from tornado.web import FallbackHandler, Application, RequestHandler
+from tornado.locks import Semaphore
+from tornado.web import FallbackHandler, Application, RequestHandler, \
+    stream_request_body
 from . import app, PORT, HOME_DIR, TORNADO_LOG_FILE_PREFIX, \
     TARGETS_UPLOAD_PATH, PROBES_UPLOAD_PATH, RESULTS_PATH, REFS_PATH, \
     PLATES_UPLOAD_PATH, TMP_PATH, MAX_BUFFER_SIZE, PA_PROCESS_COLLECTION, \
     SA_IDENTITY_COLLECTION, SA_ASSAY_CALLER_COLLECTION, SA_GENOTYPER_COLLECTION, \
-    SA_EXPLORATORY_COLLECTION, FA_PROCESS_COLLECTION
+    SA_EXPLORATORY_COLLECTION, FA_PROCESS_COLLECTION, \
+    IMAGES_COLLECTION, \
+    WSGI_THREADS, ENDPOINT_CONCURRENCY_LIMITS, STREAMED_UPLOAD_PATHS
+from bioweb_api.controller import STREAMED_FILES
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.execution_engine.ExecutionManager import ExecutionManager
+from bioweb_api.execution_engine.Indexer import Indexer
 from bioweb_api.utilities import io_utilities
 from bioweb_api.utilities.logging_utilities import GENERAL_LOGGER
-from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import update_archives
+from bioweb_api.utilities.job_utilities import ensure_job_indexes
+from bioweb_api.utilities.upload_utilities import MultipartUploadParser
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import update_devices
 from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import update_dyes
+from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import ensure_primary_analysis_indexes
+from bioweb_api.apis.primary_analysis.PrimaryAnalysisUtils import shutdown_hdf5_readers
+from bioweb_api.apis.run_info.RunInfoUtils import ensure_run_report_indexes
+from bioweb_api.apis.full_analysis.FullAnalysisPostFunction import ensure_param_keys
 
 #===============================================================================
 # Class private variables
@@ -79,6 +98,324 @@ class MainHandler(RequestHandler):
     def get(self):
         self.write("This message comes from Tornado ^_^")
 
+class ThreadedWSGIContainer(WSGIContainer):
+    '''
+    WSGIContainer that runs the WSGI application in a bounded thread pool
+    rather than on the IOLoop thread, so a slow request doesn't hold up every
+    other request. Responses are written as the application yields them,
+    rather than once the whole body is built. Requests matching a pattern in
+    limits are also limited to that many at a time, so slow endpoints can't
+    occupy every thread. Patterns are matched against the method and path of
+    the request, e.g. "POST /api/v1/Image/Images". Requests waiting on a
+    limit don't hold a thread.
+    '''
+    def __init__(self, wsgi_application, max_workers, limits=None):
+        super(ThreadedWSGIContainer, self).__init__(wsgi_application)
+        self.executor  = ThreadPoolExecutor(max_workers=max_workers)
+        self._limits   = [(re.compile(pattern, re.IGNORECASE), Semaphore(limit))
+                          for pattern, limit in (limits or {}).iteritems()]
+
+    def __call__(self, request):
+        IOLoop.current().add_future(self._handle(request), lambda f: f.result())
+
+    @gen.coroutine
+    def run(self, method, path, fn, *args):
+        '''
+        Call fn(*args) in the thread pool, subject to the limits matching
+        method and path, and return its result.
+        '''
+        endpoint   = "%s %s" % (method.upper(), path)
+        semaphores = [semaphore for pattern, semaphore in self._limits
+                      if pattern.search(endpoint)]
+        for semaphore in semaphores:
+            yield semaphore.acquire()
+        try:
+            result = yield self.executor.submit(fn, *args)
+        finally:
+            for semaphore in semaphores:
+                semaphore.release()
+        raise gen.Return(result)
+
+    @gen.coroutine
+    def _handle(self, request):
+        try:
+            yield self.run(request.method, request.path,
+                           self._run_application, request, IOLoop.current())
+        except Exception:
+            GENERAL_LOGGER.exception("Error processing request: %s" %
+                                     request.uri)
+            self._write_response(request, "500 Internal Server Error", [], "")
+
+    def _run_application(self, request, io_loop):
+        '''
+        Run the WSGI application and write its response one chunk at a time,
+        as the application yields it, so the body is never held in memory.
+        This is called in a worker thread, which waits for each chunk to be
+        written on the IOLoop thread before reading the next. Errors raised
+        before the response is started are raised, so a 500 is written in
+        its place. Errors raised after are logged and the connection is
+        closed, so the client can tell the response is incomplete.
+        '''
+        data     = {}
+        response = []
+
+        def start_response(status, response_headers, exc_info=None):
+            data["status"]  = status
+            data["headers"] = response_headers
+            return response.append
+
+        app_response = self.wsgi_application(WSGIContainer.environ(request),
+                                             start_response)
+        try:
+            chunks = iter(app_response)
+            response.append(next(chunks, ""))
+            if not data:
+                raise Exception("WSGI app did not call start_response")
+            self._on_ioloop(io_loop, self._write_headers, request,
+                            data["status"], data["headers"],
+                            "".join(response))
+            del response[:]
+            try:
+                for chunk in chunks:
+                    response.append(chunk)
+                    body = "".join(response)
+                    del response[:]
+                    if body:
+                        self._on_ioloop(io_loop, self._write_chunk, request,
+                                        body)
+                self._on_ioloop(io_loop, self._finish, request,
+                                data["status"])
+            except iostream.StreamClosedError:
+                # The client closed the connection
+                pass
+            except Exception:
+                GENERAL_LOGGER.exception("Error streaming response: %s" %
+                                         request.uri)
+                io_loop.add_callback(self._abort, request)
+        finally:
+            if hasattr(app_response, "close"):
+                app_response.close()
+
+    @staticmethod
+    def _on_ioloop(io_loop, fn, *args):
+        '''
+        Call fn(*args), which returns a Future, on the IOLoop thread and wait
+        for it to resolve. Return its result. This is called in a worker
+        thread.
+        '''
+        future = Future()
+
+        def callback():
+            try:
+                chain_future(fn(*args), future)
+            except Exception as e:
+                future.set_exception(e)
+
+        io_loop.add_callback(callback)
+        return future.result()
+
+    def _write_headers(self, request, status, headers, chunk):
+        '''
+        Write the start line and headers of a response, and its first chunk.
+        Unless the application set a Content-Length, the body is sent with
+        chunked transfer encoding. Return a Future resolved once written.
+        '''
+        status_code, reason = status.split(" ", 1)
+        header_set = set(k.lower() for (k, _) in headers)
+        if int(status_code) != 304 and "content-type" not in header_set:
+            headers.append(("Content-Type", "text/html; charset=UTF-8"))
+        if "server" not in header_set:
+            headers.append(("Server", "TornadoServer/%s" % tornado.version))
+
+        start_line = httputil.ResponseStartLine("HTTP/1.1", int(status_code),
+                                                reason)
+        header_obj = httputil.HTTPHeaders()
+        for key, value in headers:
+            header_obj.add(key, value)
+        return request.connection.write_headers(start_line, header_obj,
+                                                chunk=escape.utf8(chunk))
+
+    @staticmethod
+    def _write_chunk(request, chunk):
+        '''
+        Write a chunk of a response body. Return a Future resolved once
+        written.
+        '''
+        return request.connection.write(escape.utf8(chunk))
+
+    @gen.coroutine
+    def _finish(self, request, status):
+        request.connection.finish()
+        self._log(int(status.split(" ", 1)[0]), request)
+
+    @staticmethod
+    def _abort(request):
+        '''
+        Close the connection of a response that failed after it started.
+        '''
+        request.connection.detach().close()
+
+    def _write_response(self, request, status, headers, body):
+        '''
+        Write a whole response, as WSGIContainer does. This is called on the
+        IOLoop thread.
+        '''
+        status_code, reason = status.split(" ", 1)
+        status_code = int(status_code)
+        header_set  = set(k.lower() for (k, _) in headers)
+        body        = escape.utf8(body)
+        if status_code != 304:
+            if "content-length" not in header_set:
+                headers.append(("Content-Length", str(len(body))))
+            if "content-type" not in header_set:
+                headers.append(("Content-Type", "text/html; charset=UTF-8"))
+        if "server" not in header_set:
+            headers.append(("Server", "TornadoServer/%s" % tornado.version))
+
+        start_line = httputil.ResponseStartLine("HTTP/1.1", status_code, reason)
+        header_obj = httputil.HTTPHeaders()
+        for key, value in headers:
+            header_obj.add(key, value)
+        request.connection.write_headers(start_line, header_obj, chunk=body)
+        request.connection.finish()
+        self._log(status_code, request)
+
+@stream_request_body
+class StreamedUploadHandler(RequestHandler):
+    '''
+    Handler for paths whose multipart POSTs are streamed to disk as they are
+    received, rather than buffered in memory. The uploaded files are then
+    passed to the Flask app in place of request.files. Other requests are
+    buffered and passed to the fallback WSGI container, as FallbackHandler
+    does.
+    '''
+    def initialize(self, fallback):
+        self._fallback = fallback
+        self._parser   = None
+        self._chunks   = []
+
+    def prepare(self):
+        content_type = self.request.headers.get("Content-Type", "")
+        if self.request.method == "POST" and \
+           content_type.startswith("multipart/form-data"):
+            self._parser = MultipartUploadParser(content_type)
+
+    @gen.coroutine
+    def data_received(self, chunk):
+        if self._parser is None:
+            self._chunks.append(chunk)
+            return
+
+        # Uploads are written and hashed in a worker thread, so large
+        # uploads don't hold up the IOLoop. The next chunk isn't read until
+        # this one is written.
+        try:
+            yield self._submit(self._parser.data_received, chunk)
+        except Exception:
+            GENERAL_LOGGER.exception("Error parsing upload: %s" %
+                                     self.request.uri)
+            self._parser.abort()
+
+    def on_connection_close(self):
+        # Fails the pending request body so the handler doesn't wait for it
+        super(StreamedUploadHandler, self).on_connection_close()
+
+        # Remove partial uploads, complete ones are removed by post()
+        if self._parser is not None and not self._parser.complete:
+            self._parser.abort()
+
+    @gen.coroutine
+    def post(self):
+        if self._parser is None:
+            self._forward()
+            return
+
+        parser, self._parser = self._parser, None
+        if not parser.complete:
+            parser.abort()
+            self.send_error(400)
+            return
+
+        try:
+            if isinstance(self._fallback, ThreadedWSGIContainer):
+                response = yield self._fallback.run(self.request.method,
+                                                    self.request.path,
+                                                    self._process, parser)
+            else:
+                response = self._process(parser)
+        except Exception:
+            GENERAL_LOGGER.exception("Error processing upload: %s" %
+                                     self.request.uri)
+            self.send_error(500)
+            return
+        finally:
+            # Remove uploads that weren't saved
+            parser.abort()
+
+        status, headers, body = response
+        status_code, reason   = status.split(" ", 1)
+        self.set_status(int(status_code), reason)
+        self.clear_header("Content-Type")
+        for name, value in headers:
+            if name.lower() != "content-length":
+                self.add_header(name, value)
+        self.write(body)
+
+    def get(self):
+        self._forward()
+
+    def delete(self):
+        self._forward()
+
+    def options(self):
+        self._forward()
+
+    def _forward(self):
+        request      = copy.copy(self.request)
+        request.body = "".join(self._chunks)
+        self._fallback(request)
+        self._finished = True
+
+    def _submit(self, fn, *args):
+        '''
+        Call fn(*args) in the fallback's thread pool, if it has one, and
+        return a Future of its result.
+        '''
+        if isinstance(self._fallback, ThreadedWSGIContainer):
+            return self._fallback.executor.submit(fn, *args)
+        return gen.maybe_future(fn(*args))
+
+    def _process(self, parser):
+        '''
+        Wait for the uploads to finish, then run the Flask app on the request
+        and return its (status, headers, body). The uploads are passed in the
+        WSGI environ, in place of the body, which the app never reads.
+        '''
+        files           = parser.finish()
+        request         = copy.copy(self.request)
+        request.headers = httputil.HTTPHeaders(self.request.headers)
+        request.body    = ""
+        environ         = WSGIContainer.environ(request)
+        environ.pop("CONTENT_TYPE", None)
+        environ.pop("CONTENT_LENGTH", None)
+        environ[STREAMED_FILES] = files
+
+        data = {}
+        body = []
+
+        def start_response(status, response_headers, exc_info=None):
+            data["status"]  = status
+            data["headers"] = response_headers
+            return body.append
+
+        app_response = app(environ, start_response)
+        try:
+            body.extend(app_response)
+        finally:
+            if hasattr(app_response, "close"):
+                app_response.close()
+        return data["status"], data["headers"], "".join(body)
+
 #===============================================================================
 # Main
 #===============================================================================
@@ -174,8 +511,9 @@ USAGE
     shutil.rmtree(TMP_PATH, ignore_errors=True)
     io_utilities.safe_make_dirs(TMP_PATH)
 
-    # Update database with latest information
-    update_archives()
+    # Update database with latest information. Archives, HDF5s, run reports
+    # and experiment definitions are indexed in the background once the
+    # server starts.
     update_devices()
     update_dyes()
 
@@ -232,28 +570,70 @@ def start(current_info):
     tornado.options.options.log_file_prefix = TORNADO_LOG_FILE_PREFIX
     tornado.options.parse_command_line()
 
-    # Delete running or submitted jobs
+    # Resume jobs in the job queue, then delete running or submitted jobs
+    # that weren't resumed
     # Delete TSV outputs of old jobs
+    GENERAL_LOGGER.info("Resuming queued jobs.")
+    resumed_uuids = list()
+    try:
+        resumed_uuids = ExecutionManager.Instance().resume_jobs()
+    except:
+        GENERAL_LOGGER.exception("Failure resuming queued jobs.")
+
     GENERAL_LOGGER.info("Deleting records of unfinished jobs from databse. Deleting TSV outputs of old jobs.")
     for collection in [PA_PROCESS_COLLECTION, SA_IDENTITY_COLLECTION,
                        SA_ASSAY_CALLER_COLLECTION, SA_GENOTYPER_COLLECTION,
-                       SA_EXPLORATORY_COLLECTION, FA_PROCESS_COLLECTION]:
+                       SA_EXPLORATORY_COLLECTION, FA_PROCESS_COLLECTION,
+                       IMAGES_COLLECTION]:
         try:
-            # Do not remove VCF/TSV outputs of genotyper and exploratory analysis
-            if collection not in [SA_GENOTYPER_COLLECTION, SA_EXPLORATORY_COLLECTION]:
+            # Do not remove VCF/TSV outputs of genotyper and exploratory
+            # analysis, or image stacks
+            if collection not in [SA_GENOTYPER_COLLECTION, SA_EXPLORATORY_COLLECTION,
+                                  IMAGES_COLLECTION]:
                 io_utilities.delete_tsv(collection)
-            io_utilities.delete_unfinished_jobs(collection)
+            io_utilities.delete_unfinished_jobs(collection, resumed_uuids)
         except:
             GENERAL_LOGGER.exception("Failure deleting records of unfinished jobs or TSVs of old jobs.")
 
+    # Job names and UUIDs are looked up on every submit and delete, and must
+    # be unique even when the same job is submitted concurrently. Job and run
+    # report GETs filter, sort and paginate on indexed fields. Indexed
+    # archives and HDF5 datasets are upserted by their identifying fields.
+    GENERAL_LOGGER.info("Ensuring job collection indexes.")
+    try:
+        ensure_job_indexes()
+        ensure_run_report_indexes()
+        ensure_primary_analysis_indexes()
+    except:
+        GENERAL_LOGGER.exception("Failure ensuring job collection indexes.")
+
+    # Full analysis jobs are found for rerun by their parameter keys
+    GENERAL_LOGGER.info("Recording parameter keys of full analysis jobs.")
+    try:
+        ensure_param_keys(DbConnector.Instance())
+    except:
+        GENERAL_LOGGER.exception("Failure recording parameter keys of full analysis jobs.")
+
+    GENERAL_LOGGER.info("Starting background indexing of archives, HDF5s, run reports and experiment definitions.")
+    Indexer.Instance().refresh()
+
     GENERAL_LOGGER.info("Starting up server on machine %s and port %s at %s." %
                  (current_info[MACHINE], current_info[PORT_HEADER],
                   time.strftime("%I:%M:%S")))
 
-    tr = WSGIContainer(app)
-    application = Application([ (r"/tornado", MainHandler),
-                                (r".*", FallbackHandler, dict(fallback=tr)),
-                              ])
+    # Serve API requests in a thread pool, so slow requests don't block the
+    # IOLoop
+    if WSGI_THREADS > 0:
+        tr = ThreadedWSGIContainer(app, WSGI_THREADS,
+                                   ENDPOINT_CONCURRENCY_LIMITS)
+    else:
+        tr = WSGIContainer(app)
+    # Uploads are streamed to disk rather than buffered in memory
+    handlers = [(r"/tornado", MainHandler)]
+    handlers.extend((path, StreamedUploadHandler, dict(fallback=tr))
+                    for path in STREAMED_UPLOAD_PATHS)
+    handlers.append((r".*", FallbackHandler, dict(fallback=tr)))
+    application = Application(handlers)
 
     # Max file upload size == MAX_BUFFER_SIZE
     application.listen(PORT, max_buffer_size=MAX_BUFFER_SIZE)
@@ -436,6 +816,7 @@ def shutdown():
     GENERAL_LOGGER.info("Shutting down server on machine %s and port %s at %s." %
                  (current_info[MACHINE], current_info[PORT_HEADER],
                   time.strftime("%I:%M:%S")))
+    shutdown_hdf5_readers()
     IOLoop.instance().stop()
 
 #===============================================================================
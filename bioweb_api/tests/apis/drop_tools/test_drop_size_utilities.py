@@ -0,0 +1,105 @@
+'''
+Copyright 2015 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import unittest
+
+import numpy
+
+from bioweb_api.apis.drop_tools.drop_size_utilities import NEGLIGIBLE_OVERLAP, \
+    check_collision, fit_pairs, make_centroids, make_clusters, overlap_bound
+from bioweb_api.utilities.spatial_utilities import nearest_neighbors
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Static Variables
+#=============================================================================
+_MIN_PROB_THRESH = 0.66
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestDropSizeUtilities(unittest.TestCase):
+
+    def setUp(self):
+        numpy.random.seed(0)
+
+    def test_overlap_bound(self):
+        # The bound must not underestimate the ambiguous drops the gaussian
+        # mixture model finds, or pairs that collide would be skipped
+        for intensity in [5000.0, 15000.0, 30000.0]:
+            for separation in [1000, 2000, 3000, 5000, 8000, 12000]:
+                centroids = numpy.array([[intensity, intensity],
+                                         [intensity + separation, intensity]])
+                clusters  = make_clusters(centroids, drop_ave=28.0, drop_std=1.5)
+                ndrops    = sum(len(c.drops) for c in clusters)
+                bound     = overlap_bound(clusters[0].centroid,
+                                          numpy.cov(clusters[0].drops, rowvar=False),
+                                          clusters[1].centroid,
+                                          numpy.cov(clusters[1].drops, rowvar=False),
+                                          ndrops, _MIN_PROB_THRESH)
+
+                drops      = {0: clusters[0].drops, 1: clusters[1].drops}
+                collisions = fit_pairs([(0, 1)], drops, _MIN_PROB_THRESH)
+                ambiguous  = 0.0
+                if collisions:
+                    ambiguous = collisions[0][2] * ndrops / 100.0
+
+                msg = "Overlap bound (%f) of clusters at %d and %d is below " \
+                      "the %f ambiguous drops found." % (bound, intensity,
+                      intensity + separation, ambiguous)
+                self.assertGreaterEqual(bound, ambiguous, msg)
+                if bound < NEGLIGIBLE_OVERLAP:
+                    self.assertFalse(collisions)
+
+    def test_check_collision(self):
+        # Skipping pairs with a negligible overlap bound finds the same
+        # collisions as fitting every pair of neighbors
+        centroids = make_centroids([4, 4], [(0, 30000), (0, 30000)])
+        clusters  = make_clusters(centroids, drop_ave=28.0, drop_std=1.5)
+
+        numpy.random.seed(1)
+        observed = check_collision(clusters, min_prob_thresh=_MIN_PROB_THRESH)
+        observed = set((c['id_1'], c['id_2']) for c in observed)
+
+        numpy.random.seed(1)
+        _, nn_idxs = nearest_neighbors(numpy.array([c.centroid for c in clusters]), 4)
+        pairs      = sorted(set(tuple(sorted([idx, nn]))
+                                for idx, nns in enumerate(nn_idxs) for nn in nns))
+        drops      = dict((idx, c.drops) for idx, c in enumerate(clusters))
+        expected   = set((clusters[idx1].cluster_id, clusters[idx2].cluster_id)
+                         for idx1, idx2, _ in fit_pairs(pairs, drops,
+                                                        _MIN_PROB_THRESH))
+
+        msg = "Observed collisions (%s) don't match expected (%s)." % \
+            (observed, expected)
+        self.assertEqual(observed, expected, msg)
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
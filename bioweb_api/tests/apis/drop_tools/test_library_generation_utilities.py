@@ -0,0 +1,131 @@
+'''
+Copyright 2015 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import itertools
+import unittest
+
+import numpy
+
+from bioweb_api.apis.drop_tools.library_generation_utilities import \
+    LibraryDesign
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Static Variables
+#=============================================================================
+_PROFILE_LEN       = 60
+_BARCODE_PEAKS     = [8, 10, 15, 19, 22, 30, 33, 38, 44, 52]
+_NON_BARCODE_PEAKS = {"assay": 5, "pico2": 26}
+
+#=============================================================================
+# Classes
+#=============================================================================
+class _SyntheticLibraryDesign(LibraryDesign):
+    '''
+    LibraryDesign whose dye profiles are gaussians peaking at
+    _BARCODE_PEAKS and _NON_BARCODE_PEAKS, rather than profiles read from the
+    database.
+    '''
+    def _set_barcode_maps(self):
+        for i, peak in enumerate(_BARCODE_PEAKS):
+            name = "dye%d" % i
+            self._barcode_profile_map[name] = _make_profile(peak)
+            self._barcode_lot_map[name]     = "lot%d" % i
+            self._barcode_potency_map[name] = 1.0
+            self._barcode_peaks_map[name]   = peak
+
+    def _set_non_barcode_profiles(self):
+        self._non_barcode_profile             = numpy.zeros(_PROFILE_LEN)
+        self._normalized_non_barcode_profile  = numpy.zeros(_PROFILE_LEN)
+        for name, intensity in [(self._assay_dye, self._assay_intensity),
+                                (self._pico2_dye, self._pico2_intensity)]:
+            profile = _make_profile(_NON_BARCODE_PEAKS[name])
+            self._non_barcode_profile             += profile * intensity
+            self._normalized_non_barcode_profile  += profile
+            self._non_barcode_profile_map[name]   = profile
+            self._non_barcode_lot_map[name]       = "lot_%s" % name
+            self._non_barcode_intensity_map[name] = intensity
+        self._non_barcode_peaks = numpy.array(_NON_BARCODE_PEAKS.values())
+
+class TestLibraryDesign(unittest.TestCase):
+
+    def test_pruned_search_matches_exhaustive(self):
+        for nbarcodes in [8, 12, 24, 48, 96, 192]:
+            design = self._make_design(nbarcodes)
+            for ndyes in range(2, 7):
+                observed = [(tuple(dye_idxs), tuple(nlvls))
+                            for nlvls, dye_idxs in design._generate(ndyes)]
+                expected = _exhaustive_generate(design, ndyes)
+                msg = "Pruned search for %d barcodes from %d dyes found %s, " \
+                      "exhaustive search found %s." % (nbarcodes, ndyes,
+                                                       observed, expected)
+                self.assertEqual(observed, expected, msg)
+
+    def test_expired_budget_returns_best_found(self):
+        design  = self._make_design(12, requested_ndyes=2)
+        designs = design.generate(time_budget=0)
+        self.assertTrue(designs)
+        self.assertEqual(len(designs[0]['barcode_dyes']), 2)
+
+    @staticmethod
+    def _make_design(nbarcodes, requested_ndyes=None):
+        return _SyntheticLibraryDesign(nbarcodes,
+                                       requested_ndyes=requested_ndyes,
+                                       assay_dye="assay", pico2_dye="pico2")
+
+#=============================================================================
+# Functions
+#=============================================================================
+def _make_profile(peak):
+    profile = numpy.exp(-0.5 * ((numpy.arange(_PROFILE_LEN) - peak) / 3.0) ** 2)
+    return profile / numpy.sum(profile)
+
+def _exhaustive_generate(design, ndyes, nchoose=5):
+    '''
+    Reference for LibraryDesign._generate: evaluate the levels of every
+    combination of ndyes dyes, rejecting combinations whose peaks are too
+    close, and return the best nchoose.
+    '''
+    optimal_nlvls = list()
+    for dye_idxs in itertools.combinations(range(len(_BARCODE_PEAKS)), ndyes):
+        peaks = sorted([_BARCODE_PEAKS[idx] for idx in dye_idxs] +
+                       _NON_BARCODE_PEAKS.values())
+        if any(numpy.diff(peaks) < design._min_peak_difference):
+            continue
+        try:
+            nlvls, lowest_peak = design._calc_optimal_nlvls(numpy.array(dye_idxs))
+        except Exception:
+            continue
+        optimal_nlvls.append((lowest_peak, dye_idxs, tuple(nlvls)))
+    optimal_nlvls.sort(key=lambda x: x[0])
+    return [(dye_idxs, nlvls) for _, dye_idxs, nlvls in optimal_nlvls[:nchoose]]
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import unittest
+
+from pymongo.errors import DuplicateKeyError
+
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.dye_profiles_database.datastore import bulk_utilities
+from bioweb_api.apis.dye_profiles_database.datastore.bulk_utilities import \
+    ensure_unique_index, find_existing, insert_missing
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Static Variables
+#=============================================================================
+_DB_CONNECTOR = DbConnector.Instance()
+_COLLECTION   = "test_bulk_utilities"
+_KEY_FIELDS   = ["name", "lot"]
+_VALUE        = "value"
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestBulkUtilities(unittest.TestCase):
+
+    def setUp(self):
+        _DB_CONNECTOR.remove(_COLLECTION, {}, {'multi': True})
+        ensure_unique_index(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS)
+        self._max_keys = bulk_utilities.MAX_KEYS_PER_QUERY
+
+    def tearDown(self):
+        bulk_utilities.MAX_KEYS_PER_QUERY = self._max_keys
+        _DB_CONNECTOR.remove(_COLLECTION, {}, {'multi': True})
+
+    def test_reimport(self):
+        docs   = _make_docs(10, "first")
+        result = insert_missing(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS, docs)
+        self.assertEqual(result.upserted_count, 10)
+
+        # Importing the same documents again, along with new ones, only
+        # inserts the new documents and leaves the existing ones unchanged
+        docs   = _make_docs(12, "second")
+        result = insert_missing(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS, docs)
+        self.assertEqual(result.upserted_count, 2)
+        self.assertEqual(result.modified_count, 0)
+
+        records = _DB_CONNECTOR.find(_COLLECTION, {}, _KEY_FIELDS + [_VALUE])
+        values  = sorted((r["name"], r["lot"], r[_VALUE]) for r in records)
+        self.assertEqual(values, sorted([(d["name"], d["lot"], "first")
+                                         for d in _make_docs(10)] +
+                                        [(d["name"], d["lot"], "second")
+                                         for d in _make_docs(12)[10:]]))
+
+        self.assertIsNone(insert_missing(_DB_CONNECTOR, _COLLECTION,
+                                         _KEY_FIELDS, []))
+
+    def test_find_existing(self):
+        # Keys are looked up in several queries
+        bulk_utilities.MAX_KEYS_PER_QUERY = 3
+        docs = _make_docs(10)
+        insert_missing(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS, docs)
+
+        keys     = [(d["name"], d["lot"]) for d in _make_docs(12)]
+        existing = find_existing(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS, keys,
+                                 [_VALUE])
+        self.assertEqual(sorted(existing.keys()), sorted(keys[:10]))
+        for key, doc in existing.iteritems():
+            self.assertEqual((doc["name"], doc["lot"]), key)
+            self.assertEqual(doc[_VALUE], "")
+            self.assertNotIn("other", doc)
+
+        self.assertEqual(find_existing(_DB_CONNECTOR, _COLLECTION,
+                                       _KEY_FIELDS, []), {})
+
+    def test_unique_index(self):
+        docs = _make_docs(1)
+        insert_missing(_DB_CONNECTOR, _COLLECTION, _KEY_FIELDS, docs)
+        with self.assertRaises(DuplicateKeyError):
+            _DB_CONNECTOR.insert(_COLLECTION, _make_docs(1))
+
+#=============================================================================
+# Functions
+#=============================================================================
+def _make_docs(ndocs, value=""):
+    '''
+    Documents with two lots of each name, so neither key field alone
+    identifies a document.
+    '''
+    return [{"name": "dye%d" % (idx // 2), "lot": "lot%d" % (idx % 2),
+             _VALUE: value, "other": idx} for idx in range(ndocs)]
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
@@ -25,6 +25,7 @@ import unittest
 
 from bioweb_api import app, EXP_DEF_COLLECTION
 from bioweb_api.DbConnector import DbConnector
+from bioweb_api.execution_engine.Indexer import Indexer
 from bioweb_api.tests.test_utils import get_data
 
 #=============================================================================
@@ -59,7 +60,9 @@ class TestExpDefAPI(unittest.TestCase):
                 % (len_observed_defs, len_expected_defs)
         self.assertEqual(len_expected_defs, len_observed_defs, msg)
 
-        response = get_data(self, _EXP_DEF_URL + '/ExpDef?refresh=true', 200)
+        get_data(self, _EXP_DEF_URL + '/ExpDef?refresh=true', 200)
+        self.assertTrue(Indexer.Instance().wait(timeout=600))
+        response = get_data(self, _EXP_DEF_URL + '/ExpDef', 200)
         len_expected_defs = len(_DB_CONNECTOR.find(EXP_DEF_COLLECTION, {}))
         len_observed_defs = len(response['ExpDef'])
 
@@ -0,0 +1,161 @@
+'''
+Copyright 2016 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import os
+import shutil
+import tempfile
+import unittest
+
+from uuid import uuid4
+
+from bioweb_api import TMP_PATH
+from bioweb_api.apis.exp_def import ExpDefCache as exp_def_cache
+from bioweb_api.utilities.io_utilities import safe_make_dirs
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Classes
+#=============================================================================
+class _Barcode(object):
+    def __init__(self, dye_levels):
+        self.dye_levels = dye_levels
+
+class _Experiment(object):
+    def __init__(self, nbarcodes):
+        self.barcodes = [_Barcode({"dye1": idx, "dye2": 0})
+                         for idx in range(nbarcodes)]
+
+class _ExpDefHandler(object):
+    '''
+    Stands in for the experiment definition service, recording the
+    definitions fetched from it.
+    '''
+    experiments = dict()
+    fetched     = list()
+
+    @property
+    def experiment_uuids(self):
+        return self.experiments.keys()
+
+    def get_experiment_uuid(self, exp_def):
+        return exp_def if exp_def in self.experiments else None
+
+    def get_experiment_definition(self, uuid):
+        self.fetched.append(uuid)
+        return self.experiments.get(uuid)
+
+class _ExpDefCache(exp_def_cache.ExpDefCache):
+    '''
+    ExpDefCache that isn't a singleton, so each instance stands in for the
+    cache of a separate process.
+    '''
+    _INSTANCE = None
+
+class TestExpDefCache(unittest.TestCase):
+    def setUp(self):
+        safe_make_dirs(TMP_PATH)
+        self._path    = tempfile.mkdtemp(dir=TMP_PATH)
+        self._handler = exp_def_cache.ExpDefHandler
+        exp_def_cache.ExpDefHandler = _ExpDefHandler
+
+        self._uuid = str(uuid4())
+        _ExpDefHandler.experiments = {self._uuid: _Experiment(3)}
+        _ExpDefHandler.fetched     = list()
+
+    def tearDown(self):
+        exp_def_cache.ExpDefHandler = self._handler
+        shutil.rmtree(self._path, ignore_errors=True)
+
+    def test_shared_file(self):
+        # The definition is fetched once and shared through its file
+        cache1, cache2 = self._make_caches()
+        experiment = cache1.experiment(self._uuid)
+        self.assertEqual(len(experiment.barcodes), 3)
+        self.assertEqual(cache1.dye_levels(self._uuid), {"dye1": 3, "dye2": 1})
+
+        self.assertEqual(len(cache2.experiment(self._uuid).barcodes), 3)
+        self.assertEqual(cache2.digest(self._uuid), cache1.digest(self._uuid))
+        self.assertEqual(_ExpDefHandler.fetched, [self._uuid])
+        self.assertIs(cache1.experiment(self._uuid), experiment)
+
+    def test_invalidate(self):
+        # Invalidating a definition in one process reloads it in the others
+        cache1, cache2 = self._make_caches()
+        digest = cache1.digest(self._uuid)
+        cache2.experiment(self._uuid)
+
+        _ExpDefHandler.experiments[self._uuid] = _Experiment(5)
+        cache2.invalidate([self._uuid])
+        self.assertFalse(os.listdir(self._path))
+
+        self.assertEqual(len(cache1.experiment(self._uuid).barcodes), 5)
+        self.assertEqual(len(cache2.experiment(self._uuid).barcodes), 5)
+        self.assertNotEqual(cache1.digest(self._uuid), digest)
+        self.assertEqual(cache2.digest(self._uuid), cache1.digest(self._uuid))
+        self.assertEqual(_ExpDefHandler.fetched, [self._uuid] * 2)
+
+    def test_replaced_file(self):
+        # A definition written by another process replaces the one in memory
+        cache1, cache2 = self._make_caches()
+        cache1.experiment(self._uuid)
+
+        _ExpDefHandler.experiments[self._uuid] = _Experiment(4)
+        cache2.invalidate([self._uuid])
+        self.assertEqual(len(cache2.experiment(self._uuid).barcodes), 4)
+        self.assertEqual(len(cache1.experiment(self._uuid).barcodes), 4)
+        self.assertEqual(_ExpDefHandler.fetched, [self._uuid] * 2)
+
+    def test_invalidate_all(self):
+        other_uuid = str(uuid4())
+        _ExpDefHandler.experiments[other_uuid] = _Experiment(2)
+        cache1, cache2 = self._make_caches()
+        for uuid in [self._uuid, other_uuid]:
+            cache1.experiment(uuid)
+
+        cache2.invalidate()
+        self.assertFalse(os.listdir(self._path))
+        for uuid in [self._uuid, other_uuid]:
+            cache1.experiment(uuid)
+        self.assertEqual(sorted(_ExpDefHandler.fetched),
+                         sorted([self._uuid, other_uuid] * 2))
+
+    def test_missing_definition(self):
+        cache, _ = self._make_caches()
+        missing  = str(uuid4())
+        self.assertIsNone(cache.experiment(missing))
+        self.assertIsNone(cache.dye_levels(missing))
+        self.assertIsNone(cache.digest(missing))
+        self.assertFalse(os.listdir(self._path))
+
+    def _make_caches(self):
+        return [_ExpDefCache(path=self._path) for _ in range(2)]
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
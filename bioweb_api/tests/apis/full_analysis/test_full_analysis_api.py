@@ -41,6 +41,7 @@ from bioweb_api.apis.ApiConstants import UUID, STATUS, JOB_TYPE_NAME, JOB_NAME,
 
 from bioweb_api.apis.full_analysis.FullAnalysisPostFunction import FULL_ANALYSIS
 from bioweb_api.apis.full_analysis.FullAnalysisUtils import MakeUnifiedPDF
+from bioweb_api.execution_engine.Indexer import Indexer
 
 #=============================================================================
 # Setup Logging
@@ -242,6 +243,7 @@ class TestFullAnalysisAPI(unittest.TestCase):
         # bamboo is updated with the latest image stacks and HDF5 archives
         get_data(self, _ARCHIVES_URL + '?refresh=true&format=json', 200)
         get_data(self, _HDF5S_URL + '?refresh=true&format=json', 200)
+        self.assertTrue(Indexer.Instance().wait(timeout=600))
 
         # Construct url
         url = _FULL_ANALYSIS_URL
@@ -317,19 +319,22 @@ class TestFullAnalysisAPI(unittest.TestCase):
         job
         """
         make_pdf = MakeUnifiedPDF(_FA_JOB)
-        make_pdf._combine_sa(_OUTPUT_SA_PATH,
-                             _ID_REPORT_PATH,
-                             _GT_PNG_IND_PATH,
-                             _GT_PNG_PATH,
-                             _GT_KDE_IND_PATH,
-                             _GT_KDE_PATH,
-                             )
-        self.assertTrue(os.path.isfile(_OUTPUT_SA_PATH))
-
-        make_pdf._merge_pdfs(_OUTPUT_PDF_PATH, _OUTPUT_SA_PATH, _GT_PDF_PATH)
+        timings  = dict()
+        sections = make_pdf._render_sections(_OUTPUT_SA_PATH,
+                                             _ID_REPORT_PATH,
+                                             _GT_PNG_PATH,
+                                             _GT_KDE_PATH,
+                                             timings)
+        for path in sections:
+            self.assertTrue(os.path.isfile(path))
+        self.assertTrue('render' in timings)
+
+        make_pdf._merge_pdfs(_OUTPUT_PDF_PATH, _GT_PDF_PATH, _GT_PNG_IND_PATH,
+                             _GT_KDE_IND_PATH, *sections)
         self.assertTrue(os.path.isfile(_OUTPUT_PDF_PATH))
 
-        os.unlink(_OUTPUT_SA_PATH)
+        for path in sections:
+            os.unlink(path)
         os.unlink(_OUTPUT_PDF_PATH)
 
     def test_full_analysis_exploratory(self):
@@ -21,6 +21,7 @@ limitations under the License.
 # Imports
 #=============================================================================
 import os
+import time
 import unittest
 
 from bioweb_api import app
@@ -30,7 +31,8 @@ from bioweb_api.apis.image.ReplayImagesPostFunction import REPLAY_IMAGES
 from bioweb_api.tests.test_utils import get_data, delete_data, \
     add_url_argument, upload_file, post_data
 from bioweb_api.apis.ApiConstants import EXP_DEF, NAME, DESCRIPTION, UUID,\
-    NUM_IMAGES, STACK_TYPE, MONITOR1, MONITOR2, HAM_NAME, MON1_NAME, MON2_NAME
+    NUM_IMAGES, STACK_TYPE, MONITOR1, MONITOR2, HAM_NAME, MON1_NAME, MON2_NAME, \
+    STATUS, JOB_STATUS, PROGRESS
 
 #=============================================================================
 # Setup Logging
@@ -314,6 +316,26 @@ class TestImagesAppi(unittest.TestCase):
         replay_response = post_data(self, replay_url, 200)
         replay_uuid = replay_response[UUID]
 
+        # wait for the replay image stack to be built, stacks that aren't
+        # built are only returned when their status is requested
+        status_url = add_url_argument(_REPLAY_IMAGES_URL, STATUS,
+                                      ",".join(JOB_STATUS), True)
+        running = True
+        while running:
+            time.sleep(1)
+            response = get_data(self, status_url, 200)
+            for stack in response[REPLAY_IMAGES]:
+                if replay_uuid == stack[UUID]:
+                    running = stack[STATUS] in [JOB_STATUS.submitted, # @UndefinedVariable
+                                                JOB_STATUS.running]   # @UndefinedVariable
+                    if not running:
+                        msg = "Replay image stack %s failed to build." % replay_uuid
+                        self.assertEqual(stack[STATUS], JOB_STATUS.succeeded, msg) # @UndefinedVariable
+                        self.assertEqual(stack[PROGRESS], 100)
+
+        response = get_data(self, _REPLAY_IMAGES_URL, 200)
+        self.assertIn(replay_uuid, [stack[UUID] for stack in response[REPLAY_IMAGES]])
+
         # try to add replay image stack with same name
         replay_url = _REPLAY_IMAGES_URL
         replay_url = add_url_argument(replay_url, NAME, 'replay_images_name', True)
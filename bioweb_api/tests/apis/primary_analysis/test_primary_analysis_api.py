@@ -233,6 +233,12 @@ class TestPrimaryAnalysisAPI(unittest.TestCase):
               (config_path, exp_config_path)
         self.assertTrue(filecmp.cmp(exp_config_path, config_path), msg)
 
+        # Test paginated retrieval of a subset of fields
+        response = get_data(self, _PROCESS_URL + "?status=succeeded&page_size=1" \
+                            "&sort=-submit_datestamp&fields=uuid,status", 200)
+        self.assertEqual(len(response[_PROCESS]), 1)
+        self.assertEqual(set(response[_PROCESS][0].keys()), set([UUID, _STATUS]))
+
         # Delete absorption job
         delete_data(self, _PROCESS_URL + "?uuid=%s" % process_uuid, 200)
 
@@ -0,0 +1,110 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#===============================================================================
+# Imports
+#===============================================================================
+import calendar
+import os
+import time
+import unittest
+
+import numpy
+
+from bioweb_api.apis.primary_analysis.ProcessPostFunction import \
+    epoch_to_hour_min
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#===============================================================================
+# Private Static Variables
+#===============================================================================
+_TIMEZONES = ["America/Los_Angeles", "Europe/London", "Australia/Sydney",
+              "UTC"]
+
+# Daylight saving transitions of _TIMEZONES in 2016 (UTC)
+_TRANSITIONS = [(2016, 3, 13, 10), (2016, 11, 6, 9),
+                (2016, 3, 27, 1), (2016, 10, 30, 1),
+                (2016, 4, 2, 16), (2016, 10, 1, 16)]
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestEpochToHourMin(unittest.TestCase):
+    def setUp(self):
+        self._tz = os.environ.get("TZ")
+
+    def tearDown(self):
+        if self._tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self._tz
+        time.tzset()
+
+    def test_daylight_saving_transitions(self):
+        # Chunks span a transition or end or start at it. The offsets at the
+        # start and end of the last chunk are the same, but differ from the
+        # offset in the middle of it.
+        chunks = list()
+        for year, month, day, hour in _TRANSITIONS:
+            transition = calendar.timegm((year, month, day, hour, 0, 0))
+            chunks.append(numpy.arange(transition - 7200, transition + 7200, 7.3))
+            chunks.append(numpy.arange(transition - 7200, transition, 7.3))
+            chunks.append(numpy.arange(transition, transition + 7200, 7.3))
+        start = calendar.timegm((2016, 1, 1, 0, 0, 0))
+        end   = calendar.timegm((2017, 1, 1, 0, 0, 0))
+        chunks.append(numpy.array([start, (start + end) / 2.0, end]))
+
+        for timezone in _TIMEZONES:
+            os.environ["TZ"] = timezone
+            time.tzset()
+            for epochs in chunks:
+                self._check(epochs, timezone)
+
+    def test_nan(self):
+        os.environ["TZ"] = "America/Los_Angeles"
+        time.tzset()
+        transition = calendar.timegm((2016, 3, 13, 10, 0, 0))
+        epochs     = numpy.arange(transition - 600, transition + 600, 30.5)
+        epochs[::4] = numpy.nan
+        self._check(epochs, "America/Los_Angeles")
+
+        observed = epoch_to_hour_min(numpy.array([numpy.nan, numpy.nan]))
+        self.assertTrue(numpy.isnan(observed).all())
+        self.assertEqual(len(epoch_to_hour_min(numpy.array([]))), 0)
+
+    def _check(self, epochs, timezone):
+        expected = numpy.array([numpy.nan if numpy.isnan(epoch) else
+                                float(time.strftime('%H%M.%S',
+                                                    time.localtime(epoch)))
+                                for epoch in epochs])
+        observed = epoch_to_hour_min(epochs)
+        msg = "Times of day in %s (%s) don't match expected (%s)." % \
+            (timezone, observed, expected)
+        self.assertTrue(numpy.allclose(observed, expected, equal_nan=True), msg)
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
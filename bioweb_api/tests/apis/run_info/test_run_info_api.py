@@ -36,6 +36,7 @@ from bioweb_api.apis.run_info.constants import CARTRIDGE_SN, CHIP_SN, \
     CUSTOMER_APP_NAME
 from bioweb_api.apis.ApiConstants import UUID, TAGS
 from bioweb_api.apis.run_info.RunInfoUtils import read_report_file
+from bioweb_api.execution_engine.Indexer import Indexer, FRESHNESS_HEADER
 
 #===============================================================================
 # Private Static Variables
@@ -114,7 +115,10 @@ class TestRunReportAPI(unittest.TestCase):
         """
         test RunInfoGetFunction
         """
-        response = get_data(self, _RUN_INFO_GET_URL + '?refresh=true&format=json', 200)
+        # Refreshes run in the background, so wait for it before comparing
+        get_data(self, _RUN_INFO_GET_URL + '?refresh=true&format=json', 200)
+        self.assertTrue(Indexer.Instance().wait(timeout=600))
+        response = get_data(self, _RUN_INFO_GET_URL + '?format=json', 200)
         len_expected_reports = len(_DB_CONNECTOR.find(RUN_REPORT_COLLECTION, {UUID: {'$exists': True},
                                                                               DEVICE_NAME: {'$ne': ''},
                                                                               EXP_DEF_NAME: {'$ne': None},
@@ -126,6 +130,9 @@ class TestRunReportAPI(unittest.TestCase):
                 % (len_observed_reports, len_expected_reports)
         self.assertEqual(len_expected_reports, len_observed_reports, msg)
 
+        response = self._client.get(_RUN_INFO_GET_URL)
+        self.assertIn(FRESHNESS_HEADER, response.headers)
+
     def test_update_report_by_dates(self):
         """
         test RunInfoGetFunction with start and end parameters
@@ -134,7 +141,9 @@ class TestRunReportAPI(unittest.TestCase):
         param_str = '?refresh=true&start={0}&end={1}'.format(
                                             _START_DATE.strftime("%Y_%m_%d"),
                                             _END_DATE.strftime("%Y_%m_%d"))
-        response = get_data(self, _RUN_INFO_GET_URL + param_str, 200)
+        get_data(self, _RUN_INFO_GET_URL + param_str, 200)
+        self.assertTrue(Indexer.Instance().wait(timeout=600))
+        response = get_data(self, _RUN_INFO_GET_URL, 200)
         len_expected_reports = len(_DB_CONNECTOR.find(RUN_REPORT_COLLECTION,
                                             {UUID: {'$exists': True},
                                              DEVICE_NAME: {'$ne': ''},
@@ -148,7 +157,9 @@ class TestRunReportAPI(unittest.TestCase):
 
         # test when only start date is specified
         param_str = '?refresh=true&start={0}'.format(_START_DATE.strftime("%Y_%m_%d"))
-        response = get_data(self, _RUN_INFO_GET_URL + param_str, 200)
+        get_data(self, _RUN_INFO_GET_URL + param_str, 200)
+        self.assertTrue(Indexer.Instance().wait(timeout=600))
+        response = get_data(self, _RUN_INFO_GET_URL, 200)
         len_expected_reports = len(_DB_CONNECTOR.find(RUN_REPORT_COLLECTION,
                                             {UUID: {'$exists': True},
                                              DEVICE_NAME: {'$ne': ''},
@@ -70,6 +70,8 @@ _JOB_NAME                 = "test_pa_process_job"
 _IDENTITY_JOB_NAME     = "test_identity"
 _ASSAY_CALLER_JOB_NAME = "test_assay_caller"
 _GENOTYPER_JOB_NAME    = "test_genotyper"
+_GENOTYPER_COMPUTE_JOB_NAME = "test_genotyper_compute"
+_GENOTYPER_REUSE_JOB_NAME   = "test_genotyper_reuse"
 _ID_NUM_PROBES         = 0
 _TRAINING_FACTOR       = 10
 _DYE_LEVELS            = "594:4,633:3,cy5.5:4,pe:2,pe-cy7:2,IF790:2"
@@ -473,6 +475,41 @@ class TestSecondaryAnalysisAPI(unittest.TestCase):
             msg = "Genotyper job %s still exists in database." % genotyper_uuid
             self.assertNotEqual(genotyper_uuid, job[UUID], msg)
 
+    def test_genotyper_reuse(self):
+        """
+        Test that a genotyper job reusing the result of an identical job
+        generates its own plots, like the job that computed the result.
+        """
+        url = _GENOTYPER_URL
+        url = add_url_argument(url, UUID, self._ac_record[UUID], True)
+        url = add_url_argument(url, EXP_DEF, _EXP_DEF_NAME)
+        url = add_url_argument(url, REQUIRED_DROPS, _REQUIRED_DROPS)
+
+        # The first job computes the result, the second reuses it
+        jobs = list()
+        for job_name in [_GENOTYPER_COMPUTE_JOB_NAME, _GENOTYPER_REUSE_JOB_NAME]:
+            response = post_data(self, add_url_argument(url, JOB_NAME, job_name), 200)
+            jobs.append(self.wait_for_genotyper(response[GENOTYPER][0][UUID]))
+
+        for job_details in jobs:
+            msg = "Expected genotyper job %s status succeeded, but found %s. " \
+                  "Error: %s" % (job_details[UUID], job_details[STATUS],
+                                 job_details.get('error', ""))
+            self.assertEquals(job_details[STATUS], "succeeded", msg)
+            for key in [RESULT, PDF, PNG, PNG_SUM, KDE_PNG, KDE_PNG_SUM]:
+                msg = "Result file doesn't exist: %s" % job_details[key]
+                self.assertTrue(os.path.isfile(job_details[key]), msg)
+
+        with open(jobs[0][RESULT]) as computed, open(jobs[1][RESULT]) as reused:
+            self.assertEqual(computed.read(), reused.read())
+
+        for job_details in jobs:
+            delete_url = add_url_argument(_GENOTYPER_URL, UUID,
+                                          job_details[UUID], True)
+            delete_data(self, delete_url, 200)
+            for key in [RESULT, PDF, PNG, PNG_SUM, KDE_PNG, KDE_PNG_SUM]:
+                self.ensure_genotyper_result_deleted(job_details, key)
+
     def test_get_assay_caller_submodel(self):
         """
         Test GET assay caller model files.
@@ -497,6 +534,18 @@ class TestSecondaryAnalysisAPI(unittest.TestCase):
         else:
             shutil.copy(job_details[key], "observed_genotyper%s" % file_ext)
 
+    def wait_for_genotyper(self, genotyper_uuid):
+        """
+        Wait for a genotyper job to finish and return its details.
+        """
+        while True:
+            time.sleep(10)
+            response = get_data(self, _GENOTYPER_URL, 200)
+            for job in response[GENOTYPER]:
+                if genotyper_uuid == job[UUID] and \
+                   job[STATUS] not in ['submitted', 'running']:
+                    return job
+
     def ensure_genotyper_result_deleted(self, job_details, key):
         msg = "Result file not deleted: %s" % job_details[key]
         self.assertFalse(os.path.isfile(job_details[key]), msg)
@@ -0,0 +1,146 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import threading
+import unittest
+
+from bioweb_api.EnumRegistry import EnumRegistry
+from bioweb_api.apis.parameters.CaseSensitiveStringParameter import CaseSensitiveStringParameter
+from bioweb_api.apis.parameters.LowerCaseStringParameter import LowerCaseStringParameter
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Global Variables
+#=============================================================================
+_COLLECTION = "test_enum_registry"
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestEnumRegistry(unittest.TestCase):
+    def setUp(self):
+        self._registry = EnumRegistry.Instance()
+        self._values   = ["Foo", "Bar"]
+        self._loads    = 0
+        # Keys are unique per test, because registering an existing key keeps
+        # the original loader.
+        self._enum     = self._registry.register(self.id(), [_COLLECTION],
+                                                 self._loader)
+
+    def _loader(self):
+        self._loads += 1
+        return list(self._values)
+
+    def test_cached_until_invalidated(self):
+        version, values = self._enum.snapshot()
+        self.assertEqual(values, ["Foo", "Bar"])
+        self._values.append("Baz")
+        self.assertEqual(self._enum.snapshot(), (version, ["Foo", "Bar"]))
+        self.assertEqual(self._loads, 1)
+
+        self._registry.invalidate("some_other_collection")
+        self.assertEqual(self._enum.snapshot()[0], version)
+
+        self._registry.invalidate(_COLLECTION)
+        new_version, values = self._enum.snapshot()
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(values, ["Foo", "Bar", "Baz"])
+        self.assertEqual(self._loads, 2)
+
+    def test_miss_refresh_rate_limited(self):
+        version, _ = self._enum.snapshot()
+
+        # The first miss reloads the values, later misses within the refresh
+        # interval don't
+        self._values.append("Baz")
+        self._enum.refresh()
+        self.assertEqual(self._enum.snapshot()[1], ["Foo", "Bar", "Baz"])
+        self._values.append("Qux")
+        self._enum.refresh()
+        self.assertEqual(self._enum.snapshot()[1], ["Foo", "Bar", "Baz"])
+        self.assertEqual(self._loads, 2)
+
+        # Writes still invalidate the values
+        self._registry.invalidate(_COLLECTION)
+        self.assertEqual(self._enum.snapshot()[1], ["Foo", "Bar", "Baz", "Qux"])
+
+    def test_load_outside_lock(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_loader():
+            started.set()
+            release.wait()
+            return self._loader()
+
+        slow_enum = self._registry.register(self.id() + ".slow",
+                                            [_COLLECTION], slow_loader)
+        results = list()
+        threads = [threading.Thread(target=lambda: results.append(slow_enum.snapshot()))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+
+        # Other enums can be loaded while the slow enum is loading
+        self.assertEqual(self._enum.snapshot()[1], ["Foo", "Bar"])
+
+        # Concurrent requests for the slow enum share a single load
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(version for version, _ in results)), 1)
+        self.assertEqual(self._loads, 2)
+
+    def test_case_sensitive_parameter(self):
+        parameter = CaseSensitiveStringParameter("foo", "Foo.",
+                                                 enum=self._enum)
+        self.assertEqual(parameter.parse_args(["foo", "BAR"]), ["Foo", "Bar"])
+        self.assertEqual(parameter.enum, ["Foo", "Bar"])
+
+        # Values written by another process are picked up on a miss
+        self._values.append("Baz")
+        self.assertEqual(parameter.parse_args(["baz"]), ["Baz"])
+        self.assertEqual(self._loads, 2)
+        self.assertRaises(Exception, parameter.parse_args, ["qux"])
+
+    def test_lower_case_parameter(self):
+        parameter = LowerCaseStringParameter("foo", "Foo.", enum=self._enum)
+        self.assertEqual(parameter.parse_args(["FOO"]), ["foo"])
+        self.assertRaises(Exception, parameter.parse_args, ["qux"])
+        self.assertEqual(parameter.parse_args(["bar"]), ["bar"])
+
+        # Membership set is only rebuilt when the registry reloads
+        loads = self._loads
+        parameter.parse_args(["foo"])
+        self.assertEqual(self._loads, loads)
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import os
+import shutil
+import tempfile
+import unittest
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from bioweb_api import PA_PROCESS_COLLECTION, TMP_PATH
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.ApiConstants import ID, UUID, JOB_NAME, STATUS, \
+    STAGE_KEY, RESULT, FINISH_DATESTAMP, JOB_STATUS
+from bioweb_api.utilities.io_utilities import safe_make_dirs
+from bioweb_api.utilities.job_utilities import ensure_job_indexes, \
+    insert_job, reuse_stage_result, JobExistsError
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Global Variables
+#=============================================================================
+_DB_CONNECTOR = DbConnector.Instance()
+_SUFFIXES     = ["", ".cfg"]
+
+#=============================================================================
+# Classes
+#=============================================================================
+class TestInsertJob(unittest.TestCase):
+    def setUp(self):
+        ensure_job_indexes()
+        self._job_name = str(uuid4())
+
+    def tearDown(self):
+        _DB_CONNECTOR.remove(PA_PROCESS_COLLECTION,
+                             {JOB_NAME: self._job_name}, {'multi': True})
+
+    def test_duplicate_job_name(self):
+        insert_job(PA_PROCESS_COLLECTION,
+                   {UUID: str(uuid4()), JOB_NAME: self._job_name})
+
+        document = {UUID: str(uuid4()), JOB_NAME: self._job_name}
+        with self.assertRaises(JobExistsError):
+            insert_job(PA_PROCESS_COLLECTION, document)
+        self.assertNotIn(ID, document)
+        self.assertEqual(len(_DB_CONNECTOR.find(PA_PROCESS_COLLECTION,
+                                                {JOB_NAME: self._job_name})), 1)
+
+class TestReuseStageResult(unittest.TestCase):
+    def setUp(self):
+        safe_make_dirs(TMP_PATH)
+        self._folder    = tempfile.mkdtemp(dir=TMP_PATH)
+        self._stage_key = str(uuid4())
+        self._uuids     = list()
+
+    def tearDown(self):
+        _DB_CONNECTOR.remove(PA_PROCESS_COLLECTION,
+                             {UUID: {'$in': self._uuids}}, {'multi': True})
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+    def test_reuse_newest_result(self):
+        self._add_job(days_ago=2)
+        newer = self._add_job(days_ago=1)
+
+        uuid, paths = self._output_paths()
+        record = reuse_stage_result(PA_PROCESS_COLLECTION, self._stage_key,
+                                    uuid, paths)
+        self.assertEqual(record[UUID], newer)
+        self._check_outputs(newer, paths)
+
+    def test_skip_missing_result(self):
+        older = self._add_job(days_ago=2)
+        newer = self._add_job(days_ago=1)
+        os.remove(self._path(newer))
+
+        uuid, paths = self._output_paths()
+        record = reuse_stage_result(PA_PROCESS_COLLECTION, self._stage_key,
+                                    uuid, paths)
+        self.assertEqual(record[UUID], older)
+        self._check_outputs(older, paths)
+
+    def test_no_reusable_result(self):
+        uuid, paths = self._output_paths()
+        self._add_job(status=JOB_STATUS.failed)          # @UndefinedVariable
+        self._add_job(stage_key=str(uuid4()))
+        self._add_job(uuid=uuid)
+
+        # Failed jobs, jobs with other keys and the job itself aren't reused
+        for stage_key in [self._stage_key, None]:
+            record = reuse_stage_result(PA_PROCESS_COLLECTION, stage_key,
+                                        uuid, paths)
+            self.assertIsNone(record)
+
+    def test_delete_reused_job(self):
+        reused = self._add_job()
+
+        uuid, paths = self._output_paths()
+        reuse_stage_result(PA_PROCESS_COLLECTION, self._stage_key, uuid, paths)
+
+        # Results are linked, so removing the reused job's files leaves the
+        # reusing job's result intact
+        for suffix in _SUFFIXES:
+            os.remove(self._path(reused, suffix))
+        self._check_outputs(reused, paths)
+
+    def _add_job(self, days_ago=0, status=JOB_STATUS.succeeded, # @UndefinedVariable
+                 stage_key=None, uuid=None):
+        '''
+        Insert a job with result files named after its uuid.
+        '''
+        uuid = uuid or str(uuid4())
+        for suffix in _SUFFIXES:
+            with open(self._path(uuid, suffix), "w") as f:
+                f.write(uuid + suffix)
+        _DB_CONNECTOR.insert(PA_PROCESS_COLLECTION,
+            [{UUID: uuid,
+              STATUS: status,
+              STAGE_KEY: stage_key or self._stage_key,
+              RESULT: self._path(uuid),
+              FINISH_DATESTAMP: datetime.today() - timedelta(days=days_ago)}])
+        self._uuids.append(uuid)
+        return uuid
+
+    def _output_paths(self):
+        uuid = str(uuid4())
+        return uuid, [self._path(uuid, suffix) for suffix in _SUFFIXES]
+
+    def _path(self, uuid, suffix=""):
+        return os.path.join(self._folder, uuid + suffix)
+
+    def _check_outputs(self, reused_uuid, paths):
+        for suffix, path in zip(_SUFFIXES, paths):
+            with open(path) as f:
+                self.assertEqual(f.read(), reused_uuid + suffix)
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
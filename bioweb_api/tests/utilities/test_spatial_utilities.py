@@ -0,0 +1,99 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import unittest
+
+import numpy
+
+from bioweb_api.utilities.spatial_utilities import nearest_neighbors
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestNearestNeighbors(unittest.TestCase):
+
+    def setUp(self):
+        numpy.random.seed(0)
+
+    def test_distinct_points(self):
+        points = numpy.random.uniform(0, 30000, (200, 2))
+        for k in [1, 4, 10]:
+            self._check(points, k)
+
+    def test_duplicate_points(self):
+        # Every point has duplicates, so the KD-tree may return a duplicate
+        # ahead of the point itself
+        points = numpy.repeat(numpy.random.uniform(0, 30000, (40, 2)), 3, axis=0)
+        numpy.random.shuffle(points)
+        for k in [1, 2, 4]:
+            self._check(points, k)
+
+        # Only duplicates
+        points = numpy.zeros((5, 2))
+        dists, _ = nearest_neighbors(points, 3)
+        self.assertTrue((dists == 0).all())
+        self._check(points, 3)
+
+    def test_too_few_points(self):
+        points = numpy.random.uniform(0, 30000, (3, 2))
+        dists, _ = nearest_neighbors(points, 10)
+        self.assertEqual(dists.shape, (3, 2))
+        self._check(points, 10)
+
+        for npoints in [0, 1]:
+            dists, idxs = nearest_neighbors(numpy.zeros((npoints, 2)), 4)
+            self.assertEqual(dists.shape, (npoints, 0))
+            self.assertEqual(idxs.shape, (npoints, 0))
+
+    def _check(self, points, k):
+        '''
+        Compare the neighbors found with a brute force search. Neighbors at
+        the same distance may be found in any order, so the distances are
+        compared and the indexes are checked to be other points at those
+        distances.
+        '''
+        dists, idxs = nearest_neighbors(points, k)
+        k = min(k, len(points) - 1)
+        self.assertEqual(dists.shape, (len(points), k))
+        self.assertEqual(idxs.shape, (len(points), k))
+
+        all_dists = numpy.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+        for idx, (nn_dists, nn_idxs) in enumerate(zip(dists, idxs)):
+            expected = numpy.sort(numpy.delete(all_dists[idx], idx))[:k]
+            msg = "Neighbor distances of point %d (%s) don't match expected " \
+                  "(%s)." % (idx, nn_dists, expected)
+            self.assertTrue(numpy.allclose(nn_dists, expected), msg)
+            self.assertNotIn(idx, nn_idxs)
+            self.assertEqual(len(set(nn_idxs)), k)
+            self.assertTrue(numpy.allclose(all_dists[idx, nn_idxs], nn_dists))
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
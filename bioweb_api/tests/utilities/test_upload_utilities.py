@@ -0,0 +1,150 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Imports
+#=============================================================================
+import hashlib
+import os
+import unittest
+
+from bioweb_api import TMP_PATH
+from bioweb_api.utilities.io_utilities import safe_make_dirs
+from bioweb_api.utilities.upload_utilities import MultipartUploadParser
+
+#=============================================================================
+# Setup Logging
+#=============================================================================
+import tornado.options
+tornado.options.parse_command_line()
+
+#=============================================================================
+# Private Global Variables
+#=============================================================================
+_BOUNDARY     = "----bioweb-test-boundary"
+_CONTENT_TYPE = "multipart/form-data; boundary=%s" % _BOUNDARY
+_FIRST_DATA   = "first file\r\n--not-a-boundary\r\n" * 100
+_SECOND_DATA  = "".join(chr(i % 256) for i in range(5000))
+
+#=============================================================================
+# Class
+#=============================================================================
+class TestMultipartUploadParser(unittest.TestCase):
+    def setUp(self):
+        safe_make_dirs(TMP_PATH)
+
+    def test_boundary_split_across_chunks(self):
+        body   = self._make_body([("images", "first.tgz", _FIRST_DATA)])
+        parser = MultipartUploadParser(_CONTENT_TYPE)
+        # Feed the body a byte at a time, so every delimiter is split
+        for i in range(len(body)):
+            parser.data_received(body[i])
+        self.assertTrue(parser.complete)
+
+        files = parser.finish()
+        try:
+            self._check_upload(files["images"], "first.tgz", _FIRST_DATA)
+        finally:
+            parser.abort()
+
+    def test_several_parts(self):
+        body   = self._make_body([("images", "first.tgz", _FIRST_DATA),
+                                  ("name", None, "my_stack"),
+                                  ("exp_def", "second.bin", _SECOND_DATA)])
+        parser = MultipartUploadParser(_CONTENT_TYPE)
+        for i in range(0, len(body), 1000):
+            parser.data_received(body[i:i + 1000])
+        self.assertTrue(parser.complete)
+
+        files = parser.finish()
+        try:
+            # Non-file parts are discarded
+            self.assertEqual(sorted(files.keys()), ["exp_def", "images"])
+            self._check_upload(files["images"], "first.tgz", _FIRST_DATA)
+            self._check_upload(files["exp_def"], "second.bin", _SECOND_DATA)
+        finally:
+            parser.abort()
+
+    def test_truncated_body(self):
+        body   = self._make_body([("images", "first.tgz", _FIRST_DATA)])
+        parser = MultipartUploadParser(_CONTENT_TYPE)
+        parser.data_received(body[:len(body) // 2])
+        self.assertFalse(parser.complete)
+
+        path = parser.files["images"].path
+        with self.assertRaises(Exception):
+            parser.finish()
+        self.assertFalse(os.path.exists(path))
+
+    def test_abort(self):
+        body   = self._make_body([("images", "first.tgz", _FIRST_DATA)])
+        parser = MultipartUploadParser(_CONTENT_TYPE)
+        parser.data_received(body[:len(body) // 2])
+        path = parser.files["images"].path
+        self.assertTrue(os.path.exists(path))
+
+        parser.abort()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(parser.complete)
+
+        # The rest of the body is ignored
+        parser.data_received(body[len(body) // 2:])
+        self.assertFalse(parser.complete)
+        self.assertFalse(os.path.exists(path))
+
+    def test_duplicate_name(self):
+        body   = self._make_body([("images", "first.tgz", _FIRST_DATA),
+                                  ("images", "second.bin", _SECOND_DATA)])
+        parser = MultipartUploadParser(_CONTENT_TYPE)
+        with self.assertRaises(Exception):
+            parser.data_received(body)
+        path = parser.files["images"].path
+
+        parser.abort()
+        self.assertEqual(len(parser.files), 1)
+        self.assertFalse(os.path.exists(path))
+
+    def _check_upload(self, upload, filename, data):
+        self.assertEqual(upload.filename, filename)
+        self.assertEqual(upload.checksum, hashlib.md5(data).hexdigest())
+        with open(upload.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    @staticmethod
+    def _make_body(parts):
+        '''
+        Make a multipart/form-data body from a list of (name, filename, data)
+        tuples. Parts with no filename are plain fields.
+        '''
+        body = []
+        for name, filename, data in parts:
+            disposition = 'form-data; name="%s"' % name
+            if filename is not None:
+                disposition += '; filename="%s"' % filename
+            body.append("--%s\r\n" % _BOUNDARY)
+            body.append("Content-Disposition: %s\r\n\r\n" % disposition)
+            body.append(data + "\r\n")
+        body.append("--%s--\r\n" % _BOUNDARY)
+        return "".join(body)
+
+#=============================================================================
+# Main
+#=============================================================================
+if __name__ == "__main__":
+    unittest.main()
@@ -36,7 +36,8 @@ from flask import make_response, jsonify
 from bioweb_api import ARCHIVES_PATH, RESULTS_PATH, HOSTNAME, PORT, FA_PROCESS_COLLECTION, \
     HOME_DIR, DAYS_TO_EXPIRE
 from bioweb_api.apis.ApiConstants import VALID_HAM_IMAGE_EXTENSIONS, STATUS, RUNNING, \
-    SUBMITTED, SUBMIT_DATESTAMP, URL, RESULT, PA_DOCUMENT, ID_DOCUMENT, AC_DOCUMENT
+    SUBMITTED, SUBMIT_DATESTAMP, URL, RESULT, PA_DOCUMENT, ID_DOCUMENT, AC_DOCUMENT, \
+    UUID
 from bioweb_api.DbConnector import DbConnector
 
 #===============================================================================
@@ -310,12 +311,27 @@ def get_subfolders(folder):
     subs = [os.path.join(folder, sf) for sf in os.listdir(folder)]
     return [f for f in subs if os.path.isdir(f)]
 
-def delete_unfinished_jobs(collection):
+def get_dir_stamp(path):
+    """
+    Return the (mtime, inode) of a directory. A directory's mtime changes when
+    entries are added to or removed from it and its inode changes when it is
+    replaced, so directories whose stamp is unchanged needn't be listed again.
+    """
+    st = os.stat(path)
+    return (st.st_mtime, st.st_ino)
+
+def delete_unfinished_jobs(collection, exclude_uuids=None):
     """
     Delete jobs with status running or submitted given a collection.
+
+    @param collection:      Job collection.
+    @param exclude_uuids:   Optional list of uuids of jobs to keep, e.g. jobs
+                            resumed by the ExecutionManager.
     """
-    _DB_CONNECTOR.remove(collection, {STATUS: {'$in': [RUNNING, SUBMITTED]}},
-                         {'multi': True})
+    criteria = {STATUS: {'$in': [RUNNING, SUBMITTED]}}
+    if exclude_uuids:
+        criteria[UUID] = {'$nin': exclude_uuids}
+    _DB_CONNECTOR.remove(collection, criteria, {'multi': True})
 
 def delete_tsv(collection):
     """
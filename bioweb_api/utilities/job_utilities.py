@@ -0,0 +1,253 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+#===============================================================================
+# Imports
+#===============================================================================
+import hashlib
+import json
+import os
+import shutil
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from bioweb_api import PA_PROCESS_COLLECTION, PA_CONVERT_IMAGES_COLLECTION, \
+    PA_PLOTS_COLLECTION, SA_IDENTITY_COLLECTION, SA_ASSAY_CALLER_COLLECTION, \
+    SA_GENOTYPER_COLLECTION, SA_EXPLORATORY_COLLECTION, FA_PROCESS_COLLECTION
+from bioweb_api.apis.ApiConstants import ID, UUID, JOB_NAME, PA_PROCESS_UUID, \
+    STATUS, SUBMIT_DATESTAMP, ARCHIVE, STAGE_KEY, RESULT, FINISH_DATESTAMP, \
+    JOB_STATUS, PARAM_KEYS
+from bioweb_api.DbConnector import DbConnector
+from bioweb_api.apis.exp_def.ExpDefCache import ExpDefCache
+from bioweb_api.utilities.logging_utilities import APP_LOGGER, VERSION
+
+#===============================================================================
+# Private Global Variables
+#===============================================================================
+_DB_CONNECTOR = DbConnector.Instance()
+
+# Fields that identify a job within each job collection. Full analysis job
+# names are reused when a workflow is resubmitted with different parameters,
+# so only full analysis uuids are unique.
+_JOB_IDENTITY_FIELDS = {
+                        PA_PROCESS_COLLECTION:        [UUID, JOB_NAME],
+                        PA_CONVERT_IMAGES_COLLECTION: [UUID, JOB_NAME],
+                        PA_PLOTS_COLLECTION:          [UUID, PA_PROCESS_UUID],
+                        SA_IDENTITY_COLLECTION:       [UUID, JOB_NAME],
+                        SA_ASSAY_CALLER_COLLECTION:   [UUID, JOB_NAME],
+                        SA_GENOTYPER_COLLECTION:      [UUID, JOB_NAME],
+                        SA_EXPLORATORY_COLLECTION:    [UUID, JOB_NAME],
+                        FA_PROCESS_COLLECTION:        [UUID],
+                       }
+
+# Indexes backing the status/since filters and submit date sort of job GETs.
+# Sorts break ties on _id, so it is included to keep sorts index-backed.
+_JOB_QUERY_INDEXES = [
+                      [(SUBMIT_DATESTAMP, 1), (ID, 1)],
+                      [(STATUS, 1), (SUBMIT_DATESTAMP, 1), (ID, 1)],
+                     ]
+
+# Full analysis jobs are also looked up by archive and by parameter keys
+_FA_QUERY_INDEXES = [
+                     [(ARCHIVE, 1)],
+                     [(PARAM_KEYS, 1)],
+                    ]
+
+# Collections of analysis stages whose results are reused by stage key
+_STAGE_COLLECTIONS = [
+                      PA_PROCESS_COLLECTION,
+                      SA_IDENTITY_COLLECTION,
+                      SA_ASSAY_CALLER_COLLECTION,
+                      SA_GENOTYPER_COLLECTION,
+                     ]
+_STAGE_QUERY_INDEX = [(STAGE_KEY, 1), (STATUS, 1), (FINISH_DATESTAMP, -1)]
+
+#===============================================================================
+# Classes
+#===============================================================================
+class JobExistsError(Exception):
+    '''
+    Raised by insert_job() when a job with the same identity already exists.
+    '''
+    pass
+
+#===============================================================================
+# Utility Methods
+#===============================================================================
+def ensure_job_indexes():
+    '''
+    Ensure every job collection has a unique index on each of its identity
+    fields. If a collection already contains duplicate values for a field
+    (e.g. records created before the index existed), a non-unique index is
+    created instead so lookups remain indexed, and a warning is logged. Also
+    ensure the indexes used to filter and sort jobs exist.
+    '''
+    for collection, fields in _JOB_IDENTITY_FIELDS.iteritems():
+        for field in fields:
+            try:
+                _DB_CONNECTOR.create_index(collection, field, unique=True,
+                                           sparse=True)
+            except OperationFailure:
+                APP_LOGGER.warning("Unable to create unique %s index on %s, " \
+                                   "falling back to non-unique index. Remove " \
+                                   "duplicate %s values and drop the index " \
+                                   "to enforce uniqueness." % (field,
+                                   collection, field))
+                _DB_CONNECTOR.create_index(collection, field)
+
+        for keys in _JOB_QUERY_INDEXES:
+            _DB_CONNECTOR.create_index(collection, keys)
+
+    for keys in _FA_QUERY_INDEXES:
+        _DB_CONNECTOR.create_index(FA_PROCESS_COLLECTION, keys)
+
+    for collection in _STAGE_COLLECTIONS:
+        _DB_CONNECTOR.create_index(collection, _STAGE_QUERY_INDEX)
+
+def job_exists(collection, field, value):
+    '''
+    Determine whether a job with the provided value for field exists in the
+    provided collection.
+    '''
+    return _DB_CONNECTOR.exists(collection, {field: value})
+
+def job_name_exists(collection, job_name):
+    '''
+    Determine whether a job with the provided name exists in the provided
+    collection.
+    '''
+    return job_exists(collection, JOB_NAME, job_name)
+
+def insert_job(collection, document):
+    '''
+    Insert a job document. Uniqueness is enforced by the indexes created in
+    ensure_job_indexes(), so two concurrent submissions of the same job can't
+    both succeed.
+
+    @param collection - Name of job collection.
+    @param document   - Job document to insert.
+
+    @raises JobExistsError if a job with the same identity already exists.
+    '''
+    try:
+        _DB_CONNECTOR.insert(collection, [document])
+    except DuplicateKeyError:
+        # The insert added an _id to the document, but nothing was stored
+        document.pop(ID, None)
+        raise JobExistsError('Job %s already exists in %s collection' %
+                             (document.get(JOB_NAME, document[UUID]), collection))
+
+def get_stage_key(stage, source, parameters):
+    '''
+    Return the key that identifies the result of an analysis stage: a hash of
+    the stage, its input and its parameters. Jobs with the same key produce
+    the same results. The API version is included, so results are never
+    reused across releases of the analysis code.
+
+    @param stage      - Name of the stage, e.g. PROCESS.
+    @param source     - Identifies the stage's input, e.g. the archive name
+                        or the key returned by get_source_key().
+    @param parameters - Dictionary of the parameters that affect the result.
+
+    @return md5 hex digest.
+    '''
+    canonical = json.dumps([stage, source, parameters, VERSION],
+                           sort_keys=True, default=str)
+    return hashlib.md5(canonical).hexdigest()
+
+def get_exp_def_key(exp_def):
+    '''
+    Return the stage key parameter that identifies an experiment definition:
+    its uuid and a digest of its cached content, so results computed from a
+    definition aren't reused once it's replaced.
+
+    @param exp_def - Name or uuid of the experiment definition.
+
+    @return String.
+    '''
+    exp_def_cache = ExpDefCache.Instance()
+    uuid   = exp_def_cache.get_uuid(exp_def)
+    digest = exp_def_cache.digest(uuid) if uuid is not None else None
+    if digest is None:
+        raise Exception("Unable to identify experiment definition %s." % exp_def)
+    return "%s:%s" % (uuid, digest)
+
+def get_source_key(collection, uuid):
+    '''
+    Return the stage key of the job whose result is the input of another
+    stage. Jobs submitted before stage keys were recorded are identified by
+    their uuid.
+
+    @param collection - Name of the input job's collection.
+    @param uuid       - Uuid of the input job.
+    '''
+    records = _DB_CONNECTOR.find(collection, {UUID: uuid}, [STAGE_KEY])
+    if records and records[0].get(STAGE_KEY):
+        return records[0][STAGE_KEY]
+    return uuid
+
+def reuse_stage_result(collection, stage_key, uuid, output_paths):
+    '''
+    Find the most recent succeeded job with the same stage key whose result
+    still exists and link its result files to the output paths of the job
+    identified by uuid, so the job doesn't have to be run. Output paths are
+    named after the job's uuid, so the matching result files are those named
+    after the succeeded job's uuid with the same suffix. Result files are
+    hard linked, so deleting either job doesn't affect the other.
+
+    @param collection   - Name of the job collection.
+    @param stage_key    - Key returned by get_stage_key(), or None if the job
+                          has none.
+    @param uuid         - Uuid of the job that would reuse the result.
+    @param output_paths - Paths of the job's result files. The first is its
+                          main result, which the reused job must have.
+
+    @return Document of the job whose result was reused, or None if there
+            isn't one.
+    '''
+    if stage_key is None:
+        return None
+
+    records = _DB_CONNECTOR.find(collection,
+                                 {STAGE_KEY: stage_key,
+                                  STATUS: JOB_STATUS.succeeded}, # @UndefinedVariable
+                                 sort=[(FINISH_DATESTAMP, -1)])
+    for record in records:
+        result = record.get(RESULT)
+        if record[UUID] == uuid or not result or not os.path.isfile(result):
+            continue
+
+        folder = os.path.dirname(result)
+        for path in output_paths:
+            suffix = os.path.basename(path)[len(uuid):]
+            src    = os.path.join(folder, record[UUID] + suffix)
+            if os.path.isfile(src):
+                _link_file(src, path)
+        APP_LOGGER.info("Job %s reused the result of job %s in %s." %
+                        (uuid, record[UUID], collection))
+        return record
+    return None
+
+def _link_file(src, dst):
+    '''
+    Hard link src to dst, copying it if they're on different file systems.
+    '''
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
@@ -0,0 +1,41 @@
+'''
+Copyright 2016 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+
+#=============================================================================
+# Functions
+#=============================================================================
+def terminate_pool(pool, futures=()):
+    '''
+    Shut down a ProcessPoolExecutor whose work didn't finish, e.g. because it
+    timed out. Pending futures are cancelled and the worker processes are
+    killed, so shutting it down doesn't wait for them.
+
+    @param pool:    ProcessPoolExecutor
+    @param futures: Futures submitted to the pool.
+    '''
+    for future in futures:
+        future.cancel()
+
+    processes = pool._processes or ()
+    if isinstance(processes, dict):
+        processes = processes.values()
+    for process in list(processes):
+        if process.is_alive():
+            process.terminate()
+    pool.shutdown(wait=False)
@@ -0,0 +1,56 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+#===============================================================================
+# Imports
+#===============================================================================
+import numpy
+
+from scipy.spatial import cKDTree
+
+#===============================================================================
+# Utility Methods
+#===============================================================================
+def nearest_neighbors(points, k=1):
+    '''
+    Find the k nearest neighbors of every point using a KD-tree, so a dense
+    matrix of the distances between every pair of points is never built.
+
+    @param points: 2D numpy array with a row for each point.
+    @param k:      Number of neighbors to find for each point. At most
+                   len(points) - 1 neighbors are found.
+
+    @return Tuple of 2D numpy arrays containing the distances to and the
+            indexes of each point's nearest neighbors, nearest first. A point
+            isn't its own neighbor.
+    '''
+    npoints = len(points)
+    k       = min(k, npoints - 1)
+    if k < 1:
+        return numpy.empty((npoints, 0)), numpy.empty((npoints, 0), dtype=int)
+
+    dists, idxs = cKDTree(points).query(points, k=k+1)
+    dists = dists.reshape(npoints, -1)
+    idxs  = idxs.reshape(npoints, -1)
+
+    # A point with duplicates may not be returned as its own neighbor, in
+    # which case its furthest neighbor is dropped instead
+    is_self = idxs == numpy.arange(npoints).reshape(-1, 1)
+    is_self[~is_self.any(axis=1), -1] = True
+
+    return dists[~is_self].reshape(npoints, k), idxs[~is_self].reshape(npoints, k)
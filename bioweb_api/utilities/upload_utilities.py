@@ -0,0 +1,326 @@
+'''
+Copyright 2014 Bio-Rad Laboratories, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+@author: Dan DiCara
+@date:   Oct 18, 2026
+'''
+#===============================================================================
+# Imports
+#===============================================================================
+import cgi
+import hashlib
+import os
+import shutil
+import tarfile
+import threading
+import zlib
+
+from uuid import uuid4
+
+from tornado.httputil import HTTPHeaders
+
+from bioweb_api import TMP_PATH
+from bioweb_api.utilities.io_utilities import silently_remove_file
+from bioweb_api.utilities.logging_utilities import APP_LOGGER
+
+#===============================================================================
+# Private Global Variables
+#===============================================================================
+_READ_SIZE = 1024*1024
+
+#===============================================================================
+# Utility Methods
+#===============================================================================
+def save_upload(file_storage, path):
+    '''
+    Save an uploaded file to path and return its tar members and checksum.
+    Uploads streamed to disk by the server are moved to path, and the members
+    and checksum computed while they streamed in are returned. Other uploads
+    are saved, then read once to compute them.
+
+    @param file_storage: UploadedFile or werkzeug FileStorage.
+    @param path:         Path to save the file to.
+
+    @return Tuple containing a list of TarInfo objects, or None if the file
+            isn't a tar file, and the md5 hex digest of the file.
+    '''
+    if isinstance(file_storage, UploadedFile):
+        file_storage.save(path)
+        return file_storage.members, file_storage.checksum
+
+    file_storage.save(path)
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        reader  = _HashingReader(f, md5)
+        members = read_tar_members(reader)
+        while reader.read(_READ_SIZE):
+            pass
+    return members, md5.hexdigest()
+
+def read_tar_members(fileobj):
+    '''
+    Read the headers of a (possibly compressed) tar file in a single pass
+    over fileobj, which is read sequentially.
+
+    @return List of TarInfo objects, or None if fileobj isn't a readable tar
+            file.
+    '''
+    try:
+        tf = tarfile.open(fileobj=fileobj, mode="r|*")
+        try:
+            return list(tf)
+        finally:
+            tf.close()
+    except (tarfile.TarError, IOError, EOFError, ValueError, zlib.error):
+        return None
+
+#===============================================================================
+# Classes
+#===============================================================================
+class _HashingReader(object):
+    '''
+    File-like object that updates a hash with everything read from fileobj.
+    '''
+    def __init__(self, fileobj, hash_obj):
+        self._fileobj = fileobj
+        self._hash    = hash_obj
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self._hash.update(data)
+        return data
+
+class _GrowingFileReader(object):
+    '''
+    File-like object that reads an UploadedFile while it is being written,
+    waiting for data rather than returning end of file until the upload is
+    finished.
+    '''
+    def __init__(self, upload):
+        self._upload = upload
+        self._file   = open(upload.path, "rb")
+        self._pos    = 0
+
+    def read(self, size=-1):
+        with self._upload._condition:
+            while self._upload._size <= self._pos and \
+                  not self._upload._finished:
+                self._upload._condition.wait()
+            available = self._upload._size - self._pos
+        if size < 0 or size > available:
+            size = available
+        data = self._file.read(size)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+class UploadedFile(object):
+    '''
+    A file part of a multipart request body, written to TMP_PATH as it is
+    received. An md5 checksum is computed from the written chunks, and the
+    tar headers are read from the file in a separate thread as it grows, so
+    both are available as soon as the upload finishes without reading the
+    file again. Mimics the parts of werkzeug's FileStorage used by API
+    functions.
+    '''
+    def __init__(self, filename):
+        self.filename   = filename
+        self.path       = os.path.join(TMP_PATH, "%s.upload" % uuid4())
+        self.members    = None
+        self._md5       = hashlib.md5()
+        self._file      = open(self.path, "wb")
+        self._size      = 0
+        self._finished  = False
+        self._condition = threading.Condition()
+        self._reader    = threading.Thread(target=self._read_members)
+        self._reader.daemon = True
+        self._reader.start()
+
+    @property
+    def checksum(self):
+        return self._md5.hexdigest()
+
+    def write(self, data):
+        self._md5.update(data)
+        self._file.write(data)
+        self._file.flush()
+        with self._condition:
+            self._size += len(data)
+            self._condition.notify_all()
+
+    def finish(self):
+        '''
+        Mark the upload as complete and wait for its headers to be read.
+        '''
+        self._file.close()
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+        self._reader.join()
+
+    def save(self, dst):
+        '''
+        Move the finished upload to dst.
+        '''
+        shutil.move(self.path, dst)
+
+    def close(self):
+        '''
+        Remove the upload if it wasn't saved.
+        '''
+        if not self._finished:
+            self.finish()
+        silently_remove_file(self.path)
+
+    def _read_members(self):
+        reader = _GrowingFileReader(self)
+        try:
+            self.members = read_tar_members(reader)
+        except:
+            APP_LOGGER.exception("Failure reading tar headers of upload %s." %
+                                 self.filename)
+        finally:
+            reader.close()
+
+class MultipartUploadParser(object):
+    '''
+    Incremental multipart/form-data parser. File parts are written to
+    UploadedFiles as chunks of the request body arrive, so the body is never
+    held in memory. Other parts are discarded, since API functions only read
+    files from the body. A part with the same name as an earlier file part
+    is rejected, as is the whole request.
+
+    Chunks may be fed from a different thread than the one that aborts the
+    upload, e.g. when the client disconnects, so both are serialized.
+    '''
+    _PREAMBLE = 0
+    _HEADERS  = 1
+    _BODY     = 2
+    _DONE     = 3
+    _ABORTED  = 4
+
+    def __init__(self, content_type):
+        _, params = cgi.parse_header(content_type)
+        boundary  = params.get("boundary")
+        if not boundary:
+            raise Exception("Multipart request is missing a boundary.")
+        self.files      = dict()
+        self._first     = "--%s\r\n" % boundary
+        self._delimiter = "\r\n--%s" % boundary
+        self._buffer    = ""
+        self._state     = self._PREAMBLE
+        self._upload    = None
+        self._lock      = threading.Lock()
+
+    @property
+    def complete(self):
+        '''
+        True if the closing delimiter of the body has been received.
+        '''
+        return self._state == self._DONE
+
+    def data_received(self, chunk):
+        '''
+        Parse the next chunk of the body, writing file data to disk. Raises
+        an exception if the body is malformed, in which case the caller
+        should abort.
+        '''
+        with self._lock:
+            self._buffer += chunk
+            while self._parse():
+                pass
+
+    def finish(self):
+        '''
+        Finish every upload and return a dictionary of field name to
+        UploadedFile.
+        '''
+        if not self.complete:
+            self.abort()
+            raise Exception("Multipart request body is incomplete.")
+        with self._lock:
+            for upload in self.files.itervalues():
+                upload.finish()
+        return self.files
+
+    def abort(self):
+        '''
+        Remove every upload, e.g. when the client disconnects.
+        '''
+        with self._lock:
+            self._state  = self._ABORTED
+            self._buffer = ""
+            for upload in self.files.itervalues():
+                upload.close()
+
+    def _parse(self):
+        '''
+        Consume as much of the buffer as possible in the current state and
+        return True if the state changed.
+        '''
+        if self._state == self._PREAMBLE:
+            index = self._buffer.find(self._first)
+            if index < 0:
+                return False
+            self._buffer = self._buffer[index + len(self._first):]
+            self._state  = self._HEADERS
+        elif self._state == self._HEADERS:
+            index = self._buffer.find("\r\n\r\n")
+            if index < 0:
+                return False
+            self._start_part(self._buffer[:index])
+            self._buffer = self._buffer[index + 4:]
+            self._state  = self._BODY
+        elif self._state == self._BODY:
+            index = self._buffer.find(self._delimiter)
+            end   = index + len(self._delimiter)
+            if index < 0 or len(self._buffer) < end + 2:
+                # Keep enough of the buffer to match a delimiter split across
+                # chunks
+                keep = len(self._delimiter) + 2
+                if len(self._buffer) > keep:
+                    self._write(self._buffer[:-keep])
+                    self._buffer = self._buffer[-keep:]
+                return False
+            self._write(self._buffer[:index])
+            self._upload = None
+            if self._buffer[end:end + 2] == "--":
+                self._buffer = ""
+                self._state  = self._DONE
+            else:
+                self._buffer = self._buffer[end + 2:]
+                self._state  = self._HEADERS
+        else:
+            self._buffer = ""
+            return False
+        return True
+
+    def _start_part(self, header_data):
+        headers = HTTPHeaders.parse(header_data.decode("utf-8"))
+        disposition, params = cgi.parse_header(
+            headers.get("Content-Disposition", ""))
+        if disposition == "form-data" and "name" in params and \
+           "filename" in params:
+            if params["name"] in self.files:
+                raise Exception("Multipart request has more than one file " \
+                                "named %s." % params["name"])
+            self._upload = UploadedFile(params["filename"])
+            self.files[params["name"]] = self._upload
+
+    def _write(self, data):
+        if self._upload is not None and data:
+            self._upload.write(data)